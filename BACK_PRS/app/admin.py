@@ -1,12 +1,57 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils import timezone
 
+from .domain.events import PrestamoEvento
+from .domain.ports.versiones import (
+    COLECCION_EMPLEADOS,
+    COLECCION_PRESTAMOS,
+    COLECCION_RADIOS,
+    COLECCION_SAP_USUARIOS,
+)
+from .infrastructure.broker import OnCommitPrestamoPublisher
 from .infrastructure.models import (
     EmpleadoModel,
     RadioFrecuenciaModel,
     SapUsuarioModel,
     PrestamoModel,
+    PrestamoHistoricoModel,
 )
+from .infrastructure.mappers import prestamo_from_model
+from .infrastructure.reportes import DjangoResumenesRepository
+from .infrastructure.repositories import DjangoVersionColeccionRepository
+
+_versiones = DjangoVersionColeccionRepository()
+_resumenes = DjangoResumenesRepository()
+_eventos = OnCommitPrestamoPublisher()
+
+
+# ---------- Versionado (el admin escribe sin pasar por los servicios) ----------
+class VersionedAdminMixin:
+    """Incrementa la version de las colecciones afectadas para invalidar ETags de la API."""
+
+    colecciones: tuple = ()
+
+    def _marcar_cambio(self):
+        for coleccion in self.colecciones:
+            _versiones.incrementar(coleccion)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self._marcar_cambio()
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        self._marcar_cambio()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._marcar_cambio()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        self._marcar_cambio()
+
 
 # ---------- Inlines ----------
 class SapUsuarioInline(admin.TabularInline):
@@ -17,7 +62,8 @@ class SapUsuarioInline(admin.TabularInline):
 
 # ---------- Empleado ----------
 @admin.register(EmpleadoModel)
-class EmpleadoAdmin(admin.ModelAdmin):
+class EmpleadoAdmin(VersionedAdminMixin, admin.ModelAdmin):
+    colecciones = (COLECCION_EMPLEADOS, COLECCION_SAP_USUARIOS)
     list_display = ("cedula", "nombre", "activo", "total_prestamos")
     search_fields = ("cedula", "nombre")
     list_filter = ("activo",)
@@ -25,11 +71,15 @@ class EmpleadoAdmin(admin.ModelAdmin):
 
     @admin.display(description="Préstamos")
     def total_prestamos(self, obj):
-        return PrestamoModel.objects.filter(cedula=obj.cedula).count()
+        return (
+            PrestamoModel.objects.filter(cedula=obj.cedula).count()
+            + PrestamoHistoricoModel.objects.filter(cedula=obj.cedula).count()
+        )
 
 # ---------- RadioFrecuencia ----------
 @admin.register(RadioFrecuenciaModel)
-class RadioFrecuenciaAdmin(admin.ModelAdmin):
+class RadioFrecuenciaAdmin(VersionedAdminMixin, admin.ModelAdmin):
+    colecciones = (COLECCION_RADIOS,)
     list_display = ("codigo", "descripcion", "activo", "prestamos_abiertos")
     search_fields = ("codigo", "descripcion")
     list_filter = ("activo",)
@@ -43,7 +93,8 @@ class RadioFrecuenciaAdmin(admin.ModelAdmin):
 
 # ---------- SAP Usuario ----------
 @admin.register(SapUsuarioModel)
-class SapUsuarioAdmin(admin.ModelAdmin):
+class SapUsuarioAdmin(VersionedAdminMixin, admin.ModelAdmin):
+    colecciones = (COLECCION_SAP_USUARIOS,)
     list_display = ("username", "empleado", "activo")
     search_fields = ("username", "empleado__nombre", "empleado__cedula")
     list_filter = ("activo",)
@@ -52,13 +103,29 @@ class SapUsuarioAdmin(admin.ModelAdmin):
 # ---------- Acciones para Préstamos ----------
 @admin.action(description="Marcar seleccionados como DEVUELTO (fecha ahora)")
 def marcar_como_devuelto(modeladmin, request, queryset):
-    qs = queryset.filter(fecha_hora_devolucion__isnull=True)
-    n = qs.update(fecha_hora_devolucion=timezone.now(), estado="DEVUELTO")
+    with transaction.atomic():
+        # Tomado con el lock de escritura (BEGIN IMMEDIATE): updated_at sigue el orden de commit
+        ahora = timezone.now()
+        abiertos = list(queryset.filter(fecha_hora_devolucion__isnull=True).select_related("usuario_registra"))
+        # update() no dispara auto_now: se fija updated_at para que la sincronizacion delta vea el cambio
+        n = PrestamoModel.objects.filter(id__in=[p.id for p in abiertos]).update(
+            fecha_hora_devolucion=ahora, estado="DEVUELTO", updated_at=ahora
+        )
+        for obj in abiertos:
+            obj.estado, obj.fecha_hora_devolucion = "DEVUELTO", ahora
+        devueltos = [prestamo_from_model(obj) for obj in abiertos]
+        _resumenes.registrar_devoluciones(devueltos)
+        # Como en el servicio: el tablero en vivo recibe la devolucion solo si hay commit
+        for prestamo in devueltos:
+            _eventos.publicar(PrestamoEvento(tipo="devuelto", prestamo=prestamo))
+    if n:
+        _versiones.incrementar(COLECCION_PRESTAMOS)
     modeladmin.message_user(request, f"{n} préstamo(s) marcados como devueltos.")
 
 # ---------- Préstamo ----------
 @admin.register(PrestamoModel)
-class PrestamoAdmin(admin.ModelAdmin):
+class PrestamoAdmin(VersionedAdminMixin, admin.ModelAdmin):
+    colecciones = (COLECCION_PRESTAMOS,)
     date_hierarchy = "fecha_hora_prestamo"
     list_display = (
         "id",
@@ -81,3 +148,55 @@ class PrestamoAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         return qs.select_related("usuario_registra")
+
+    # Editar o borrar aqui no pasa por el servicio: se corrige el resumen diario
+    # en la misma transaccion (resta lo que aportaba antes, suma lo de ahora)
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            antes = []
+            if change:
+                antes = [prestamo_from_model(PrestamoModel.objects.select_related("usuario_registra").get(pk=obj.pk))]
+            super().save_model(request, obj, form, change)
+            _resumenes.registrar_correccion(antes, [prestamo_from_model(obj)])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            _resumenes.registrar_correccion([prestamo_from_model(obj)], [])
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            borrados = [prestamo_from_model(obj) for obj in queryset.select_related("usuario_registra")]
+            _resumenes.registrar_correccion(borrados, [])
+            super().delete_queryset(request, queryset)
+
+
+# ---------- Histórico (solo lectura: lo alimenta el comando archivar_prestamos) ----------
+@admin.register(PrestamoHistoricoModel)
+class PrestamoHistoricoAdmin(admin.ModelAdmin):
+    date_hierarchy = "fecha_hora_prestamo"
+    list_display = (
+        "id",
+        "codigo_radio",
+        "cedula",
+        "empleado_nombre",
+        "usuario_sap",
+        "turno",
+        "fecha_hora_prestamo",
+        "fecha_hora_devolucion",
+        "archivado_en",
+    )
+    list_filter = ("turno", ("fecha_hora_prestamo", admin.DateFieldListFilter))
+    search_fields = ("codigo_radio", "cedula", "empleado_nombre", "usuario_sap")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("usuario_registra")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
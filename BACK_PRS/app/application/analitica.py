@@ -0,0 +1,34 @@
+"""Servicio de aplicacion para las consultas del motor analitico (fuera de la base transaccional)."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from ..domain.errors import BusinessRuleViolation, EntityNotFound
+from ..domain.ports.analitica import AnaliticaRepository
+from ..domain.reportes import CONSULTAS_ANALITICAS, ResultadoAnalitico
+
+ANALITICA_LIMITE_DEFAULT = 100
+ANALITICA_MAX_FILAS = 1000
+
+
+class AnaliticaService:
+    """
+    Valida los parametros de las consultas analiticas. No limita la longitud
+    del rango: las agregaciones corren en el motor columnar sobre una copia de
+    solo lectura, no compiten con el mostrador.
+    """
+
+    def __init__(self, repo: AnaliticaRepository) -> None:
+        self.repo = repo
+
+    def consultar(
+        self, consulta: str, *, desde: datetime, hasta: datetime, limite: int = ANALITICA_LIMITE_DEFAULT
+    ) -> ResultadoAnalitico:
+        if consulta not in CONSULTAS_ANALITICAS:
+            raise EntityNotFound(f"Consulta analítica '{consulta}' no existe.")
+        if hasta <= desde:
+            raise BusinessRuleViolation("'desde' debe ser anterior a 'hasta'.")
+        if not 1 <= limite <= ANALITICA_MAX_FILAS:
+            raise BusinessRuleViolation(f"'limite' debe estar entre 1 y {ANALITICA_MAX_FILAS}.")
+        return self.repo.consultar(consulta, desde=desde, hasta=hasta, limite=limite)
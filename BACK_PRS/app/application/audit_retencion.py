@@ -0,0 +1,62 @@
+"""Servicio de aplicacion para la retencion (compactacion y purga) del log de auditoria."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List, Sequence
+
+from ..domain.errors import BusinessRuleViolation
+from ..domain.events import ReglaRetencionAudit, ResultadoRetencionAudit
+from ..domain.ports.audit import AuditLogRetencionRepository
+
+RETENCION_LOTE_DEFAULT = 500
+
+
+def _validar(reglas: Sequence[ReglaRetencionAudit]) -> List[ReglaRetencionAudit]:
+    claves = [r.clave for r in reglas]
+    if len(set(claves)) != len(claves):
+        raise BusinessRuleViolation("Hay reglas de retención repetidas para el mismo agregado/acción")
+    for r in reglas:
+        for dias in (r.compactar_dias, r.purgar_dias):
+            if dias is not None and dias < 1:
+                raise BusinessRuleViolation("Los días de retención deben ser positivos")
+    return list(reglas)
+
+
+class AuditRetencionService:
+    """Aplica la politica de retencion regla a regla; la mas especifica gana en cada entrada."""
+
+    def __init__(self, repo: AuditLogRetencionRepository, reglas: Sequence[ReglaRetencionAudit]) -> None:
+        self.repo = repo
+        self.reglas = _validar(reglas)
+
+    def aplicar(self, *, ahora: datetime, lote: int = RETENCION_LOTE_DEFAULT) -> ResultadoRetencionAudit:
+        """
+        Compacta y purga por lotes las entradas vencidas segun cada regla. Las
+        entradas cubiertas por una regla mas especifica se excluyen de las
+        generales, asi un "DELETED: conservar 5 años" no lo borra un "*: 2 años".
+        """
+        if lote < 1:
+            raise BusinessRuleViolation("El tamaño de lote debe ser positivo")
+        purgados = compactados = liberados = 0
+        for regla in self.reglas:
+            excluir = [otra.clave for otra in self.reglas if regla.incluye(otra)]
+            comunes = dict(aggregate=regla.aggregate, action=regla.action, excluir=excluir, lote=lote)
+            # Primero se purga: no tiene sentido reescribir filas que se van a borrar
+            if regla.purgar_dias is not None:
+                filas, bytes_ = self.repo.purgar(antes_de=ahora - timedelta(days=regla.purgar_dias), **comunes)
+                purgados += filas
+                liberados += bytes_
+            if regla.compactar_dias is not None:
+                filas, bytes_ = self.repo.compactar(antes_de=ahora - timedelta(days=regla.compactar_dias), **comunes)
+                compactados += filas
+                liberados += bytes_
+        return ResultadoRetencionAudit(purgados=purgados, compactados=compactados, bytes_liberados=liberados)
+
+
+def reglas_desde_config(config: Sequence[dict]) -> List[ReglaRetencionAudit]:
+    """Convierte la configuracion (lista de dicts de settings) en reglas de dominio."""
+    try:
+        return [ReglaRetencionAudit(**item) for item in config]
+    except TypeError as exc:
+        raise BusinessRuleViolation(f"Regla de retención inválida: {exc}") from exc
@@ -14,6 +14,12 @@ from ..domain.ports.repositories import (
 )
 from ..domain.ports.audit import AuditLogRepository
 from ..domain.ports.uow import UnitOfWork
+from ..domain.ports.versiones import (
+    COLECCION_EMPLEADOS,
+    COLECCION_RADIOS,
+    COLECCION_SAP_USUARIOS,
+    VersionColeccionRepository,
+)
 from ..domain.entities import Empleado, RadioFrecuencia, SapUsuario
 
 
@@ -28,6 +34,7 @@ class CatalogosService:
         audit: AuditLogRepository,
         uow: Optional[UnitOfWork] = None,
         clock: Optional[Callable[[], datetime]] = None,
+        versiones: Optional[VersionColeccionRepository] = None,
     ) -> None:
         self.empleados = empleados
         self.radios = radios
@@ -35,6 +42,7 @@ class CatalogosService:
         self.audit = audit
         self.uow = uow
         self._clock = clock or datetime.utcnow
+        self.versiones = versiones
 
     # -------- Helpers --------
     def _ctx(self) -> ContextManager:
@@ -45,6 +53,13 @@ class CatalogosService:
         """Obtiene la marca de tiempo actual desde el clock inyectado."""
         return self._clock()
 
+    def _marcar_cambio(self, *colecciones: str) -> None:
+        """Incrementa la version de las colecciones afectadas (invalida ETags de listados)."""
+        if self.versiones is None:
+            return
+        for coleccion in colecciones:
+            self.versiones.incrementar(coleccion)
+
     # -------- Empleado --------
     def crear_empleado(self, *, cedula: str, nombre: str, activo: bool, actor_user_id: int, reason: Optional[str] = None) -> Empleado:
         """Crea un empleado nuevo y registra el evento de auditoria correspondiente."""
@@ -55,6 +70,7 @@ class CatalogosService:
 
             created = self.empleados.crear(cedula=cedula, nombre=nombre, activo=activo)
 
+            self._marcar_cambio(COLECCION_EMPLEADOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="Empleado",
                 action="CREATED",
@@ -76,6 +92,7 @@ class CatalogosService:
 
             updated = self.empleados.actualizar(cedula=cedula, cambios=cambios)
 
+            self._marcar_cambio(COLECCION_EMPLEADOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="Empleado",
                 action="UPDATED",
@@ -97,6 +114,7 @@ class CatalogosService:
 
             self.empleados.eliminar(cedula=cedula)
 
+            self._marcar_cambio(COLECCION_EMPLEADOS, COLECCION_SAP_USUARIOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="Empleado",
                 action="DELETED",
@@ -118,6 +136,7 @@ class CatalogosService:
 
             created = self.radios.crear(codigo=codigo, descripcion=descripcion, activo=activo)
 
+            self._marcar_cambio(COLECCION_RADIOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="RadioFrecuencia",
                 action="CREATED",
@@ -139,6 +158,7 @@ class CatalogosService:
 
             updated = self.radios.actualizar(codigo=codigo, cambios=cambios)
 
+            self._marcar_cambio(COLECCION_RADIOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="RadioFrecuencia",
                 action="UPDATED",
@@ -160,6 +180,7 @@ class CatalogosService:
 
             self.radios.eliminar(codigo=codigo)
 
+            self._marcar_cambio(COLECCION_RADIOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="RadioFrecuencia",
                 action="DELETED",
@@ -181,6 +202,7 @@ class CatalogosService:
 
             created = self.sap.crear(username=username, empleado_cedula=empleado_cedula, activo=activo)
 
+            self._marcar_cambio(COLECCION_SAP_USUARIOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="SapUsuario",
                 action="CREATED",
@@ -207,6 +229,7 @@ class CatalogosService:
 
             updated = self.sap.actualizar(username=username, cambios=cambios)
 
+            self._marcar_cambio(COLECCION_SAP_USUARIOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="SapUsuario",
                 action="UPDATED",
@@ -236,6 +259,7 @@ class CatalogosService:
 
             self.sap.eliminar(username=username)
 
+            self._marcar_cambio(COLECCION_SAP_USUARIOS)
             self.audit.append(AdminChangeEvent(
                 aggregate="SapUsuario",
                 action="DELETED",
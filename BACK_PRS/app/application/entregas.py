@@ -0,0 +1,90 @@
+"""Servicio de aplicacion para el reporte de cambio de turno (entrega entre supervisores)."""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from typing import Tuple
+
+from ..domain.entities import EntregaTurno, Prestamo
+from ..domain.errors import BusinessRuleViolation
+from ..domain.ports.entregas import EntregasTurnoRepository
+from ..domain.ports.repositories import PrestamoRepository
+from ..domain.rules import DURACION_TURNO, calcular_turno, inicio_turno, ventana_turno
+from ..domain.value_objects import EstadoPrestamo, FiltroPrestamos, Turno
+
+CONGELAR_DIAS_DEFAULT = 1
+
+
+def _al_corte(prestamo: Prestamo, corte: datetime) -> Prestamo:
+    """El prestamo como se veia en ``corte``: una devolucion posterior aun no habia ocurrido."""
+    if prestamo.fecha_hora_devolucion is not None and prestamo.fecha_hora_devolucion > corte:
+        return replace(prestamo, estado=EstadoPrestamo.ASIGNADO, fecha_hora_devolucion=None)
+    return prestamo
+
+
+def turno_anterior(ahora: datetime) -> Tuple[date, Turno]:
+    """(dia, turno) del turno que acaba de terminar en ``ahora``."""
+    inicio = inicio_turno(ahora) - DURACION_TURNO
+    return inicio.date(), calcular_turno(inicio)
+
+
+class EntregasTurnoService:
+    """
+    Arma la foto de cada cambio de turno. La del turno en curso se calcula al
+    momento; la de un turno cerrado ya no cambia, asi que se calcula una vez
+    (al primer pedido o con ``congelar_entregas``) y despues solo se lee.
+    """
+
+    def __init__(self, prestamos: PrestamoRepository, entregas: EntregasTurnoRepository) -> None:
+        self.prestamos = prestamos
+        self.entregas = entregas
+
+    def _calcular(self, *, dia: date, turno: Turno, inicio: datetime, fin: datetime, corte: datetime) -> EntregaTurno:
+        prestados = self.prestamos.iterar(filtro=FiltroPrestamos(desde=inicio, hasta=corte))
+        return EntregaTurno(
+            dia=dia,
+            turno=turno,
+            inicio=inicio,
+            fin=fin,
+            corte=corte,
+            pendientes=[_al_corte(p, corte) for p in self.prestamos.listar_abiertos_en(corte)],
+            prestados=[_al_corte(p, corte) for p in reversed(list(prestados))],
+            devueltos=self.prestamos.listar_devueltos_entre(inicio, corte),
+        )
+
+    def _congelar(self, *, dia: date, turno: Turno, inicio: datetime, fin: datetime, ahora: datetime) -> EntregaTurno:
+        entrega = self._calcular(dia=dia, turno=turno, inicio=inicio, fin=fin, corte=fin)
+        return self.entregas.guardar(replace(entrega, congelada_en=ahora))
+
+    def entrega(self, *, dia: date, turno: Turno, ahora: datetime) -> EntregaTurno:
+        """Foto del ``turno`` que empieza el ``dia`` local; ``ahora`` en hora local define la zona."""
+        inicio, fin = ventana_turno(dia, turno, ahora.tzinfo)
+        if inicio > ahora:
+            raise BusinessRuleViolation("El turno todavía no ha empezado.")
+        if fin > ahora:
+            return self._calcular(dia=dia, turno=turno, inicio=inicio, fin=fin, corte=ahora)
+        congelada = self.entregas.obtener(dia=dia, turno=turno)
+        if congelada is not None:
+            return congelada
+        return self._congelar(dia=dia, turno=turno, inicio=inicio, fin=fin, ahora=ahora)
+
+    def ultima_entrega(self, *, ahora: datetime) -> EntregaTurno:
+        """Foto del turno que acaba de terminar: lo que recibio el supervisor del turno en curso."""
+        dia, turno = turno_anterior(ahora)
+        return self.entrega(dia=dia, turno=turno, ahora=ahora)
+
+    def congelar_cerradas(self, *, ahora: datetime, dias: int = CONGELAR_DIAS_DEFAULT) -> int:
+        """Congela los turnos cerrados en los ultimos ``dias`` dias que aun no tienen foto; devuelve cuantos."""
+        if dias < 1:
+            raise BusinessRuleViolation("Se debe revisar al menos 1 día.")
+        congeladas = 0
+        inicio = inicio_turno(ahora) - DURACION_TURNO
+        limite = ahora - timedelta(days=dias)
+        while inicio + DURACION_TURNO >= limite:
+            dia, turno = inicio.date(), calcular_turno(inicio)
+            if self.entregas.obtener(dia=dia, turno=turno) is None:
+                self._congelar(dia=dia, turno=turno, inicio=inicio, fin=inicio + DURACION_TURNO, ahora=ahora)
+                congeladas += 1
+            inicio -= DURACION_TURNO
+        return congeladas
@@ -0,0 +1,41 @@
+"""Servicio de aplicacion para la exportacion incremental a Parquet (dataset de BI)."""
+
+from __future__ import annotations
+
+from typing import List, Sequence
+
+from ..domain.errors import BusinessRuleViolation
+from ..domain.ports.exportacion import ExportacionParquet
+from ..domain.reportes import TABLAS_PARQUET, ResultadoExportacionParquet
+
+
+class ExportacionParquetService:
+    """
+    Reescribe solo las particiones mensuales que cambiaron desde el ultimo
+    watermark de cada tabla (``updated_at`` en prestamos, ``at`` en audit_log).
+    El watermark se guarda despues de escribir: si el proceso se corta, la
+    siguiente ejecucion vuelve a escribir los mismos meses. Dos ejecuciones
+    simultaneas sobre el mismo destino se excluyen (BusinessRuleViolation).
+    """
+
+    def __init__(self, destino: ExportacionParquet) -> None:
+        self.destino = destino
+
+    def exportar(
+        self, *, tablas: Sequence[str] = TABLAS_PARQUET, completo: bool = False
+    ) -> List[ResultadoExportacionParquet]:
+        desconocidas = [t for t in tablas if t not in TABLAS_PARQUET]
+        if desconocidas:
+            raise BusinessRuleViolation(f"Tablas no exportables: {', '.join(desconocidas)}.")
+        resultados: List[ResultadoExportacionParquet] = []
+        with self.destino.bloqueo():
+            for tabla in tablas:
+                marca = None if completo else self.destino.leer_marca(tabla)
+                meses, nueva = self.destino.meses_modificados(tabla, desde=marca)
+                filas = sum(self.destino.escribir_mes(tabla, mes) for mes in meses)
+                if nueva is not None and nueva != marca:
+                    self.destino.guardar_marca(tabla, nueva)
+                resultados.append(
+                    ResultadoExportacionParquet(tabla=tabla, meses=meses, filas=filas, marca=nueva or marca)
+                )
+        return resultados
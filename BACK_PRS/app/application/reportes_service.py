@@ -0,0 +1,444 @@
+"""Servicios de aplicacion para los reportes agregados de prestamos."""
+
+from __future__ import annotations
+
+import heapq
+import math
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from ..domain.errors import BusinessRuleViolation
+from ..domain.ports.reportes import CacheReportes, ReportesRepository, ResumenesRepository
+from ..domain.ports.versiones import COLECCION_PRESTAMOS, VersionColeccionRepository
+from ..domain.reportes import (
+    DIAS_SEMANA,
+    EVENTO_ASIGNACION,
+    EstadisticasUso,
+    MapaCalor,
+    PicoConcurrencia,
+    PivotEmpleadosMes,
+    PuntoConcurrencia,
+    ReporteConcurrencia,
+    ReporteTurnos,
+    ReporteUtilizacion,
+    UsoEmpleadoMes,
+)
+from ..domain.rules import calcular_turno, fin_turno, inicio_turno
+from ..domain.value_objects import EstadoPrestamo, Turno
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependencia opcional
+    np = None
+
+REPORTE_MAX_DIAS = 366
+CONCURRENCIA_MAX_PUNTOS = 10_000
+PIVOT_MAX_MESES = 36
+UTILIZACION_DISPONIBLE = np is not None
+_PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def _percentiles_por_grupo(grupos, valores, conteos) -> "np.ndarray":
+    """
+    Percentiles (interpolacion lineal, como ``np.percentile``) de ``valores``
+    agrupados por ``grupos`` sin iterar grupos: se ordena una vez por
+    (grupo, valor) y cada percentil se lee por indice. NaN si el grupo esta vacio.
+    """
+    salida = np.full((len(conteos), len(_PERCENTILES)), np.nan)
+    if valores.size == 0:
+        return salida
+    ordenados = valores[np.lexsort((valores, grupos))]
+    inicios = np.concatenate(([0], np.cumsum(conteos)[:-1]))
+    con_datos = conteos > 0
+    for j, q in enumerate(_PERCENTILES):
+        pos = inicios[con_datos] + q * (conteos[con_datos] - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        salida[con_datos, j] = ordenados[lo] + (ordenados[hi] - ordenados[lo]) * (pos - lo)
+    return salida
+
+
+def _opcional(valor: float) -> Optional[float]:
+    return None if np.isnan(valor) else float(valor)
+
+
+Tramo = Tuple[datetime, datetime, int]
+
+
+def _tramos_concurrencia(
+    intervalos: Iterable[Tuple[datetime, Optional[datetime]]],
+    *,
+    desde: datetime,
+    hasta: datetime,
+    ahora: datetime,
+) -> Iterator[Tramo]:
+    """
+    Barrido de linea sobre intervalos ordenados por inicio: produce tramos
+    (inicio, fin, radios en uso) constantes que cubren ``[desde, hasta)``. Solo
+    se guarda un heap con el fin de cada prestamo activo (a lo sumo la flota),
+    asi que la memoria no crece con el numero de prestamos. Los abiertos
+    cuentan como en uso hasta ``ahora``; los instantes salen en la zona de ``ahora``.
+    """
+    tz = ahora.tzinfo
+    desde, hasta = desde.astimezone(tz), hasta.astimezone(tz)
+    fines: List[datetime] = []
+    actual, en_uso = desde, 0
+    for inicio, fin in intervalos:
+        inicio = max(inicio.astimezone(tz), desde)
+        fin = min((fin or ahora).astimezone(tz), hasta)
+        if fin <= inicio:
+            continue
+        while fines and fines[0] <= inicio:
+            t = heapq.heappop(fines)
+            if t > actual:
+                yield actual, t, en_uso
+                actual = t
+            en_uso -= 1
+        if inicio > actual:
+            yield actual, inicio, en_uso
+            actual = inicio
+        en_uso += 1
+        heapq.heappush(fines, fin)
+    while fines:
+        t = heapq.heappop(fines)
+        if t > actual:
+            yield actual, t, en_uso
+            actual = t
+        en_uso -= 1
+    if actual < hasta:
+        yield actual, hasta, 0
+
+
+class _PicosPorVentana:
+    """
+    Pico (y primer instante en que se alcanza) de cada ventana que toca un
+    tramo. Los tramos llegan en orden, asi que basta recordar la ventana actual.
+    """
+
+    def __init__(self, ventana: Callable[[datetime], Tuple[Hashable, datetime]]) -> None:
+        # ventana(t) -> (clave, fin) de la ventana que contiene t
+        self.ventana = ventana
+        self.picos: Dict[Hashable, Tuple[int, datetime]] = {}
+        self._clave: Hashable = None
+        self._fin: Optional[datetime] = None
+        self._pico = -1
+
+    def registrar(self, inicio: datetime, fin: datetime, en_uso: int) -> None:
+        t = inicio
+        while t < fin:
+            if self._fin is None or t >= self._fin:
+                self._clave, self._fin = self.ventana(t)
+                self._pico = -1
+            if en_uso > self._pico:
+                self._pico = en_uso
+                self.picos[self._clave] = (en_uso, t)
+            t = self._fin
+
+
+def _sumar_meses(mes: date, n: int) -> date:
+    """Dia 1 del mes ``n`` meses despues de ``mes``."""
+    indice = mes.year * 12 + mes.month - 1 + n
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _ventana_dia(t: datetime) -> Tuple[date, datetime]:
+    return t.date(), datetime.combine(t.date() + timedelta(days=1), time.min, tzinfo=t.tzinfo)
+
+
+def _ventana_turno(t: datetime) -> Tuple[Tuple[date, Turno], datetime]:
+    return (inicio_turno(t).date(), calcular_turno(t)), fin_turno(t)
+
+
+class ReportesService:
+    """Valida rangos y da forma a los agregados que calcula el repositorio."""
+
+    def __init__(
+        self,
+        repo: ReportesRepository,
+        resumenes: Optional[ResumenesRepository] = None,
+        cache: Optional[CacheReportes] = None,
+        versiones: Optional[VersionColeccionRepository] = None,
+    ) -> None:
+        self.repo = repo
+        self.resumenes = resumenes
+        self.cache = cache
+        self.versiones = versiones
+
+    def reconstruir_resumenes(self, *, desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+        """
+        Recalcula los resumenes diarios del rango (backfill o tras cambios hechos
+        fuera de la API) e invalida los ETags de prestamos: los reportes servidos
+        desde los resumenes pueden haber cambiado.
+        """
+        if self.resumenes is None:
+            raise BusinessRuleViolation("No hay repositorio de resúmenes configurado.")
+        if desde is not None and hasta is not None and hasta < desde:
+            raise BusinessRuleViolation("'desde' no puede ser posterior a 'hasta'.")
+        filas = self.resumenes.reconstruir(desde=desde, hasta=hasta)
+        if self.versiones is not None:
+            self.versiones.incrementar(COLECCION_PRESTAMOS)
+        return filas
+
+    def _prefijo_cache(self) -> str:
+        """
+        Version de prestamos para las claves de la cache: un periodo cerrado
+        puede cambiar por una correccion en el admin o una reconstruccion, y
+        toda escritura incrementa la version, asi que lo guardado con una version
+        anterior ya no se lee (y sale de la cache por reemplazo o expiracion).
+        """
+        if self.versiones is None:
+            return ""
+        return f"v{self.versiones.obtener(COLECCION_PRESTAMOS)}:"
+
+    def turnos_por_dia(self, *, desde: date, hasta: date) -> ReporteTurnos:
+        """Matriz de asignaciones y devoluciones por dia local y turno en ``[desde, hasta]``."""
+        if hasta < desde:
+            raise BusinessRuleViolation("'desde' no puede ser posterior a 'hasta'.")
+        n_dias = (hasta - desde).days + 1
+        if n_dias > REPORTE_MAX_DIAS:
+            raise BusinessRuleViolation(f"El rango no puede superar {REPORTE_MAX_DIAS} dias.")
+
+        turnos = list(Turno)
+        conteos: Dict[Tuple[date, Turno, EstadoPrestamo], int] = {
+            (c.dia, c.turno, c.estado): c.total for c in self.repo.contar_por_turno_dia(desde=desde, hasta=hasta)
+        }
+        dias = [desde + timedelta(days=i) for i in range(n_dias)]
+        asignaciones = [[conteos.get((d, t, EstadoPrestamo.ASIGNADO), 0) for t in turnos] for d in dias]
+        devoluciones = [[conteos.get((d, t, EstadoPrestamo.DEVUELTO), 0) for t in turnos] for d in dias]
+        return ReporteTurnos(dias=dias, turnos=turnos, asignaciones=asignaciones, devoluciones=devoluciones)
+
+    def utilizacion(self, *, desde: datetime, hasta: datetime, ahora: datetime) -> ReporteUtilizacion:
+        """
+        Duracion de prestamos (media, p50, p90, p99), horas en uso y ratio ocioso
+        por radio y de la flota, para los prestamos que se solapan con
+        ``[desde, hasta)``. Las duraciones son las completas de cada prestamo
+        cerrado; las horas en uso se recortan al periodo.
+
+        Las columnas llegan por bloques y se acumulan en arreglos NumPy; todas
+        las agregaciones son vectoriales (bincount / lexsort), sin recorrer
+        prestamos en Python. Los abiertos cuentan como en uso hasta ``ahora``.
+        """
+        if np is None:
+            raise BusinessRuleViolation("El reporte de utilizacion requiere numpy instalado.")
+        if hasta <= desde:
+            raise BusinessRuleViolation("'desde' debe ser anterior a 'hasta'.")
+        if (hasta - desde).days > REPORTE_MAX_DIAS:
+            raise BusinessRuleViolation(f"El rango no puede superar {REPORTE_MAX_DIAS} dias.")
+
+        ini_ts = desde.timestamp()
+        fin_ts = min(hasta, ahora).timestamp()
+        horas_periodo = max(fin_ts - ini_ts, 0.0) / 3600
+
+        # Radios activas primero (aparecen aunque no tengan prestamos), luego las que surjan del historico
+        indice: Dict[str, int] = {codigo: i for i, codigo in enumerate(self.repo.codigos_radios_activos())}
+        codigos_b: List["np.ndarray"] = []
+        inicios_b: List["np.ndarray"] = []
+        fines_b: List["np.ndarray"] = []
+        for bloque in self.repo.iterar_duraciones(desde=desde, hasta=hasta):
+            unicos, inversa = np.unique(np.asarray(bloque.radios), return_inverse=True)
+            ids = np.fromiter((indice.setdefault(str(c), len(indice)) for c in unicos), dtype=np.int64, count=len(unicos))
+            codigos_b.append(ids[inversa])
+            inicios_b.append(np.asarray(bloque.inicios, dtype=np.float64))
+            fines_b.append(np.asarray(bloque.fines, dtype=np.float64))  # None -> NaN (abierto)
+
+        n = len(indice)
+        codigos = np.concatenate(codigos_b) if codigos_b else np.empty(0, dtype=np.int64)
+        inicios = np.concatenate(inicios_b) if inicios_b else np.empty(0)
+        fines = np.concatenate(fines_b) if fines_b else np.empty(0)
+
+        abiertos = np.isnan(fines)
+        inicio_uso = np.maximum(inicios, ini_ts)
+        fin_uso = np.minimum(np.where(abiertos, ahora.timestamp(), fines), fin_ts)
+        horas_uso = np.bincount(codigos, weights=np.clip(fin_uso - inicio_uso, 0, None), minlength=n) / 3600
+
+        cerrados = ~abiertos
+        cod_c = codigos[cerrados]
+        duraciones = (fines[cerrados] - inicios[cerrados]) / 3600
+        n_prestamos = np.bincount(codigos, minlength=n)
+        n_cerrados = np.bincount(cod_c, minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medias = np.bincount(cod_c, weights=duraciones, minlength=n) / n_cerrados
+        pcts = _percentiles_por_grupo(cod_c, duraciones, n_cerrados)
+
+        def ocioso(horas: float, radios: int) -> float:
+            capacidad = horas_periodo * radios
+            return float(min(max(1 - horas / capacidad, 0.0), 1.0)) if capacidad > 0 else 1.0
+
+        codigos_radio = sorted(indice, key=indice.__getitem__)
+        radios = [
+            EstadisticasUso(
+                codigo_radio=codigo,
+                prestamos=int(n_prestamos[i]),
+                cerrados=int(n_cerrados[i]),
+                media_horas=_opcional(medias[i]),
+                p50_horas=_opcional(pcts[i, 0]),
+                p90_horas=_opcional(pcts[i, 1]),
+                p99_horas=_opcional(pcts[i, 2]),
+                horas_en_uso=float(horas_uso[i]),
+                ratio_ocioso=ocioso(float(horas_uso[i]), 1),
+            )
+            for i, codigo in enumerate(codigos_radio)
+        ]
+        radios.sort(key=lambda r: r.codigo_radio)
+
+        flota_pcts = np.percentile(duraciones, [q * 100 for q in _PERCENTILES]) if duraciones.size else [np.nan] * 3
+        total_horas = float(horas_uso.sum())
+        flota = EstadisticasUso(
+            codigo_radio=None,
+            prestamos=int(codigos.size),
+            cerrados=int(duraciones.size),
+            media_horas=float(duraciones.mean()) if duraciones.size else None,
+            p50_horas=_opcional(flota_pcts[0]),
+            p90_horas=_opcional(flota_pcts[1]),
+            p99_horas=_opcional(flota_pcts[2]),
+            horas_en_uso=total_horas,
+            ratio_ocioso=ocioso(total_horas, n),
+        )
+        return ReporteUtilizacion(horas_periodo=horas_periodo, flota=flota, radios=radios)
+
+    def concurrencia(
+        self, *, desde: datetime, hasta: datetime, ahora: datetime, paso_minutos: int = 60
+    ) -> ReporteConcurrencia:
+        """
+        Radios prestadas simultaneamente en ``[desde, hasta)``: pico e instante,
+        serie con el maximo de cada ``paso_minutos`` y picos por dia y turno
+        (en la zona horaria de ``ahora``). Un solo recorrido en orden de inicio,
+        O(n log n) en tiempo; no hay limite de dias, solo de puntos de la serie.
+        """
+        if hasta <= desde:
+            raise BusinessRuleViolation("'desde' debe ser anterior a 'hasta'.")
+        if paso_minutos < 1:
+            raise BusinessRuleViolation("'paso' debe ser de al menos 1 minuto.")
+        paso = timedelta(minutes=paso_minutos)
+        n_puntos = math.ceil((hasta - desde) / paso)
+        if n_puntos > CONCURRENCIA_MAX_PUNTOS:
+            raise BusinessRuleViolation(
+                f"La serie tendria {n_puntos} puntos (maximo {CONCURRENCIA_MAX_PUNTOS}); aumente 'paso'."
+            )
+
+        inicio_serie = desde.astimezone(ahora.tzinfo)
+
+        def ventana_serie(t: datetime) -> Tuple[int, datetime]:
+            k = (t - inicio_serie) // paso
+            return k, inicio_serie + (k + 1) * paso
+
+        serie, dias, turnos = (
+            _PicosPorVentana(ventana_serie),
+            _PicosPorVentana(_ventana_dia),
+            _PicosPorVentana(_ventana_turno),
+        )
+        pico, instante_pico = 0, None
+        intervalos = self.repo.iterar_intervalos(desde=desde, hasta=hasta)
+        for inicio, fin, en_uso in _tramos_concurrencia(intervalos, desde=desde, hasta=hasta, ahora=ahora):
+            if en_uso > pico:
+                pico, instante_pico = en_uso, inicio
+            serie.registrar(inicio, fin, en_uso)
+            dias.registrar(inicio, fin, en_uso)
+            turnos.registrar(inicio, fin, en_uso)
+
+        orden_turno = {t: i for i, t in enumerate(Turno)}
+        picos_dia = [
+            PicoConcurrencia(dia=dia, turno=None, pico=valor, instante=t if valor else None)
+            for dia, (valor, t) in sorted(dias.picos.items())
+        ]
+        picos_turno = [
+            PicoConcurrencia(dia=dia, turno=turno, pico=valor, instante=t if valor else None)
+            for (dia, turno), (valor, t) in sorted(
+                turnos.picos.items(), key=lambda kv: (kv[0][0], orden_turno[kv[0][1]])
+            )
+        ]
+        return ReporteConcurrencia(
+            pico=pico,
+            instante_pico=instante_pico,
+            paso_minutos=paso_minutos,
+            serie=[
+                PuntoConcurrencia(inicio=inicio_serie + k * paso, maximo=serie.picos.get(k, (0, None))[0])
+                for k in range(n_puntos)
+            ],
+            dias=picos_dia,
+            turnos=picos_turno,
+        )
+
+    def mapa_calor(self, *, desde: date, hasta: date, hoy: date, turno: Optional[Turno] = None) -> MapaCalor:
+        """
+        Asignaciones y devoluciones por dia de la semana y hora local en los
+        dias ``[desde, hasta]``. Cada evento cuenta en su propio instante, asi
+        que la operacion normal no cambia un rango que termino antes de ``hoy``:
+        ese resultado se guarda en la cache (si hay) bajo la version de
+        prestamos y las consultas siguientes no tocan la base mientras no haya
+        otra escritura.
+        """
+        if hasta < desde:
+            raise BusinessRuleViolation("'desde' no puede ser posterior a 'hasta'.")
+        cerrado = self.cache is not None and hasta < hoy
+        clave = f"{self._prefijo_cache() if cerrado else ''}mapa-calor:{desde.isoformat()}:{hasta.isoformat()}:{turno.name if turno else '*'}"
+        if cerrado:
+            guardado = self.cache.obtener(clave)
+            if guardado is not None:
+                return guardado
+
+        asignaciones = [[0] * 24 for _ in DIAS_SEMANA]
+        devoluciones = [[0] * 24 for _ in DIAS_SEMANA]
+        for c in self.repo.contar_por_hora_semana(desde=desde, hasta=hasta, turno=turno):
+            matriz = asignaciones if c.evento == EVENTO_ASIGNACION else devoluciones
+            matriz[c.dia_semana][c.hora] += c.total
+        mapa = MapaCalor(asignaciones=asignaciones, devoluciones=devoluciones)
+
+        if cerrado:
+            self.cache.guardar(clave, mapa)
+        return mapa
+
+    def uso_empleados_mes(self, *, desde: date, hasta: date, hoy: date) -> PivotEmpleadosMes:
+        """
+        Pivot empleado x mes (prestamos iniciados y horas de los devueltos) para
+        los meses de ``desde`` a ``hasta``. La operacion normal no cambia un mes
+        anterior al de ``hoy`` sin prestamos abiertos: se guarda en la cache (si
+        hay) bajo la version de prestamos y no se vuelve a consultar mientras no
+        haya otra escritura.
+        """
+        desde, hasta = desde.replace(day=1), hasta.replace(day=1)
+        if hasta < desde:
+            raise BusinessRuleViolation("'desde' no puede ser posterior a 'hasta'.")
+        n_meses = (hasta.year - desde.year) * 12 + hasta.month - desde.month + 1
+        if n_meses > PIVOT_MAX_MESES:
+            raise BusinessRuleViolation(f"El rango no puede superar {PIVOT_MAX_MESES} meses.")
+
+        meses = [_sumar_meses(desde, i) for i in range(n_meses)]
+        mes_actual = hoy.replace(day=1)
+        por_mes: Dict[date, List[UsoEmpleadoMes]] = {}
+        prefijo = self._prefijo_cache() if self.cache is not None else ""
+        if self.cache is not None:
+            for mes in meses:
+                if mes < mes_actual:
+                    guardado = self.cache.obtener(f"{prefijo}empleados-mes:{mes.isoformat()}")
+                    if guardado is not None:
+                        por_mes[mes] = guardado
+
+        pendientes = [m for m in meses if m not in por_mes]
+        if pendientes:
+            leidos: Dict[date, List[UsoEmpleadoMes]] = {m: [] for m in pendientes}
+            for uso in self.repo.contar_por_empleado_mes(desde=pendientes[0], hasta=pendientes[-1]):
+                if uso.mes in leidos:
+                    leidos[uso.mes].append(uso)
+            for mes, usos in leidos.items():
+                por_mes[mes] = usos
+                if self.cache is not None and mes < mes_actual and not any(u.abiertos for u in usos):
+                    self.cache.guardar(f"{prefijo}empleados-mes:{mes.isoformat()}", usos)
+
+        columna = {mes: j for j, mes in enumerate(meses)}
+        nombres: Dict[str, str] = {}
+        filas: Dict[str, Tuple[List[int], List[float]]] = {}
+        for mes in meses:
+            for uso in por_mes[mes]:
+                nombres[uso.cedula] = uso.empleado_nombre  # el del mes mas reciente
+                prestamos, horas = filas.setdefault(uso.cedula, ([0] * n_meses, [0.0] * n_meses))
+                prestamos[columna[mes]] = uso.prestamos
+                horas[columna[mes]] = uso.segundos_uso / 3600
+        cedulas = sorted(filas)
+        return PivotEmpleadosMes(
+            meses=meses,
+            cedulas=cedulas,
+            nombres=[nombres[c] for c in cedulas],
+            prestamos=[filas[c][0] for c in cedulas],
+            horas=[filas[c][1] for c in cedulas],
+        )
@@ -1,8 +1,9 @@
 """Servicios de aplicacion para el flujo de prestamos de radios."""
 
 from __future__ import annotations
-from datetime import datetime
-from typing import ContextManager, Optional, List
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import ContextManager, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 from contextlib import nullcontext
 
 from ..domain.errors import BusinessRuleViolation, EntityNotFound, InactiveEntity
@@ -12,10 +13,45 @@ from ..domain.ports.repositories import (
     SapUsuarioRepository,
     PrestamoRepository,
 )
+from ..domain.events import PrestamoEvento
+from ..domain.ports.eventos import PrestamoEventPublisher
+from ..domain.ports.reportes import ResumenesRepository
 from ..domain.ports.uow import UnitOfWork
-from ..domain.entities import Prestamo
-from ..domain.rules import calcular_turno, clean_doc, clean_rf, clean_sap
-from ..domain.value_objects import EstadoPrestamo
+from ..domain.ports.versiones import COLECCION_PRESTAMOS, VersionColeccionRepository
+from ..domain.entities import (
+    CambiosPrestamos,
+    IntervaloPrestamo,
+    PaginaPrestamos,
+    Prestamo,
+    PrestamoVencido,
+    ResultadoDevolucion,
+)
+from ..domain.reportes import EstadisticasEmpleado, ResumenPrestamos
+from ..domain.rules import calcular_turno, clean_doc, clean_rf, clean_sap, fin_turno, inicio_turno
+from ..domain.value_objects import CursorPrestamo, EstadoPrestamo, FiltroPrestamos, MarcaCambios
+
+LISTAR_LIMIT_DEFAULT = 50
+LISTAR_LIMIT_MAX = 500
+DEVOLVER_LOTE_MAX = 500
+ARCHIVO_LOTE_DEFAULT = 1000
+TIMELINE_MAX_DIAS = 366
+
+_ETIQUETAS_DEVOLUCION = {"codigo_radio": "radio", "cedula": "cédula", "usuario_sap": "usuario SAP"}
+
+
+def _identificador_devolucion(
+    codigo_radio: Optional[str], cedula: Optional[str], usuario_sap: Optional[str]
+) -> Tuple[str, str]:
+    """Normaliza los identificadores de devolucion y exige exactamente uno: (campo, valor)."""
+    candidatos = [
+        ("codigo_radio", clean_rf(codigo_radio) if codigo_radio is not None else None),
+        ("cedula", clean_doc(cedula) if cedula is not None else None),
+        ("usuario_sap", clean_sap(usuario_sap) if usuario_sap is not None else None),
+    ]
+    provided = [(campo, valor) for campo, valor in candidatos if valor]
+    if len(provided) != 1:
+        raise BusinessRuleViolation("Debe enviar exactamente uno de: codigo_radio, cedula o usuario_sap")
+    return provided[0]
 
 
 class PrestamosService:
@@ -28,20 +64,155 @@ class PrestamosService:
         sap: SapUsuarioRepository,
         prestamos: PrestamoRepository,
         uow: Optional[UnitOfWork] = None,
+        versiones: Optional[VersionColeccionRepository] = None,
+        eventos: Optional[PrestamoEventPublisher] = None,
+        resumenes: Optional[ResumenesRepository] = None,
     ) -> None:
         self.empleados = empleados
         self.radios = radios
         self.sap = sap
         self.prestamos = prestamos
         self.uow = uow
+        self.versiones = versiones
+        self.eventos = eventos
+        self.resumenes = resumenes
 
     def _ctx(self) -> ContextManager:
         """Abstrae el UnitOfWork para reusar la misma semantica en pruebas."""
         return self.uow if self.uow is not None else nullcontext()
 
-    def listar(self, *, cedula: Optional[str] = None, codigo_radio: Optional[str] = None) -> List[Prestamo]:
-        """Consulta prestamos sin reglas adicionales (read model)."""
-        return self.prestamos.listar(cedula=cedula, codigo_radio=codigo_radio)
+    def _registrar_cambio(self, tipo: str, *prestamos: Prestamo) -> None:
+        """
+        Invalida los ETags de prestamos, acumula los resumenes diarios (misma
+        transaccion que el cambio) y publica un evento por prestamo para los
+        suscriptores en vivo.
+        """
+        if self.versiones is not None:
+            self.versiones.incrementar(COLECCION_PRESTAMOS)
+        if self.resumenes is not None:
+            if tipo == "asignado":
+                self.resumenes.registrar_asignaciones(prestamos)
+            else:
+                self.resumenes.registrar_devoluciones(prestamos)
+        if self.eventos is not None:
+            for prestamo in prestamos:
+                self.eventos.publicar(PrestamoEvento(tipo=tipo, prestamo=prestamo))
+
+    def listar(
+        self,
+        *,
+        limit: int = LISTAR_LIMIT_DEFAULT,
+        cursor: Optional[CursorPrestamo] = None,
+        filtro: Optional[FiltroPrestamos] = None,
+    ) -> PaginaPrestamos:
+        """Consulta una pagina de prestamos (read model) acotando el limit a 1..LISTAR_LIMIT_MAX."""
+        limit = max(1, min(limit, LISTAR_LIMIT_MAX))
+        return self.prestamos.listar(limit=limit, cursor=cursor, filtro=filtro)
+
+    def listar_cambios(
+        self,
+        *,
+        desde: Optional[MarcaCambios],
+        limit: int = LISTAR_LIMIT_MAX,
+        filtro: Optional[FiltroPrestamos] = None,
+    ) -> CambiosPrestamos:
+        """Devuelve los prestamos creados o modificados despues del watermark recibido."""
+        limit = max(1, min(limit, LISTAR_LIMIT_MAX))
+        return self.prestamos.listar_cambios(limit=limit, desde=desde, filtro=filtro)
+
+    def exportar(self, *, filtro: Optional[FiltroPrestamos] = None) -> Iterator[Prestamo]:
+        """Itera todos los prestamos que cumplen el filtro sin materializarlos en memoria."""
+        return self.prestamos.iterar(filtro=filtro)
+
+    def resumen(self, *, filtro: Optional[FiltroPrestamos] = None, inicio_dia: datetime) -> ResumenPrestamos:
+        """Totales del filtro completo (no de una pagina) para los indicadores del tablero."""
+        return self.prestamos.resumir(filtro=filtro, inicio_dia=inicio_dia)
+
+    def marca_actual(self) -> Optional[MarcaCambios]:
+        """Watermark del ultimo cambio persistido, para iniciar una sincronizacion delta."""
+        return self.prestamos.marca_actual()
+
+    def historial_empleado(
+        self,
+        *,
+        cedula: str,
+        limit: int = LISTAR_LIMIT_DEFAULT,
+        cursor: Optional[CursorPrestamo] = None,
+    ) -> Tuple[PaginaPrestamos, EstadisticasEmpleado]:
+        """Pagina de prestamos del empleado (mas recientes primero) y el resumen de todo su historial."""
+        doc = clean_doc(cedula)
+        if not doc:
+            raise EntityNotFound(f"Empleado {cedula} no existe")
+        estadisticas = self.prestamos.estadisticas_empleado(doc)
+        # Un empleado borrado del catalogo conserva su historial consultable
+        if estadisticas.prestamos == 0 and self.empleados.obtener_por_cedula(doc) is None:
+            raise EntityNotFound(f"Empleado {cedula} no existe")
+        pagina = self.listar(limit=limit, cursor=cursor, filtro=FiltroPrestamos(cedula=doc))
+        return pagina, estadisticas
+
+    def timeline_radio(self, *, codigo_radio: str, desde: datetime, hasta: datetime) -> List[IntervaloPrestamo]:
+        """Quien tuvo la radio y cuando: sus prestamos que se solapan con ``[desde, hasta)``."""
+        codigo = clean_rf(codigo_radio)
+        if hasta <= desde:
+            raise BusinessRuleViolation("'desde' debe ser anterior a 'hasta'.")
+        if (hasta - desde).days > TIMELINE_MAX_DIAS:
+            raise BusinessRuleViolation(f"El rango no puede superar {TIMELINE_MAX_DIAS} dias.")
+        if not codigo:
+            raise EntityNotFound(f"Radio {codigo_radio} no existe")
+        intervalos = self.prestamos.intervalos_radio(codigo_radio=codigo, desde=desde, hasta=hasta)
+        # Una radio borrada del catalogo conserva su timeline consultable
+        if (
+            not intervalos
+            and self.radios.obtener_por_codigo(codigo) is None
+            and not self.prestamos.radio_tiene_prestamos(codigo)
+        ):
+            raise EntityNotFound(f"Radio {codigo_radio} no existe")
+        return intervalos
+
+    def abiertos_en(self, *, instante: datetime) -> List[Prestamo]:
+        """Foto en un instante: que empleado tenia cada radio (prestamos en curso en ``instante``)."""
+        return self.prestamos.listar_abiertos_en(instante)
+
+    # --------- Vencidos ---------
+    def detectar_vencidos(self, *, ahora: datetime) -> List[PrestamoVencido]:
+        """
+        Prestamos abiertos cuyo turno ya termino. Como los turnos son contiguos,
+        equivale a los abiertos iniciados antes del comienzo del turno en curso.
+        ``ahora`` debe venir en hora local (la de los limites de turno).
+        """
+        abiertos = self.prestamos.listar_abiertos_anteriores(inicio_turno(ahora))
+        return [
+            PrestamoVencido(
+                prestamo=p,
+                fin_turno=fin_turno(p.fecha_hora_prestamo.astimezone(ahora.tzinfo)),
+                detectado_en=ahora,
+            )
+            for p in abiertos
+        ]
+
+    def materializar_vencidos(self, *, ahora: datetime) -> List[PrestamoVencido]:
+        """Recalcula y guarda el conjunto de vencidos que consultan los tableros."""
+        with self._ctx():
+            vencidos = self.detectar_vencidos(ahora=ahora)
+            self.prestamos.reemplazar_vencidos(vencidos)
+            return vencidos
+
+    def listar_vencidos(self) -> List[PrestamoVencido]:
+        """Ultimo conjunto materializado (sin recorrer el historico)."""
+        return self.prestamos.listar_vencidos()
+
+    # --------- Archivo ---------
+    def archivar(self, *, ahora: datetime, dias: int, lote: int = ARCHIVO_LOTE_DEFAULT) -> int:
+        """
+        Mueve al historico los prestamos devueltos que se prestaron hace mas de
+        ``dias`` dias. No usa el UnitOfWork: cada lote confirma por separado
+        para no retener el lock de escritura durante todo el barrido.
+        """
+        if dias < 1:
+            raise BusinessRuleViolation("La antigüedad mínima para archivar es de 1 día")
+        if lote < 1:
+            raise BusinessRuleViolation("El tamaño de lote debe ser positivo")
+        return self.prestamos.archivar_devueltos(antes_de=ahora - timedelta(days=dias), lote=lote)
 
     # --------- Asignar ---------
     def asignar(
@@ -52,6 +223,7 @@ class PrestamosService:
         usuario_sap: str,
         usuario_registra_id: int,
         ahora: datetime,
+        usuario_registra_username: Optional[str] = None,
     ) -> Prestamo:
         """Crea un prestamo abierto tras validar entidades activas y duplicados."""
         cedula_clean = clean_doc(cedula)
@@ -70,32 +242,34 @@ class PrestamosService:
         usuario_sap = usuario_sap_clean
 
         with self._ctx():
-            empleado = self.empleados.obtener_por_cedula(cedula)
+            # Catalogos y conflictos en bloque; los mensajes conservan el orden de validacion
+            ctx = self.prestamos.resolver_asignacion(
+                cedula=cedula, codigo_radio=codigo_radio, usuario_sap=usuario_sap
+            )
+            empleado, radio, sapuser = ctx.empleado, ctx.radio, ctx.sap_usuario
             if not empleado:
                 raise EntityNotFound(f"Empleado {cedula} no existe")
             if not empleado.activo:
                 raise InactiveEntity(f"Empleado {cedula} inactivo")
 
-            radio = self.radios.obtener_por_codigo(codigo_radio)
             if not radio:
                 raise EntityNotFound(f"Radio {codigo_radio} no existe")
             if not radio.activo:
                 raise InactiveEntity(f"Radio {codigo_radio} inactiva")
 
-            sapuser = self.sap.obtener_por_username(usuario_sap)
             if not sapuser:
                 raise EntityNotFound(f"SAP Usuario {usuario_sap} no existe")
             if not sapuser.activo:
                 raise InactiveEntity(f"SAP Usuario {usuario_sap} inactivo")
 
             # Verificar abiertos por cada dimensión
-            if self.prestamos.obtener_prestamo_abierto(cedula=cedula):
+            if ctx.cedula_ocupada:
                 raise BusinessRuleViolation(f"Empleado {cedula} ya tiene préstamo abierto")
 
-            if self.prestamos.obtener_prestamo_abierto(usuario_sap=usuario_sap):
+            if ctx.sap_ocupado:
                 raise BusinessRuleViolation(f"SAP Usuario {usuario_sap} ya tiene préstamo abierto")
 
-            if self.prestamos.obtener_prestamo_abierto(codigo_radio=codigo_radio):
+            if ctx.radio_ocupado:
                 raise BusinessRuleViolation(f"Radio {codigo_radio} ya está asignada")
 
             turno_vo = calcular_turno(ahora)
@@ -110,8 +284,10 @@ class PrestamosService:
                 turno=turno_vo,
                 estado=EstadoPrestamo.ASIGNADO,
                 usuario_registra_id=usuario_registra_id,
+                usuario_registra_username=usuario_registra_username,
             )
             created = self.prestamos.crear(entity)
+            self._registrar_cambio("asignado", created)
             return created
 
     # --------- Devolver (métodos específicos delegan en el unificado) ---------
@@ -136,26 +312,75 @@ class PrestamosService:
         ahora: datetime,
     ) -> Prestamo:
         """Devuelve un prestamo abierto segun un unico identificador recibido."""
-        codigo_radio_clean = clean_rf(codigo_radio) if codigo_radio is not None else None
-        cedula_clean = clean_doc(cedula) if cedula is not None else None
-        usuario_sap_clean = clean_sap(usuario_sap) if usuario_sap is not None else None
+        campo, valor = _identificador_devolucion(codigo_radio, cedula, usuario_sap)
+
+        with self._ctx():
+            abierto = self.prestamos.obtener_prestamo_abierto(**{campo: valor})
+            if not abierto:
+                raise EntityNotFound(f"No existe préstamo abierto para {_ETIQUETAS_DEVOLUCION[campo]} {valor}")
+
+            devuelto = self.prestamos.marcar_devolucion(abierto.id, fecha_hora=ahora)
+            self._registrar_cambio("devuelto", devuelto)
+            return devuelto
+
+    def devolver_lote(
+        self,
+        *,
+        items: Sequence[Mapping[str, Optional[str]]],
+        ahora: datetime,
+    ) -> List[ResultadoDevolucion]:
+        """
+        Devuelve varios prestamos en una sola transaccion (cierre de turno).
+
+        Cada item lleva uno de ``codigo_radio``, ``cedula`` o ``usuario_sap`` y
+        recibe su propio resultado; los items rechazados no impiden cerrar el
+        resto. Se hace una lectura de los abiertos y un UPDATE por conjunto.
+        """
+        if len(items) > DEVOLVER_LOTE_MAX:
+            raise BusinessRuleViolation(f"El lote admite como maximo {DEVOLVER_LOTE_MAX} items.")
 
-        provided = [v for v in (codigo_radio_clean, cedula_clean, usuario_sap_clean) if v]
-        if len(provided) != 1:
-            raise BusinessRuleViolation("Debe enviar exactamente uno de: codigo_radio, cedula o usuario_sap")
+        resultados: List[Optional[ResultadoDevolucion]] = []
+        pedidos: List[Tuple[int, str, str]] = []
+        for idx, item in enumerate(items):
+            try:
+                campo, valor = _identificador_devolucion(
+                    item.get("codigo_radio"), item.get("cedula"), item.get("usuario_sap")
+                )
+            except BusinessRuleViolation as exc:
+                resultados.append(ResultadoDevolucion(campo=None, valor=None, error=str(exc)))
+                continue
+            resultados.append(None)
+            pedidos.append((idx, campo, valor))
 
         with self._ctx():
-            if codigo_radio_clean:
-                abierto = self.prestamos.obtener_prestamo_abierto(codigo_radio=codigo_radio_clean)
-                target = f"radio {codigo_radio_clean}"
-            elif cedula_clean:
-                abierto = self.prestamos.obtener_prestamo_abierto(cedula=cedula_clean)
-                target = f"cédula {cedula_clean}"
-            else:
-                abierto = self.prestamos.obtener_prestamo_abierto(usuario_sap=usuario_sap_clean)
-                target = f"usuario SAP {usuario_sap_clean}"
+            valores: Dict[str, set] = {campo: set() for campo in _ETIQUETAS_DEVOLUCION}
+            for _, campo, valor in pedidos:
+                valores[campo].add(valor)
+            abiertos = self.prestamos.obtener_prestamos_abiertos(
+                codigos_radio=valores["codigo_radio"],
+                cedulas=valores["cedula"],
+                usuarios_sap=valores["usuario_sap"],
+            )
+            indice = {(campo, getattr(p, campo)): p for p in abiertos for campo in _ETIQUETAS_DEVOLUCION}
 
-            if not abierto:
-                raise EntityNotFound(f"No existe préstamo abierto para {target}")
+            cerrados: Dict[int, Prestamo] = {}
+            for idx, campo, valor in pedidos:
+                abierto = indice.get((campo, valor))
+                if abierto is None:
+                    error = f"No existe préstamo abierto para {_ETIQUETAS_DEVOLUCION[campo]} {valor}"
+                    resultados[idx] = ResultadoDevolucion(campo=campo, valor=valor, error=error)
+                elif abierto.id in cerrados:
+                    error = f"El préstamo {abierto.id} ya se incluyó en este lote"
+                    resultados[idx] = ResultadoDevolucion(campo=campo, valor=valor, error=error)
+                else:
+                    devuelto = replace(abierto, estado=EstadoPrestamo.DEVUELTO, fecha_hora_devolucion=ahora)
+                    cerrados[abierto.id] = devuelto
+                    resultados[idx] = ResultadoDevolucion(campo=campo, valor=valor, prestamo=devuelto)
 
-            return self.prestamos.marcar_devolucion(abierto.id, fecha_hora=ahora)
+            if cerrados:
+                n = self.prestamos.marcar_devolucion_lote(list(cerrados), fecha_hora=ahora)
+                if n != len(cerrados):
+                    # Otro proceso cerro alguno entre la lectura y el UPDATE: se revierte el lote completo
+                    raise BusinessRuleViolation("Algunos préstamos cambiaron durante la devolución; reintente el lote.")
+                self._registrar_cambio("devuelto", *cerrados.values())
+        return resultados
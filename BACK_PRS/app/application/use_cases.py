@@ -3,11 +3,11 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from .services import PrestamosService
 from .catalogos_service import CatalogosService
-from ..domain.entities import Prestamo, Empleado, RadioFrecuencia, SapUsuario
+from ..domain.entities import Prestamo, Empleado, RadioFrecuencia, SapUsuario, ResultadoDevolucion
 
 
 # -------- Commands / DTOs (simples) --------
@@ -20,6 +20,7 @@ class AsignarPrestamoCmd:
     usuario_sap: str
     usuario_registra_id: int
     ahora: datetime
+    usuario_registra_username: Optional[str] = None
 
 @dataclass(frozen=True)
 class DevolverPorRadioCmd:
@@ -39,6 +40,12 @@ class DevolverPorUsuarioSapCmd:
     usuario_sap: str
     ahora: datetime
 
+@dataclass(frozen=True)
+class DevolverLoteCmd:
+    """DTO para devolver varios prestamos; cada item trae codigo_radio, cedula o usuario_sap."""
+    items: List[Dict[str, Optional[str]]]
+    ahora: datetime
+
 
 # -------- Use Cases: thin wrappers sobre Services --------
 
@@ -55,6 +62,7 @@ class PrestamoUseCases:
             usuario_sap=cmd.usuario_sap,
             usuario_registra_id=cmd.usuario_registra_id,
             ahora=cmd.ahora,
+            usuario_registra_username=cmd.usuario_registra_username,
         )
 
     def devolver_por_radio(self, cmd: DevolverPorRadioCmd) -> Prestamo:
@@ -69,6 +77,10 @@ class PrestamoUseCases:
         """Enruta la devolucion usando el usuario SAP."""
         return self.svc.devolver_por_usuario_sap(usuario_sap=cmd.usuario_sap, ahora=cmd.ahora)
 
+    def devolver_lote(self, cmd: DevolverLoteCmd) -> List[ResultadoDevolucion]:
+        """Enruta la devolucion en lote (una transaccion, resultado por item)."""
+        return self.svc.devolver_lote(items=cmd.items, ahora=cmd.ahora)
+
 
 # -------- Use Cases de Catálogos --------
 
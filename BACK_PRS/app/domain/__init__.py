@@ -1,10 +1,18 @@
 """API publica del dominio para imports estables desde capas superiores."""
 
-from .entities import Empleado, RadioFrecuencia, SapUsuario, Prestamo
-from .value_objects import Turno, EstadoPrestamo, Cedula, CodigoRF, Username
-from .rules import calcular_turno, clean_doc, clean_sap, clean_rf
+from .entities import Empleado, RadioFrecuencia, SapUsuario, Prestamo, PaginaPrestamos, CambiosPrestamos, ContextoAsignacion, ResultadoDevolucion, PrestamoVencido, IntervaloPrestamo, EntregaTurno
+from .value_objects import Turno, EstadoPrestamo, Cedula, CodigoRF, Username, CursorPrestamo, FiltroPrestamos, MarcaCambios
+from .rules import calcular_turno, inicio_turno, fin_turno, ventana_turno, clean_doc, clean_sap, clean_rf
 from .errors import DomainError, EntityNotFound, InactiveEntity, BusinessRuleViolation
-from .events import AdminChangeEvent, AuditLogRecord
+from .events import (
+    AdminChangeEvent,
+    AuditLogRecord,
+    PrestamoEvento,
+    ReglaRetencionAudit,
+    ResultadoRetencionAudit,
+    condensar_cambio,
+)
+from .reportes import BloqueDuraciones, ConteoTurnoDia, EstadisticasUso, ReporteTurnos, ReporteUtilizacion, ResumenDiario, PicoConcurrencia, PuntoConcurrencia, ReporteConcurrencia, ConteoHoraSemana, MapaCalor, EstadisticasEmpleado, UsoEmpleadoMes, PivotEmpleadosMes, ResultadoAnalitico, ResultadoExportacionParquet
 
 # Puertos
 from .ports.repositories import (
@@ -13,21 +21,36 @@ from .ports.repositories import (
     SapUsuarioRepository,
     PrestamoRepository,
 )
-from .ports.audit import AuditLogRepository, AuditLogQueryRepository
+from .ports.audit import AuditLogRepository, AuditLogQueryRepository, AuditLogRetencionRepository
 from .ports.uow import UnitOfWork
+from .ports.versiones import VersionColeccionRepository
+from .ports.eventos import PrestamoEventPublisher
+from .ports.reportes import CacheReportes, ReportesRepository, ResumenesRepository
+from .ports.entregas import EntregasTurnoRepository
+from .ports.analitica import AnaliticaRepository
+from .ports.exportacion import ExportacionParquet
 
 __all__ = [
     # Entidades
-    "Empleado", "RadioFrecuencia", "SapUsuario", "Prestamo",
+    "Empleado", "RadioFrecuencia", "SapUsuario", "Prestamo", "PaginaPrestamos", "CambiosPrestamos",
+    "ContextoAsignacion", "ResultadoDevolucion", "PrestamoVencido", "IntervaloPrestamo", "EntregaTurno",
     # Value Objects
-    "Turno", "EstadoPrestamo", "Cedula", "CodigoRF", "Username",
+    "Turno", "EstadoPrestamo", "Cedula", "CodigoRF", "Username", "CursorPrestamo", "FiltroPrestamos", "MarcaCambios",
     # Reglas
-    "calcular_turno", "clean_doc", "clean_sap", "clean_rf",
+    "calcular_turno", "inicio_turno", "fin_turno", "ventana_turno", "clean_doc", "clean_sap", "clean_rf",
     # Errores
     "DomainError", "EntityNotFound", "InactiveEntity", "BusinessRuleViolation",
     # Eventos
-    "AdminChangeEvent", "AuditLogRecord",
+    "AdminChangeEvent", "AuditLogRecord", "PrestamoEvento", "ReglaRetencionAudit", "ResultadoRetencionAudit",
+    "condensar_cambio",
+    # Reportes
+    "ConteoTurnoDia", "ReporteTurnos", "BloqueDuraciones", "EstadisticasUso", "ReporteUtilizacion", "ResumenDiario",
+    "PicoConcurrencia", "PuntoConcurrencia", "ReporteConcurrencia", "ConteoHoraSemana", "MapaCalor",
+    "EstadisticasEmpleado", "UsoEmpleadoMes", "PivotEmpleadosMes",
+    "ResultadoAnalitico", "ResultadoExportacionParquet",
     # Puertos
     "EmpleadoRepository", "RadioRepository", "SapUsuarioRepository", "PrestamoRepository",
-    "AuditLogRepository", "AuditLogQueryRepository", "UnitOfWork",
+    "AuditLogRepository", "AuditLogQueryRepository", "AuditLogRetencionRepository", "UnitOfWork", "VersionColeccionRepository",
+    "PrestamoEventPublisher", "ReportesRepository", "ResumenesRepository", "CacheReportes",
+    "EntregasTurnoRepository", "AnaliticaRepository", "ExportacionParquet",
 ]
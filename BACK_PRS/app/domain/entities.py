@@ -3,10 +3,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 
-from .value_objects import Turno, EstadoPrestamo
+from .value_objects import CursorPrestamo, MarcaCambios, Turno, EstadoPrestamo
 
 
 @dataclass(frozen=True)
@@ -56,3 +56,97 @@ class Prestamo:
     fecha_hora_devolucion: Optional[datetime] = None
     # Campo de conveniencia: lo inyecta infraestructura para evitar query en serializers
     usuario_registra_username: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class PrestamoVencido:
+    """Prestamo que sigue abierto despues de terminar su turno."""
+
+    prestamo: Prestamo
+    fin_turno: datetime
+    detectado_en: datetime
+
+
+@dataclass(frozen=True)
+class EntregaTurno:
+    """
+    Foto de un cambio de turno tomada en ``corte`` (el fin del turno si ya
+    cerro). ``pendientes`` son los prestamos abiertos en ese momento (los que
+    recibe el supervisor entrante); ``prestados`` y ``devueltos`` los que se
+    abrieron y cerraron durante el turno. Las devoluciones posteriores al corte
+    no se ven. ``congelada_en`` indica cuando se guardo la foto de un turno cerrado.
+    """
+
+    dia: date
+    turno: Turno
+    inicio: datetime
+    fin: datetime
+    corte: datetime
+    pendientes: List[Prestamo]
+    prestados: List[Prestamo]
+    devueltos: List[Prestamo]
+    congelada_en: Optional[datetime] = None
+
+    def minutos_en_uso(self, prestamo: Prestamo) -> float:
+        """Minutos que la radio estuvo prestada hasta su devolucion o, si seguia abierta, hasta el corte."""
+        fin = prestamo.fecha_hora_devolucion or self.corte
+        return (fin - prestamo.fecha_hora_prestamo).total_seconds() / 60
+
+
+@dataclass(frozen=True)
+class IntervaloPrestamo:
+    """Tramo de uso de una radio (vista compacta de un prestamo); ``fin`` es None si sigue abierto."""
+
+    id: int
+    cedula: str
+    empleado_nombre: str
+    usuario_sap: str
+    inicio: datetime
+    fin: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class ContextoAsignacion:
+    """Catalogos y prestamos abiertos que intervienen en una asignacion, resueltos en bloque.
+
+    Las entidades son None si no existen; los indicadores ``*_ocupado`` señalan
+    que ya hay un prestamo abierto para esa cedula, usuario SAP o radio.
+    """
+
+    empleado: Optional[Empleado]
+    radio: Optional[RadioFrecuencia]
+    sap_usuario: Optional[SapUsuario]
+    cedula_ocupada: bool = False
+    sap_ocupado: bool = False
+    radio_ocupado: bool = False
+
+
+@dataclass(frozen=True)
+class ResultadoDevolucion:
+    """Resultado de un item de devolucion en lote: el prestamo cerrado o el motivo del rechazo."""
+
+    campo: Optional[str]
+    valor: Optional[str]
+    prestamo: Optional[Prestamo] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass(frozen=True)
+class PaginaPrestamos:
+    """Pagina de prestamos y cursor para continuar (None si no hay mas filas)."""
+
+    items: List[Prestamo]
+    siguiente: Optional[CursorPrestamo] = None
+
+
+@dataclass(frozen=True)
+class CambiosPrestamos:
+    """Prestamos creados o modificados despues de un watermark y la marca para la siguiente consulta."""
+
+    items: List[Prestamo]
+    marca: Optional[MarcaCambios]
+    hay_mas: bool = False
@@ -4,7 +4,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+from .entities import Prestamo
 
 
 @dataclass(frozen=True)
@@ -35,3 +37,59 @@ class AuditLogRecord:
     before: Optional[Dict[str, Any]]
     after: Optional[Dict[str, Any]]
     reason: Optional[str]
+
+
+@dataclass(frozen=True)
+class ReglaRetencionAudit:
+    """
+    Politica de retencion del log de auditoria para un agregado/accion
+    (``None`` = cualquiera). Si varias reglas cubren una entrada gana la mas
+    especifica. ``None`` en los dias significa no compactar / no purgar nunca.
+    """
+
+    aggregate: Optional[str] = None
+    action: Optional[str] = None
+    compactar_dias: Optional[int] = None
+    purgar_dias: Optional[int] = None
+
+    @property
+    def clave(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.aggregate, self.action
+
+    def incluye(self, otra: "ReglaRetencionAudit") -> bool:
+        """True si ``otra`` es una regla distinta y mas especifica dentro de esta."""
+        return (
+            otra.clave != self.clave
+            and (self.aggregate is None or self.aggregate == otra.aggregate)
+            and (self.action is None or self.action == otra.action)
+        )
+
+
+@dataclass(frozen=True)
+class ResultadoRetencionAudit:
+    """Resumen de una pasada de retencion: filas afectadas y bytes de JSON liberados."""
+
+    purgados: int = 0
+    compactados: int = 0
+    bytes_liberados: int = 0
+
+
+def condensar_cambio(
+    before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Deja en ``before``/``after`` solo los campos que cambiaron. Las altas y
+    bajas (un lado vacio) se conservan completas; es idempotente.
+    """
+    if not before or not after:
+        return before, after
+    claves = [k for k in before.keys() | after.keys() if before.get(k) != after.get(k)]
+    return {k: before[k] for k in claves if k in before}, {k: after[k] for k in claves if k in after}
+
+
+@dataclass(frozen=True)
+class PrestamoEvento:
+    """Evento de dominio emitido cuando se asigna o devuelve un radio."""
+
+    tipo: str  # "asignado" | "devuelto"
+    prestamo: Prestamo
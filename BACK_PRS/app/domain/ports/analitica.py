@@ -0,0 +1,14 @@
+"""Puerto del motor analitico que resuelve las consultas pesadas fuera de la base transaccional."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Protocol
+
+from ..reportes import ResultadoAnalitico
+
+
+class AnaliticaRepository(Protocol):
+    """Ejecuta una de ``CONSULTAS_ANALITICAS`` sobre ``[desde, hasta)`` devolviendo a lo sumo ``limite`` filas."""
+
+    def consultar(self, consulta: str, *, desde: datetime, hasta: datetime, limite: int) -> ResultadoAnalitico: ...
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from typing import List, Optional, Protocol
+from datetime import datetime
+from typing import List, Optional, Protocol, Sequence, Tuple
 
 from ..events import AdminChangeEvent, AuditLogRecord
 
@@ -17,3 +18,31 @@ class AuditLogQueryRepository(Protocol):
     """Puerto de solo lectura para consultar entradas de auditoria."""
 
     def listar(self, *, limit: int, aggregate: Optional[str] = None) -> List[AuditLogRecord]: ...
+
+
+class AuditLogRetencionRepository(Protocol):
+    """
+    Puerto de mantenimiento del log: opera por lotes sobre las entradas
+    anteriores a ``antes_de`` del agregado/accion (``None`` = cualquiera),
+    omitiendo los pares de ``excluir``. Devuelven (filas, bytes de JSON liberados).
+    """
+
+    def purgar(
+        self,
+        *,
+        antes_de: datetime,
+        aggregate: Optional[str],
+        action: Optional[str],
+        excluir: Sequence[Tuple[Optional[str], Optional[str]]] = (),
+        lote: int = 500,
+    ) -> Tuple[int, int]: ...
+
+    def compactar(
+        self,
+        *,
+        antes_de: datetime,
+        aggregate: Optional[str],
+        action: Optional[str],
+        excluir: Sequence[Tuple[Optional[str], Optional[str]]] = (),
+        lote: int = 500,
+    ) -> Tuple[int, int]: ...
@@ -0,0 +1,16 @@
+"""Puerto para las fotos congeladas de cambio de turno."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Optional, Protocol
+
+from ..entities import EntregaTurno
+from ..value_objects import Turno
+
+
+class EntregasTurnoRepository(Protocol):
+    """Fotos de turnos cerrados; ``guardar`` nunca reemplaza una existente y devuelve la que quedo."""
+
+    def obtener(self, *, dia: date, turno: Turno) -> Optional[EntregaTurno]: ...
+    def guardar(self, entrega: EntregaTurno) -> EntregaTurno: ...
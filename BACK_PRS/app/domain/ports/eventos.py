@@ -0,0 +1,13 @@
+"""Puerto para publicar eventos de prestamos hacia suscriptores en tiempo real."""
+
+from __future__ import annotations
+
+from typing import Protocol
+
+from ..events import PrestamoEvento
+
+
+class PrestamoEventPublisher(Protocol):
+    """Publica eventos de prestamos una vez confirmada la transaccion que los origina."""
+
+    def publicar(self, evento: PrestamoEvento) -> None: ...
@@ -0,0 +1,23 @@
+"""Puerto del dataset Parquet (particionado por mes) que consumen las herramientas de BI."""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from contextlib import AbstractContextManager
+from typing import List, Optional, Protocol, Tuple
+
+
+class ExportacionParquet(Protocol):
+    """
+    Destino de la exportacion incremental. ``meses_modificados`` devuelve los
+    meses con filas cambiadas despues de ``desde`` (todos si es None) y el
+    nuevo watermark; ``escribir_mes`` reemplaza la particion completa del mes.
+    ``bloqueo`` excluye a otra ejecucion sobre el mismo destino.
+    """
+
+    def bloqueo(self) -> AbstractContextManager[None]: ...
+
+    def leer_marca(self, tabla: str) -> Optional[datetime]: ...
+    def meses_modificados(self, tabla: str, *, desde: Optional[datetime]) -> Tuple[List[date], Optional[datetime]]: ...
+    def escribir_mes(self, tabla: str, mes: date) -> int: ...
+    def guardar_marca(self, tabla: str, marca: datetime) -> None: ...
@@ -0,0 +1,44 @@
+"""Puertos de solo lectura para los reportes agregados sobre prestamos."""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+from ..entities import Prestamo
+from ..reportes import BloqueDuraciones, ConteoHoraSemana, ConteoTurnoDia, ResumenDiario, UsoEmpleadoMes
+from ..value_objects import Turno
+
+
+class ReportesRepository(Protocol):
+    """Consultas agregadas que se resuelven en la base de datos."""
+
+    def contar_por_turno_dia(self, *, desde: date, hasta: date) -> List[ConteoTurnoDia]: ...
+    def iterar_duraciones(
+        self, *, desde: datetime, hasta: datetime, chunk_size: int = 50_000
+    ) -> Iterator[BloqueDuraciones]: ...
+    def codigos_radios_activos(self) -> List[str]: ...
+    def iterar_intervalos(
+        self, *, desde: datetime, hasta: datetime, chunk_size: int = 50_000
+    ) -> Iterator[Tuple[datetime, Optional[datetime]]]: ...
+    def contar_por_hora_semana(
+        self, *, desde: date, hasta: date, turno: Optional[Turno] = None
+    ) -> List[ConteoHoraSemana]: ...
+    def contar_por_empleado_mes(self, *, desde: date, hasta: date) -> List[UsoEmpleadoMes]: ...
+
+
+class ResumenesRepository(Protocol):
+    """Tablas de resumen diario que se actualizan en la misma transaccion que los prestamos."""
+
+    def registrar_asignaciones(self, prestamos: Sequence[Prestamo]) -> None: ...
+    def registrar_devoluciones(self, prestamos: Sequence[Prestamo]) -> None: ...
+    def registrar_correccion(self, antes: Sequence[Prestamo], despues: Sequence[Prestamo]) -> None: ...
+    def listar_resumenes(self, *, dimension: str, desde: date, hasta: date) -> List[ResumenDiario]: ...
+    def reconstruir(self, *, desde: Optional[date] = None, hasta: Optional[date] = None) -> int: ...
+
+
+class CacheReportes(Protocol):
+    """Cache clave -> valor para reportes de periodos cerrados; la clave lleva la version de los datos."""
+
+    def obtener(self, clave: str) -> Optional[Any]: ...
+    def guardar(self, clave: str, valor: Any) -> None: ...
@@ -3,9 +3,21 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Dict, List, Optional, Protocol
+from typing import Collection, Dict, Iterator, List, Optional, Protocol, Sequence
 
-from ..entities import Empleado, Prestamo, RadioFrecuencia, SapUsuario
+from ..entities import (
+    CambiosPrestamos,
+    ContextoAsignacion,
+    Empleado,
+    IntervaloPrestamo,
+    PaginaPrestamos,
+    Prestamo,
+    PrestamoVencido,
+    RadioFrecuencia,
+    SapUsuario,
+)
+from ..reportes import EstadisticasEmpleado, ResumenPrestamos
+from ..value_objects import CursorPrestamo, FiltroPrestamos, MarcaCambios
 
 
 class EmpleadoRepository(Protocol):
@@ -42,6 +54,7 @@ class PrestamoRepository(Protocol):
     """Operaciones disponibles sobre prestamos de radios."""
 
     def crear(self, prestamo: Prestamo) -> Prestamo: ...
+    def resolver_asignacion(self, *, cedula: str, codigo_radio: str, usuario_sap: str) -> ContextoAsignacion: ...
     def obtener_prestamo_abierto(
         self,
         *,
@@ -50,4 +63,37 @@ class PrestamoRepository(Protocol):
         codigo_radio: Optional[str] = None,
     ) -> Optional[Prestamo]: ...
     def marcar_devolucion(self, id_: int, fecha_hora: datetime) -> Prestamo: ...
-    def listar(self, *, cedula: Optional[str] = None, codigo_radio: Optional[str] = None) -> List[Prestamo]: ...
+    def obtener_prestamos_abiertos(
+        self,
+        *,
+        cedulas: Collection[str] = (),
+        usuarios_sap: Collection[str] = (),
+        codigos_radio: Collection[str] = (),
+    ) -> List[Prestamo]: ...
+    def marcar_devolucion_lote(self, ids: Sequence[int], fecha_hora: datetime) -> int: ...
+    def listar_abiertos_anteriores(self, antes_de: datetime) -> List[Prestamo]: ...
+    def listar_abiertos_en(self, instante: datetime) -> List[Prestamo]: ...
+    def listar_devueltos_entre(self, desde: datetime, hasta: datetime) -> List[Prestamo]: ...
+    def reemplazar_vencidos(self, vencidos: Sequence[PrestamoVencido]) -> None: ...
+    def listar_vencidos(self) -> List[PrestamoVencido]: ...
+    def listar(
+        self,
+        *,
+        limit: int,
+        cursor: Optional[CursorPrestamo] = None,
+        filtro: Optional[FiltroPrestamos] = None,
+    ) -> PaginaPrestamos: ...
+    def listar_cambios(
+        self,
+        *,
+        limit: int,
+        desde: Optional[MarcaCambios] = None,
+        filtro: Optional[FiltroPrestamos] = None,
+    ) -> CambiosPrestamos: ...
+    def marca_actual(self) -> Optional[MarcaCambios]: ...
+    def iterar(self, *, filtro: Optional[FiltroPrestamos] = None, chunk_size: int = 2000) -> Iterator[Prestamo]: ...
+    def archivar_devueltos(self, *, antes_de: datetime, lote: int = 1000) -> int: ...
+    def estadisticas_empleado(self, cedula: str) -> EstadisticasEmpleado: ...
+    def resumir(self, *, filtro: Optional[FiltroPrestamos] = None, inicio_dia: datetime) -> ResumenPrestamos: ...
+    def intervalos_radio(self, *, codigo_radio: str, desde: datetime, hasta: datetime) -> List[IntervaloPrestamo]: ...
+    def radio_tiene_prestamos(self, codigo_radio: str) -> bool: ...
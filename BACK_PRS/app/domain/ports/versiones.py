@@ -0,0 +1,18 @@
+"""Puerto para versionar colecciones y soportar GET condicionales."""
+
+from __future__ import annotations
+
+from typing import Protocol
+
+# Nombres de coleccion compartidos por servicios (escritura) y vistas (ETag)
+COLECCION_PRESTAMOS = "prestamos"
+COLECCION_EMPLEADOS = "empleados"
+COLECCION_RADIOS = "radios"
+COLECCION_SAP_USUARIOS = "sap_usuarios"
+
+
+class VersionColeccionRepository(Protocol):
+    """Contador monotono por coleccion que se incrementa con cada escritura."""
+
+    def obtener(self, coleccion: str) -> int: ...
+    def incrementar(self, coleccion: str) -> None: ...
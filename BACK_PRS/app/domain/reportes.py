@@ -0,0 +1,232 @@
+"""Modelos de lectura de los reportes operativos (agregados, sin identidad propia)."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+
+from .value_objects import EstadoPrestamo, Turno
+
+# Dimensiones de los resumenes diarios (``clave`` es el turno, el codigo de radio o la cedula)
+DIMENSION_TURNO = "turno"
+DIMENSION_RADIO = "radio"
+DIMENSION_EMPLEADO = "empleado"
+DIMENSIONES_RESUMEN = (DIMENSION_TURNO, DIMENSION_RADIO, DIMENSION_EMPLEADO)
+
+# Filas del mapa de calor (indice 0 = lunes, como ``date.weekday()``)
+DIAS_SEMANA = ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo")
+EVENTO_ASIGNACION = "asignacion"
+EVENTO_DEVOLUCION = "devolucion"
+
+
+@dataclass(frozen=True)
+class ConteoTurnoDia:
+    """Eventos de un dia local y turno: ``ASIGNADO`` = asignaciones, ``DEVUELTO`` = devoluciones."""
+
+    dia: date
+    turno: Turno
+    estado: EstadoPrestamo
+    total: int
+
+
+@dataclass(frozen=True)
+class ReporteTurnos:
+    """Matriz dia x turno: ``asignaciones[i][j]`` corresponde a ``dias[i]`` y ``turnos[j]``.
+
+    Las asignaciones cuentan los prestamos iniciados ese dia y turno; las
+    devoluciones, las registradas en ese dia y turno (de cualquier prestamo).
+    """
+
+    dias: List[date]
+    turnos: List[Turno]
+    asignaciones: List[List[int]]
+    devoluciones: List[List[int]]
+
+
+@dataclass(frozen=True)
+class BloqueDuraciones:
+    """Bloque columnar de prestamos para analitica: codigo de radio e instantes en segundos epoch.
+
+    ``fines`` trae None para los prestamos que siguen abiertos.
+    """
+
+    radios: Sequence[str]
+    inicios: Sequence[float]
+    fines: Sequence[Optional[float]]
+
+
+@dataclass(frozen=True)
+class EstadisticasUso:
+    """Duraciones (horas) de prestamos cerrados y ocupacion en el periodo; ``codigo_radio`` None = flota."""
+
+    codigo_radio: Optional[str]
+    prestamos: int
+    cerrados: int
+    media_horas: Optional[float]
+    p50_horas: Optional[float]
+    p90_horas: Optional[float]
+    p99_horas: Optional[float]
+    horas_en_uso: float
+    ratio_ocioso: float
+
+
+@dataclass(frozen=True)
+class ReporteUtilizacion:
+    """Utilizacion de la flota y de cada radio en ``[inicio, fin)`` (``horas_periodo`` por radio)."""
+
+    horas_periodo: float
+    flota: EstadisticasUso
+    radios: List[EstadisticasUso]
+
+
+@dataclass(frozen=True)
+class ResumenDiario:
+    """Rollup de los prestamos iniciados un dia local, agrupados por una dimension.
+
+    ``devueltos`` y ``segundos_uso`` solo cuentan los ya cerrados. La clave es
+    el dia de inicio, asi que un dia ya pasado sigue cambiando: una devolucion
+    tardia, una correccion en el admin o ``reconstruir_resumenes`` reescriben su
+    fila. Nada debe cachearla como definitiva.
+    """
+
+    dia: date
+    dimension: str
+    clave: str
+    asignados: int
+    devueltos: int
+    segundos_uso: float
+
+
+@dataclass(frozen=True)
+class PicoConcurrencia:
+    """Maximo de radios prestadas a la vez en un dia local o en un turno (``turno`` None = dia completo).
+
+    En los turnos ``dia`` es el dia local en que empieza el turno (Turno 3 cruza la medianoche).
+    """
+
+    dia: date
+    turno: Optional[Turno]
+    pico: int
+    instante: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class PuntoConcurrencia:
+    """Maximo de radios prestadas a la vez dentro de ``[inicio, inicio + paso)``."""
+
+    inicio: datetime
+    maximo: int
+
+
+@dataclass(frozen=True)
+class ReporteConcurrencia:
+    """Pico de prestamos simultaneos del periodo, serie temporal y picos por dia y por turno."""
+
+    pico: int
+    instante_pico: Optional[datetime]
+    paso_minutos: int
+    serie: List[PuntoConcurrencia]
+    dias: List[PicoConcurrencia]
+    turnos: List[PicoConcurrencia]
+
+
+@dataclass(frozen=True)
+class ConteoHoraSemana:
+    """Eventos (asignaciones o devoluciones) en un dia de la semana (0 = lunes) y hora local."""
+
+    evento: str  # "asignacion" | "devolucion"
+    dia_semana: int
+    hora: int
+    total: int
+
+
+@dataclass(frozen=True)
+class MapaCalor:
+    """Matrices 7x24: ``asignaciones[d][h]`` es el dia de la semana ``d`` (0 = lunes) a la hora local ``h``."""
+
+    asignaciones: List[List[int]]
+    devoluciones: List[List[int]]
+
+
+@dataclass(frozen=True)
+class EstadisticasEmpleado:
+    """Resumen del historial de un empleado; los campos ``abierto_*`` son None si no tiene prestamo abierto."""
+
+    cedula: str
+    prestamos: int
+    devueltos: int
+    media_horas: Optional[float]
+    ultimo_prestamo: Optional[datetime]
+    abierto_id: Optional[int] = None
+    abierto_radio: Optional[str] = None
+    abierto_desde: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class ResumenPrestamos:
+    """Totales de los prestamos de un filtro; ``*_hoy`` cuentan desde el inicio del dia local."""
+
+    total: int
+    abiertos: int
+    prestados_hoy: int
+    devueltos_hoy: int
+
+
+@dataclass(frozen=True)
+class UsoEmpleadoMes:
+    """Prestamos que un empleado inicio en un mes local (``mes`` = dia 1) y horas de los ya devueltos.
+
+    ``abiertos`` cuenta los que siguen sin devolver: mientras sea mayor que cero
+    las horas del mes todavia pueden crecer.
+    """
+
+    mes: date
+    cedula: str
+    empleado_nombre: str
+    prestamos: int
+    abiertos: int
+    segundos_uso: float
+
+
+@dataclass(frozen=True)
+class PivotEmpleadosMes:
+    """Matriz empleado x mes: ``prestamos[i][j]`` y ``horas[i][j]`` son de ``cedulas[i]`` en ``meses[j]``."""
+
+    meses: List[date]
+    cedulas: List[str]
+    nombres: List[str]
+    prestamos: List[List[int]]
+    horas: List[List[float]]
+
+
+# Consultas parametrizadas del motor analitico (columnar, fuera de la base transaccional)
+CONSULTA_RADIOS = "radios"
+CONSULTA_EMPLEADOS = "empleados"
+CONSULTA_AUDITORIA = "auditoria"
+CONSULTAS_ANALITICAS = (CONSULTA_RADIOS, CONSULTA_EMPLEADOS, CONSULTA_AUDITORIA)
+
+
+@dataclass(frozen=True)
+class ResultadoAnalitico:
+    """Resultado tabular de una consulta analitica: ``filas[i][j]`` es la columna ``columnas[j]``."""
+
+    consulta: str
+    columnas: List[str]
+    filas: List[Sequence[object]]
+
+
+# Tablas del dataset Parquet para BI (particionado por mes local)
+TABLA_PRESTAMOS = "prestamos"
+TABLA_AUDITORIA = "audit_log"
+TABLAS_PARQUET = (TABLA_PRESTAMOS, TABLA_AUDITORIA)
+
+
+@dataclass(frozen=True)
+class ResultadoExportacionParquet:
+    """Particiones (dia 1 de cada mes) reescritas de una tabla, filas escritas y watermark que quedo guardado."""
+
+    tabla: str
+    meses: List[date]
+    filas: int
+    marca: Optional[datetime]
@@ -2,8 +2,8 @@
 
 from __future__ import annotations
 
-from datetime import datetime, time
-from typing import Optional
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Optional, Tuple
 
 from .value_objects import Turno
 
@@ -20,6 +20,39 @@ def calcular_turno(ahora: Optional[datetime]) -> Turno:
     return Turno.T3
 
 
+def inicio_turno(ahora: datetime) -> datetime:
+    """Instante (misma zona que ``ahora``) en que empezo el turno en curso."""
+    t = ahora.time()
+    if time(6, 0) <= t < time(14, 0):
+        return ahora.replace(hour=6, minute=0, second=0, microsecond=0)
+    if time(14, 0) <= t < time(22, 0):
+        return ahora.replace(hour=14, minute=0, second=0, microsecond=0)
+    inicio = ahora.replace(hour=22, minute=0, second=0, microsecond=0)
+    # Turno 3 cruza la medianoche: de madrugada empezo a las 22:00 del dia anterior
+    return inicio if t >= time(22, 0) else inicio - timedelta(days=1)
+
+
+def fin_turno(inicio_prestamo: datetime) -> datetime:
+    """Instante en que termina el turno al que pertenece ``inicio_prestamo``."""
+    t = inicio_prestamo.time()
+    if time(6, 0) <= t < time(14, 0):
+        return inicio_prestamo.replace(hour=14, minute=0, second=0, microsecond=0)
+    if time(14, 0) <= t < time(22, 0):
+        return inicio_prestamo.replace(hour=22, minute=0, second=0, microsecond=0)
+    fin = inicio_prestamo.replace(hour=6, minute=0, second=0, microsecond=0)
+    return fin + timedelta(days=1) if t >= time(22, 0) else fin
+
+
+_HORA_INICIO_TURNO = {Turno.T1: 6, Turno.T2: 14, Turno.T3: 22}
+DURACION_TURNO = timedelta(hours=8)
+
+
+def ventana_turno(dia: date, turno: Turno, tz: Optional[tzinfo]) -> Tuple[datetime, datetime]:
+    """Inicio y fin del ``turno`` que empieza el ``dia`` local indicado (el Turno 3 termina al dia siguiente)."""
+    inicio = datetime.combine(dia, time(_HORA_INICIO_TURNO[turno]), tzinfo=tz)
+    return inicio, inicio + DURACION_TURNO
+
+
 def clean_doc(x: Optional[str]) -> Optional[str]:
     """Limpia una cedula dejando solo digitos (maximo 15)."""
     if not x:
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
-from typing import NewType
+from typing import NewType, Optional
 
 # Identificadores semanticos (opcionalmente normalizados en rules.py)
 Cedula = NewType("Cedula", str)
@@ -24,3 +26,38 @@ class EstadoPrestamo(Enum):
 
     ASIGNADO = "ASIGNADO"
     DEVUELTO = "DEVUELTO"
+
+
+@dataclass(frozen=True)
+class CursorPrestamo:
+    """Posicion de keyset sobre (fecha_hora_prestamo, id) para paginar prestamos."""
+
+    fecha_hora_prestamo: datetime
+    id: int
+
+
+@dataclass(frozen=True)
+class MarcaCambios:
+    """Watermark (updated_at, id) del ultimo cambio entregado en una sincronizacion delta."""
+
+    updated_at: datetime
+    id: int
+
+
+@dataclass(frozen=True)
+class FiltroPrestamos:
+    """Criterios de busqueda sobre prestamos (todos opcionales y combinables con AND).
+
+    ``usuario_sap`` se interpreta como prefijo, ``empleado_nombre`` como texto
+    contenido (sin distinguir mayusculas) y el rango ``[desde, hasta)`` aplica
+    sobre ``fecha_hora_prestamo``.
+    """
+
+    cedula: Optional[str] = None
+    codigo_radio: Optional[str] = None
+    usuario_sap: Optional[str] = None
+    empleado_nombre: Optional[str] = None
+    estado: Optional[EstadoPrestamo] = None
+    turno: Optional[Turno] = None
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
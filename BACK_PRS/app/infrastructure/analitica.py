@@ -0,0 +1,140 @@
+"""
+Infraestructura :: Motor analitico embebido (DuckDB) sobre la base SQLite.
+
+DuckDB adjunta en solo lectura la copia periodica de la base
+(``ANALITICA_SQLITE``, refrescada por ``snapshot_analitica``) y resuelve las
+agregaciones de forma vectorizada, sin pasar por el ORM ni leer el archivo que
+atiende al mostrador: un barrido del historico sobre la base en linea tomaria
+el lock de lectura y bloquearia a los escritores. ``duckdb`` es una dependencia
+opcional; sin ella, o sin snapshot configurado, las vistas responden 503.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from ..domain.ports.analitica import AnaliticaRepository
+from ..domain.reportes import CONSULTA_AUDITORIA, CONSULTA_EMPLEADOS, CONSULTA_RADIOS, ResultadoAnalitico
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - dependencia opcional
+    duckdb = None
+
+ANALITICA_DISPONIBLE = duckdb is not None
+
+
+def snapshot_configurado() -> bool:
+    """Hay un snapshot que leer; nunca se adjunta la base en linea."""
+    return bool(getattr(settings, "ANALITICA_SQLITE", None))
+
+
+# Prestamos (caliente + historico) iniciados en [$desde, $hasta). SQLite guarda los
+# instantes como texto UTC: se convierten una vez aqui y el resto opera en TIMESTAMP.
+_PRESTAMOS_RANGO = """
+WITH prestamos AS (
+    SELECT codigo_radio, cedula, empleado_nombre,
+           CAST(fecha_hora_prestamo AS TIMESTAMP) AS inicio,
+           CAST(fecha_hora_devolucion AS TIMESTAMP) AS fin
+    FROM oltp.prestamos
+    UNION ALL
+    SELECT codigo_radio, cedula, empleado_nombre,
+           CAST(fecha_hora_prestamo AS TIMESTAMP),
+           CAST(fecha_hora_devolucion AS TIMESTAMP)
+    FROM oltp.prestamos_historico
+),
+rango AS (
+    SELECT *, epoch(fin - inicio) / 3600.0 AS horas
+    FROM prestamos
+    WHERE inicio >= $desde AND inicio < $hasta
+)
+"""
+
+_CONSULTAS: Dict[str, str] = {
+    CONSULTA_RADIOS: _PRESTAMOS_RANGO + """
+SELECT codigo_radio,
+       count(*) AS prestamos,
+       count(fin) AS devueltos,
+       round(coalesce(sum(horas), 0), 2) AS horas_en_uso,
+       round(avg(horas), 2) AS media_horas,
+       round(quantile_cont(horas, 0.9), 2) AS p90_horas,
+       count(DISTINCT cedula) AS empleados
+FROM rango
+GROUP BY codigo_radio
+ORDER BY prestamos DESC, codigo_radio
+LIMIT $limite
+""",
+    CONSULTA_EMPLEADOS: _PRESTAMOS_RANGO + """
+SELECT cedula,
+       max(empleado_nombre) AS empleado_nombre,
+       count(*) AS prestamos,
+       count(fin) AS devueltos,
+       round(coalesce(sum(horas), 0), 2) AS horas_en_uso,
+       round(avg(horas), 2) AS media_horas,
+       round(quantile_cont(horas, 0.9), 2) AS p90_horas,
+       count(DISTINCT codigo_radio) AS radios
+FROM rango
+GROUP BY cedula
+ORDER BY prestamos DESC, cedula
+LIMIT $limite
+""",
+    CONSULTA_AUDITORIA: """
+WITH entradas AS (
+    SELECT aggregate, action, actor_user_id, CAST("at" AS TIMESTAMP) AS instante
+    FROM oltp.audit_log
+)
+SELECT aggregate AS agregado,
+       action AS accion,
+       actor_user_id,
+       count(*) AS eventos,
+       min(instante) AS primero,
+       max(instante) AS ultimo
+FROM entradas
+WHERE instante >= $desde AND instante < $hasta
+GROUP BY aggregate, action, actor_user_id
+ORDER BY eventos DESC, agregado, accion, actor_user_id
+LIMIT $limite
+""",
+}
+
+
+def _utc_naive(instante: datetime) -> datetime:
+    """Los TIMESTAMP leidos de SQLite son UTC sin zona: los parametros van igual."""
+    return instante.astimezone(dt_timezone.utc).replace(tzinfo=None)
+
+
+def _valor(valor: object) -> object:
+    return valor.replace(tzinfo=dt_timezone.utc) if isinstance(valor, datetime) else valor
+
+
+class DuckDBAnaliticaRepository(AnaliticaRepository):
+    """
+    Cada consulta abre una conexion DuckDB en memoria y adjunta ``ruta`` (por
+    defecto ``ANALITICA_SQLITE``) en solo lectura; ``ATTACH`` es barato, solo
+    lee el esquema.
+    """
+
+    def __init__(self, ruta: Optional[str] = None) -> None:
+        ruta = ruta or getattr(settings, "ANALITICA_SQLITE", None)
+        if not ruta:
+            raise ImproperlyConfigured("ANALITICA_SQLITE no esta configurada (ver snapshot_analitica).")
+        self.ruta = str(ruta)
+
+    def consultar(self, consulta: str, *, desde: datetime, hasta: datetime, limite: int) -> ResultadoAnalitico:
+        if duckdb is None:
+            raise RuntimeError("duckdb no esta instalado.")
+        con = duckdb.connect(":memory:")
+        try:
+            ruta = self.ruta.replace("'", "''")
+            con.execute(f"ATTACH '{ruta}' AS oltp (TYPE SQLITE, READ_ONLY)")
+            cursor = con.execute(
+                _CONSULTAS[consulta], {"desde": _utc_naive(desde), "hasta": _utc_naive(hasta), "limite": limite}
+            )
+            columnas = [d[0] for d in cursor.description]
+            filas = [[_valor(v) for v in fila] for fila in cursor.fetchall()]
+        finally:
+            con.close()
+        return ResultadoAnalitico(consulta=consulta, columnas=columnas, filas=filas)
@@ -0,0 +1,58 @@
+"""
+Infraestructura :: Escritura atomica y bloqueo de los artefactos en disco.
+
+Lo usan los archivos que se generan fuera de la base (dataset Parquet,
+snapshot SQLite de analitica). Cada escritura va a un temporal con nombre
+unico en el mismo directorio y se renombra sobre el destino; el bloqueo evita
+que dos ejecuciones (cron y la API, o dos workers) reescriban a la vez.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+from ..domain.errors import BusinessRuleViolation
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def bloqueo_exclusivo(ruta: Path, mensaje: str) -> Iterator[None]:
+    """
+    Lock exclusivo no bloqueante sobre ``ruta`` durante la ejecucion; si ya lo
+    tiene otro proceso levanta BusinessRuleViolation(``mensaje``). Lo libera
+    el sistema operativo si el proceso muere, asi que no quedan locks huerfanos.
+    """
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:  # pragma: no cover - Windows
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            raise BusinessRuleViolation(mensaje) from None
+        yield
+    finally:
+        os.close(fd)
+
+
+def escribir_atomico(ruta: Path, escribir: Callable[[Path], object]) -> None:
+    """``escribir(temporal)`` y renombra sobre ``ruta``; si falla, borra el temporal."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=ruta.parent, prefix=f".{ruta.name}.", suffix=".tmp", delete=False) as tmp:
+        temporal = Path(tmp.name)
+    try:
+        escribir(temporal)
+        os.replace(temporal, ruta)
+    except BaseException:
+        temporal.unlink(missing_ok=True)
+        raise
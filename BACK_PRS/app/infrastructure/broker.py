@@ -0,0 +1,115 @@
+"""
+Infraestructura :: Broker en proceso para difundir eventos de prestamos (SSE).
+
+Todas las conexiones abiertas de un worker comparten un unico buffer circular:
+una conexion inactiva solo retiene un Future a la espera, por lo que cientos
+de tableros abiertos no cuestan mas que un puñado de objetos. Los eventos no se
+comparten entre workers; cada proceso difunde lo que confirma.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Deque, List, Optional, Set, Tuple
+
+from django.db import transaction
+
+from ..domain.events import PrestamoEvento
+from ..domain.ports.eventos import PrestamoEventPublisher
+
+
+@dataclass(frozen=True)
+class MensajeBroker:
+    """Evento numerado dentro del buffer del broker."""
+
+    id: int
+    tipo: str
+    payload: Any
+
+
+@dataclass(frozen=True)
+class LecturaBroker:
+    """Resultado de leer desde un id: mensajes pendientes o aviso de que hubo un hueco."""
+
+    mensajes: List[MensajeBroker]
+    perdidos: bool = False
+
+
+class EventBroker:
+    """Fan-out thread-safe hacia consumidores asyncio con reanudacion por id."""
+
+    def __init__(self, capacidad: int = 1000) -> None:
+        # La instancia distingue ids de procesos distintos (reinicios del worker)
+        self.instancia = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._buffer: Deque[MensajeBroker] = deque(maxlen=capacidad)
+        self._ultimo_id = 0
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+
+    @property
+    def ultimo_id(self) -> int:
+        with self._lock:
+            return self._ultimo_id
+
+    def publicar(self, tipo: str, payload: Any) -> int:
+        """Agrega el evento al buffer y despierta a todos los consumidores en espera."""
+        with self._lock:
+            self._ultimo_id += 1
+            self._buffer.append(MensajeBroker(id=self._ultimo_id, tipo=tipo, payload=payload))
+            waiters, self._waiters = self._waiters, set()
+            nuevo_id = self._ultimo_id
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolver, future)
+        return nuevo_id
+
+    def leer_desde(self, ultimo_id: int) -> LecturaBroker:
+        """Mensajes con id > ultimo_id; ``perdidos`` indica que el buffer ya los descarto."""
+        with self._lock:
+            return self._leer(ultimo_id)
+
+    async def esperar(self, ultimo_id: int, timeout: float) -> LecturaBroker:
+        """Devuelve los mensajes nuevos o una lectura vacia si vence el timeout."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            lectura = self._leer(ultimo_id)
+            if lectura.mensajes or lectura.perdidos:
+                return lectura
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return LecturaBroker(mensajes=[])
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+        return self.leer_desde(ultimo_id)
+
+    def _leer(self, ultimo_id: int) -> LecturaBroker:
+        if ultimo_id >= self._ultimo_id:
+            return LecturaBroker(mensajes=[])
+        perdidos = bool(self._buffer) and self._buffer[0].id > ultimo_id + 1
+        return LecturaBroker(mensajes=[m for m in self._buffer if m.id > ultimo_id], perdidos=perdidos)
+
+
+def _resolver(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class OnCommitPrestamoPublisher(PrestamoEventPublisher):
+    """Publica en el broker solo cuando la transaccion en curso hace commit."""
+
+    def __init__(self, broker: Optional[EventBroker] = None) -> None:
+        self.broker = broker or prestamos_broker
+
+    def publicar(self, evento: PrestamoEvento) -> None:
+        transaction.on_commit(partial(self.broker.publicar, evento.tipo, evento.prestamo))
+
+
+prestamos_broker = EventBroker()
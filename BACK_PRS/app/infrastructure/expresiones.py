@@ -0,0 +1,22 @@
+"""
+Infraestructura :: Expresiones SQL compartidas por repositorios y reportes.
+"""
+from __future__ import annotations
+
+from django.db.models import FloatField, Func
+
+
+class EpochSegundos(Func):
+    """Segundos desde epoch (float) de un DateTimeField, calculados por el motor."""
+
+    template = "EXTRACT(EPOCH FROM %(expressions)s)"
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite guarda el texto en UTC; julianday conserva la fraccion de segundo
+        return self.as_sql(
+            compiler, connection, template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)", **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="UNIX_TIMESTAMP(%(expressions)s)", **extra_context)
@@ -0,0 +1,90 @@
+"""
+Infraestructura :: Mantenimiento fisico de la base de datos (espacio tras purgas).
+
+Solo aplica a SQLite: en otros motores el espacio lo gestiona el propio
+servidor (autovacuum de PostgreSQL, purge de InnoDB) y aqui no se hace nada.
+"""
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from django.db import connections
+
+from .archivos import bloqueo_exclusivo, escribir_atomico
+
+
+@dataclass(frozen=True)
+class EspacioSQLite:
+    """Tamaño del archivo y bytes en paginas libres (reutilizables, aun no devueltas al SO)."""
+
+    total: int
+    libres: int
+
+
+def _pragma(cursor, nombre: str) -> int:
+    cursor.execute(f"PRAGMA {nombre}")
+    return int(cursor.fetchone()[0])
+
+
+def espacio_sqlite(using: str = "default") -> Optional[EspacioSQLite]:
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return None
+    with connection.cursor() as cursor:
+        page_size = _pragma(cursor, "page_size")
+        return EspacioSQLite(
+            total=page_size * _pragma(cursor, "page_count"),
+            libres=page_size * _pragma(cursor, "freelist_count"),
+        )
+
+
+def recuperar_espacio_sqlite(*, completo: bool = False, using: str = "default") -> bool:
+    """
+    Devuelve al sistema las paginas libres. Con ``auto_vacuum=INCREMENTAL``
+    basta ``incremental_vacuum`` (no reescribe la base); si no, solo se hace un
+    ``VACUUM`` completo cuando se pide, porque reescribe el archivo entero y
+    bloquea las escrituras mientras dura. Devuelve si se ejecuto algun paso.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        if _pragma(cursor, "auto_vacuum") == 2:  # INCREMENTAL
+            cursor.execute("PRAGMA incremental_vacuum")
+            cursor.fetchall()
+            return True
+        if completo:
+            cursor.execute("VACUUM")
+            return True
+    return False
+
+
+def snapshot_sqlite(destino: str, *, using: str = "default") -> Optional[int]:
+    """
+    Copia consistente de la base en ``destino`` con la API de backup de SQLite
+    (por lotes de paginas, sin bloquear a los escritores mas que un instante).
+    Se escribe en un temporal unico y se renombra, asi un lector del snapshot
+    nunca ve un archivo a medias; ``<destino>.lock`` excluye a otra ejecucion
+    (BusinessRuleViolation). Devuelve el tamaño copiado, o None si no es SQLite.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return None
+    destino_path = Path(destino)
+
+    def copiar(temporal: Path) -> None:
+        copia = sqlite3.connect(temporal)
+        try:
+            connection.connection.backup(copia, pages=1024)
+        finally:
+            copia.close()
+
+    with bloqueo_exclusivo(
+        destino_path.with_name(destino_path.name + ".lock"), "Ya hay un snapshot en curso hacia ese destino."
+    ):
+        connection.ensure_connection()
+        escribir_atomico(destino_path, copiar)
+    return destino_path.stat().st_size
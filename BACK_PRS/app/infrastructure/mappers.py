@@ -2,6 +2,7 @@
 Infraestructura :: Mapeadores ORM <-> Entidades de dominio
 """
 from __future__ import annotations
+from datetime import datetime
 from typing import Optional
 
 from ..domain.entities import Empleado, RadioFrecuencia, SapUsuario, Prestamo
@@ -89,3 +90,31 @@ def prestamo_to_model_fields(entity: Prestamo) -> dict:
         "usuario_registra_id": entity.usuario_registra_id,
         "fecha_hora_devolucion": entity.fecha_hora_devolucion,
     }
+
+
+def prestamo_to_json(entity: Prestamo) -> dict:
+    """Representacion JSON de un prestamo (fechas ISO 8601) para fotos congeladas."""
+    fields = prestamo_to_model_fields(entity)
+    fields["id"] = entity.id
+    fields["usuario_registra_username"] = entity.usuario_registra_username
+    for campo in ("fecha_hora_prestamo", "fecha_hora_devolucion"):
+        fields[campo] = fields[campo].isoformat() if fields[campo] else None
+    return fields
+
+
+def prestamo_from_json(data: dict) -> Prestamo:
+    devolucion = data.get("fecha_hora_devolucion")
+    return Prestamo(
+        id=data["id"],
+        cedula=data["cedula"],
+        empleado_nombre=data["empleado_nombre"],
+        usuario_sap=data["usuario_sap"],
+        codigo_radio=data["codigo_radio"],
+        fecha_hora_prestamo=datetime.fromisoformat(data["fecha_hora_prestamo"]),
+        turno=Turno(data["turno"]),
+        estado=EstadoPrestamo(data["estado"]),
+        usuario_registra_id=data["usuario_registra_id"],
+        fecha_hora_devolucion=datetime.fromisoformat(devolucion) if devolucion else None,
+        usuario_registra_username=data.get("usuario_registra_username"),
+    )
+
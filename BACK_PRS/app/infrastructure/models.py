@@ -65,10 +65,10 @@ class SapUsuarioModel(TimeStampedMixin):
 
 class PrestamoModel(TimeStampedMixin):
     id = models.BigAutoField(primary_key=True)
-    cedula = models.CharField(max_length=15, db_index=True)
+    cedula = models.CharField(max_length=15)
     empleado_nombre = models.CharField(max_length=150)
     usuario_sap = models.CharField(max_length=50, db_index=True)
-    codigo_radio = models.CharField(max_length=25, db_index=True)
+    codigo_radio = models.CharField(max_length=25)
 
     fecha_hora_prestamo = models.DateTimeField()
     turno = models.CharField(max_length=40)  # "Turno 1 (6 am - 2 pm)" etc.
@@ -84,35 +84,187 @@ class PrestamoModel(TimeStampedMixin):
 
     class Meta:
         db_table = "prestamos"
+        # Solo los prestamos abiertos: indices parciales que no crecen con el historico
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cedula"],
+                condition=models.Q(estado="ASIGNADO"),
+                name="prestamo_abierto_cedula_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["codigo_radio"],
+                condition=models.Q(estado="ASIGNADO"),
+                name="prestamo_abierto_radio_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["usuario_sap"],
+                condition=models.Q(estado="ASIGNADO"),
+                name="prestamo_abierto_sap_uniq",
+            ),
+        ]
         indexes = [
-            models.Index(fields=["cedula", "estado"]),
-            models.Index(fields=["codigo_radio", "estado"]),
-            models.Index(fields=["usuario_sap", "estado"]),
+            # Keyset pagination del listado (orden por fecha + id como desempate)
+            models.Index(fields=["fecha_hora_prestamo", "id"]),
+            # Filtros del historico combinados con rango de fechas
+            models.Index(fields=["estado", "fecha_hora_prestamo"]),
+            models.Index(fields=["turno", "fecha_hora_prestamo"]),
+            # Historial por empleado (su prefijo cubre tambien las busquedas por cedula)
+            models.Index(fields=["cedula", "fecha_hora_prestamo"]),
+            # Timeline por radio (su prefijo cubre tambien las busquedas por codigo_radio)
+            models.Index(fields=["codigo_radio", "fecha_hora_prestamo"]),
+            # Devoluciones por rango (mapa de calor)
+            models.Index(fields=["fecha_hora_devolucion"]),
+            # Sincronizacion delta (?since=) por watermark de modificacion
+            models.Index(fields=["updated_at", "id"]),
         ]
 
     def __str__(self):
         return f"{self.codigo_radio} -> {self.cedula} ({self.estado})"
 
 
+class PrestamoHistoricoModel(models.Model):
+    """
+    Particion fria: prestamos DEVUELTO movidos por el comando ``archivar_prestamos``.
+    Conserva el id y las marcas de tiempo originales; solo se lee (union con ``prestamos``).
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    cedula = models.CharField(max_length=15)
+    empleado_nombre = models.CharField(max_length=150)
+    usuario_sap = models.CharField(max_length=50, db_index=True)
+    codigo_radio = models.CharField(max_length=25)
+
+    fecha_hora_prestamo = models.DateTimeField()
+    turno = models.CharField(max_length=40)
+    estado = models.CharField(max_length=12)
+
+    usuario_registra = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name="prestamos_historicos",
+        db_index=True,
+    )
+    fecha_hora_devolucion = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archivado_en = models.DateTimeField()
+
+    class Meta:
+        db_table = "prestamos_historico"
+        indexes = [
+            models.Index(fields=["fecha_hora_prestamo", "id"]),
+            models.Index(fields=["turno", "fecha_hora_prestamo"]),
+            models.Index(fields=["cedula", "fecha_hora_prestamo"]),
+            models.Index(fields=["codigo_radio", "fecha_hora_prestamo"]),
+            models.Index(fields=["fecha_hora_devolucion"]),
+        ]
+
+    def __str__(self):
+        return f"{self.codigo_radio} -> {self.cedula} (archivado)"
+
+
+class PrestamoVencidoModel(models.Model):
+    """Conjunto materializado por el comando ``detectar_vencidos`` (prestamos abiertos tras su turno)."""
+
+    prestamo = models.OneToOneField(
+        PrestamoModel, primary_key=True, on_delete=models.CASCADE, related_name="vencido"
+    )
+    fin_turno = models.DateTimeField()
+    detectado_en = models.DateTimeField()
+
+    class Meta:
+        db_table = "prestamos_vencidos"
+
+    def __str__(self):
+        return f"{self.prestamo_id} vencido desde {self.fin_turno}"
+
+
+class ResumenDiarioModel(models.Model):
+    """
+    Rollup por dia local de inicio del prestamo y una dimension (turno, radio o
+    empleado). Se incrementa en la transaccion de cada asignacion/devolucion y
+    se puede recalcular con ``reconstruir_resumenes``. Las filas de dias pasados
+    no son definitivas: la devolucion de un prestamo suma en el dia en que
+    empezo, y el admin corrige el dia de los prestamos que edita o borra.
+    """
+
+    dia = models.DateField()
+    dimension = models.CharField(max_length=10)  # turno | radio | empleado
+    clave = models.CharField(max_length=40)
+    asignados = models.IntegerField(default=0)
+    devueltos = models.IntegerField(default=0)
+    segundos_uso = models.FloatField(default=0.0)
+
+    class Meta:
+        db_table = "prestamos_resumen_diario"
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "dia", "clave"], name="resumen_diario_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.dimension}={self.clave}: {self.asignados}/{self.devueltos}"
+
+
+class EntregaTurnoModel(models.Model):
+    """
+    Foto congelada de un turno cerrado (pendientes, prestados y devueltos) para
+    el reporte de cambio de turno. Los prestamos se guardan como JSON tal como
+    estaban al cierre: leerla no toca las tablas de prestamos.
+    """
+
+    dia = models.DateField()  # dia local en que empezo el turno
+    turno = models.CharField(max_length=40)
+    inicio = models.DateTimeField()
+    fin = models.DateTimeField()
+    congelada_en = models.DateTimeField()
+    pendientes = models.JSONField(default=list)
+    prestados = models.JSONField(default=list)
+    devueltos = models.JSONField(default=list)
+
+    class Meta:
+        db_table = "entregas_turno"
+        constraints = [
+            models.UniqueConstraint(fields=["dia", "turno"], name="entrega_turno_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.turno}"
+
+
+# --- Versiones de colecciones (ETag / GET condicional) ---
+
+class ColeccionVersionModel(models.Model):
+    nombre = models.CharField(max_length=32, primary_key=True)  # prestamos | empleados | radios | sap_usuarios
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "colecciones_version"
+
+    def __str__(self):
+        return f"{self.nombre}@{self.version}"
+
+
 # --- Auditoría (Infraestructura para AdminChangeEvent) ---
 
 class AuditEntry(models.Model):
-    aggregate = models.CharField(max_length=64, db_index=True)  # Empleado | RadioFrecuencia | SapUsuario
-    action = models.CharField(max_length=16, db_index=True)     # CREATED | UPDATED | DELETED
+    aggregate = models.CharField(max_length=64)                 # Empleado | RadioFrecuencia | SapUsuario
+    action = models.CharField(max_length=16)                    # CREATED | UPDATED | DELETED
     id_ref = models.CharField(max_length=128, db_index=True)    # cedula | codigo | username
     at = models.DateTimeField(db_index=True)                    # UTC recomendado
     actor_user_id = models.IntegerField(db_index=True)
     before = models.JSONField(null=True, blank=True)
     after = models.JSONField(null=True, blank=True)
     reason = models.TextField(null=True, blank=True)
+    # True cuando before/after ya se redujeron a los campos que cambiaron (purgar_auditoria)
+    compactado = models.BooleanField(default=False)
 
     class Meta:
         db_table = "audit_log"
         ordering = ["-at"]
         indexes = [
-            models.Index(fields=["aggregate", "action"]),
-            models.Index(fields=["at"]),
-            models.Index(fields=["actor_user_id"]),
+            # Filtro por agregado del listado y barridos de retencion por (agregado, accion, antigüedad)
+            models.Index(fields=["aggregate", "action", "at"]),
         ]
 
     def __str__(self):
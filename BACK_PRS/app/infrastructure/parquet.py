@@ -0,0 +1,186 @@
+"""
+Infraestructura :: Dataset Parquet de prestamos y audit_log para BI.
+
+Estructura: ``<raiz>/<tabla>/mes=YYYY-MM/part-0.parquet`` (particion tipo
+Hive por mes local del prestamo o del evento) y ``<raiz>/_marcas.json`` con el
+watermark de cada tabla. Cada particion se reescribe completa en un temporal
+unico y se renombra, asi que un lector nunca ve un archivo a medias y
+reexportar un mes es idempotente; ``<raiz>/_exportacion.lock`` impide dos
+ejecuciones simultaneas. ``pyarrow`` es una dependencia opcional: sin ella
+``PARQUET_DISPONIBLE`` es False.
+"""
+from __future__ import annotations
+
+import json
+from contextlib import AbstractContextManager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db.models import DateField, F, Max
+from django.db.models.functions import Greatest, TruncMonth
+from django.utils import timezone
+
+from ..domain.ports.exportacion import ExportacionParquet
+from ..domain.reportes import TABLA_AUDITORIA, TABLA_PRESTAMOS
+from .archivos import bloqueo_exclusivo, escribir_atomico
+from .models import AuditEntry, PrestamoHistoricoModel
+from .reportes import inicio_dia_local
+from .repositories import particiones_prestamos
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependencia opcional
+    pa = pq = None
+
+PARQUET_DISPONIBLE = pa is not None
+
+# (columna, tipo) de cada tabla; los instantes van en UTC con microsegundos
+_COLUMNAS: Dict[str, Sequence[Tuple[str, str]]] = {
+    TABLA_PRESTAMOS: (
+        ("id", "int64"),
+        ("cedula", "string"),
+        ("empleado_nombre", "string"),
+        ("usuario_sap", "string"),
+        ("codigo_radio", "string"),
+        ("turno", "string"),
+        ("estado", "string"),
+        ("fecha_hora_prestamo", "timestamp"),
+        ("fecha_hora_devolucion", "timestamp"),
+        ("usuario_registra_id", "int64"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ),
+    TABLA_AUDITORIA: (
+        ("id", "int64"),
+        ("aggregate", "string"),
+        ("action", "string"),
+        ("id_ref", "string"),
+        ("at", "timestamp"),
+        ("actor_user_id", "int64"),
+        ("before", "json"),
+        ("after", "json"),
+        ("reason", "string"),
+        ("compactado", "bool"),
+    ),
+}
+
+# Instante que ubica la fila en su mes y campo del watermark incremental
+_CAMPO_MES = {TABLA_PRESTAMOS: "fecha_hora_prestamo", TABLA_AUDITORIA: "at"}
+_CAMPO_MARCA = {TABLA_PRESTAMOS: "updated_at", TABLA_AUDITORIA: "at"}
+
+_COMPRESION = "zstd"
+
+
+def _modelos(tabla: str) -> List[Any]:
+    return particiones_prestamos() if tabla == TABLA_PRESTAMOS else [AuditEntry]
+
+
+def _tipo(tipo: str) -> "pa.DataType":
+    return {
+        "int64": pa.int64(),
+        "string": pa.string(),
+        "json": pa.string(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }[tipo]
+
+
+def _marca(tabla: str, modelo: Any):
+    """
+    Instante en que la fila cambio por ultima vez. En el historico cuenta
+    tambien el archivado: la fila llega con el ``updated_at`` que tenia en la
+    tabla caliente, posiblemente anterior al watermark.
+    """
+    if modelo is PrestamoHistoricoModel:
+        return Greatest("updated_at", "archivado_en")
+    return F(_CAMPO_MARCA[tabla])
+
+
+def _siguiente_mes(mes: date) -> date:
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+class ParquetExportacion(ExportacionParquet):
+    """Dataset en el directorio ``raiz`` (por defecto ``PARQUET_EXPORT_DIR``)."""
+
+    def __init__(self, raiz: Optional[str] = None) -> None:
+        self.raiz = Path(raiz or settings.PARQUET_EXPORT_DIR)
+
+    def bloqueo(self) -> AbstractContextManager[None]:
+        return bloqueo_exclusivo(self.raiz / "_exportacion.lock", "Ya hay una exportacion Parquet en curso.")
+
+    @property
+    def _ruta_marcas(self) -> Path:
+        return self.raiz / "_marcas.json"
+
+    def _marcas(self) -> Dict[str, str]:
+        try:
+            return json.loads(self._ruta_marcas.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def ruta_particion(self, tabla: str, mes: date) -> Path:
+        return self.raiz / tabla / f"mes={mes:%Y-%m}" / "part-0.parquet"
+
+    def leer_marca(self, tabla: str) -> Optional[datetime]:
+        valor = self._marcas().get(tabla)
+        return datetime.fromisoformat(valor) if valor else None
+
+    def guardar_marca(self, tabla: str, marca: datetime) -> None:
+        marcas = {**self._marcas(), tabla: marca.isoformat()}
+        escribir_atomico(self._ruta_marcas, lambda ruta: ruta.write_text(json.dumps(marcas, indent=2), encoding="utf-8"))
+
+    def meses_modificados(self, tabla: str, *, desde: Optional[datetime]) -> Tuple[List[date], Optional[datetime]]:
+        """
+        El watermark nuevo se fija antes de buscar los meses y la busqueda se
+        acota a el: una fila que cambie mientras tanto queda para la siguiente
+        ejecucion en lugar de perderse. En el historico la marca de cada fila
+        es el mas reciente entre ``updated_at`` y ``archivado_en``.
+        """
+        tz = timezone.get_current_timezone()
+        consultas = []
+        for modelo in _modelos(tabla):
+            qs = modelo.objects.annotate(marca=_marca(tabla, modelo))
+            if desde is not None:
+                qs = qs.filter(marca__gt=desde)
+            consultas.append(qs)
+        marcas = [m for m in (qs.aggregate(m=Max("marca"))["m"] for qs in consultas) if m is not None]
+        if not marcas:
+            return [], None
+        nueva = max(marcas)
+        meses = set()
+        for qs in consultas:
+            meses.update(
+                qs.filter(marca__lte=nueva)
+                .annotate(mes=TruncMonth(_CAMPO_MES[tabla], output_field=DateField(), tzinfo=tz))
+                .values_list("mes", flat=True)
+                .distinct()
+                .order_by()
+            )
+        return sorted(meses), nueva
+
+    def escribir_mes(self, tabla: str, mes: date) -> int:
+        """Reescribe la particion del mes con todas sus filas (caliente + historico), en orden de instante."""
+        if pa is None:
+            raise RuntimeError("pyarrow no esta instalado.")
+        columnas = _COLUMNAS[tabla]
+        nombres = [c for c, _ in columnas]
+        campo_mes = _CAMPO_MES[tabla]
+        rango = {f"{campo_mes}__gte": inicio_dia_local(mes), f"{campo_mes}__lt": inicio_dia_local(_siguiente_mes(mes))}
+        valores: List[List[Any]] = [[] for _ in columnas]
+        for modelo in _modelos(tabla):
+            for fila in modelo.objects.filter(**rango).order_by(campo_mes, "id").values_list(*nombres).iterator():
+                for destino, valor, (_, tipo) in zip(valores, fila, columnas):
+                    destino.append(json.dumps(valor, ensure_ascii=False) if tipo == "json" and valor is not None else valor)
+        esquema = pa.schema([(nombre, _tipo(tipo)) for nombre, tipo in columnas])
+        tabla_arrow = pa.table(valores, schema=esquema)
+        if tabla == TABLA_PRESTAMOS:  # caliente e historico llegan por separado
+            tabla_arrow = tabla_arrow.sort_by([(campo_mes, "ascending"), ("id", "ascending")])
+        escribir_atomico(
+            self.ruta_particion(tabla, mes),
+            lambda ruta: pq.write_table(tabla_arrow, ruta, compression=_COMPRESION),
+        )
+        return tabla_arrow.num_rows
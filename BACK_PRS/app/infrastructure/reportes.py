@@ -0,0 +1,412 @@
+"""
+Infraestructura :: Consultas agregadas de reportes (GROUP BY en la base de datos).
+"""
+from __future__ import annotations
+
+import heapq
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+from itertools import chain, islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, DateField, F, Max, Min, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, TruncDate, TruncMonth
+from django.utils import timezone
+
+from ..domain.entities import Prestamo
+from ..domain.ports.reportes import CacheReportes, ReportesRepository, ResumenesRepository
+from ..domain.reportes import (
+    DIMENSION_EMPLEADO,
+    DIMENSION_RADIO,
+    DIMENSION_TURNO,
+    EVENTO_ASIGNACION,
+    EVENTO_DEVOLUCION,
+    BloqueDuraciones,
+    ConteoHoraSemana,
+    ConteoTurnoDia,
+    ResumenDiario,
+    UsoEmpleadoMes,
+)
+from ..domain.rules import calcular_turno
+from ..domain.value_objects import EstadoPrestamo, Turno
+from .expresiones import EpochSegundos
+from .models import RadioFrecuenciaModel, ResumenDiarioModel
+from .repositories import en_curso_en, particiones_prestamos
+
+
+# Instante del prestamo que ubica cada evento en el mapa de calor
+_CAMPO_EVENTO = {EVENTO_ASIGNACION: "fecha_hora_prestamo", EVENTO_DEVOLUCION: "fecha_hora_devolucion"}
+
+
+def inicio_dia_local(dia: date) -> datetime:
+    """Medianoche local (TIME_ZONE) del dia indicado como datetime aware."""
+    return timezone.make_aware(datetime.combine(dia, time.min), timezone.get_current_timezone())
+
+
+class DjangoReportesRepository(ReportesRepository):
+    def contar_por_turno_dia(self, *, desde: date, hasta: date) -> List[ConteoTurnoDia]:
+        """
+        Asignaciones: el resumen diario por turno (a lo sumo 3 filas por dia,
+        dia local y turno de inicio del prestamo). Devoluciones: un GROUP BY por
+        dia local y hora de ``fecha_hora_devolucion`` (indice propio), de modo
+        que cada una cuenta en el turno en que se registro y no en el del
+        prestamo. Ninguna de las dos depende del tamaño del historico.
+        """
+        conteos = [
+            ConteoTurnoDia(dia=r.dia, turno=Turno(r.clave), estado=EstadoPrestamo.ASIGNADO, total=r.asignados)
+            for r in ResumenDiarioModel.objects.filter(dimension=DIMENSION_TURNO, dia__gte=desde, dia__lte=hasta)
+        ]
+        tz = timezone.get_current_timezone()
+        devoluciones: Counter = Counter()
+        for modelo in particiones_prestamos():
+            rows = (
+                modelo.objects.filter(
+                    fecha_hora_devolucion__gte=inicio_dia_local(desde),
+                    fecha_hora_devolucion__lt=inicio_dia_local(hasta + timedelta(days=1)),
+                )
+                .annotate(
+                    dia=TruncDate("fecha_hora_devolucion", tzinfo=tz),
+                    hora=ExtractHour("fecha_hora_devolucion", tzinfo=tz),
+                )
+                .values_list("dia", "hora")
+                .annotate(total=Count("id"))
+                .order_by()
+            )
+            for dia, hora, total in rows:
+                devoluciones[(dia, calcular_turno(datetime.combine(dia, time(hora))))] += total
+        conteos.extend(
+            ConteoTurnoDia(dia=dia, turno=turno, estado=EstadoPrestamo.DEVUELTO, total=total)
+            for (dia, turno), total in devoluciones.items()
+        )
+        return conteos
+
+    def iterar_duraciones(
+        self, *, desde: datetime, hasta: datetime, chunk_size: int = 50_000
+    ) -> Iterator[BloqueDuraciones]:
+        """
+        Prestamos que se solapan con ``[desde, hasta)`` (caliente + historico)
+        como bloques columnares: solo viajan el codigo de radio y los dos
+        instantes ya convertidos a epoch. Son los iniciados en el rango (un
+        rango del indice de fecha) mas los que ya estaban en curso en ``desde``:
+        a lo sumo uno por radio, hallado con unas pocas busquedas por radio en
+        el indice (codigo_radio, fecha_hora_prestamo), ver ``en_curso_en``. El
+        costo depende del rango y del numero de radios, no del historial.
+        """
+        rows = chain.from_iterable(
+            qs.order_by()
+            .values_list("codigo_radio", EpochSegundos("fecha_hora_prestamo"), EpochSegundos("fecha_hora_devolucion"))
+            .iterator(chunk_size=chunk_size)
+            for modelo in particiones_prestamos()
+            for qs in (
+                en_curso_en(modelo, desde, iniciados_en_instante=False),
+                modelo.objects.filter(fecha_hora_prestamo__gte=desde, fecha_hora_prestamo__lt=hasta),
+            )
+        )
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            radios, inicios, fines = zip(*chunk)
+            yield BloqueDuraciones(radios=radios, inicios=inicios, fines=fines)
+
+    def iterar_intervalos(
+        self, *, desde: datetime, hasta: datetime, chunk_size: int = 50_000
+    ) -> Iterator[Tuple[datetime, Optional[datetime]]]:
+        """
+        (inicio, devolucion) de los prestamos que se solapan con ``[desde, hasta)``
+        en orden de inicio, mezclando un flujo por tabla (caliente e historico).
+        Cada flujo son los que ya estaban en curso en ``desde`` (a lo sumo uno
+        por radio, con unas pocas busquedas por radio en el indice
+        (codigo_radio, fecha_hora_prestamo), ver ``en_curso_en``) seguidos de
+        los iniciados en el rango por el indice (fecha_hora_prestamo, id). Lo
+        anterior a ``desde`` solo se toca en esas busquedas, no se recorre, y
+        nada se materializa.
+        """
+        flujos = [
+            chain(
+                en_curso_en(modelo, desde, iniciados_en_instante=False)
+                .order_by("fecha_hora_prestamo")
+                .values_list("fecha_hora_prestamo", "fecha_hora_devolucion"),
+                modelo.objects.filter(fecha_hora_prestamo__gte=desde, fecha_hora_prestamo__lt=hasta)
+                .order_by("fecha_hora_prestamo")
+                .values_list("fecha_hora_prestamo", "fecha_hora_devolucion")
+                .iterator(chunk_size=chunk_size),
+            )
+            for modelo in particiones_prestamos()
+        ]
+        return heapq.merge(*flujos, key=lambda intervalo: intervalo[0])
+
+    def contar_por_hora_semana(
+        self, *, desde: date, hasta: date, turno: Optional[Turno] = None
+    ) -> List[ConteoHoraSemana]:
+        """
+        Asignaciones y devoluciones ocurridas en los dias locales ``[desde, hasta]``
+        agrupadas por dia de la semana ISO y hora local; el motor hace el
+        bucketing (EXTRACT con la zona de TIME_ZONE), asi que solo vuelven a lo
+        sumo 7x24 filas por evento y tabla. ``turno`` filtra por el turno del prestamo.
+        """
+        tz = timezone.get_current_timezone()
+        inicio, fin = inicio_dia_local(desde), inicio_dia_local(hasta + timedelta(days=1))
+        totales: Counter = Counter()
+        for modelo in particiones_prestamos():
+            qs = modelo.objects.all()
+            if turno is not None:
+                qs = qs.filter(turno=turno.value)
+            for evento, campo in _CAMPO_EVENTO.items():
+                rows = (
+                    qs.filter(**{f"{campo}__gte": inicio, f"{campo}__lt": fin})
+                    .annotate(dia_semana=ExtractIsoWeekDay(campo, tzinfo=tz), hora=ExtractHour(campo, tzinfo=tz))
+                    .values_list("dia_semana", "hora")
+                    .annotate(total=Count("id"))
+                    .order_by()
+                )
+                for dia_semana, hora, total in rows:
+                    totales[(evento, dia_semana - 1, hora)] += total
+        return [
+            ConteoHoraSemana(evento=evento, dia_semana=dia_semana, hora=hora, total=total)
+            for (evento, dia_semana, hora), total in sorted(totales.items())
+        ]
+
+    def contar_por_empleado_mes(self, *, desde: date, hasta: date) -> List[UsoEmpleadoMes]:
+        """
+        Prestamos iniciados en los meses locales ``[desde, hasta]`` (``desde`` y
+        ``hasta`` son el dia 1 de cada mes) agrupados por cedula y mes: un solo
+        GROUP BY por tabla con TRUNC en la zona de TIME_ZONE, asi que vuelve una
+        fila por empleado y mes, no por prestamo. Las horas suman solo los
+        devueltos; ``abiertos`` dice si el mes todavia puede cambiar.
+        """
+        tz = timezone.get_current_timezone()
+        inicio = inicio_dia_local(desde)
+        fin = inicio_dia_local((hasta + timedelta(days=31)).replace(day=1))
+        devuelto = Q(estado=EstadoPrestamo.DEVUELTO.value)
+        totales: Dict[Tuple[date, str], List[Any]] = {}
+        for modelo in particiones_prestamos():
+            rows = (
+                modelo.objects.filter(fecha_hora_prestamo__gte=inicio, fecha_hora_prestamo__lt=fin)
+                .annotate(mes=TruncMonth("fecha_hora_prestamo", output_field=DateField(), tzinfo=tz))
+                .values_list("mes", "cedula")
+                .annotate(
+                    nombre=Max("empleado_nombre"),
+                    prestamos=Count("id"),
+                    abiertos=Count("id", filter=Q(estado=EstadoPrestamo.ASIGNADO.value)),
+                    segundos=Sum(
+                        EpochSegundos("fecha_hora_devolucion") - EpochSegundos("fecha_hora_prestamo"), filter=devuelto
+                    ),
+                )
+                .order_by()
+            )
+            for mes, cedula, nombre, prestamos, abiertos, segundos in rows:
+                acumulado = totales.setdefault((mes, cedula), [nombre, 0, 0, 0.0])
+                acumulado[1] += prestamos
+                acumulado[2] += abiertos
+                acumulado[3] += segundos or 0.0
+        return [
+            UsoEmpleadoMes(
+                mes=mes, cedula=cedula, empleado_nombre=nombre, prestamos=prestamos, abiertos=abiertos, segundos_uso=segundos
+            )
+            for (mes, cedula), (nombre, prestamos, abiertos, segundos) in sorted(totales.items())
+        ]
+
+    def codigos_radios_activos(self) -> List[str]:
+        return list(RadioFrecuenciaModel.objects.filter(activo=True).order_by("codigo").values_list("codigo", flat=True))
+
+
+class DjangoCacheReportes(CacheReportes):
+    """
+    Cache de reportes sobre el framework de cache de Django (``CACHES``). La
+    invalidacion va en la clave (el servicio antepone la version de prestamos);
+    la expiracion solo descarta las entradas de versiones viejas, que ya nadie
+    pide, en backends que no las desalojan solos.
+    """
+
+    def __init__(self, alias: str = "default", prefijo: str = "reportes:", segundos: int = 7 * 24 * 3600) -> None:
+        self.cache = caches[alias]
+        self.prefijo = prefijo
+        self.segundos = segundos
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        return self.cache.get(self.prefijo + clave)
+
+    def guardar(self, clave: str, valor: Any) -> None:
+        self.cache.set(self.prefijo + clave, valor, timeout=self.segundos)
+
+
+# Columna del prestamo que da la clave de cada dimension del resumen
+_COLUMNA_DIMENSION = {
+    DIMENSION_TURNO: "turno",
+    DIMENSION_RADIO: "codigo_radio",
+    DIMENSION_EMPLEADO: "cedula",
+}
+
+_Clave = Tuple[date, str, str]
+
+
+def _claves(p: Prestamo) -> List[_Clave]:
+    dia = timezone.localdate(p.fecha_hora_prestamo)
+    return [
+        (dia, DIMENSION_TURNO, p.turno.value),
+        (dia, DIMENSION_RADIO, p.codigo_radio),
+        (dia, DIMENSION_EMPLEADO, p.cedula),
+    ]
+
+
+class DjangoResumenesRepository(ResumenesRepository):
+    """
+    Mantiene ``prestamos_resumen_diario``. Los incrementos son UPDATE con F()
+    (sin leer-modificar-escribir), asi que dos transacciones que tocan la misma
+    fila no se pisan; la primera de cada dia/clave la crea. Todo cae en el dia
+    de inicio del prestamo, asi que tambien se escriben dias ya pasados; quien
+    lea estas filas las lee al momento, sin guardarlas.
+    """
+
+    def _acumular(self, incrementos: Dict[_Clave, Tuple[int, int, float]]) -> None:
+        for (dia, dimension, clave), (asignados, devueltos, segundos) in incrementos.items():
+            _, creado = ResumenDiarioModel.objects.get_or_create(
+                dia=dia,
+                dimension=dimension,
+                clave=clave,
+                defaults={"asignados": asignados, "devueltos": devueltos, "segundos_uso": segundos},
+            )
+            if not creado:
+                ResumenDiarioModel.objects.filter(dia=dia, dimension=dimension, clave=clave).update(
+                    asignados=F("asignados") + asignados,
+                    devueltos=F("devueltos") + devueltos,
+                    segundos_uso=F("segundos_uso") + segundos,
+                )
+
+    def registrar_asignaciones(self, prestamos: Sequence[Prestamo]) -> None:
+        incrementos: Dict[_Clave, Tuple[int, int, float]] = defaultdict(lambda: (0, 0, 0.0))
+        for p in prestamos:
+            for clave in _claves(p):
+                a, d, s = incrementos[clave]
+                incrementos[clave] = (a + 1, d, s)
+        self._acumular(incrementos)
+
+    def registrar_devoluciones(self, prestamos: Sequence[Prestamo]) -> None:
+        incrementos: Dict[_Clave, Tuple[int, int, float]] = defaultdict(lambda: (0, 0, 0.0))
+        for p in prestamos:
+            segundos = (p.fecha_hora_devolucion - p.fecha_hora_prestamo).total_seconds()
+            for clave in _claves(p):
+                a, d, s = incrementos[clave]
+                incrementos[clave] = (a, d + 1, s + segundos)
+        self._acumular(incrementos)
+
+    def registrar_correccion(self, antes: Sequence[Prestamo], despues: Sequence[Prestamo]) -> None:
+        """
+        Cambio fuera del flujo asignar/devolver (edicion o borrado en el admin):
+        resta el aporte de ``antes`` y suma el de ``despues``, cada uno en su dia
+        y sus claves, con el mismo criterio que ``reconstruir`` (devuelto segun
+        el estado; la duracion solo si hay fecha de devolucion). Las filas que
+        quedan sin prestamos se borran, como las deja ``reconstruir``.
+        """
+        incrementos: Dict[_Clave, Tuple[int, int, float]] = defaultdict(lambda: (0, 0, 0.0))
+        for signo, prestamos in ((-1, antes), (1, despues)):
+            for p in prestamos:
+                devuelto = int(p.estado == EstadoPrestamo.DEVUELTO)
+                segundos = 0.0
+                if devuelto and p.fecha_hora_devolucion is not None:
+                    segundos = (p.fecha_hora_devolucion - p.fecha_hora_prestamo).total_seconds()
+                for clave in _claves(p):
+                    a, d, s = incrementos[clave]
+                    incrementos[clave] = (a + signo, d + signo * devuelto, s + signo * segundos)
+        cambios = {clave: v for clave, v in incrementos.items() if v != (0, 0, 0.0)}
+        self._acumular(cambios)
+        vacias = Q(pk__in=[])
+        for dia, dimension, clave in cambios:
+            vacias |= Q(dia=dia, dimension=dimension, clave=clave)
+        ResumenDiarioModel.objects.filter(vacias, asignados=0, devueltos=0).delete()
+
+    def listar_resumenes(self, *, dimension: str, desde: date, hasta: date) -> List[ResumenDiario]:
+        qs = ResumenDiarioModel.objects.filter(dimension=dimension, dia__gte=desde, dia__lte=hasta)
+        return [
+            ResumenDiario(
+                dia=r.dia,
+                dimension=r.dimension,
+                clave=r.clave,
+                asignados=r.asignados,
+                devueltos=r.devueltos,
+                segundos_uso=r.segundos_uso,
+            )
+            for r in qs.order_by("dia", "clave")
+        ]
+
+    def _totales_dia(self, dia: date) -> Dict[Tuple[str, str], List[float]]:
+        """Un GROUP BY por dimension y tabla sobre los prestamos iniciados en el dia local."""
+        devuelto = Q(estado=EstadoPrestamo.DEVUELTO.value)
+        totales: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0, 0.0])
+        for modelo in particiones_prestamos():
+            qs = modelo.objects.filter(
+                fecha_hora_prestamo__gte=inicio_dia_local(dia),
+                fecha_hora_prestamo__lt=inicio_dia_local(dia + timedelta(days=1)),
+            )
+            for dimension, columna in _COLUMNA_DIMENSION.items():
+                rows = (
+                    qs.values(columna)
+                    .annotate(
+                        asignados=Count("id"),
+                        devueltos=Count("id", filter=devuelto),
+                        segundos=Sum(
+                            EpochSegundos("fecha_hora_devolucion") - EpochSegundos("fecha_hora_prestamo"),
+                            filter=devuelto,
+                        ),
+                    )
+                    .order_by()
+                )
+                for row in rows:
+                    acumulado = totales[(dimension, row[columna])]
+                    acumulado[0] += row["asignados"]
+                    acumulado[1] += row["devueltos"]
+                    acumulado[2] += row["segundos"] or 0.0
+        return totales
+
+    def reconstruir(self, *, desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+        """
+        Recalcula el rango de dias (``None`` = desde el primer / hasta el ultimo
+        prestamo) dia por dia: cada dia se agrupa y reemplaza en su propia
+        transaccion corta, de modo que un backfill largo no retiene el lock de
+        escritura frente al mostrador y ningun incremento concurrente del dia se
+        pierde entre la lectura y el reemplazo. Las filas fuera de los extremos
+        se borran. Devuelve cuantas filas de resumen quedaron.
+        """
+        extremos = [
+            valor
+            for modelo in particiones_prestamos()
+            for valor in modelo.objects.aggregate(
+                primero=Min("fecha_hora_prestamo"), ultimo=Max("fecha_hora_prestamo")
+            ).values()
+            if valor is not None
+        ]
+        if not extremos:
+            sobrantes = ResumenDiarioModel.objects.all()
+            if desde is not None:
+                sobrantes = sobrantes.filter(dia__gte=desde)
+            if hasta is not None:
+                sobrantes = sobrantes.filter(dia__lte=hasta)
+            sobrantes.delete()
+            return 0
+        if desde is None:
+            desde = timezone.localdate(min(extremos))
+            ResumenDiarioModel.objects.filter(dia__lt=desde).delete()
+        if hasta is None:
+            hasta = timezone.localdate(max(extremos))
+            ResumenDiarioModel.objects.filter(dia__gt=hasta).delete()
+
+        filas = 0
+        dia = desde
+        while dia <= hasta:
+            with transaction.atomic():
+                totales = self._totales_dia(dia)
+                ResumenDiarioModel.objects.filter(dia=dia).delete()
+                ResumenDiarioModel.objects.bulk_create(
+                    [
+                        ResumenDiarioModel(
+                            dia=dia, dimension=dimension, clave=clave, asignados=a, devueltos=d, segundos_uso=s
+                        )
+                        for (dimension, clave), (a, d, s) in totales.items()
+                    ]
+                )
+            filas += len(totales)
+            dia += timedelta(days=1)
+        return filas
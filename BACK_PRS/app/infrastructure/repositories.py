@@ -1,37 +1,64 @@
 from __future__ import annotations
-from typing import Dict, List, Optional
-from datetime import datetime
+import heapq
+import json
+from dataclasses import replace
+from itertools import islice
+from typing import Any, Collection, Dict, Iterator, List, Optional, Sequence, Tuple
+from datetime import date, datetime
 from contextvars import ContextVar
 
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from django.db.models import Q
+from django.db import IntegrityError, connection, transaction
+from django.db.models import BigIntegerField, CharField, Count, F, Max, Q, Sum, Value
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
 
-from ..domain.events import AuditLogRecord
+from ..domain.events import AuditLogRecord, condensar_cambio
 from ..domain.ports.repositories import (
     EmpleadoRepository,
     RadioRepository,
     SapUsuarioRepository,
     PrestamoRepository,
 )
-from ..domain.ports.audit import AuditLogRepository, AuditLogQueryRepository
+from ..domain.ports.audit import AuditLogRepository, AuditLogQueryRepository, AuditLogRetencionRepository
+from ..domain.ports.entregas import EntregasTurnoRepository
 from ..domain.ports.uow import UnitOfWork
-from ..domain.entities import Empleado, RadioFrecuencia, SapUsuario, Prestamo
-from ..domain.errors import EntityNotFound
-from ..domain.value_objects import EstadoPrestamo
+from ..domain.ports.versiones import VersionColeccionRepository
+from ..domain.entities import (
+    CambiosPrestamos,
+    ContextoAsignacion,
+    Empleado,
+    EntregaTurno,
+    IntervaloPrestamo,
+    PaginaPrestamos,
+    Prestamo,
+    PrestamoVencido,
+    RadioFrecuencia,
+    SapUsuario,
+)
+from ..domain.errors import BusinessRuleViolation, EntityNotFound
+from ..domain.reportes import EstadisticasEmpleado, ResumenPrestamos
+from ..domain.value_objects import CursorPrestamo, EstadoPrestamo, FiltroPrestamos, MarcaCambios, Turno
 
+from .expresiones import EpochSegundos
 from .models import (
     EmpleadoModel,
     RadioFrecuenciaModel,
     SapUsuarioModel,
     PrestamoModel,
+    PrestamoHistoricoModel,
+    PrestamoVencidoModel,
     AuditEntry,
+    ColeccionVersionModel,
+    EntregaTurnoModel,
 )
 from .mappers import (
     empleado_from_model,
     radio_from_model,
     sap_from_model,
+    prestamo_from_json,
     prestamo_from_model,
+    prestamo_to_json,
     prestamo_to_model_fields,
 )
 
@@ -195,14 +222,194 @@ class DjangoSapUsuarioRepository(SapUsuarioRepository):
 # Prestamo Repository
 # -----------------------
 
+def filtrar_prestamos(qs, filtro: Optional[FiltroPrestamos]):
+    """
+    Traduce FiltroPrestamos a predicados SQL indexables. El prefijo SAP se
+    expresa como rango [prefijo, prefijo + U+FFFF) para que use el indice
+    (usuario_sap, estado) en lugar de un LIKE.
+    """
+    if filtro is None:
+        return qs
+    if filtro.cedula:
+        qs = qs.filter(cedula=filtro.cedula)
+    if filtro.codigo_radio:
+        qs = qs.filter(codigo_radio=filtro.codigo_radio)
+    if filtro.usuario_sap:
+        qs = qs.filter(usuario_sap__gte=filtro.usuario_sap, usuario_sap__lt=filtro.usuario_sap + "\uffff")
+    if filtro.estado is not None:
+        qs = qs.filter(estado=filtro.estado.value)
+    if filtro.turno is not None:
+        qs = qs.filter(turno=filtro.turno.value)
+    if filtro.desde is not None:
+        qs = qs.filter(fecha_hora_prestamo__gte=filtro.desde)
+    if filtro.hasta is not None:
+        qs = qs.filter(fecha_hora_prestamo__lt=filtro.hasta)
+    if filtro.empleado_nombre:
+        qs = qs.filter(empleado_nombre__icontains=filtro.empleado_nombre)
+    return qs
+
+
+def particiones_prestamos(filtro: Optional[FiltroPrestamos] = None) -> List[type]:
+    """
+    Tablas que pueden contener prestamos del filtro: la caliente siempre y el
+    historico (solo DEVUELTO) salvo que se pidan explicitamente los abiertos.
+    """
+    if filtro is not None and filtro.estado == EstadoPrestamo.ASIGNADO:
+        return [PrestamoModel]
+    return [PrestamoModel, PrestamoHistoricoModel]
+
+
+def en_curso_en(modelo: type, instante: datetime, *, iniciados_en_instante: bool = True):
+    """
+    Prestamos de ``modelo`` en curso en ``instante`` (devueltos despues, o aun
+    abiertos). Como una radio no tiene dos prestamos a la vez, solo puede
+    estarlo el ultimo que empezo antes de ``instante`` en cada radio. Las radios
+    salen de los propios prestamos, no del catalogo (una radio borrada conserva
+    su historial), con un skip-scan: un CTE recursivo salta en el indice
+    (codigo_radio, fecha_hora_prestamo) de una radio a la siguiente y en cada
+    una busca su ultimo inicio (MAX, no ORDER BY: en el historico el id no es
+    el rowid y ordenar por el ordenaria todo el historial de la radio). Son
+    unas pocas busquedas por radio, sin recorrer lo prestado antes de
+    ``instante`` (un DISTINCT leeria todo el historial). Con
+    ``iniciados_en_instante`` en False se excluyen los que empiezan justo en
+    ``instante``.
+    """
+    qn = connection.ops.quote_name
+    tabla = qn(modelo._meta.db_table)
+    radio = qn(modelo._meta.get_field("codigo_radio").column)
+    inicio = qn(modelo._meta.get_field("fecha_hora_prestamo").column)
+    pk = qn(modelo._meta.pk.column)
+    comparacion = "<=" if iniciados_en_instante else "<"
+    # Radios cuyo primer prestamo es posterior dan NULL, que nunca coincide en el IN
+    ultimos = RawSQL(
+        f"WITH RECURSIVE radios(codigo) AS ("
+        f"SELECT MIN({radio}) FROM {tabla} "
+        f"UNION ALL "
+        f"SELECT (SELECT MIN({radio}) FROM {tabla} WHERE {radio} > radios.codigo) FROM radios "
+        f"WHERE radios.codigo IS NOT NULL) "
+        f"SELECT (SELECT MAX({pk}) FROM {tabla} WHERE {radio} = radios.codigo AND {inicio} = ("
+        f"SELECT MAX({inicio}) FROM {tabla} WHERE {radio} = radios.codigo AND {inicio} {comparacion} %s)) "
+        f"FROM radios WHERE radios.codigo IS NOT NULL",
+        (connection.ops.adapt_datetimefield_value(instante),),
+    )
+    return modelo.objects.filter(
+        Q(fecha_hora_devolucion__isnull=True) | Q(fecha_hora_devolucion__gt=instante),
+        id__in=ultimos,
+    )
+
+
+def _orden_keyset(obj) -> tuple:
+    return obj.fecha_hora_prestamo, obj.id
+
+
+def _sin_repetidos(objs: Iterator[Any]) -> Iterator[Any]:
+    """Descarta ids repetidos contiguos (la misma fila leida en la tabla caliente y en el historico)."""
+    anterior = None
+    for obj in objs:
+        if obj.id != anterior:
+            yield obj
+        anterior = obj.id
+
+
+# Columnas que se copian tal cual de la tabla caliente al historico
+_CAMPOS_ARCHIVO = (
+    "id",
+    "cedula",
+    "empleado_nombre",
+    "usuario_sap",
+    "codigo_radio",
+    "fecha_hora_prestamo",
+    "turno",
+    "estado",
+    "usuario_registra_id",
+    "fecha_hora_devolucion",
+    "created_at",
+    "updated_at",
+)
+
+
+# Restricciones unicas parciales (solo ASIGNADO) -> mensaje de negocio equivalente al del servicio.
+# Se reconoce el nombre (PostgreSQL) o la columna (SQLite: "UNIQUE constraint failed: prestamos.x").
+_CONFLICTOS_ABIERTO = (
+    ("prestamo_abierto_cedula_uniq", "prestamos.cedula", lambda p: f"Empleado {p.cedula} ya tiene préstamo abierto"),
+    ("prestamo_abierto_sap_uniq", "prestamos.usuario_sap", lambda p: f"SAP Usuario {p.usuario_sap} ya tiene préstamo abierto"),
+    ("prestamo_abierto_radio_uniq", "prestamos.codigo_radio", lambda p: f"Radio {p.codigo_radio} ya está asignada"),
+)
+
+
+def _conflicto_abierto(exc: IntegrityError, prestamo: Prestamo) -> Optional[str]:
+    detalle = str(exc)
+    for constraint, columna, mensaje in _CONFLICTOS_ABIERTO:
+        if constraint in detalle or columna in detalle:
+            return mensaje(prestamo)
+    return None
+
+
 class DjangoPrestamoRepository(PrestamoRepository):
     def crear(self, prestamo: Prestamo) -> Prestamo:
         fields = prestamo_to_model_fields(prestamo)
-        obj = PrestamoModel.objects.create(**fields)
+        try:
+            obj = PrestamoModel.objects.create(**fields)
+        except IntegrityError as exc:
+            # Otra transaccion abrio un prestamo para la misma dimension despues de nuestra
+            # validacion: la base de datos es la que garantiza el invariante
+            mensaje = _conflicto_abierto(exc, prestamo)
+            if mensaje is None:
+                raise
+            raise BusinessRuleViolation(mensaje) from exc
+        if prestamo.usuario_registra_username:
+            # El llamador ya conoce el username: no hace falta releer la fila
+            return replace(prestamo, id=obj.id)
         # select_related para garantizar username
         obj = PrestamoModel.objects.select_related("usuario_registra").get(id=obj.id)
         return prestamo_from_model(obj)
 
+    def resolver_asignacion(self, *, cedula: str, codigo_radio: str, usuario_sap: str) -> ContextoAsignacion:
+        """
+        Dos consultas: los tres catalogos en un UNION ALL y los prestamos abiertos
+        que chocan con cualquiera de las tres dimensiones (indices parciales).
+        """
+        nulo_txt = Value(None, output_field=CharField())
+        nulo_id = Value(None, output_field=BigIntegerField())
+        empleados = EmpleadoModel.objects.filter(cedula=cedula).values_list(
+            Value("E"), "id", "cedula", "nombre", "activo", nulo_id, nulo_txt
+        )
+        radios = RadioFrecuenciaModel.objects.filter(codigo=codigo_radio).values_list(
+            Value("R"), "id", "codigo", "descripcion", "activo", nulo_id, nulo_txt
+        )
+        saps = SapUsuarioModel.objects.filter(username=usuario_sap).values_list(
+            Value("S"), "id", "username", nulo_txt, "activo", "empleado_id", "empleado__cedula"
+        )
+
+        empleado = radio = sap_usuario = None
+        for tipo, id_, clave, texto, activo, empleado_id, empleado_cedula in empleados.union(radios, saps, all=True):
+            if tipo == "E":
+                empleado = Empleado(id=id_, cedula=clave, nombre=texto, activo=activo)
+            elif tipo == "R":
+                radio = RadioFrecuencia(id=id_, codigo=clave, descripcion=texto, activo=activo)
+            else:
+                sap_usuario = SapUsuario(
+                    id=id_,
+                    username=clave,
+                    empleado_id=empleado_id,
+                    empleado_cedula=empleado_cedula,
+                    activo=activo,
+                )
+
+        abiertos = list(
+            PrestamoModel.objects.filter(estado=EstadoPrestamo.ASIGNADO.value)
+            .filter(Q(cedula=cedula) | Q(usuario_sap=usuario_sap) | Q(codigo_radio=codigo_radio))
+            .values_list("cedula", "usuario_sap", "codigo_radio")
+        )
+        return ContextoAsignacion(
+            empleado=empleado,
+            radio=radio,
+            sap_usuario=sap_usuario,
+            cedula_ocupada=any(c == cedula for c, _, _ in abiertos),
+            sap_ocupado=any(s == usuario_sap for _, s, _ in abiertos),
+            radio_ocupado=any(r == codigo_radio for _, _, r in abiertos),
+        )
+
     def obtener_prestamo_abierto(
         self,
         *,
@@ -217,7 +424,9 @@ class DjangoPrestamoRepository(PrestamoRepository):
             qs = qs.filter(usuario_sap=usuario_sap)
         if codigo_radio:
             qs = qs.filter(codigo_radio=codigo_radio)
-        obj = qs.order_by("-fecha_hora_prestamo").first()
+        # A lo sumo una fila por dimension (indices unicos parciales sobre ASIGNADO):
+        # sin ORDER BY la busqueda se resuelve en el indice parcial, no en el historico
+        obj = next(iter(qs[:1]), None)
         return prestamo_from_model(obj) if obj else None
 
     def marcar_devolucion(self, id_: int, fecha_hora: datetime) -> Prestamo:
@@ -229,14 +438,338 @@ class DjangoPrestamoRepository(PrestamoRepository):
         obj.save(update_fields=["estado", "fecha_hora_devolucion", "updated_at"])
         return prestamo_from_model(obj)
 
-    def listar(self, *, cedula: Optional[str] = None, codigo_radio: Optional[str] = None) -> List[Prestamo]:
-        qs = PrestamoModel.objects.select_related("usuario_registra").all()
-        if cedula:
-            qs = qs.filter(cedula=cedula)
-        if codigo_radio:
-            qs = qs.filter(codigo_radio=codigo_radio)
-        return [prestamo_from_model(x) for x in qs.order_by("-fecha_hora_prestamo")]
-    
+    def obtener_prestamos_abiertos(
+        self,
+        *,
+        cedulas: Collection[str] = (),
+        usuarios_sap: Collection[str] = (),
+        codigos_radio: Collection[str] = (),
+    ) -> List[Prestamo]:
+        """Prestamos abiertos que coinciden con cualquiera de los identificadores (una consulta)."""
+        cond = Q()
+        if cedulas:
+            cond |= Q(cedula__in=list(cedulas))
+        if usuarios_sap:
+            cond |= Q(usuario_sap__in=list(usuarios_sap))
+        if codigos_radio:
+            cond |= Q(codigo_radio__in=list(codigos_radio))
+        if not cond:
+            return []
+        qs = PrestamoModel.objects.select_related("usuario_registra").filter(
+            cond, estado=EstadoPrestamo.ASIGNADO.value
+        )
+        return [prestamo_from_model(obj) for obj in qs]
+
+    def marcar_devolucion_lote(self, ids: Sequence[int], fecha_hora: datetime) -> int:
+        """Cierra en un solo UPDATE los prestamos indicados que sigan abiertos; devuelve cuantos."""
+        if not ids:
+            return 0
+        # update() no dispara auto_now: se fija updated_at para que la sincronizacion delta vea el cambio
+        return PrestamoModel.objects.filter(id__in=list(ids), estado=EstadoPrestamo.ASIGNADO.value).update(
+            estado=EstadoPrestamo.DEVUELTO.value,
+            fecha_hora_devolucion=fecha_hora,
+            updated_at=timezone.now(),
+        )
+
+    def listar_abiertos_anteriores(self, antes_de: datetime) -> List[Prestamo]:
+        """Abiertos iniciados antes de ``antes_de``: rango sobre el indice (estado, fecha), sin tocar cerrados."""
+        qs = PrestamoModel.objects.select_related("usuario_registra").filter(
+            estado=EstadoPrestamo.ASIGNADO.value, fecha_hora_prestamo__lt=antes_de
+        )
+        return [prestamo_from_model(obj) for obj in qs.order_by("fecha_hora_prestamo")]
+
+    def listar_abiertos_en(self, instante: datetime) -> List[Prestamo]:
+        """
+        Prestamos en curso en ``instante`` (iniciados antes o en ese momento y
+        devueltos despues, o aun abiertos): por tabla, un skip-scan del indice
+        (codigo_radio, fecha_hora_prestamo) con dos busquedas por radio, ver
+        ``en_curso_en``.
+        """
+        encontrados: Dict[int, PrestamoModel] = {}
+        for modelo in particiones_prestamos():
+            qs = en_curso_en(modelo, instante).select_related("usuario_registra")
+            encontrados.update((obj.id, obj) for obj in qs)
+        return [prestamo_from_model(obj) for obj in sorted(encontrados.values(), key=_orden_keyset)]
+
+    def listar_devueltos_entre(self, desde: datetime, hasta: datetime) -> List[Prestamo]:
+        """Devueltos en ``[desde, hasta)`` en orden de devolucion: rango sobre el indice de fecha_hora_devolucion."""
+        filas = [
+            modelo.objects.select_related("usuario_registra")
+            .filter(fecha_hora_devolucion__gte=desde, fecha_hora_devolucion__lt=hasta)
+            .order_by("fecha_hora_devolucion", "id")
+            for modelo in particiones_prestamos()
+        ]
+        merged = heapq.merge(*filas, key=lambda obj: (obj.fecha_hora_devolucion, obj.id))
+        return [prestamo_from_model(obj) for obj in _sin_repetidos(merged)]
+
+    def reemplazar_vencidos(self, vencidos: Sequence[PrestamoVencido]) -> None:
+        """Sincroniza la tabla materializada; los que ya estaban conservan su ``detectado_en``."""
+        ids = {v.prestamo.id for v in vencidos}
+        with transaction.atomic():
+            PrestamoVencidoModel.objects.exclude(prestamo_id__in=ids).delete()
+            existentes = set(PrestamoVencidoModel.objects.values_list("prestamo_id", flat=True))
+            PrestamoVencidoModel.objects.bulk_create(
+                [
+                    PrestamoVencidoModel(prestamo_id=v.prestamo.id, fin_turno=v.fin_turno, detectado_en=v.detectado_en)
+                    for v in vencidos
+                    if v.prestamo.id not in existentes
+                ]
+            )
+
+    def listar_vencidos(self) -> List[PrestamoVencido]:
+        """Conjunto materializado, descartando los que se devolvieron despues de la ultima deteccion."""
+        qs = PrestamoVencidoModel.objects.select_related("prestamo__usuario_registra").filter(
+            prestamo__estado=EstadoPrestamo.ASIGNADO.value
+        )
+        return [
+            PrestamoVencido(prestamo=prestamo_from_model(v.prestamo), fin_turno=v.fin_turno, detectado_en=v.detectado_en)
+            for v in qs.order_by("fin_turno", "prestamo_id")
+        ]
+
+    def listar(
+        self,
+        *,
+        limit: int,
+        cursor: Optional[CursorPrestamo] = None,
+        filtro: Optional[FiltroPrestamos] = None,
+    ) -> PaginaPrestamos:
+        """
+        Keyset pagination sobre (fecha_hora_prestamo, id) descendente: nunca
+        materializa mas de ``limit + 1`` filas por tabla (caliente e historico)
+        sin importar el tamaño del historico. Las dos tablas se leen en
+        consultas separadas, sin una foto comun: la caliente va primero y
+        archivar solo mueve filas hacia el historico (con el mismo id), asi que
+        un prestamo archivado entre ambas lecturas aparece en las dos y se
+        emite una sola vez; nunca falta.
+        """
+        paginas = []
+        for modelo in particiones_prestamos(filtro):
+            qs = filtrar_prestamos(modelo.objects.select_related("usuario_registra"), filtro)
+            if cursor is not None:
+                qs = qs.filter(
+                    Q(fecha_hora_prestamo__lt=cursor.fecha_hora_prestamo)
+                    | Q(fecha_hora_prestamo=cursor.fecha_hora_prestamo, id__lt=cursor.id)
+                )
+            paginas.append(list(qs.order_by("-fecha_hora_prestamo", "-id")[: limit + 1]))
+        # Union transparente con el historico: cada tabla aporta su pagina y se mezclan por la clave;
+        # un mismo id en ambas tiene la misma clave, asi que el repetido llega contiguo
+        mezcla = heapq.merge(*paginas, key=_orden_keyset, reverse=True)
+        rows = list(islice(_sin_repetidos(mezcla), limit + 1))
+        siguiente = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            siguiente = CursorPrestamo(fecha_hora_prestamo=last.fecha_hora_prestamo, id=last.id)
+        return PaginaPrestamos(items=[prestamo_from_model(x) for x in rows], siguiente=siguiente)
+
+    def listar_cambios(
+        self,
+        *,
+        limit: int,
+        desde: Optional[MarcaCambios] = None,
+        filtro: Optional[FiltroPrestamos] = None,
+    ) -> CambiosPrestamos:
+        """
+        Devuelve en orden (updated_at, id) ascendente los prestamos modificados
+        despues de ``desde``; el costo depende de los cambios, no del historico.
+        Solo mira la tabla caliente: lo archivado ya no cambia.
+
+        La marca solo es segura si los ``updated_at`` crecen en orden de commit:
+        con ``transaction_mode`` IMMEDIATE (ver settings) SQLite serializa a los
+        escritores desde el BEGIN, y ``updated_at`` se toma dentro de la
+        transaccion, asi que nadie confirma despues una marca menor a una ya
+        leida. Con un motor de escritores concurrentes (PostgreSQL, MySQL) una
+        transaccion lenta podria confirmar por debajo de la marca y el cliente
+        no la veria: ahi hace falta una secuencia asignada al confirmar.
+        """
+        qs = filtrar_prestamos(PrestamoModel.objects.select_related("usuario_registra"), filtro)
+        if desde is not None:
+            qs = qs.filter(
+                Q(updated_at__gt=desde.updated_at)
+                | Q(updated_at=desde.updated_at, id__gt=desde.id)
+            )
+        rows = list(qs.order_by("updated_at", "id")[: limit + 1])
+        hay_mas = len(rows) > limit
+        rows = rows[:limit]
+        marca = MarcaCambios(updated_at=rows[-1].updated_at, id=rows[-1].id) if rows else desde
+        return CambiosPrestamos(items=[prestamo_from_model(x) for x in rows], marca=marca, hay_mas=hay_mas)
+
+    def iterar(self, *, filtro: Optional[FiltroPrestamos] = None, chunk_size: int = 2000) -> Iterator[Prestamo]:
+        """
+        Recorre los prestamos filtrados (mas recientes primero) por paginas de
+        keyset de ``chunk_size`` (las mismas de ``listar``): cada pagina se lee
+        completa con consultas cortas antes de emitirla, asi que ningun cursor
+        queda abierto mientras el cliente descarga. En SQLite (journal
+        "delete") un SELECT vivo retiene el lock compartido y ningun escritor
+        puede confirmar hasta que termina. La memoria queda acotada por la
+        pagina. Cada pagina se lee en su propio momento: una fila editada
+        durante la descarga sale con el valor que tenia al leer su pagina.
+        """
+        cursor: Optional[CursorPrestamo] = None
+        while True:
+            pagina = self.listar(limit=chunk_size, cursor=cursor, filtro=filtro)
+            yield from pagina.items
+            if pagina.siguiente is None:
+                return
+            cursor = pagina.siguiente
+
+    def archivar_devueltos(self, *, antes_de: datetime, lote: int = 1000) -> int:
+        """
+        Mueve al historico los DEVUELTO prestados antes de ``antes_de`` en lotes
+        de ``lote`` filas; cada lote es su propia transaccion corta, asi que las
+        asignaciones nunca esperan mas que un lote. Devuelve cuantos movio.
+        """
+        total = 0
+        while True:
+            with transaction.atomic():
+                filas = list(
+                    PrestamoModel.objects.filter(
+                        estado=EstadoPrestamo.DEVUELTO.value, fecha_hora_prestamo__lt=antes_de
+                    )
+                    .order_by()
+                    .values(*_CAMPOS_ARCHIVO)[:lote]
+                )
+                if not filas:
+                    return total
+                archivado_en = timezone.now()
+                PrestamoHistoricoModel.objects.bulk_create(
+                    [PrestamoHistoricoModel(archivado_en=archivado_en, **fila) for fila in filas]
+                )
+                PrestamoModel.objects.filter(id__in=[fila["id"] for fila in filas]).delete()
+            total += len(filas)
+
+    def estadisticas_empleado(self, cedula: str) -> EstadisticasEmpleado:
+        """
+        Un solo aggregate por tabla sobre el indice (cedula, fecha_hora_prestamo):
+        total, devueltos, horas acumuladas y ultimo prestamo. Un empleado tiene
+        a lo sumo un prestamo abierto, asi que sus datos salen del mismo
+        aggregate con ``Max(..., filter=abierto)`` sin otra consulta.
+        """
+        devuelto = Q(estado=EstadoPrestamo.DEVUELTO.value)
+        abierto = Q(estado=EstadoPrestamo.ASIGNADO.value)
+        comunes = dict(
+            prestamos=Count("id"),
+            devueltos=Count("id", filter=devuelto),
+            segundos=Sum(EpochSegundos("fecha_hora_devolucion") - EpochSegundos("fecha_hora_prestamo"), filter=devuelto),
+            ultimo=Max("fecha_hora_prestamo"),
+        )
+        caliente = PrestamoModel.objects.filter(cedula=cedula).aggregate(
+            **comunes,
+            abierto_id=Max("id", filter=abierto),
+            abierto_radio=Max("codigo_radio", filter=abierto),
+            abierto_desde=Max("fecha_hora_prestamo", filter=abierto),
+        )
+        historico = PrestamoHistoricoModel.objects.filter(cedula=cedula).aggregate(**comunes)
+        devueltos = caliente["devueltos"] + historico["devueltos"]
+        segundos = (caliente["segundos"] or 0.0) + (historico["segundos"] or 0.0)
+        ultimos = [f for f in (caliente["ultimo"], historico["ultimo"]) if f is not None]
+        return EstadisticasEmpleado(
+            cedula=cedula,
+            prestamos=caliente["prestamos"] + historico["prestamos"],
+            devueltos=devueltos,
+            media_horas=segundos / devueltos / 3600 if devueltos else None,
+            ultimo_prestamo=max(ultimos) if ultimos else None,
+            abierto_id=caliente["abierto_id"],
+            abierto_radio=caliente["abierto_radio"],
+            abierto_desde=caliente["abierto_desde"],
+        )
+
+    def resumir(self, *, filtro: Optional[FiltroPrestamos] = None, inicio_dia: datetime) -> ResumenPrestamos:
+        """Un aggregate por particion del filtro, con los conteos condicionados en la misma pasada."""
+        totales = {"total": 0, "abiertos": 0, "prestados_hoy": 0, "devueltos_hoy": 0}
+        for modelo in particiones_prestamos(filtro):
+            fila = filtrar_prestamos(modelo.objects.all(), filtro).aggregate(
+                total=Count("id"),
+                abiertos=Count("id", filter=Q(estado=EstadoPrestamo.ASIGNADO.value)),
+                prestados_hoy=Count("id", filter=Q(fecha_hora_prestamo__gte=inicio_dia)),
+                devueltos_hoy=Count("id", filter=Q(fecha_hora_devolucion__gte=inicio_dia)),
+            )
+            for campo in totales:
+                totales[campo] += fila[campo]
+        return ResumenPrestamos(**totales)
+
+    def intervalos_radio(self, *, codigo_radio: str, desde: datetime, hasta: datetime) -> List[IntervaloPrestamo]:
+        """
+        Prestamos de la radio que se solapan con ``[desde, hasta)``, por inicio.
+        Una radio no puede tener dos prestamos abiertos a la vez, asi que sus
+        intervalos no se solapan entre si: basta el rango de inicios dentro de
+        la ventana mas el ultimo iniciado antes de ``desde`` (si seguia en uso).
+        Ambas lecturas son busquedas acotadas en el indice (codigo_radio,
+        fecha_hora_prestamo) de cada tabla; no dependen del tamaño del historico.
+        """
+        campos = ("id", "cedula", "empleado_nombre", "usuario_sap", "fecha_hora_prestamo", "fecha_hora_devolucion")
+
+        def orden(fila) -> Tuple[datetime, int]:
+            return fila[4], fila[0]
+
+        dentro, previos = [], []
+        for modelo in particiones_prestamos():
+            qs = modelo.objects.filter(codigo_radio=codigo_radio).values_list(*campos)
+            dentro.append(
+                qs.filter(fecha_hora_prestamo__gte=desde, fecha_hora_prestamo__lt=hasta).order_by(
+                    "fecha_hora_prestamo", "id"
+                )
+            )
+            previo = qs.filter(fecha_hora_prestamo__lt=desde).order_by("-fecha_hora_prestamo", "-id").first()
+            if previo is not None:
+                previos.append(previo)
+        filas = list(heapq.merge(*dentro, key=orden))
+        if previos:
+            previo = max(previos, key=orden)
+            if previo[5] is None or previo[5] > desde:
+                filas.insert(0, previo)
+        return [
+            IntervaloPrestamo(id=id_, cedula=cedula, empleado_nombre=nombre, usuario_sap=sap, inicio=inicio, fin=fin)
+            for id_, cedula, nombre, sap, inicio, fin in filas
+        ]
+
+    def radio_tiene_prestamos(self, codigo_radio: str) -> bool:
+        """Prefijo del indice (codigo_radio, fecha_hora_prestamo): una busqueda por tabla."""
+        return any(modelo.objects.filter(codigo_radio=codigo_radio).exists() for modelo in particiones_prestamos())
+
+    def marca_actual(self) -> Optional[MarcaCambios]:
+        row = PrestamoModel.objects.order_by("-updated_at", "-id").values("updated_at", "id").first()
+        return MarcaCambios(updated_at=row["updated_at"], id=row["id"]) if row else None
+
+
+# -----------------------
+# Entregas de turno
+# -----------------------
+
+class DjangoEntregasTurnoRepository(EntregasTurnoRepository):
+    def _a_entidad(self, obj: EntregaTurnoModel) -> EntregaTurno:
+        return EntregaTurno(
+            dia=obj.dia,
+            turno=Turno(obj.turno),
+            inicio=obj.inicio,
+            fin=obj.fin,
+            corte=obj.fin,
+            pendientes=[prestamo_from_json(p) for p in obj.pendientes],
+            prestados=[prestamo_from_json(p) for p in obj.prestados],
+            devueltos=[prestamo_from_json(p) for p in obj.devueltos],
+            congelada_en=obj.congelada_en,
+        )
+
+    def obtener(self, *, dia: date, turno: Turno) -> Optional[EntregaTurno]:
+        obj = EntregaTurnoModel.objects.filter(dia=dia, turno=turno.value).first()
+        return self._a_entidad(obj) if obj else None
+
+    def guardar(self, entrega: EntregaTurno) -> EntregaTurno:
+        """Inserta la foto si no existe; si otro proceso la congelo primero se conserva la suya."""
+        obj, _ = EntregaTurnoModel.objects.get_or_create(
+            dia=entrega.dia,
+            turno=entrega.turno.value,
+            defaults={
+                "inicio": entrega.inicio,
+                "fin": entrega.fin,
+                "congelada_en": entrega.congelada_en or timezone.now(),
+                "pendientes": [prestamo_to_json(p) for p in entrega.pendientes],
+                "prestados": [prestamo_to_json(p) for p in entrega.prestados],
+                "devueltos": [prestamo_to_json(p) for p in entrega.devueltos],
+            },
+        )
+        return self._a_entidad(obj)
+
 
 # -----------------------
 # AuditLog Repository
@@ -288,3 +821,103 @@ class DjangoAuditLogQueryRepository(AuditLogQueryRepository):
             )
             for entry in entries
         ]
+
+
+def _bytes_json(valor: Optional[Any]) -> int:
+    """Tamaño aproximado en disco de un JSONField (texto UTF-8 serializado)."""
+    if valor is None:
+        return 0
+    return len(json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+class DjangoAuditLogRetencionRepository(AuditLogRetencionRepository):
+    """
+    Mantenimiento del audit_log en lotes de ``lote`` filas, cada uno en su
+    propia transaccion: el lock de escritura se retiene solo lo que dura un lote.
+    """
+
+    def _candidatas(self, *, antes_de, aggregate, action, excluir):
+        qs = AuditEntry.objects.filter(at__lt=antes_de)
+        if aggregate is not None:
+            qs = qs.filter(aggregate=aggregate)
+        if action is not None:
+            qs = qs.filter(action=action)
+        for excl_aggregate, excl_action in excluir:
+            cond = Q()
+            if excl_aggregate is not None:
+                cond &= Q(aggregate=excl_aggregate)
+            if excl_action is not None:
+                cond &= Q(action=excl_action)
+            qs = qs.exclude(cond)
+        return qs.order_by()
+
+    def purgar(
+        self,
+        *,
+        antes_de: datetime,
+        aggregate: Optional[str],
+        action: Optional[str],
+        excluir: Sequence[Tuple[Optional[str], Optional[str]]] = (),
+        lote: int = 500,
+    ) -> Tuple[int, int]:
+        qs = self._candidatas(antes_de=antes_de, aggregate=aggregate, action=action, excluir=excluir)
+        filas = liberados = 0
+        while True:
+            with transaction.atomic():
+                bloque = list(qs.values_list("id", "before", "after", "reason")[:lote])
+                if not bloque:
+                    return filas, liberados
+                AuditEntry.objects.filter(id__in=[row[0] for row in bloque]).delete()
+            filas += len(bloque)
+            liberados += sum(_bytes_json(b) + _bytes_json(a) + len((r or "").encode()) for _, b, a, r in bloque)
+
+    def compactar(
+        self,
+        *,
+        antes_de: datetime,
+        aggregate: Optional[str],
+        action: Optional[str],
+        excluir: Sequence[Tuple[Optional[str], Optional[str]]] = (),
+        lote: int = 500,
+    ) -> Tuple[int, int]:
+        qs = self._candidatas(antes_de=antes_de, aggregate=aggregate, action=action, excluir=excluir).filter(
+            compactado=False
+        )
+        filas = liberados = 0
+        while True:
+            with transaction.atomic():
+                bloque = list(qs.only("id", "before", "after")[:lote])
+                if not bloque:
+                    return filas, liberados
+                for entry in bloque:
+                    antes = _bytes_json(entry.before) + _bytes_json(entry.after)
+                    entry.before, entry.after = condensar_cambio(entry.before, entry.after)
+                    entry.compactado = True
+                    liberados += antes - _bytes_json(entry.before) - _bytes_json(entry.after)
+                AuditEntry.objects.bulk_update(bloque, ["before", "after", "compactado"])
+            filas += len(bloque)
+
+
+# -----------------------
+# Versiones de colecciones
+# -----------------------
+
+class DjangoVersionColeccionRepository(VersionColeccionRepository):
+    """
+    Contadores por coleccion en una tabla de pocas filas: leer la version es
+    un lookup por PK, de modo que un 304 nunca toca las filas de la coleccion.
+    Cada escritura incrementa la fila de su coleccion dentro de su propia
+    transaccion, asi que las escrituras de una misma coleccion se serializan
+    en esa fila hasta el commit, tambien en motores con locks por fila.
+    """
+
+    def obtener(self, coleccion: str) -> int:
+        version = ColeccionVersionModel.objects.filter(nombre=coleccion).values_list("version", flat=True).first()
+        return version or 0
+
+    def incrementar(self, coleccion: str) -> None:
+        updated = ColeccionVersionModel.objects.filter(nombre=coleccion).update(version=F("version") + 1)
+        if not updated:
+            _, created = ColeccionVersionModel.objects.get_or_create(nombre=coleccion, defaults={"version": 1})
+            if not created:
+                ColeccionVersionModel.objects.filter(nombre=coleccion).update(version=F("version") + 1)
@@ -0,0 +1,198 @@
+"""
+Exportacion en streaming (CSV y XLSX) del historico de prestamos y CSV del
+pivot empleado x mes.
+
+Ambos formatos se generan fila a fila y se entregan en bloques: el XLSX se
+escribe con ``zipfile`` sobre un sumidero no posicionable (entradas con data
+descriptor), asi que ni el archivo completo ni el historico viven en memoria.
+"""
+from __future__ import annotations
+
+import csv
+import zipfile
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from ..domain.entities import Prestamo
+from ..domain.reportes import PivotEmpleadosMes
+
+HEADERS: Sequence[str] = (
+    "ID",
+    "Cédula",
+    "Empleado",
+    "Usuario SAP",
+    "RF",
+    "Turno",
+    "Estado",
+    "Prestado",
+    "Devuelto",
+    "Registrado por",
+)
+
+_FLUSH_BYTES = 64 * 1024
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def _local(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None:
+        return None
+    return timezone.localtime(dt) if timezone.is_aware(dt) else dt
+
+
+def _row(p: Prestamo) -> List[object]:
+    return [
+        p.id,
+        p.cedula,
+        p.empleado_nombre,
+        p.usuario_sap,
+        p.codigo_radio,
+        p.turno.value,
+        p.estado.value,
+        _local(p.fecha_hora_prestamo),
+        _local(p.fecha_hora_devolucion),
+        p.usuario_registra_username or "",
+    ]
+
+
+# ---------------- CSV ----------------
+
+class _Echo:
+    """Pseudo-buffer: csv.writer escribe y devolvemos la linea tal cual."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def stream_csv(prestamos: Iterable[Prestamo]) -> Iterator[str]:
+    """Lineas CSV (con BOM para Excel) en hora local."""
+    writer = csv.writer(_Echo())
+    yield "\ufeff" + writer.writerow(HEADERS)
+    for p in prestamos:
+        yield writer.writerow(
+            [v.strftime("%Y-%m-%d %H:%M:%S") if isinstance(v, datetime) else ("" if v is None else v) for v in _row(p)]
+        )
+
+
+# ---------------- XLSX ----------------
+
+class _ChunkSink:
+    """Sumidero de escritura sin seek: acumula bytes hasta que el generador los drena."""
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        self.size = 0
+        return data
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>"
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    "</Relationships>"
+)
+# Estilo 1: fecha-hora; estilo 2: encabezado en negrita
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+
+
+def _workbook(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    )
+
+
+def _cell(value: object, *, style: int = 0) -> str:
+    if value is None or value == "":
+        return "<c/>"
+    if isinstance(value, datetime):
+        serial = (value.replace(tzinfo=None) - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c s="1"><v>{serial:.8f}</v></c>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    s_attr = f' s="{style}"' if style else ""
+    return f'<c t="inlineStr"{s_attr}><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def stream_xlsx(prestamos: Iterable[Prestamo], *, sheet_name: str = "Histórico") -> Iterator[bytes]:
+    """Bloques de bytes de un .xlsx valido generado en una sola pasada."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("xl/workbook.xml", _workbook(sheet_name))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        zf.writestr("xl/styles.xml", _STYLES)
+        with zf.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            header = "".join(_cell(h, style=2) for h in HEADERS)
+            sheet.write(f"<row>{header}</row>".encode())
+            for p in prestamos:
+                sheet.write(("<row>" + "".join(_cell(v) for v in _row(p)) + "</row>").encode())
+                if sink.size >= _FLUSH_BYTES:
+                    yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+# ---------------- Pivot empleado x mes ----------------
+
+def stream_csv_empleados_mes(pivot: PivotEmpleadosMes) -> Iterator[str]:
+    """Una linea por empleado con prestamos y horas (2 decimales) de cada mes, en columnas pareadas."""
+    writer = csv.writer(_Echo())
+    columnas = [f"{mes:%Y-%m} {campo}" for mes in pivot.meses for campo in ("préstamos", "horas")]
+    yield "\ufeff" + writer.writerow(["Cédula", "Empleado", *columnas])
+    for cedula, nombre, prestamos, horas in zip(pivot.cedulas, pivot.nombres, pivot.prestamos, pivot.horas):
+        celdas = [v for par in zip(prestamos, (f"{h:.2f}" for h in horas)) for v in par]
+        yield writer.writerow([cedula, nombre, *celdas])
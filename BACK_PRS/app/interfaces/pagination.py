@@ -0,0 +1,80 @@
+"""Codificacion de cursores opacos y enlaces ``next`` para listados paginados."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+from ..domain.value_objects import CursorPrestamo, MarcaCambios
+
+
+def _encode_token(instante: datetime, id_: int) -> str:
+    """Serializa un par (instante, id) como token base64 url-safe (opaco para el cliente)."""
+    raw = json.dumps({"f": instante.isoformat(), "i": id_}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_token(token: str, *, param: str) -> Tuple[datetime, int]:
+    """Inversa de _encode_token; lanza ValidationError sobre ``param`` si el token fue alterado."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        instante = parse_datetime(data["f"])
+        id_ = int(data["i"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValidationError({param: "Token invalido."}) from None
+    if instante is None:
+        raise ValidationError({param: "Token invalido."})
+    return instante, id_
+
+
+def encode_cursor(cursor: CursorPrestamo) -> str:
+    """Token opaco para el cursor de keyset del listado."""
+    return _encode_token(cursor.fecha_hora_prestamo, cursor.id)
+
+
+def decode_cursor(token: Optional[str]) -> Optional[CursorPrestamo]:
+    """Reconstruye el cursor recibido en query params."""
+    if not token:
+        return None
+    fecha, id_ = _decode_token(token, param="cursor")
+    return CursorPrestamo(fecha_hora_prestamo=fecha, id=id_)
+
+
+def encode_marca(marca: Optional[MarcaCambios]) -> Optional[str]:
+    """Token opaco para el watermark de sincronizacion delta."""
+    if marca is None:
+        return None
+    return _encode_token(marca.updated_at, marca.id)
+
+
+def decode_marca(token: str) -> Optional[MarcaCambios]:
+    """Reconstruye el watermark de ``?since=``; el valor ``0`` significa desde el inicio."""
+    if token == "0":
+        return None
+    updated_at, id_ = _decode_token(token, param="since")
+    return MarcaCambios(updated_at=updated_at, id=id_)
+
+
+def parse_limit(raw: Optional[str], *, default: int) -> int:
+    """Convierte el query param ``limit`` a entero (el acotado lo hace la capa de aplicacion)."""
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise ValidationError({"limit": "Debe ser un entero valido."}) from None
+
+
+def next_link(request, cursor: Optional[CursorPrestamo]) -> Optional[str]:
+    """Construye la URL absoluta de la siguiente pagina conservando los filtros actuales."""
+    if cursor is None:
+        return None
+    return replace_query_param(request.build_absolute_uri(), "cursor", encode_cursor(cursor))
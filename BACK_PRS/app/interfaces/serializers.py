@@ -4,6 +4,9 @@ from __future__ import annotations
 from typing import Optional
 from rest_framework import serializers
 
+from ..application.services import DEVOLVER_LOTE_MAX
+from ..domain.reportes import TABLAS_PARQUET
+
 # ---- Empleado ----
 
 class EmpleadoRequestSerializer(serializers.Serializer):
@@ -39,6 +42,14 @@ class RadioResponseSerializer(serializers.Serializer):
     descripcion = serializers.CharField(allow_null=True, allow_blank=True)
     activo = serializers.BooleanField()
 
+class RadioTimelineResponseSerializer(serializers.Serializer):
+    codigo_radio = serializers.CharField()
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    columnas = serializers.ListField(child=serializers.CharField())
+    # Un arreglo por prestamo con los valores en el orden de 'columnas' (fin null = sigue abierto)
+    intervalos = serializers.ListField(child=serializers.ListField())
+
 
 # ---- SAP Usuario ----
 
@@ -117,6 +128,33 @@ class DevolverPrestamoRequestSerializer(serializers.Serializer):
     usuario_sap = serializers.CharField(max_length=50, required=False, allow_blank=True)
     ahora = serializers.DateTimeField(required=False)
 
+class DevolverLoteItemSerializer(serializers.Serializer):
+    """Un item del lote: exactamente uno de codigo_radio, cedula o usuario_sap (se valida en el servicio)."""
+    codigo_radio = serializers.CharField(max_length=25, required=False, allow_blank=True)
+    cedula = serializers.CharField(max_length=15, required=False, allow_blank=True)
+    usuario_sap = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+class DevolverLoteRequestSerializer(serializers.Serializer):
+    items = DevolverLoteItemSerializer(many=True, allow_empty=False, max_length=DEVOLVER_LOTE_MAX)
+    ahora = serializers.DateTimeField(required=False)
+
+class PrestamoFiltroQuerySerializer(serializers.Serializer):
+    """Filtros del historico recibidos por query string (todos opcionales)."""
+    cedula = serializers.CharField(max_length=15, required=False, allow_blank=True)
+    codigo_radio = serializers.CharField(max_length=25, required=False, allow_blank=True)
+    usuario_sap = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    empleado_nombre = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    estado = serializers.ChoiceField(choices=["ASIGNADO", "DEVUELTO"], required=False, allow_blank=True)
+    turno = serializers.ChoiceField(choices=["1", "2", "3"], required=False, allow_blank=True)
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        desde, hasta = attrs.get("desde"), attrs.get("hasta")
+        if desde and hasta and desde > hasta:
+            raise serializers.ValidationError({"hasta": "Debe ser posterior o igual a 'desde'."})
+        return attrs
+
 class PrestamoResponseSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     cedula = serializers.CharField()
@@ -129,3 +167,227 @@ class PrestamoResponseSerializer(serializers.Serializer):
     usuario_registra_id = serializers.IntegerField()
     fecha_hora_devolucion = serializers.DateTimeField(allow_null=True)
     usuario_registra_username = serializers.CharField(allow_null=True)
+
+
+class PrestamoAsOfQuerySerializer(serializers.Serializer):
+    """Instante de la consulta; sin zona horaria se interpreta en hora local."""
+    t = serializers.DateTimeField()
+
+
+class PrestamoVencidoResponseSerializer(PrestamoResponseSerializer):
+    fin_turno = serializers.DateTimeField()
+    detectado_en = serializers.DateTimeField()
+
+
+class EstadisticasEmpleadoSerializer(serializers.Serializer):
+    prestamos = serializers.IntegerField()
+    devueltos = serializers.IntegerField()
+    media_horas = serializers.FloatField(allow_null=True)
+    ultimo_prestamo = serializers.DateTimeField(allow_null=True)
+    abierto_id = serializers.IntegerField(allow_null=True)
+    abierto_radio = serializers.CharField(allow_null=True)
+    abierto_desde = serializers.DateTimeField(allow_null=True)
+
+
+class ResumenPrestamosSerializer(serializers.Serializer):
+    total = serializers.IntegerField()
+    abiertos = serializers.IntegerField()
+    prestados_hoy = serializers.IntegerField()
+    devueltos_hoy = serializers.IntegerField()
+
+
+class PrestamoPageResponseSerializer(serializers.Serializer):
+    next = serializers.CharField(allow_null=True)
+    watermark = serializers.CharField(allow_null=True)
+    results = PrestamoResponseSerializer(many=True)
+
+
+class PrestamosEmpleadoResponseSerializer(serializers.Serializer):
+    cedula = serializers.CharField()
+    estadisticas = EstadisticasEmpleadoSerializer()
+    next = serializers.CharField(allow_null=True)
+    results = PrestamoResponseSerializer(many=True)
+
+
+class PrestamoDeltaResponseSerializer(serializers.Serializer):
+    watermark = serializers.CharField(allow_null=True)
+    has_more = serializers.BooleanField()
+    results = PrestamoResponseSerializer(many=True)
+
+
+class DevolucionResultadoSerializer(serializers.Serializer):
+    campo = serializers.CharField(allow_null=True)
+    valor = serializers.CharField(allow_null=True)
+    ok = serializers.BooleanField()
+    prestamo = PrestamoResponseSerializer(allow_null=True)
+    error = serializers.CharField(allow_null=True)
+
+
+class DevolverLoteResponseSerializer(serializers.Serializer):
+    devueltos = serializers.IntegerField()
+    results = DevolucionResultadoSerializer(many=True)
+
+
+class ExportarParquetRequestSerializer(serializers.Serializer):
+    """Tablas a exportar (por defecto todas); ``completo`` ignora los watermarks."""
+    tablas = serializers.ListField(child=serializers.ChoiceField(choices=TABLAS_PARQUET), required=False, allow_empty=False)
+    completo = serializers.BooleanField(required=False, default=False)
+
+
+class ExportacionParquetResultadoSerializer(serializers.Serializer):
+    tabla = serializers.CharField()
+    meses = serializers.ListField(child=serializers.DateField(format="%Y-%m"))
+    filas = serializers.IntegerField()
+    marca = serializers.DateTimeField(allow_null=True)
+
+
+class ExportarParquetResponseSerializer(serializers.Serializer):
+    results = ExportacionParquetResultadoSerializer(many=True)
+
+
+# ---- Reportes ----
+
+class ReporteRangoQuerySerializer(serializers.Serializer):
+    """Rango de dias locales [desde, hasta]; por defecto el mes en curso hasta hoy."""
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        desde, hasta = attrs.get("desde"), attrs.get("hasta")
+        if desde and hasta and desde > hasta:
+            raise serializers.ValidationError({"hasta": "Debe ser posterior o igual a 'desde'."})
+        return attrs
+
+
+class ReporteTurnosResponseSerializer(serializers.Serializer):
+    turnos = serializers.ListField(child=serializers.CharField())
+    dias = serializers.ListField(child=serializers.DateField())
+    asignaciones = serializers.ListField(child=serializers.ListField(child=serializers.IntegerField()))
+    devoluciones = serializers.ListField(child=serializers.ListField(child=serializers.IntegerField()))
+
+
+class EstadisticasUsoSerializer(serializers.Serializer):
+    codigo_radio = serializers.CharField(allow_null=True)
+    prestamos = serializers.IntegerField()
+    cerrados = serializers.IntegerField()
+    media_horas = serializers.FloatField(allow_null=True)
+    p50_horas = serializers.FloatField(allow_null=True)
+    p90_horas = serializers.FloatField(allow_null=True)
+    p99_horas = serializers.FloatField(allow_null=True)
+    horas_en_uso = serializers.FloatField()
+    ratio_ocioso = serializers.FloatField()
+
+
+class ReporteUtilizacionResponseSerializer(serializers.Serializer):
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    horas_periodo = serializers.FloatField()
+    flota = EstadisticasUsoSerializer()
+    radios = EstadisticasUsoSerializer(many=True)
+
+
+class ReporteConcurrenciaQuerySerializer(ReporteRangoQuerySerializer):
+    paso = serializers.IntegerField(required=False, min_value=1, max_value=1440, default=60)
+
+
+class ReporteMapaCalorQuerySerializer(ReporteRangoQuerySerializer):
+    turno = serializers.ChoiceField(choices=["1", "2", "3"], required=False)
+
+
+class PicoConcurrenciaSerializer(serializers.Serializer):
+    dia = serializers.DateField()
+    turno = serializers.CharField(allow_null=True)
+    pico = serializers.IntegerField()
+    instante = serializers.DateTimeField(allow_null=True)
+
+
+class PuntoConcurrenciaSerializer(serializers.Serializer):
+    inicio = serializers.DateTimeField()
+    maximo = serializers.IntegerField()
+
+
+class ReporteConcurrenciaResponseSerializer(serializers.Serializer):
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    pico = serializers.IntegerField()
+    instante_pico = serializers.DateTimeField(allow_null=True)
+    paso_minutos = serializers.IntegerField()
+    serie = PuntoConcurrenciaSerializer(many=True)
+    dias = PicoConcurrenciaSerializer(many=True)
+    turnos = PicoConcurrenciaSerializer(many=True)
+
+
+class ReporteMapaCalorResponseSerializer(serializers.Serializer):
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    turno = serializers.CharField(allow_null=True)
+    dias_semana = serializers.ListField(child=serializers.CharField())
+    horas = serializers.ListField(child=serializers.IntegerField())
+    asignaciones = serializers.ListField(child=serializers.ListField(child=serializers.IntegerField()))
+    devoluciones = serializers.ListField(child=serializers.ListField(child=serializers.IntegerField()))
+
+
+class ReporteEmpleadosMesQuerySerializer(serializers.Serializer):
+    """Meses locales [desde, hasta] en formato YYYY-MM; por defecto los ultimos 12 hasta el mes en curso."""
+    desde = serializers.DateField(required=False, input_formats=["%Y-%m"])
+    hasta = serializers.DateField(required=False, input_formats=["%Y-%m"])
+    formato = serializers.ChoiceField(choices=["json", "csv"], required=False, default="json")
+
+    def validate(self, attrs):
+        desde, hasta = attrs.get("desde"), attrs.get("hasta")
+        if desde and hasta and desde > hasta:
+            raise serializers.ValidationError({"hasta": "Debe ser posterior o igual a 'desde'."})
+        return attrs
+
+
+class FilaEmpleadoMesSerializer(serializers.Serializer):
+    cedula = serializers.CharField()
+    empleado_nombre = serializers.CharField()
+    prestamos = serializers.ListField(child=serializers.IntegerField())
+    horas = serializers.ListField(child=serializers.FloatField())
+
+
+class ReporteEmpleadosMesResponseSerializer(serializers.Serializer):
+    meses = serializers.ListField(child=serializers.DateField(format="%Y-%m"))
+    empleados = FilaEmpleadoMesSerializer(many=True)
+
+
+class ReporteAnaliticaQuerySerializer(ReporteRangoQuerySerializer):
+    limite = serializers.IntegerField(required=False)
+
+
+class ReporteAnaliticaResponseSerializer(serializers.Serializer):
+    consulta = serializers.CharField()
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    columnas = serializers.ListField(child=serializers.CharField())
+    filas = serializers.ListField(child=serializers.ListField())
+
+
+class EntregaTurnoQuerySerializer(serializers.Serializer):
+    """Turno a consultar (dia local en que empieza + numero); sin parametros, el ultimo turno cerrado."""
+    dia = serializers.DateField(required=False)
+    turno = serializers.ChoiceField(choices=["1", "2", "3"], required=False)
+
+    def validate(self, attrs):
+        if ("dia" in attrs) != ("turno" in attrs):
+            raise serializers.ValidationError("Envíe 'dia' y 'turno' juntos.")
+        return attrs
+
+
+class PrestamoEntregaSerializer(PrestamoResponseSerializer):
+    minutos_en_uso = serializers.FloatField()
+
+
+class EntregaTurnoResponseSerializer(serializers.Serializer):
+    dia = serializers.DateField()
+    turno = serializers.CharField()
+    inicio = serializers.DateTimeField()
+    fin = serializers.DateTimeField()
+    corte = serializers.DateTimeField()
+    congelada_en = serializers.DateTimeField(allow_null=True)
+    media_minutos_devueltos = serializers.FloatField(allow_null=True)
+    pendientes = PrestamoEntregaSerializer(many=True)
+    prestados = PrestamoEntregaSerializer(many=True)
+    devueltos = PrestamoEntregaSerializer(many=True)
+
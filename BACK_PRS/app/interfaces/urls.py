@@ -9,6 +9,9 @@ from .views import (
     PrestamoViewSet,
     AuditLogViewSet,
     AppUserViewSet,
+    ReportesViewSet,
+    prestamos_stream,
+    prestamos_stream_ticket,
 )
 
 router = DefaultRouter()
@@ -18,7 +21,11 @@ router.register(r"sap-usuarios", SapUsuarioViewSet, basename="sapusuario")
 router.register(r"prestamos", PrestamoViewSet, basename="prestamo")
 router.register(r"audit-log", AuditLogViewSet, basename="auditlog")
 router.register(r"usuarios-app", AppUserViewSet, basename="usuariosapp")
+router.register(r"reportes", ReportesViewSet, basename="reporte")
 
 urlpatterns = [
+    # Antes del router para que no lo capture una ruta de detalle de prestamos
+    path("prestamos/stream/", prestamos_stream, name="prestamo-stream"),
+    path("prestamos/stream/ticket/", prestamos_stream_ticket, name="prestamo-stream-ticket"),
     path("", include(router.urls)),
 ]
@@ -4,6 +4,8 @@ from .catalogos import EmpleadoViewSet, RadioViewSet, SapUsuarioViewSet
 from .prestamos import PrestamoViewSet
 from .audit import AuditLogViewSet
 from .users import AppUserViewSet
+from .reportes import ReportesViewSet
+from .stream import prestamos_stream, prestamos_stream_ticket
 
 __all__ = [
     "EmpleadoViewSet",
@@ -12,4 +14,7 @@ __all__ = [
     "PrestamoViewSet",
     "AuditLogViewSet",
     "AppUserViewSet",
+    "ReportesViewSet",
+    "prestamos_stream",
+    "prestamos_stream_ticket",
 ]
@@ -2,25 +2,31 @@
 
 from __future__ import annotations
 
+from datetime import timedelta
 from typing import Any, Dict, Optional
 
-from rest_framework import viewsets
+from rest_framework import serializers, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 
+from ..pagination import decode_cursor, next_link, parse_limit
 from ..permissions import IsAuthenticatedReadOnlyOrAdmin
 from ..serializers import (
     EmpleadoRequestSerializer,
     EmpleadoResponseSerializer,
     EmpleadoUpdateSerializer,
+    PrestamosEmpleadoResponseSerializer,
     RadioRequestSerializer,
     RadioResponseSerializer,
+    RadioTimelineResponseSerializer,
     RadioUpdateSerializer,
     SapUsuarioRequestSerializer,
     SapUsuarioResponseSerializer,
     SapUsuarioUpdateSerializer,
 )
+from ...application.services import LISTAR_LIMIT_DEFAULT, LISTAR_LIMIT_MAX
 from ...application.use_cases import (
     ActualizarEmpleadoCmd,
     ActualizarRadioCmd,
@@ -32,7 +38,18 @@ from ...application.use_cases import (
     EliminarRadioCmd,
     EliminarSapUsuarioCmd,
 )
-from .shared import CatalogosServiceMixin, handle_domain_errors
+from ...domain.ports.versiones import COLECCION_EMPLEADOS, COLECCION_RADIOS, COLECCION_SAP_USUARIOS
+from ...infrastructure.reportes import inicio_dia_local
+from .reportes import RANGO_PARAMETERS, rango_from_request
+from .shared import (
+    CatalogosServiceMixin,
+    ConditionalGetMixin,
+    PrestamosServiceMixin,
+    conditional_get,
+    handle_domain_errors,
+)
+
+TIMELINE_COLUMNAS = ["id", "cedula", "empleado_nombre", "usuario_sap", "inicio", "fin"]
 
 
 def _serialize(serializer_cls, entity) -> Dict[str, Any]:
@@ -40,11 +57,12 @@ def _serialize(serializer_cls, entity) -> Dict[str, Any]:
     return serializer_cls(entity.__dict__).data
 
 
-class EmpleadoViewSet(CatalogosServiceMixin, viewsets.GenericViewSet):
+class EmpleadoViewSet(ConditionalGetMixin, CatalogosServiceMixin, PrestamosServiceMixin, viewsets.GenericViewSet):
     """CRUD del catalogo de empleados con validaciones de dominio."""
 
     permission_classes = [IsAuthenticatedReadOnlyOrAdmin]
     lookup_field = "cedula"
+    etag_collection = COLECCION_EMPLEADOS
 
     @extend_schema(
         parameters=[
@@ -58,6 +76,7 @@ class EmpleadoViewSet(CatalogosServiceMixin, viewsets.GenericViewSet):
         responses={200: EmpleadoResponseSerializer(many=True)},
         tags=["Empleados"],
     )
+    @conditional_get
     def list(self, request):
         """Lista empleados permitiendo filtrar por nombre o cedula."""
         q = request.query_params.get("q")
@@ -132,12 +151,44 @@ class EmpleadoViewSet(CatalogosServiceMixin, viewsets.GenericViewSet):
         self.catalogos.eliminar_empleado(**cmd.__dict__)
         return Response(status=204)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("cedula", OpenApiTypes.STR, OpenApiParameter.PATH),
+            OpenApiParameter("limit", OpenApiTypes.INT, OpenApiParameter.QUERY, description=f"Tamaño de pagina (1-{LISTAR_LIMIT_MAX}, por defecto {LISTAR_LIMIT_DEFAULT})."),
+            OpenApiParameter("cursor", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Cursor opaco devuelto en 'next'."),
+        ],
+        responses={200: PrestamosEmpleadoResponseSerializer, 404: OpenApiResponse(description="No encontrado")},
+        tags=["Empleados"],
+        description=(
+            "Historial de prestamos del empleado paginado por cursor (mas recientes primero) y estadisticas de todo "
+            "el historial: total, devueltos, duracion media, ultimo prestamo y prestamo abierto."
+        ),
+    )
+    @handle_domain_errors
+    @action(detail=True, methods=["get"], url_path="prestamos")
+    def prestamos_empleado(self, request, cedula: Optional[str] = None):
+        """Pagina del historial mas un aggregate de estadisticas sobre el indice (cedula, fecha)."""
+        limit = parse_limit(request.query_params.get("limit"), default=LISTAR_LIMIT_DEFAULT)
+        cursor = decode_cursor(request.query_params.get("cursor"))
+        pagina, estadisticas = self.prestamos.historial_empleado(cedula=cedula, limit=limit, cursor=cursor)
+        return Response(
+            PrestamosEmpleadoResponseSerializer(
+                {
+                    "cedula": estadisticas.cedula,
+                    "estadisticas": estadisticas.__dict__,
+                    "next": next_link(request, pagina.siguiente),
+                    "results": [p.__dict__ for p in pagina.items],
+                }
+            ).data
+        )
 
-class RadioViewSet(CatalogosServiceMixin, viewsets.GenericViewSet):
+
+class RadioViewSet(ConditionalGetMixin, CatalogosServiceMixin, PrestamosServiceMixin, viewsets.GenericViewSet):
     """CRUD del catalogo de radios de frecuencia."""
 
     permission_classes = [IsAuthenticatedReadOnlyOrAdmin]
     lookup_field = "codigo"
+    etag_collection = COLECCION_RADIOS
 
     @extend_schema(
         parameters=[
@@ -151,6 +202,7 @@ class RadioViewSet(CatalogosServiceMixin, viewsets.GenericViewSet):
         responses={200: RadioResponseSerializer(many=True)},
         tags=["Radios"],
     )
+    @conditional_get
     def list(self, request):
         """Lista radios permitiendo filtro por codigo o descripcion."""
         q = request.query_params.get("q")
@@ -228,12 +280,55 @@ class RadioViewSet(CatalogosServiceMixin, viewsets.GenericViewSet):
         self.catalogos.eliminar_radio(**cmd.__dict__)
         return Response(status=204)
 
+    @extend_schema(
+        parameters=[OpenApiParameter("codigo", OpenApiTypes.STR, OpenApiParameter.PATH)] + RANGO_PARAMETERS,
+        responses={200: RadioTimelineResponseSerializer, 404: OpenApiResponse(description="No encontrado")},
+        tags=["Radios"],
+        description=(
+            "Quien tuvo la radio y cuando: prestamos que se solapan con los dias [desde, hasta] (hora local), "
+            "incluido el que ya estaba en curso al inicio. Cada intervalo es un arreglo en el orden de 'columnas'."
+        ),
+    )
+    @handle_domain_errors
+    @action(detail=True, methods=["get"], url_path="timeline")
+    def timeline(self, request, codigo: Optional[str] = None):
+        """Intervalos de uso de la radio en formato compacto (Gantt)."""
+        desde, hasta = rango_from_request(request)
+        intervalos = self.prestamos.timeline_radio(
+            codigo_radio=codigo,
+            desde=inicio_dia_local(desde),
+            hasta=inicio_dia_local(hasta + timedelta(days=1)),
+        )
+        fecha = serializers.DateTimeField()
+        return Response(
+            RadioTimelineResponseSerializer(
+                {
+                    "codigo_radio": codigo,
+                    "desde": desde,
+                    "hasta": hasta,
+                    "columnas": TIMELINE_COLUMNAS,
+                    "intervalos": [
+                        [
+                            i.id,
+                            i.cedula,
+                            i.empleado_nombre,
+                            i.usuario_sap,
+                            fecha.to_representation(i.inicio),
+                            fecha.to_representation(i.fin) if i.fin else None,
+                        ]
+                        for i in intervalos
+                    ],
+                }
+            ).data
+        )
+
 
-class SapUsuarioViewSet(CatalogosServiceMixin, viewsets.GenericViewSet):
+class SapUsuarioViewSet(ConditionalGetMixin, CatalogosServiceMixin, viewsets.GenericViewSet):
     """CRUD del catalogo de usuarios SAP."""
 
     permission_classes = [IsAuthenticatedReadOnlyOrAdmin]
     lookup_field = "username"
+    etag_collection = COLECCION_SAP_USUARIOS
 
     @extend_schema(
         parameters=[
@@ -247,6 +342,7 @@ class SapUsuarioViewSet(CatalogosServiceMixin, viewsets.GenericViewSet):
         responses={200: SapUsuarioResponseSerializer(many=True)},
         tags=["SapUsuarios"],
     )
+    @conditional_get
     def list(self, request):
         """Lista usuarios SAP con filtro opcional por username."""
         q = request.query_params.get("q")
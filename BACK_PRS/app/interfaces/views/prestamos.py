@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from datetime import date, datetime, time, timedelta
 
 from django.utils import timezone
 from rest_framework import status, viewsets
@@ -12,49 +12,162 @@ from rest_framework.response import Response
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 
+from ..exports import stream_csv, stream_xlsx
+from ..pagination import decode_cursor, decode_marca, encode_marca, next_link, parse_limit
 from ..permissions import IsAdmin
 from ..serializers import (
     AsignarPrestamoRequestSerializer,
+    DevolverLoteRequestSerializer,
+    DevolverLoteResponseSerializer,
     DevolverPrestamoRequestSerializer,
+    ExportarParquetRequestSerializer,
+    ExportarParquetResponseSerializer,
+    PrestamoAsOfQuerySerializer,
+    PrestamoDeltaResponseSerializer,
+    PrestamoFiltroQuerySerializer,
+    PrestamoPageResponseSerializer,
     PrestamoResponseSerializer,
+    PrestamoVencidoResponseSerializer,
+    ResumenPrestamosSerializer,
 )
+from ...application.services import LISTAR_LIMIT_DEFAULT, LISTAR_LIMIT_MAX
 from ...application.use_cases import (
     AsignarPrestamoCmd,
+    DevolverLoteCmd,
     DevolverPorCedulaCmd,
     DevolverPorRadioCmd,
     DevolverPorUsuarioSapCmd,
 )
-from .shared import PrestamosServiceMixin, handle_domain_errors
+from ...domain.value_objects import EstadoPrestamo, FiltroPrestamos, Turno
+from ...domain.ports.versiones import COLECCION_PRESTAMOS
+from ...domain.reportes import TABLAS_PARQUET
+from ...infrastructure.parquet import PARQUET_DISPONIBLE
+from .shared import (
+    ConditionalGetMixin,
+    ExportacionParquetServiceMixin,
+    PrestamosServiceMixin,
+    conditional_get,
+    handle_domain_errors,
+    streaming_response,
+)
+
+_TURNOS = {"1": Turno.T1, "2": Turno.T2, "3": Turno.T3}
+
+FILTRO_PARAMETERS = [
+    OpenApiParameter("cedula", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Filtrar por cedula exacta"),
+    OpenApiParameter("codigo_radio", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Filtrar por codigo de radio"),
+    OpenApiParameter("usuario_sap", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Prefijo del usuario SAP"),
+    OpenApiParameter("empleado_nombre", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Texto contenido en el nombre del empleado"),
+    OpenApiParameter("estado", OpenApiTypes.STR, OpenApiParameter.QUERY, description="ASIGNADO | DEVUELTO"),
+    OpenApiParameter("turno", OpenApiTypes.STR, OpenApiParameter.QUERY, description="1 | 2 | 3"),
+    OpenApiParameter("desde", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="Fecha inicial (inclusive, hora local)"),
+    OpenApiParameter("hasta", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="Fecha final (inclusive, hora local)"),
+]
+
 
+def _inicio_dia_local(dia: date) -> datetime:
+    """Medianoche local (TIME_ZONE) del dia indicado como datetime aware."""
+    return timezone.make_aware(datetime.combine(dia, time.min), timezone.get_current_timezone())
 
-class PrestamoViewSet(PrestamosServiceMixin, viewsets.GenericViewSet):
+
+def clave_dia(request) -> str:
+    """Los conteos ``*_hoy`` cambian a medianoche aunque la coleccion no cambie."""
+    return timezone.localdate().isoformat()
+
+
+def filtro_from_request(request) -> FiltroPrestamos:
+    """Valida los query params de filtro y los convierte al value object del dominio."""
+    serializer = PrestamoFiltroQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    estado = data.get("estado")
+    turno = data.get("turno")
+    desde = data.get("desde")
+    hasta = data.get("hasta")
+    return FiltroPrestamos(
+        cedula=data.get("cedula") or None,
+        codigo_radio=data.get("codigo_radio") or None,
+        usuario_sap=data.get("usuario_sap") or None,
+        empleado_nombre=data.get("empleado_nombre") or None,
+        estado=EstadoPrestamo(estado) if estado else None,
+        turno=_TURNOS[turno] if turno else None,
+        desde=_inicio_dia_local(desde) if desde else None,
+        hasta=_inicio_dia_local(hasta + timedelta(days=1)) if hasta else None,
+    )
+
+
+class PrestamoViewSet(ConditionalGetMixin, PrestamosServiceMixin, ExportacionParquetServiceMixin, viewsets.GenericViewSet):
     """Operaciones de asignacion y devolucion de radios."""
 
     permission_classes = [IsAdmin]
+    etag_collection = COLECCION_PRESTAMOS
 
     def get_permissions(self):  # type: ignore[override]
         """Permite acceso de lectura/escritura a usuarios autenticados para acciones publicas."""
-        if self.action in {"list", "create", "devolver"}:
+        if self.action in {"list", "resumen", "create", "devolver", "devolver_lote", "exportar", "vencidos", "as_of"}:
             return [IsAuthenticated()]
         return super().get_permissions()
 
     @extend_schema(
         parameters=[
-            OpenApiParameter("cedula", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Filtrar por cedula"),
-            OpenApiParameter("codigo_radio", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Filtrar por codigo de radio"),
+            *FILTRO_PARAMETERS,
+            OpenApiParameter("limit", OpenApiTypes.INT, OpenApiParameter.QUERY, description=f"Tamaño de pagina (1-{LISTAR_LIMIT_MAX}, por defecto {LISTAR_LIMIT_DEFAULT})."),
+            OpenApiParameter("cursor", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Cursor opaco devuelto en 'next'."),
+            OpenApiParameter("since", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Modo delta: watermark previo ('0' para iniciar). Devuelve solo filas creadas o modificadas despues."),
         ],
-        responses={200: PrestamoResponseSerializer(many=True)},
+        responses={200: PrestamoPageResponseSerializer},
         tags=["Prestamos"],
-        description="Lista prestamos. Si no se filtra, devuelve los mas recientes primero.",
+        description=(
+            "Lista prestamos filtrados en servidor y paginados por cursor, los mas recientes primero. "
+            "Con 'since' responde en modo delta (PrestamoDeltaResponse) ordenado por fecha de modificacion."
+        ),
     )
+    @conditional_get
     def list(self, request):
-        """Lista prestamos abiertos o historicos segun los filtros recibidos."""
-        cedula: Optional[str] = request.query_params.get("cedula")
-        codigo_radio: Optional[str] = request.query_params.get("codigo_radio")
-        prestamos = self.prestamos.listar(cedula=cedula, codigo_radio=codigo_radio)
-        payload = [prestamo.__dict__ for prestamo in prestamos]
+        """Devuelve una pagina de prestamos, o los cambios desde un watermark si llega 'since'."""
+        filtro = filtro_from_request(request)
+        since = request.query_params.get("since")
+        if since is not None:
+            return self._list_delta(request, since, filtro)
+
+        limit = parse_limit(request.query_params.get("limit"), default=LISTAR_LIMIT_DEFAULT)
+        cursor = decode_cursor(request.query_params.get("cursor"))
+        # La marca se toma antes de leer para que ningun cambio concurrente quede por detras de ella
+        marca = self.prestamos.marca_actual()
+        pagina = self.prestamos.listar(limit=limit, cursor=cursor, filtro=filtro)
+        payload = [prestamo.__dict__ for prestamo in pagina.items]
         data = PrestamoResponseSerializer(payload, many=True).data
-        return Response(data)
+        return Response({"next": next_link(request, pagina.siguiente), "watermark": encode_marca(marca), "results": data})
+
+    def _list_delta(self, request, since: str, filtro: FiltroPrestamos) -> Response:
+        """Respuesta del modo delta: cambios posteriores a ``since`` y el watermark siguiente."""
+        desde = decode_marca(since)
+        limit = parse_limit(request.query_params.get("limit"), default=LISTAR_LIMIT_MAX)
+        cambios = self.prestamos.listar_cambios(desde=desde, limit=limit, filtro=filtro)
+        payload = [prestamo.__dict__ for prestamo in cambios.items]
+        return Response(
+            PrestamoDeltaResponseSerializer(
+                {"watermark": encode_marca(cambios.marca), "has_more": cambios.hay_mas, "results": payload}
+            ).data
+        )
+
+    @extend_schema(
+        parameters=FILTRO_PARAMETERS,
+        responses={200: ResumenPrestamosSerializer},
+        tags=["Prestamos"],
+        description=(
+            "Totales de todos los prestamos del filtro (no solo de una pagina del listado): total, abiertos y "
+            "prestados/devueltos desde el inicio del dia local."
+        ),
+    )
+    @conditional_get(clave=clave_dia)
+    @action(detail=False, methods=["get"], url_path="resumen")
+    def resumen(self, request):
+        """Aggregate en servidor para los indicadores del tablero y del historico."""
+        resumen = self.prestamos.resumen(
+            filtro=filtro_from_request(request), inicio_dia=_inicio_dia_local(timezone.localdate())
+        )
+        return Response(ResumenPrestamosSerializer(resumen.__dict__).data)
 
     @extend_schema(
         request=AsignarPrestamoRequestSerializer,
@@ -75,6 +188,7 @@ class PrestamoViewSet(PrestamosServiceMixin, viewsets.GenericViewSet):
             usuario_sap=serializer.validated_data["usuario_sap"],
             usuario_registra_id=request.user.id,
             ahora=ahora,
+            usuario_registra_username=request.user.get_username(),
         )
         prestamo = self.prestamos.asignar(**cmd.__dict__)
         return Response(PrestamoResponseSerializer(prestamo.__dict__).data, status=201)
@@ -119,3 +233,133 @@ class PrestamoViewSet(PrestamosServiceMixin, viewsets.GenericViewSet):
             prestamo = self.prestamos.devolver_por_usuario_sap(**cmd.__dict__)
 
         return Response(PrestamoResponseSerializer(prestamo.__dict__).data)
+
+    @extend_schema(
+        request=DevolverLoteRequestSerializer,
+        responses={200: DevolverLoteResponseSerializer, 400: OpenApiResponse(description="Peticion invalida")},
+        tags=["Prestamos"],
+        description=(
+            "Registrar devoluciones en lote (fin de turno). Cada item lleva uno de codigo_radio, cedula o "
+            "usuario_sap; todo se cierra en una transaccion y se informa el resultado de cada item."
+        ),
+    )
+    @handle_domain_errors
+    @action(detail=False, methods=["post"], url_path="devolver-lote")
+    def devolver_lote(self, request):
+        """Cierra todos los prestamos abiertos indicados y devuelve un resultado por item."""
+        serializer = DevolverLoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        cmd = DevolverLoteCmd(
+            items=[dict(item) for item in serializer.validated_data["items"]],
+            ahora=serializer.validated_data.get("ahora") or timezone.localtime(),
+        )
+        resultados = self.prestamos.devolver_lote(**cmd.__dict__)
+        payload = [
+            {
+                "campo": r.campo,
+                "valor": r.valor,
+                "ok": r.ok,
+                "prestamo": r.prestamo.__dict__ if r.prestamo else None,
+                "error": r.error,
+            }
+            for r in resultados
+        ]
+        devueltos = sum(1 for r in resultados if r.ok)
+        return Response(DevolverLoteResponseSerializer({"devueltos": devueltos, "results": payload}).data)
+
+    @extend_schema(
+        responses={200: PrestamoVencidoResponseSerializer(many=True)},
+        tags=["Prestamos"],
+        description=(
+            "Prestamos que siguen abiertos despues de terminar su turno, segun la ultima ejecucion del "
+            "comando 'detectar_vencidos' (los devueltos desde entonces se omiten)."
+        ),
+    )
+    @action(detail=False, methods=["get"], url_path="vencidos")
+    def vencidos(self, request):
+        """Lee el conjunto materializado de vencidos, ordenado por fin de turno."""
+        payload = [
+            {**v.prestamo.__dict__, "fin_turno": v.fin_turno, "detectado_en": v.detectado_en}
+            for v in self.prestamos.listar_vencidos()
+        ]
+        return Response(PrestamoVencidoResponseSerializer(payload, many=True).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "t", OpenApiTypes.DATETIME, OpenApiParameter.QUERY, required=True,
+                description="Instante a consultar (ISO 8601; sin zona se toma la hora local).",
+            ),
+        ],
+        responses={200: PrestamoResponseSerializer(many=True)},
+        tags=["Prestamos"],
+        description=(
+            "Prestamos en curso en el instante 't': iniciados antes o en ese momento y devueltos despues "
+            "(o aun abiertos). Responde quien tenia cada radio, p. ej. para investigar un incidente."
+        ),
+    )
+    @action(detail=False, methods=["get"], url_path="as-of")
+    def as_of(self, request):
+        """Foto historica de los prestamos abiertos, ordenada por fecha de prestamo."""
+        query = PrestamoAsOfQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        prestamos = self.prestamos.abiertos_en(instante=query.validated_data["t"])
+        return Response(PrestamoResponseSerializer([p.__dict__ for p in prestamos], many=True).data)
+
+    @extend_schema(
+        parameters=[
+            *FILTRO_PARAMETERS,
+            OpenApiParameter("formato", OpenApiTypes.STR, OpenApiParameter.QUERY, description="csv | xlsx (por defecto csv)"),
+        ],
+        responses={200: OpenApiResponse(description="Archivo CSV o XLSX en streaming")},
+        tags=["Prestamos"],
+        description=(
+            "Exporta el historico filtrado sin limite de filas, generado en streaming y leido por paginas de keyset "
+            "(ninguna lectura queda abierta durante la descarga)."
+        ),
+    )
+    @action(detail=False, methods=["get"], url_path="exportar")
+    def exportar(self, request):
+        """Devuelve el historico filtrado como descarga CSV o XLSX en memoria constante."""
+        formato = (request.query_params.get("formato") or "csv").lower()
+        if formato not in {"csv", "xlsx"}:
+            return Response({"formato": "Debe ser 'csv' o 'xlsx'."}, status=status.HTTP_400_BAD_REQUEST)
+        prestamos = self.prestamos.exportar(filtro=filtro_from_request(request))
+        if formato == "csv":
+            response = streaming_response(request, stream_csv(prestamos), "text/csv; charset=utf-8")
+        else:
+            response = streaming_response(
+                request,
+                stream_xlsx(prestamos),
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+        response["Content-Disposition"] = f'attachment; filename="historico.{formato}"'
+        return response
+
+    @extend_schema(
+        request=ExportarParquetRequestSerializer,
+        responses={200: ExportarParquetResponseSerializer, 503: OpenApiResponse(description="pyarrow no instalado")},
+        tags=["Prestamos"],
+        description=(
+            "Solo administradores. Actualiza el dataset Parquet de BI (PARQUET_EXPORT_DIR): reescribe las particiones "
+            "mensuales de prestamos y audit_log con cambios desde la ultima exportacion (watermarks updated_at / at). "
+            "Columnas tipadas y comprimidas con zstd."
+        ),
+    )
+    @handle_domain_errors
+    @action(detail=False, methods=["post"], url_path="exportar-parquet")
+    def exportar_parquet(self, request):
+        """Misma exportacion incremental que el comando exportar_parquet."""
+        if not PARQUET_DISPONIBLE:
+            return Response(
+                {"detail": "La exportacion Parquet no esta disponible (falta pyarrow)."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        serializer = ExportarParquetRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        resultados = self.exportacion_parquet.exportar(
+            tablas=serializer.validated_data.get("tablas") or TABLAS_PARQUET,
+            completo=serializer.validated_data["completo"],
+        )
+        return Response(ExportarParquetResponseSerializer({"results": [r.__dict__ for r in resultados]}).data)
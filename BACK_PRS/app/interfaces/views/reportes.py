@@ -0,0 +1,408 @@
+"""Viewset de reportes agregados (calculados en la base de datos)."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Tuple
+
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+
+from ..exports import stream_csv_empleados_mes
+from ..serializers import (
+    ReporteAnaliticaQuerySerializer,
+    ReporteAnaliticaResponseSerializer,
+    EntregaTurnoQuerySerializer,
+    EntregaTurnoResponseSerializer,
+    ReporteConcurrenciaQuerySerializer,
+    ReporteConcurrenciaResponseSerializer,
+    ReporteEmpleadosMesQuerySerializer,
+    ReporteEmpleadosMesResponseSerializer,
+    ReporteMapaCalorQuerySerializer,
+    ReporteMapaCalorResponseSerializer,
+    ReporteRangoQuerySerializer,
+    ReporteTurnosResponseSerializer,
+    ReporteUtilizacionResponseSerializer,
+)
+from ...application.analitica import ANALITICA_LIMITE_DEFAULT
+from ...application.entregas import turno_anterior
+from ...application.reportes_service import UTILIZACION_DISPONIBLE
+from ...domain.ports.versiones import COLECCION_PRESTAMOS
+from ...domain.reportes import CONSULTAS_ANALITICAS, DIAS_SEMANA
+from ...domain.rules import ventana_turno
+from ...domain.value_objects import Turno
+from ...infrastructure.analitica import ANALITICA_DISPONIBLE, snapshot_configurado
+from ...infrastructure.reportes import inicio_dia_local
+from .shared import (
+    AnaliticaServiceMixin,
+    ConditionalGetMixin,
+    EntregasServiceMixin,
+    ReportesServiceMixin,
+    conditional_get,
+    handle_domain_errors,
+    streaming_response,
+)
+
+_TURNOS = {"1": Turno.T1, "2": Turno.T2, "3": Turno.T3}
+
+RANGO_PARAMETERS = [
+    OpenApiParameter("desde", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="Dia inicial (YYYY-MM-DD, hora local). Por defecto el primero del mes."),
+    OpenApiParameter("hasta", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="Dia final inclusivo (YYYY-MM-DD, hora local). Por defecto hoy."),
+]
+
+
+def rango_from_request(request) -> Tuple[date, date]:
+    """Valida ``desde``/``hasta``; sin parametros devuelve el mes en curso hasta hoy (hora local)."""
+    serializer = ReporteRangoQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    hoy = timezone.localdate()
+    hasta = serializer.validated_data.get("hasta") or hoy
+    desde = serializer.validated_data.get("desde") or hasta.replace(day=1)
+    return desde, hasta
+
+
+def clave_rango(request) -> str:
+    """Clave de ETag de los reportes por dias: el rango resuelto, que sin parametros termina hoy."""
+    desde, hasta = rango_from_request(request)
+    return f"{desde}/{hasta}"
+
+
+def ahora_reporte() -> datetime:
+    """Hora local truncada al minuto: resolucion del corte de los reportes que dependen de ``ahora``."""
+    return timezone.localtime().replace(second=0, microsecond=0)
+
+
+def clave_rango_en_curso(request) -> str:
+    """
+    Clave de ETag de los reportes que cortan lo abierto en ``ahora``: el rango
+    resuelto y, mientras el rango no termine, el minuto del corte.
+    """
+    desde, hasta = rango_from_request(request)
+    ahora = ahora_reporte()
+    if inicio_dia_local(hasta + timedelta(days=1)) <= ahora:
+        return f"{desde}/{hasta}"
+    return f"{desde}/{hasta}@{ahora.isoformat()}"
+
+
+def turno_de_entrega(request, ahora: datetime) -> Tuple[date, Turno]:
+    """(dia, turno) pedido, o sin parametros el ultimo turno cerrado en ``ahora``."""
+    query = EntregaTurnoQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    if "dia" in query.validated_data:
+        return query.validated_data["dia"], _TURNOS[query.validated_data["turno"]]
+    return turno_anterior(ahora)
+
+
+def clave_entrega_turno(request) -> str:
+    """
+    Clave de ETag de la entrega de turno: el (dia, turno) resuelto (sin
+    parametros depende de la hora) y, si el turno sigue en curso, el minuto del corte.
+    """
+    ahora = ahora_reporte()
+    dia, turno = turno_de_entrega(request, ahora)
+    _, fin = ventana_turno(dia, turno, ahora.tzinfo)
+    if fin <= ahora:
+        return f"{dia}/{turno.name}"
+    return f"{dia}/{turno.name}@{ahora.isoformat()}"
+
+
+def meses_from_request(request) -> Tuple[date, date]:
+    """Valida ``desde``/``hasta`` (meses); sin parametros, los 12 meses que terminan en el mes en curso."""
+    query = ReporteEmpleadosMesQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    hasta = query.validated_data.get("hasta") or timezone.localdate().replace(day=1)
+    # 12 meses contando el final: el mes siguiente al mismo mes del año anterior
+    desde = query.validated_data.get("desde") or (date(hasta.year - 1, hasta.month, 1) + timedelta(days=31)).replace(day=1)
+    return desde, hasta
+
+
+def clave_meses(request) -> str:
+    """Clave de ETag del pivot por mes: el rango resuelto, que sin parametros depende del mes en curso."""
+    desde, hasta = meses_from_request(request)
+    return f"{desde:%Y-%m}/{hasta:%Y-%m}"
+
+
+class ReportesViewSet(
+    ConditionalGetMixin, ReportesServiceMixin, EntregasServiceMixin, AnaliticaServiceMixin, viewsets.GenericViewSet
+):
+    """Reportes de solo lectura; el ETag sigue la version de la coleccion de prestamos."""
+
+    permission_classes = [IsAuthenticated]
+    http_method_names = ["get"]
+    etag_collection = COLECCION_PRESTAMOS
+
+    @extend_schema(
+        parameters=RANGO_PARAMETERS,
+        responses={200: ReporteTurnosResponseSerializer},
+        tags=["Reportes"],
+        description=(
+            "Asignaciones y devoluciones por dia (hora local) y turno. 'asignaciones[i][j]' corresponde a "
+            "dias[i] y turnos[j]. Cada devolucion cuenta en el dia y turno en que se registro."
+        ),
+    )
+    @conditional_get(clave=clave_rango)
+    @handle_domain_errors
+    @action(detail=False, methods=["get"], url_path="turnos")
+    def turnos(self, request):
+        """Matriz dia x turno agregada con un GROUP BY en la base de datos."""
+        desde, hasta = rango_from_request(request)
+        reporte = self.reportes.turnos_por_dia(desde=desde, hasta=hasta)
+        return Response(
+            ReporteTurnosResponseSerializer(
+                {
+                    "turnos": [t.value for t in reporte.turnos],
+                    "dias": reporte.dias,
+                    "asignaciones": reporte.asignaciones,
+                    "devoluciones": reporte.devoluciones,
+                }
+            ).data
+        )
+
+    @extend_schema(
+        parameters=RANGO_PARAMETERS,
+        responses={200: ReporteUtilizacionResponseSerializer},
+        tags=["Reportes"],
+        description=(
+            "Duracion de los prestamos cerrados (media, p50, p90, p99 en horas), horas en uso y ratio ocioso "
+            "por radio y de toda la flota, para los prestamos que se solapan con el rango; las horas en uso se "
+            "recortan al rango y los abiertos cuentan hasta el minuto en curso. Requiere numpy."
+        ),
+    )
+    @conditional_get(clave=clave_rango_en_curso)
+    @handle_domain_errors
+    @action(detail=False, methods=["get"], url_path="utilizacion")
+    def utilizacion(self, request):
+        """Estadisticas de uso calculadas de forma vectorizada sobre el historico del rango."""
+        if not UTILIZACION_DISPONIBLE:
+            return Response(
+                {"detail": "El reporte de utilizacion no esta disponible (falta numpy)."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        desde, hasta = rango_from_request(request)
+        reporte = self.reportes.utilizacion(
+            desde=inicio_dia_local(desde),
+            hasta=inicio_dia_local(hasta + timedelta(days=1)),
+            ahora=ahora_reporte(),
+        )
+        return Response(
+            ReporteUtilizacionResponseSerializer(
+                {
+                    "desde": desde,
+                    "hasta": hasta,
+                    "horas_periodo": reporte.horas_periodo,
+                    "flota": reporte.flota.__dict__,
+                    "radios": [r.__dict__ for r in reporte.radios],
+                }
+            ).data
+        )
+
+    @extend_schema(
+        parameters=RANGO_PARAMETERS
+        + [
+            OpenApiParameter(
+                "paso", OpenApiTypes.INT, OpenApiParameter.QUERY,
+                description="Resolucion de la serie en minutos (1-1440, por defecto 60).",
+            ),
+        ],
+        responses={200: ReporteConcurrenciaResponseSerializer},
+        tags=["Reportes"],
+        description=(
+            "Radios prestadas al mismo tiempo: pico del periodo e instante en que se alcanzo, serie con el maximo "
+            "de cada intervalo de 'paso' minutos y picos por dia y por turno (hora local). Los prestamos abiertos "
+            "cuentan hasta el minuto en curso. Sirve para dimensionar la flota."
+        ),
+    )
+    @conditional_get(clave=clave_rango_en_curso)
+    @handle_domain_errors
+    @action(detail=False, methods=["get"], url_path="concurrencia")
+    def concurrencia(self, request):
+        """Barrido de linea sobre los intervalos de prestamo del rango."""
+        desde, hasta = rango_from_request(request)
+        query = ReporteConcurrenciaQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        reporte = self.reportes.concurrencia(
+            desde=inicio_dia_local(desde),
+            hasta=inicio_dia_local(hasta + timedelta(days=1)),
+            ahora=ahora_reporte(),
+            paso_minutos=query.validated_data["paso"],
+        )
+        return Response(
+            ReporteConcurrenciaResponseSerializer(
+                {
+                    "desde": desde,
+                    "hasta": hasta,
+                    "pico": reporte.pico,
+                    "instante_pico": reporte.instante_pico,
+                    "paso_minutos": reporte.paso_minutos,
+                    "serie": [p.__dict__ for p in reporte.serie],
+                    "dias": [p.__dict__ for p in reporte.dias],
+                    "turnos": [
+                        {**p.__dict__, "turno": p.turno.value if p.turno else None} for p in reporte.turnos
+                    ],
+                }
+            ).data
+        )
+
+    @extend_schema(
+        parameters=RANGO_PARAMETERS
+        + [OpenApiParameter("turno", OpenApiTypes.STR, OpenApiParameter.QUERY, description="1 | 2 | 3")],
+        responses={200: ReporteMapaCalorResponseSerializer},
+        tags=["Reportes"],
+        description=(
+            "Mapa de calor 7x24: asignaciones y devoluciones por dia de la semana (fila 0 = lunes) y hora local "
+            "(columna 0 = 00:00-00:59) en el rango. Cada evento cuenta en su propio instante; 'turno' filtra por el "
+            "turno del prestamo. Los rangos que terminan antes de hoy se sirven desde cache."
+        ),
+    )
+    @conditional_get(clave=clave_rango)
+    @handle_domain_errors
+    @action(detail=False, methods=["get"], url_path="mapa-calor")
+    def mapa_calor(self, request):
+        """Conteos agrupados por EXTRACT(dia ISO, hora) en la base de datos."""
+        desde, hasta = rango_from_request(request)
+        query = ReporteMapaCalorQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        turno = query.validated_data.get("turno")
+        turno = _TURNOS[turno] if turno else None
+        mapa = self.reportes.mapa_calor(desde=desde, hasta=hasta, hoy=timezone.localdate(), turno=turno)
+        return Response(
+            ReporteMapaCalorResponseSerializer(
+                {
+                    "desde": desde,
+                    "hasta": hasta,
+                    "turno": turno.value if turno else None,
+                    "dias_semana": list(DIAS_SEMANA),
+                    "horas": list(range(24)),
+                    "asignaciones": mapa.asignaciones,
+                    "devoluciones": mapa.devoluciones,
+                }
+            ).data
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("dia", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="Dia local en que empieza el turno."),
+            OpenApiParameter("turno", OpenApiTypes.STR, OpenApiParameter.QUERY, description="1 | 2 | 3"),
+        ],
+        responses={200: EntregaTurnoResponseSerializer},
+        tags=["Reportes"],
+        description=(
+            "Cambio de turno: prestamos abiertos al cierre (los que recibe el turno entrante), prestados y devueltos "
+            "durante el turno, con minutos en uso. Sin parametros, el ultimo turno cerrado. Los turnos cerrados se "
+            "congelan la primera vez y despues se leen sin recalcular; el turno en curso se calcula al momento."
+        ),
+    )
+    @conditional_get(clave=clave_entrega_turno)
+    @handle_domain_errors
+    @action(detail=False, methods=["get"], url_path="entrega-turno")
+    def entrega_turno(self, request):
+        """Foto de cambio de turno (congelada si el turno ya cerro)."""
+        ahora = ahora_reporte()
+        dia, turno = turno_de_entrega(request, ahora)
+        entrega = self.entregas.entrega(dia=dia, turno=turno, ahora=ahora)
+
+        def items(prestamos):
+            return [{**p.__dict__, "minutos_en_uso": entrega.minutos_en_uso(p)} for p in prestamos]
+
+        duraciones = [entrega.minutos_en_uso(p) for p in entrega.devueltos]
+        return Response(
+            EntregaTurnoResponseSerializer(
+                {
+                    "dia": entrega.dia,
+                    "turno": entrega.turno.value,
+                    "inicio": entrega.inicio,
+                    "fin": entrega.fin,
+                    "corte": entrega.corte,
+                    "congelada_en": entrega.congelada_en,
+                    "media_minutos_devueltos": sum(duraciones) / len(duraciones) if duraciones else None,
+                    "pendientes": items(entrega.pendientes),
+                    "prestados": items(entrega.prestados),
+                    "devueltos": items(entrega.devueltos),
+                }
+            ).data
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("desde", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Mes inicial (YYYY-MM, hora local). Por defecto 11 meses antes de 'hasta'."),
+            OpenApiParameter("hasta", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Mes final inclusivo (YYYY-MM). Por defecto el mes en curso."),
+            OpenApiParameter("formato", OpenApiTypes.STR, OpenApiParameter.QUERY, description="json | csv (por defecto json)"),
+        ],
+        responses={200: ReporteEmpleadosMesResponseSerializer},
+        tags=["Reportes"],
+        description=(
+            "Pivot empleado x mes: prestamos iniciados en cada mes local y horas de los ya devueltos. "
+            "'prestamos[j]' y 'horas[j]' de cada empleado corresponden a meses[j]. Los meses cerrados sin "
+            "prestamos abiertos se sirven desde cache; con formato=csv se descarga en streaming."
+        ),
+    )
+    @conditional_get(clave=clave_meses)
+    @handle_domain_errors
+    @action(detail=False, methods=["get"], url_path="empleados-mes")
+    def empleados_mes(self, request):
+        """Un GROUP BY (cedula, mes) para los meses que no estan en cache."""
+        desde, hasta = meses_from_request(request)
+        pivot = self.reportes.uso_empleados_mes(desde=desde, hasta=hasta, hoy=timezone.localdate())
+        if request.query_params.get("formato") == "csv":
+            response = streaming_response(request, stream_csv_empleados_mes(pivot), "text/csv; charset=utf-8")
+            response["Content-Disposition"] = (
+                f'attachment; filename="empleados-mes-{pivot.meses[0]:%Y-%m}-{pivot.meses[-1]:%Y-%m}.csv"'
+            )
+            return response
+        return Response(
+            ReporteEmpleadosMesResponseSerializer(
+                {
+                    "meses": pivot.meses,
+                    "empleados": [
+                        {"cedula": c, "empleado_nombre": n, "prestamos": p, "horas": h}
+                        for c, n, p, h in zip(pivot.cedulas, pivot.nombres, pivot.prestamos, pivot.horas)
+                    ],
+                }
+            ).data
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("consulta", OpenApiTypes.STR, OpenApiParameter.PATH, description=" | ".join(CONSULTAS_ANALITICAS)),
+            *RANGO_PARAMETERS,
+            OpenApiParameter("limite", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Filas maximas (1-1000, por defecto 100)."),
+        ],
+        responses={200: ReporteAnaliticaResponseSerializer},
+        tags=["Reportes"],
+        description=(
+            "Consultas analiticas resueltas por el motor columnar embebido (DuckDB) sobre el snapshot de la base "
+            "(ANALITICA_SQLITE, refrescado con snapshot_analitica), nunca sobre el archivo en linea: 'radios' y "
+            "'empleados' (prestamos, horas, media y p90 de los iniciados en el rango) y 'auditoria' (eventos del "
+            "audit_log por agregado, accion y actor). 'filas[i][j]' corresponde a columnas[j]. 503 si duckdb no esta "
+            "instalado o no hay snapshot configurado."
+        ),
+    )
+    @handle_domain_errors
+    @action(detail=False, methods=["get"], url_path=r"analitica/(?P<consulta>[a-z]+)")
+    def analitica(self, request, consulta=None):
+        """Sin ETag: el snapshot y el audit_log no siguen la version de la coleccion de prestamos."""
+        if not ANALITICA_DISPONIBLE or not snapshot_configurado():
+            motivo = "falta duckdb" if not ANALITICA_DISPONIBLE else "ANALITICA_SQLITE no esta configurada"
+            return Response(
+                {"detail": f"El motor analitico no esta disponible ({motivo})."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        desde, hasta = rango_from_request(request)
+        query = ReporteAnaliticaQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        resultado = self.servicio_analitica.consultar(
+            consulta,
+            desde=inicio_dia_local(desde),
+            hasta=inicio_dia_local(hasta + timedelta(days=1)),
+            limite=query.validated_data.get("limite", ANALITICA_LIMITE_DEFAULT),
+        )
+        return Response(
+            ReporteAnaliticaResponseSerializer(
+                {"consulta": resultado.consulta, "desde": desde, "hasta": hasta, "columnas": resultado.columnas, "filas": resultado.filas}
+            ).data
+        )
@@ -2,24 +2,41 @@
 
 from __future__ import annotations
 
+import hashlib
 from functools import cached_property, wraps
+from typing import AsyncIterator, Iterable, Iterator
 
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework import status
 from rest_framework.response import Response
 
+from ...application.analitica import AnaliticaService
 from ...application.audit_queries import AuditLogQueryService
 from ...application.catalogos_service import CatalogosService
+from ...application.entregas import EntregasTurnoService
+from ...application.exportacion_parquet import ExportacionParquetService
+from ...application.reportes_service import ReportesService
 from ...application.services import PrestamosService
 from ...domain.errors import BusinessRuleViolation, EntityNotFound, InactiveEntity
+from ...domain.ports.versiones import VersionColeccionRepository
+from ...infrastructure.analitica import DuckDBAnaliticaRepository
+from ...infrastructure.broker import OnCommitPrestamoPublisher
+from ...infrastructure.parquet import ParquetExportacion
+from ...infrastructure.reportes import DjangoCacheReportes, DjangoReportesRepository, DjangoResumenesRepository
 from ...infrastructure.repositories import (
     DjangoAuditLogQueryRepository,
     DjangoAuditLogRepository,
     DjangoEmpleadoRepository,
+    DjangoEntregasTurnoRepository,
     DjangoPrestamoRepository,
     DjangoRadioRepository,
     DjangoSapUsuarioRepository,
     DjangoUnitOfWork,
+    DjangoVersionColeccionRepository,
 )
 
 
@@ -30,7 +47,10 @@ def _build_catalogos_service() -> CatalogosService:
     sap_repo = DjangoSapUsuarioRepository()
     audit_repo = DjangoAuditLogRepository()
     uow = DjangoUnitOfWork()
-    return CatalogosService(empleados_repo, radios_repo, sap_repo, audit_repo, uow, clock=timezone.now)
+    versiones = DjangoVersionColeccionRepository()
+    return CatalogosService(
+        empleados_repo, radios_repo, sap_repo, audit_repo, uow, clock=timezone.now, versiones=versiones
+    )
 
 
 def _build_prestamos_service() -> PrestamosService:
@@ -40,7 +60,19 @@ def _build_prestamos_service() -> PrestamosService:
     sap_repo = DjangoSapUsuarioRepository()
     prestamos_repo = DjangoPrestamoRepository()
     uow = DjangoUnitOfWork()
-    return PrestamosService(empleados_repo, radios_repo, sap_repo, prestamos_repo, uow)
+    versiones = DjangoVersionColeccionRepository()
+    eventos = OnCommitPrestamoPublisher()
+    resumenes = DjangoResumenesRepository()
+    return PrestamosService(
+        empleados_repo,
+        radios_repo,
+        sap_repo,
+        prestamos_repo,
+        uow,
+        versiones=versiones,
+        eventos=eventos,
+        resumenes=resumenes,
+    )
 
 
 def _build_audit_query_service() -> AuditLogQueryService:
@@ -49,6 +81,31 @@ def _build_audit_query_service() -> AuditLogQueryService:
     return AuditLogQueryService(repo)
 
 
+def _build_reportes_service() -> ReportesService:
+    """Retorna el servicio de reportes agregados."""
+    return ReportesService(
+        DjangoReportesRepository(),
+        DjangoResumenesRepository(),
+        DjangoCacheReportes(),
+        DjangoVersionColeccionRepository(),
+    )
+
+
+def _build_entregas_service() -> EntregasTurnoService:
+    """Retorna el servicio de entregas de turno."""
+    return EntregasTurnoService(DjangoPrestamoRepository(), DjangoEntregasTurnoRepository())
+
+
+def _build_analitica_service() -> AnaliticaService:
+    """Retorna el servicio de consultas del motor analitico."""
+    return AnaliticaService(DuckDBAnaliticaRepository())
+
+
+def _build_exportacion_parquet_service() -> ExportacionParquetService:
+    """Retorna el servicio de exportacion Parquet sobre PARQUET_EXPORT_DIR."""
+    return ExportacionParquetService(ParquetExportacion())
+
+
 def handle_domain_errors(func):
     """Decorator para traducir errores de dominio a respuestas HTTP."""
 
@@ -66,6 +123,82 @@ def handle_domain_errors(func):
     return wrapper
 
 
+_FIN = object()
+
+
+async def _bloques_async(bloques: Iterator) -> AsyncIterator:
+    """Pide cada bloque al generador sync en el hilo de la conexion (thread_sensitive)."""
+    siguiente = sync_to_async(next)
+    try:
+        while (bloque := await siguiente(bloques, _FIN)) is not _FIN:
+            yield bloque
+    finally:
+        # Cliente desconectado o fin: libera el cursor del generador en su mismo hilo
+        if hasattr(bloques, "close"):
+            await sync_to_async(bloques.close)()
+
+
+def streaming_response(request, bloques: Iterable, content_type: str) -> StreamingHttpResponse:
+    """
+    StreamingHttpResponse que sigue en streaming bajo ASGI: alli Django consume
+    los iteradores sync con ``list()`` antes de enviar el primer byte, asi que
+    se entregan envueltos en un iterador async que avanza bloque a bloque.
+    """
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        bloques = _bloques_async(iter(bloques))
+    return StreamingHttpResponse(bloques, content_type=content_type)
+
+
+def conditional_get(func=None, *, clave=None):
+    """
+    Decorator para listados de viewsets con ConditionalGetMixin: responde 304
+    si el If-None-Match coincide con la version actual de la coleccion, sin
+    ejecutar la consulta ni serializar; en otro caso adjunta el ETag.
+    ``clave(request) -> str`` agrega al ETag lo que la respuesta toma de fuera
+    de la URL y de la coleccion (el rango resuelto a partir de hoy, el instante
+    de corte); se evalua antes de la consulta y debe ser barata.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            etag = self.collection_etag(request, clave(request) if clave is not None else "")
+            if_none_match = request.headers.get("If-None-Match")
+            if if_none_match:
+                candidatos = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+                if "*" in candidatos or etag.removeprefix("W/") in candidatos:
+                    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            response = func(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response["ETag"] = etag
+                response["Cache-Control"] = "private, no-cache"
+            return response
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
+
+
+class ConditionalGetMixin:
+    """
+    ETag debil derivado de la version de ``etag_collection``, de la URL
+    completa (filtros y cursor incluidos) y de la ``clave`` extra de la vista.
+    La version se lee antes que los datos, de modo que un cambio concurrente
+    nunca queda oculto tras un 304.
+    """
+
+    etag_collection: str = ""
+
+    @cached_property
+    def versiones(self) -> VersionColeccionRepository:
+        return DjangoVersionColeccionRepository()
+
+    def collection_etag(self, request, clave: str = "") -> str:
+        version = self.versiones.obtener(self.etag_collection)
+        digest = hashlib.blake2s(f"{request.get_full_path()}#{clave}".encode(), digest_size=8).hexdigest()
+        return f'W/"{self.etag_collection}-{version}-{digest}"'
+
+
 class CatalogosServiceMixin:
     """Inyecta CatalogosService lazily."""
 
@@ -88,3 +221,35 @@ class AuditQueryServiceMixin:
     @cached_property
     def audit_queries(self) -> AuditLogQueryService:
         return _build_audit_query_service()
+
+
+class ReportesServiceMixin:
+    """Inyecta ReportesService lazily."""
+
+    @cached_property
+    def reportes(self) -> ReportesService:
+        return _build_reportes_service()
+
+
+class EntregasServiceMixin:
+    """Inyecta EntregasTurnoService lazily."""
+
+    @cached_property
+    def entregas(self) -> EntregasTurnoService:
+        return _build_entregas_service()
+
+
+class AnaliticaServiceMixin:
+    """Inyecta AnaliticaService lazily."""
+
+    @cached_property
+    def servicio_analitica(self) -> AnaliticaService:
+        return _build_analitica_service()
+
+
+class ExportacionParquetServiceMixin:
+    """Inyecta ExportacionParquetService lazily."""
+
+    @cached_property
+    def exportacion_parquet(self) -> ExportacionParquetService:
+        return _build_exportacion_parquet_service()
@@ -0,0 +1,173 @@
+"""
+Stream Server-Sent Events con las asignaciones y devoluciones confirmadas.
+
+Requiere un servidor ASGI (uvicorn, daphne): bajo WSGI cada conexion abierta
+retendria un hilo del worker indefinidamente, asi que ahi se responde 503 y el
+tablero vuelve al polling. El broker es por proceso (ver ``broker``).
+"""
+
+from __future__ import annotations
+
+import json
+import secrets
+from typing import AsyncIterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from drf_spectacular.utils import OpenApiResponse, extend_schema, inline_serializer
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+
+from ..serializers import PrestamoResponseSerializer
+from ...infrastructure.broker import EventBroker, MensajeBroker, prestamos_broker
+
+try:
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+except ImportError:  # pragma: no cover
+    JWTAuthentication = None
+
+HEARTBEAT_SECONDS = 15.0
+RETRY_MS = 3000
+TICKET_SECONDS = 60
+
+_SIN_ASGI = "El stream de prestamos requiere un servidor ASGI (uvicorn o daphne)."
+_ticket_signer = signing.TimestampSigner(salt="prestamos-stream-ticket")
+
+
+def _es_asgi(request: HttpRequest) -> bool:
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+@extend_schema(
+    request=None,
+    responses={
+        200: inline_serializer(
+            "TicketStream", {"ticket": serializers.CharField(), "expira_en": serializers.IntegerField()}
+        ),
+        503: OpenApiResponse(description="El servidor no es ASGI: usar polling"),
+    },
+    tags=["Prestamos"],
+    description=(
+        "Ticket firmado de un solo uso para abrir /prestamos/stream/?ticket=... . EventSource no envia "
+        "cabeceras y el JWT en la URL quedaria en los access logs; el ticket se consume al abrir el stream "
+        "y, si no se usa, caduca a los pocos segundos."
+    ),
+)
+@api_view(["POST"])
+def prestamos_stream_ticket(request):
+    """POST /api/prestamos/stream/ticket/ -> {"ticket", "expira_en"} para el usuario autenticado."""
+    if not _es_asgi(request):
+        return Response({"detail": _SIN_ASGI}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    nonce = secrets.token_urlsafe(16)
+    cache.set(f"stream-ticket:{nonce}", request.user.pk, TICKET_SECONDS)
+    return Response({"ticket": _ticket_signer.sign(f"{request.user.pk}:{nonce}"), "expira_en": TICKET_SECONDS})
+
+
+def _usuario_de_ticket(ticket: str):
+    """
+    Valida firma y edad, y consume el nonce: el ticket vale una sola vez, asi
+    que uno copiado de un log o del historial ya no abre otro stream. El nonce
+    vive en ``CACHES``; con varios workers la cache debe ser compartida.
+    """
+    try:
+        pk, _, nonce = _ticket_signer.unsign(ticket, max_age=TICKET_SECONDS).partition(":")
+    except signing.BadSignature:  # incluye SignatureExpired
+        return None
+    if not nonce or not cache.delete(f"stream-ticket:{nonce}"):
+        return None
+    return get_user_model()._default_manager.filter(pk=pk, is_active=True).first()
+
+
+async def _usuario_autenticado(request: HttpRequest):
+    """
+    EventSource no permite cabeceras propias: el navegador se autentica con un
+    ``?ticket=`` de corta vida (ver ``prestamos_stream_ticket``); otros
+    clientes pueden enviar ``Authorization: Bearer``. Sin ninguno, la sesion.
+    """
+    ticket = request.GET.get("ticket")
+    if ticket:
+        return await sync_to_async(_usuario_de_ticket)(ticket)
+    raw: Optional[str] = None
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        raw = header.removeprefix("Bearer ").strip()
+    if raw and JWTAuthentication is not None:
+        auth = JWTAuthentication()
+        try:
+            token = auth.get_validated_token(raw.encode())
+            user = await sync_to_async(auth.get_user)(token)
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return None
+        return user if user and user.is_active else None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def _parse_last_event_id(request: HttpRequest, broker: EventBroker) -> tuple[int, bool]:
+    """Devuelve (id desde el cual continuar, si el cliente debe resincronizar)."""
+    raw = request.headers.get("Last-Event-ID") or request.GET.get("lastEventId")
+    if not raw:
+        return broker.ultimo_id, False
+    instancia, _, numero = raw.partition(":")
+    if instancia != broker.instancia or not numero.isdigit() or int(numero) > broker.ultimo_id:
+        # Otro proceso (reinicio del worker): no se sabe que se perdio
+        return broker.ultimo_id, True
+    return int(numero), False
+
+
+def _formatear(broker: EventBroker, mensaje: MensajeBroker) -> str:
+    data = json.dumps(dict(PrestamoResponseSerializer(mensaje.payload.__dict__).data), separators=(",", ":"))
+    return f"id: {broker.instancia}:{mensaje.id}\nevent: {mensaje.tipo}\ndata: {data}\n\n"
+
+
+def _reset(broker: EventBroker) -> str:
+    return f"id: {broker.instancia}:{broker.ultimo_id}\nevent: reset\ndata: {{}}\n\n"
+
+
+async def _eventos(broker: EventBroker, ultimo_id: int, resincronizar: bool) -> AsyncIterator[str]:
+    yield f"retry: {RETRY_MS}\n\n"
+    if resincronizar:
+        ultimo_id = broker.ultimo_id
+        yield _reset(broker)
+    while True:
+        lectura = await broker.esperar(ultimo_id, timeout=HEARTBEAT_SECONDS)
+        if lectura.perdidos:
+            # El buffer ya descarto eventos: el cliente debe resincronizar via ?since=
+            ultimo_id = broker.ultimo_id
+            yield _reset(broker)
+            continue
+        if not lectura.mensajes:
+            yield ": ping\n\n"
+            continue
+        for mensaje in lectura.mensajes:
+            ultimo_id = mensaje.id
+            yield _formatear(broker, mensaje)
+
+
+async def prestamos_stream(request: HttpRequest):
+    """
+    GET /api/prestamos/stream/ -> text/event-stream con eventos ``asignado``,
+    ``devuelto`` y ``reset`` (resincronizar). Soporta reanudar con Last-Event-ID.
+    Bajo WSGI responde 503 en lugar de ocupar un hilo por cliente conectado.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    if not _es_asgi(request):
+        return JsonResponse({"detail": _SIN_ASGI}, status=503)
+    if await _usuario_autenticado(request) is None:
+        return JsonResponse({"detail": "Las credenciales de autenticación no se proveyeron."}, status=401)
+
+    ultimo_id, resincronizar = _parse_last_event_id(request, prestamos_broker)
+    response = StreamingHttpResponse(
+        _eventos(prestamos_broker, ultimo_id, resincronizar), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
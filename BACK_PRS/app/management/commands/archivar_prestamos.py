@@ -0,0 +1,47 @@
+"""Mueve los prestamos devueltos antiguos de la tabla caliente a prestamos_historico."""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.application.services import ARCHIVO_LOTE_DEFAULT, PrestamosService
+from app.domain.errors import BusinessRuleViolation
+from app.infrastructure.repositories import (
+    DjangoEmpleadoRepository,
+    DjangoPrestamoRepository,
+    DjangoRadioRepository,
+    DjangoSapUsuarioRepository,
+    DjangoUnitOfWork,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva en prestamos_historico los prestamos DEVUELTO con mas de --dias de antigüedad, "
+        "en lotes cortos para no bloquear las asignaciones. Pensado para ejecutarse a diario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=settings.PRESTAMOS_ARCHIVO_DIAS,
+            help="Antigüedad minima en dias desde el prestamo (por defecto PRESTAMOS_ARCHIVO_DIAS).",
+        )
+        parser.add_argument("--lote", type=int, default=ARCHIVO_LOTE_DEFAULT, help="Filas por transaccion.")
+
+    def handle(self, *args, **options):
+        service = PrestamosService(
+            DjangoEmpleadoRepository(),
+            DjangoRadioRepository(),
+            DjangoSapUsuarioRepository(),
+            DjangoPrestamoRepository(),
+            DjangoUnitOfWork(),
+        )
+        try:
+            movidos = service.archivar(ahora=timezone.now(), dias=options["dias"], lote=options["lote"])
+        except BusinessRuleViolation as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f"{movidos} préstamo(s) archivado(s)."))
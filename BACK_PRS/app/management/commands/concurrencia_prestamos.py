@@ -0,0 +1,64 @@
+"""Pico de radios prestadas simultaneamente (dimensionamiento de flota) sobre cualquier rango."""
+
+from __future__ import annotations
+
+import csv
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.application.reportes_service import ReportesService
+from app.domain.errors import BusinessRuleViolation
+from app.infrastructure.reportes import DjangoReportesRepository, inicio_dia_local
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula con un barrido de linea el pico de prestamos simultaneos del rango y los picos por dia y "
+        "turno. Recorre los prestamos en streaming, asi que admite varios años de historico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=date.fromisoformat, required=True, help="Primer dia (YYYY-MM-DD).")
+        parser.add_argument("--hasta", type=date.fromisoformat, help="Ultimo dia incluido (por defecto hoy).")
+        parser.add_argument(
+            "--paso", type=int, default=1440, help="Resolucion de la serie en minutos (por defecto un dia)."
+        )
+        parser.add_argument(
+            "--csv",
+            choices=["turnos", "dias", "serie"],
+            help="Escribe en stdout la tabla indicada como CSV en lugar del resumen.",
+        )
+
+    def handle(self, *args, **options):
+        hasta = options["hasta"] or timezone.localdate()
+        service = ReportesService(DjangoReportesRepository())
+        try:
+            reporte = service.concurrencia(
+                desde=inicio_dia_local(options["desde"]),
+                hasta=inicio_dia_local(hasta + timedelta(days=1)),
+                ahora=timezone.localtime(),
+                paso_minutos=options["paso"],
+            )
+        except BusinessRuleViolation as exc:
+            raise CommandError(str(exc)) from exc
+
+        if options["csv"] == "serie":
+            writer = csv.writer(self.stdout)
+            writer.writerow(["inicio", "maximo"])
+            writer.writerows((p.inicio.isoformat(), p.maximo) for p in reporte.serie)
+            return
+        if options["csv"]:
+            writer = csv.writer(self.stdout)
+            writer.writerow(["dia", "turno", "pico", "instante"])
+            for p in getattr(reporte, options["csv"]):
+                turno = p.turno.value if p.turno else ""
+                instante = p.instante.isoformat() if p.instante else ""
+                writer.writerow([p.dia.isoformat(), turno, p.pico, instante])
+            return
+
+        instante = reporte.instante_pico.isoformat() if reporte.instante_pico else "-"
+        self.stdout.write(f"Pico: {reporte.pico} radio(s) en uso simultaneo ({instante}).")
+        for p in sorted((p for p in reporte.turnos if p.pico), key=lambda p: p.pico, reverse=True)[:10]:
+            self.stdout.write(f"  {p.dia} {p.turno.value}: {p.pico} ({p.instante.isoformat() if p.instante else '-'})")
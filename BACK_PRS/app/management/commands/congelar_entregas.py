@@ -0,0 +1,30 @@
+"""Congela las fotos de cambio de turno de los turnos ya cerrados."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.application.entregas import CONGELAR_DIAS_DEFAULT, EntregasTurnoService
+from app.domain.errors import BusinessRuleViolation
+from app.infrastructure.repositories import DjangoEntregasTurnoRepository, DjangoPrestamoRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Guarda la foto de entrega (pendientes, prestados y devueltos) de cada turno cerrado que aun no la tenga. "
+        "Pensado para ejecutarse periodicamente (cron / tarea programada), p. ej. a las 6:05, 14:05 y 22:05."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias", type=int, default=CONGELAR_DIAS_DEFAULT, help="Cuantos dias hacia atras revisar."
+        )
+
+    def handle(self, *args, **options):
+        service = EntregasTurnoService(DjangoPrestamoRepository(), DjangoEntregasTurnoRepository())
+        try:
+            congeladas = service.congelar_cerradas(ahora=timezone.localtime(), dias=options["dias"])
+        except BusinessRuleViolation as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f"{congeladas} entrega(s) de turno congelada(s)."))
@@ -0,0 +1,33 @@
+"""Materializa los prestamos que siguen abiertos despues de terminar su turno."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.application.services import PrestamosService
+from app.infrastructure.repositories import (
+    DjangoEmpleadoRepository,
+    DjangoPrestamoRepository,
+    DjangoRadioRepository,
+    DjangoSapUsuarioRepository,
+    DjangoUnitOfWork,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Detecta prestamos ASIGNADO cuyo turno ya termino y actualiza la tabla prestamos_vencidos. "
+        "Pensado para ejecutarse periodicamente (cron / tarea programada), p. ej. cada 5 minutos."
+    )
+
+    def handle(self, *args, **options):
+        service = PrestamosService(
+            DjangoEmpleadoRepository(),
+            DjangoRadioRepository(),
+            DjangoSapUsuarioRepository(),
+            DjangoPrestamoRepository(),
+            DjangoUnitOfWork(),
+        )
+        vencidos = service.materializar_vencidos(ahora=timezone.localtime())
+        self.stdout.write(self.style.SUCCESS(f"{len(vencidos)} préstamo(s) vencido(s) materializado(s)."))
@@ -0,0 +1,36 @@
+"""Exporta de forma incremental prestamos y audit_log al dataset Parquet de BI."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.application.exportacion_parquet import ExportacionParquetService
+from app.domain.errors import BusinessRuleViolation
+from app.domain.reportes import TABLAS_PARQUET
+from app.infrastructure.parquet import PARQUET_DISPONIBLE, ParquetExportacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Reescribe en PARQUET_EXPORT_DIR (o --destino) las particiones mensuales de prestamos y audit_log "
+        "que cambiaron desde la ultima ejecucion (watermarks updated_at / at). Pensado para cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--destino", help="Directorio del dataset (por defecto PARQUET_EXPORT_DIR).")
+        parser.add_argument(
+            "--tabla", action="append", choices=TABLAS_PARQUET, help="Tabla a exportar (repetible; por defecto todas)."
+        )
+        parser.add_argument("--completo", action="store_true", help="Ignora los watermarks y reescribe todos los meses.")
+
+    def handle(self, *args, **options):
+        if not PARQUET_DISPONIBLE:
+            raise CommandError("La exportacion Parquet requiere pyarrow.")
+        service = ExportacionParquetService(ParquetExportacion(options["destino"]))
+        try:
+            resultados = service.exportar(tablas=options["tabla"] or TABLAS_PARQUET, completo=options["completo"])
+        except BusinessRuleViolation as exc:
+            raise CommandError(str(exc)) from exc
+        for r in resultados:
+            meses = ", ".join(f"{m:%Y-%m}" for m in r.meses) or "sin cambios"
+            self.stdout.write(self.style.SUCCESS(f"{r.tabla}: {r.filas} fila(s) en {len(r.meses)} particion(es) ({meses})."))
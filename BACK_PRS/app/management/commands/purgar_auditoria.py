@@ -0,0 +1,55 @@
+"""Aplica la politica de retencion del audit_log (compactar y purgar) y recupera espacio."""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.application.audit_retencion import RETENCION_LOTE_DEFAULT, AuditRetencionService, reglas_desde_config
+from app.domain.errors import BusinessRuleViolation
+from app.infrastructure.mantenimiento import espacio_sqlite, recuperar_espacio_sqlite
+from app.infrastructure.repositories import DjangoAuditLogRetencionRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Compacta y purga las entradas de audit_log segun AUDIT_RETENCION, en lotes cortos. "
+        "En SQLite ejecuta incremental_vacuum si esta habilitado, o VACUUM con --vacuum."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=RETENCION_LOTE_DEFAULT, help="Filas por transaccion.")
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="Ejecuta VACUUM completo en SQLite (reescribe el archivo; bloquea escrituras mientras dura).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            service = AuditRetencionService(
+                DjangoAuditLogRetencionRepository(), reglas_desde_config(settings.AUDIT_RETENCION)
+            )
+            resultado = service.aplicar(ahora=timezone.now(), lote=options["lote"])
+        except BusinessRuleViolation as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(
+            f"{resultado.purgados} entrada(s) purgada(s), {resultado.compactados} compactada(s), "
+            f"{resultado.bytes_liberados} bytes de JSON liberados."
+        )
+
+        antes = espacio_sqlite()
+        if antes is not None:
+            if recuperar_espacio_sqlite(completo=options["vacuum"]):
+                despues = espacio_sqlite()
+                self.stdout.write(
+                    f"Archivo SQLite: {antes.total} -> {despues.total} bytes "
+                    f"({antes.total - despues.total} recuperados)."
+                )
+            elif antes.libres:
+                self.stdout.write(
+                    f"{antes.libres} bytes en páginas libres reutilizables; use --vacuum para devolverlos al disco."
+                )
+        self.stdout.write(self.style.SUCCESS("Retención de auditoría aplicada."))
@@ -0,0 +1,33 @@
+"""Recalcula la tabla de resumenes diarios de prestamos a partir de los prestamos."""
+
+from __future__ import annotations
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.application.reportes_service import ReportesService
+from app.domain.errors import BusinessRuleViolation
+from app.infrastructure.reportes import DjangoReportesRepository, DjangoResumenesRepository
+from app.infrastructure.repositories import DjangoVersionColeccionRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye prestamos_resumen_diario (por turno, radio y empleado) para el rango de dias "
+        "locales indicado, o completo si no se indica. La migracion 0017 hace el backfill inicial; usar tras editar prestamos desde el admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=date.fromisoformat, help="Primer dia (YYYY-MM-DD).")
+        parser.add_argument("--hasta", type=date.fromisoformat, help="Ultimo dia incluido (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        service = ReportesService(
+            DjangoReportesRepository(), DjangoResumenesRepository(), versiones=DjangoVersionColeccionRepository()
+        )
+        try:
+            filas = service.reconstruir_resumenes(desde=options["desde"], hasta=options["hasta"])
+        except BusinessRuleViolation as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f"{filas} fila(s) de resumen reconstruida(s)."))
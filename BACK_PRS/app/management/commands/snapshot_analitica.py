@@ -0,0 +1,37 @@
+"""Refresca el snapshot SQLite que lee el motor analitico (DuckDB)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app.domain.errors import BusinessRuleViolation
+from app.infrastructure.mantenimiento import snapshot_sqlite
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base en linea al archivo ANALITICA_SQLITE (o --destino) para que las consultas de "
+        "/api/reportes/analitica/ no lean el archivo transaccional. Pensado para cron (p. ej. cada hora)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--destino", help="Ruta del snapshot (por defecto ANALITICA_SQLITE).")
+
+    def handle(self, *args, **options):
+        destino = options["destino"] or settings.ANALITICA_SQLITE
+        if not destino:
+            raise CommandError("Configure ANALITICA_SQLITE o indique --destino.")
+        origen = connections["default"].settings_dict["NAME"]
+        if Path(destino).resolve() == Path(str(origen)).resolve():
+            raise CommandError("El destino no puede ser la base en linea.")
+        try:
+            tamano = snapshot_sqlite(destino)
+        except BusinessRuleViolation as exc:
+            raise CommandError(str(exc)) from exc
+        if tamano is None:
+            raise CommandError("El snapshot solo aplica a bases SQLite.")
+        self.stdout.write(self.style.SUCCESS(f"Snapshot escrito en {destino} ({tamano} bytes)."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_remove_prestamomodel_prestamos_usuario_registra_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prestamomodel',
+            index=models.Index(fields=['fecha_hora_prestamo', 'id'], name='prestamos_fecha_h_65bb85_idx'),
+        ),
+    ]
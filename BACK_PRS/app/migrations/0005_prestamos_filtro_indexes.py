@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_prestamos_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prestamomodel',
+            index=models.Index(fields=['estado', 'fecha_hora_prestamo'], name='prestamos_estado_3c8f59_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamomodel',
+            index=models.Index(fields=['turno', 'fecha_hora_prestamo'], name='prestamos_turno_cd4f29_idx'),
+        ),
+    ]
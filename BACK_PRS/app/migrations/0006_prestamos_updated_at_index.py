@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_prestamos_filtro_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prestamomodel',
+            index=models.Index(fields=['updated_at', 'id'], name='prestamos_updated_457769_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_prestamos_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColeccionVersionModel',
+            fields=[
+                ('nombre', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'colecciones_version',
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+# Columnas que no pueden repetirse entre prestamos abiertos (ver restricciones)
+CAMPOS_ABIERTOS = ("cedula", "codigo_radio", "usuario_sap")
+
+
+def verificar_abiertos_unicos(apps, schema_editor):
+    """
+    Las restricciones siguientes fallarian con un IntegrityError opaco si ya
+    hay dos prestamos ASIGNADO del mismo empleado, radio o usuario SAP (las
+    carreras que vienen a impedir). No se decide cual cerrar: se listan los
+    duplicados para resolverlos a mano y se aborta la migracion.
+    """
+    abiertos = apps.get_model("app", "PrestamoModel").objects.filter(estado="ASIGNADO").order_by()
+    conflictos = []
+    for campo in CAMPOS_ABIERTOS:
+        repetidos = abiertos.values(campo).annotate(n=Count("id")).filter(n__gt=1).values_list(campo, flat=True)
+        for valor in repetidos:
+            ids = list(abiertos.filter(**{campo: valor}).order_by("fecha_hora_prestamo", "id").values_list("id", flat=True))
+            conflictos.append(f"{campo}={valor}: prestamos {ids}")
+    if conflictos:
+        raise RuntimeError(
+            "No se puede exigir un solo prestamo ASIGNADO por empleado, radio y usuario SAP: hay duplicados. "
+            "Devuelva o corrija todos menos uno de cada grupo y vuelva a ejecutar migrate.\n  "
+            + "\n  ".join(conflictos)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_coleccion_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='prestamomodel',
+            name='prestamos_cedula_4ba31e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='prestamomodel',
+            name='prestamos_codigo__091710_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='prestamomodel',
+            name='prestamos_usuario_e36916_idx',
+        ),
+        migrations.RunPython(verificar_abiertos_unicos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='prestamomodel',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado', 'ASIGNADO')), fields=('cedula',), name='prestamo_abierto_cedula_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='prestamomodel',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado', 'ASIGNADO')), fields=('codigo_radio',), name='prestamo_abierto_radio_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='prestamomodel',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado', 'ASIGNADO')), fields=('usuario_sap',), name='prestamo_abierto_sap_uniq'),
+        ),
+    ]
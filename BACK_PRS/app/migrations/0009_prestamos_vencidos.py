@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_prestamos_abiertos_parciales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrestamoVencidoModel',
+            fields=[
+                ('prestamo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vencido', serialize=False, to='app.prestamomodel')),
+                ('fin_turno', models.DateTimeField()),
+                ('detectado_en', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'prestamos_vencidos',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_prestamos_vencidos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrestamoHistoricoModel',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('cedula', models.CharField(db_index=True, max_length=15)),
+                ('empleado_nombre', models.CharField(max_length=150)),
+                ('usuario_sap', models.CharField(db_index=True, max_length=50)),
+                ('codigo_radio', models.CharField(db_index=True, max_length=25)),
+                ('fecha_hora_prestamo', models.DateTimeField()),
+                ('turno', models.CharField(max_length=40)),
+                ('estado', models.CharField(max_length=12)),
+                ('fecha_hora_devolucion', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archivado_en', models.DateTimeField()),
+                ('usuario_registra', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='prestamos_historicos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'prestamos_historico',
+                'indexes': [models.Index(fields=['fecha_hora_prestamo', 'id'], name='prestamos_h_fecha_h_1b5fbd_idx'), models.Index(fields=['turno', 'fecha_hora_prestamo'], name='prestamos_h_turno_ac848d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_prestamos_historico'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditentry',
+            name='audit_log_aggrega_797e08_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditentry',
+            name='audit_log_at_1a4cfc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditentry',
+            name='audit_log_actor_u_ae2850_idx',
+        ),
+        migrations.AddField(
+            model_name='auditentry',
+            name='compactado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='auditentry',
+            name='action',
+            field=models.CharField(max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='auditentry',
+            name='aggregate',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='auditentry',
+            index=models.Index(fields=['aggregate', 'action', 'at'], name='audit_log_aggrega_34b999_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_audit_log_retencion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('dimension', models.CharField(max_length=10)),
+                ('clave', models.CharField(max_length=40)),
+                ('asignados', models.IntegerField(default=0)),
+                ('devueltos', models.IntegerField(default=0)),
+                ('segundos_uso', models.FloatField(default=0.0)),
+            ],
+            options={
+                'db_table': 'prestamos_resumen_diario',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'dia', 'clave'), name='resumen_diario_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_resumen_diario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prestamohistoricomodel',
+            index=models.Index(fields=['fecha_hora_devolucion'], name='prestamos_h_fecha_h_ae87a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamomodel',
+            index=models.Index(fields=['fecha_hora_devolucion'], name='prestamos_fecha_h_b8b205_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_indice_devolucion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prestamohistoricomodel',
+            name='codigo_radio',
+            field=models.CharField(max_length=25),
+        ),
+        migrations.AlterField(
+            model_name='prestamomodel',
+            name='codigo_radio',
+            field=models.CharField(max_length=25),
+        ),
+        migrations.AddIndex(
+            model_name='prestamohistoricomodel',
+            index=models.Index(fields=['codigo_radio', 'fecha_hora_prestamo'], name='prestamos_h_codigo__a042d8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamomodel',
+            index=models.Index(fields=['codigo_radio', 'fecha_hora_prestamo'], name='prestamos_codigo__f47408_idx'),
+        ),
+    ]
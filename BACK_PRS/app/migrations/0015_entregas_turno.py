@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_indice_radio_fecha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntregaTurnoModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('turno', models.CharField(max_length=40)),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('congelada_en', models.DateTimeField()),
+                ('pendientes', models.JSONField(default=list)),
+                ('prestados', models.JSONField(default=list)),
+                ('devueltos', models.JSONField(default=list)),
+            ],
+            options={
+                'db_table': 'entregas_turno',
+                'constraints': [models.UniqueConstraint(fields=('dia', 'turno'), name='entrega_turno_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_entregas_turno'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prestamohistoricomodel',
+            name='cedula',
+            field=models.CharField(max_length=15),
+        ),
+        migrations.AlterField(
+            model_name='prestamomodel',
+            name='cedula',
+            field=models.CharField(max_length=15),
+        ),
+        migrations.AddIndex(
+            model_name='prestamohistoricomodel',
+            index=models.Index(fields=['cedula', 'fecha_hora_prestamo'], name='prestamos_h_cedula_38ad7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamomodel',
+            index=models.Index(fields=['cedula', 'fecha_hora_prestamo'], name='prestamos_cedula_7c13b9_idx'),
+        ),
+    ]
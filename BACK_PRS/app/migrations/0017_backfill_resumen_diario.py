@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, DateField, FloatField, Func, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# Columna del prestamo que da la clave de cada dimension (ver infrastructure/reportes.py)
+DIMENSIONES = {"turno": "turno", "radio": "codigo_radio", "empleado": "cedula"}
+
+
+class EpochSegundos(Func):
+    """
+    Copia de app.infrastructure.expresiones.EpochSegundos congelada aqui: la
+    migracion no debe cambiar si esa expresion cambia o se mueve.
+    """
+
+    template = "EXTRACT(EPOCH FROM %(expressions)s)"
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)", **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="UNIX_TIMESTAMP(%(expressions)s)", **extra_context)
+
+
+def backfill_resumen_diario(apps, schema_editor):
+    """
+    0012 creo la tabla vacia: sin este backfill los reportes leian ceros para
+    los dias previos y las devoluciones de prestamos asignados antes del
+    despliegue dejaban ASIGNADO en negativo. Reemplaza todas las filas.
+    """
+    Resumen = apps.get_model("app", "ResumenDiarioModel")
+    devuelto = Q(estado="DEVUELTO")
+    tz = timezone.get_current_timezone()
+    totales = defaultdict(lambda: [0, 0, 0.0])
+    for nombre in ("PrestamoModel", "PrestamoHistoricoModel"):
+        qs = apps.get_model("app", nombre).objects.annotate(
+            dia=TruncDate("fecha_hora_prestamo", output_field=DateField(), tzinfo=tz)
+        )
+        for dimension, columna in DIMENSIONES.items():
+            rows = (
+                qs.values("dia", columna)
+                .annotate(
+                    asignados=Count("id"),
+                    devueltos=Count("id", filter=devuelto),
+                    segundos=Sum(
+                        EpochSegundos("fecha_hora_devolucion") - EpochSegundos("fecha_hora_prestamo"),
+                        filter=devuelto,
+                    ),
+                )
+                .order_by()
+            )
+            for row in rows.iterator():
+                acumulado = totales[(row["dia"], dimension, row[columna])]
+                acumulado[0] += row["asignados"]
+                acumulado[1] += row["devueltos"]
+                acumulado[2] += row["segundos"] or 0.0
+
+    Resumen.objects.all().delete()
+    Resumen.objects.bulk_create(
+        [
+            Resumen(dia=dia, dimension=dimension, clave=clave, asignados=a, devueltos=d, segundos_uso=s)
+            for (dia, dimension, clave), (a, d, s) in totales.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_indice_cedula_fecha'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_resumen_diario,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -53,6 +53,23 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Las transacciones de escritura toman el lock al iniciar (BEGIN IMMEDIATE) y esperan
+        # hasta `timeout` segundos en vez de fallar con "database is locked" bajo concurrencia.
+        # Serializar a los escritores tambien hace que updated_at crezca en orden de commit, de lo
+        # que depende la sincronizacion delta (?since=, ver DjangoPrestamoRepository.listar_cambios)
+        "OPTIONS": {"timeout": 20, "transaction_mode": "IMMEDIATE"},
+        # Base de pruebas en archivo: la de memoria compartida no respeta el timeout entre hilos
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+    }
+}
+
+# Cache de reportes de periodos cerrados (p. ej. el mapa de calor), con la version de prestamos en
+# la clave: cualquier escritura deja atras lo guardado. En memoria por proceso; con
+# varios workers conviene un backend compartido (Redis, Memcached o DatabaseCache)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
     }
 }
 
@@ -97,6 +114,26 @@ else:
 
 CSRF_TRUSTED_ORIGINS = CORS_ALLOWED_ORIGINS
 
+# Motor analitico opcional (duckdb): snapshot SQLite que adjunta para /api/reportes/analitica/*,
+# refrescado periodicamente por el comando snapshot_analitica. Obligatorio: sin el, el endpoint
+# responde 503 en lugar de barrer el archivo que atiende al mostrador.
+ANALITICA_SQLITE = os.environ.get("ANALITICA_SQLITE") or None
+
+# Dataset Parquet para BI (comando exportar_parquet y POST /api/prestamos/exportar-parquet/,
+# requiere pyarrow): una particion por mes y tabla, mas el watermark de cada tabla
+PARQUET_EXPORT_DIR = os.environ.get("PARQUET_EXPORT_DIR") or str(BASE_DIR / "exports" / "parquet")
+
+# Antigüedad (dias desde el prestamo) a partir de la cual los DEVUELTO pasan a prestamos_historico
+PRESTAMOS_ARCHIVO_DIAS = int(os.environ.get("PRESTAMOS_ARCHIVO_DIAS", "90"))
+
+# Retencion del audit_log (comando purgar_auditoria). Por entrada gana la regla mas especifica
+# (aggregate/action; omitido = cualquiera). compactar_dias deja solo los campos que cambiaron;
+# purgar_dias borra la entrada; None = nunca.
+AUDIT_RETENCION = [
+    {"compactar_dias": 90, "purgar_dias": 730},
+    {"action": "DELETED", "compactar_dias": None, "purgar_dias": 1825},
+]
+
 from datetime import timedelta
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=8),
@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.application.analitica import ANALITICA_LIMITE_DEFAULT, AnaliticaService
+from app.domain.errors import BusinessRuleViolation, EntityNotFound
+from app.domain.reportes import ResultadoAnalitico
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeAnaliticaRepo:
+    def __init__(self):
+        self.llamadas = []
+
+    def consultar(self, consulta, *, desde, hasta, limite):
+        self.llamadas.append((consulta, desde, hasta, limite))
+        return ResultadoAnalitico(consulta=consulta, columnas=["codigo_radio"], filas=[["RF-1"]])
+
+
+class AnaliticaServiceTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.repo = FakeAnaliticaRepo()
+        self.service = AnaliticaService(self.repo)
+
+    def test_delega_consultas_conocidas_con_limite_por_defecto(self) -> None:
+        resultado = self.service.consultar("radios", desde=BASE, hasta=BASE + timedelta(days=400))
+
+        self.assertEqual([["RF-1"]], resultado.filas)
+        self.assertEqual([("radios", BASE, BASE + timedelta(days=400), ANALITICA_LIMITE_DEFAULT)], self.repo.llamadas)
+
+    def test_rechaza_consulta_desconocida_rango_vacio_y_limite_fuera_de_rango(self) -> None:
+        with self.assertRaises(EntityNotFound):
+            self.service.consultar("prestamos; DROP", desde=BASE, hasta=BASE + timedelta(days=1))
+        with self.assertRaises(BusinessRuleViolation):
+            self.service.consultar("radios", desde=BASE, hasta=BASE)
+        with self.assertRaises(BusinessRuleViolation):
+            self.service.consultar("auditoria", desde=BASE, hasta=BASE + timedelta(days=1), limite=0)
+        self.assertEqual([], self.repo.llamadas)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -44,6 +44,17 @@ class StubAudit:
         self.events.append(event)
 
 
+class StubVersiones:
+    def __init__(self):
+        self.incrementos: list[str] = []
+
+    def obtener(self, coleccion: str) -> int:
+        return self.incrementos.count(coleccion)
+
+    def incrementar(self, coleccion: str) -> None:
+        self.incrementos.append(coleccion)
+
+
 class DummyUoW:
     def __enter__(self):
         return self
@@ -57,7 +68,7 @@ class CatalogosServiceTests(unittest.TestCase):
         self.audit = StubAudit()
         self.clock_value = datetime(2024, 1, 1, 12, 0)
 
-    def _service(self, *, empleados=None, radios=None, sap=None, uow=None):
+    def _service(self, *, empleados=None, radios=None, sap=None, uow=None, versiones=None):
         return CatalogosService(
             empleados=empleados or StubRepo(),
             radios=radios or StubRepo(),
@@ -65,6 +76,7 @@ class CatalogosServiceTests(unittest.TestCase):
             audit=self.audit,
             uow=uow,
             clock=lambda: self.clock_value,
+            versiones=versiones,
         )
 
     def test_crear_empleado_emite_evento_con_clock(self) -> None:
@@ -94,6 +106,23 @@ class CatalogosServiceTests(unittest.TestCase):
         with self.assertRaises(EntityNotFound):
             svc.eliminar_sap_usuario(username="sap", actor_user_id=1)
 
+    def test_escrituras_incrementan_version_de_colecciones(self) -> None:
+        versiones = StubVersiones()
+        empleado = Empleado(id=1, cedula="1", nombre="X", activo=True)
+        svc = self._service(empleados=StubRepo(lookup=empleado), versiones=versiones)
+
+        svc.eliminar_empleado(cedula="1", actor_user_id=1)
+
+        # Los usuarios SAP exponen la cedula vinculada, que queda en NULL al borrar
+        self.assertEqual(["empleados", "sap_usuarios"], versiones.incrementos)
+
+    def test_error_de_negocio_no_incrementa_version(self) -> None:
+        versiones = StubVersiones()
+        svc = self._service(sap=StubRepo(lookup=None), versiones=versiones)
+        with self.assertRaises(EntityNotFound):
+            svc.eliminar_sap_usuario(username="sap", actor_user_id=1)
+        self.assertEqual([], versiones.incrementos)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.application.entregas import EntregasTurnoService
+from app.domain.entities import Prestamo
+from app.domain.errors import BusinessRuleViolation
+from app.domain.value_objects import EstadoPrestamo, Turno
+
+BOGOTA = ZoneInfo("America/Bogota")
+
+
+def _prestamo(id_: int, inicio: datetime, fin: datetime | None = None) -> Prestamo:
+    return Prestamo(
+        id=id_,
+        cedula=f"10{id_}",
+        empleado_nombre=f"Empleado {id_}",
+        usuario_sap=f"sap-{id_}",
+        codigo_radio=f"RF-{id_}",
+        fecha_hora_prestamo=inicio,
+        turno=Turno.T1,
+        estado=EstadoPrestamo.DEVUELTO if fin else EstadoPrestamo.ASIGNADO,
+        usuario_registra_id=1,
+        fecha_hora_devolucion=fin,
+    )
+
+
+class FakePrestamoRepo:
+    """Responde las consultas de la entrega filtrando una lista en memoria."""
+
+    def __init__(self, prestamos):
+        self.prestamos = list(prestamos)
+        self.consultas = 0
+
+    def listar_abiertos_en(self, instante):
+        self.consultas += 1
+        return [
+            p
+            for p in self.prestamos
+            if p.fecha_hora_prestamo <= instante and (p.fecha_hora_devolucion is None or p.fecha_hora_devolucion > instante)
+        ]
+
+    def iterar(self, *, filtro=None, chunk_size=2000):
+        rango = [p for p in self.prestamos if filtro.desde <= p.fecha_hora_prestamo < filtro.hasta]
+        return iter(sorted(rango, key=lambda p: p.fecha_hora_prestamo, reverse=True))
+
+    def listar_devueltos_entre(self, desde, hasta):
+        return [p for p in self.prestamos if p.fecha_hora_devolucion and desde <= p.fecha_hora_devolucion < hasta]
+
+
+class FakeEntregasRepo:
+    def __init__(self):
+        self.guardadas = {}
+
+    def obtener(self, *, dia, turno):
+        return self.guardadas.get((dia, turno))
+
+    def guardar(self, entrega):
+        return self.guardadas.setdefault((entrega.dia, entrega.turno), entrega)
+
+
+class EntregasTurnoServiceTests(unittest.TestCase):
+    def setUp(self) -> None:
+        h = lambda hora, minuto=0: datetime(2024, 3, 1, hora, minuto, tzinfo=BOGOTA)
+        self.prestamos = FakePrestamoRepo(
+            [
+                _prestamo(1, h(5), h(7)),  # del turno anterior, devuelto en este
+                _prestamo(2, h(8), h(9, 30)),  # prestado y devuelto en el turno
+                _prestamo(3, h(10), h(15)),  # sigue abierto al cambio de turno (se devuelve despues)
+                _prestamo(4, h(13)),  # abierto
+            ]
+        )
+        self.entregas = FakeEntregasRepo()
+        self.service = EntregasTurnoService(self.prestamos, self.entregas)
+
+    def test_turno_cerrado_se_congela_como_estaba_al_cierre(self) -> None:
+        ahora = datetime(2024, 3, 1, 16, 0, tzinfo=BOGOTA)
+
+        entrega = self.service.entrega(dia=date(2024, 3, 1), turno=Turno.T1, ahora=ahora)
+
+        self.assertEqual(datetime(2024, 3, 1, 14, 0, tzinfo=BOGOTA), entrega.corte)
+        self.assertEqual([3, 4], [p.id for p in entrega.pendientes])
+        self.assertEqual([2, 3, 4], [p.id for p in entrega.prestados])
+        self.assertEqual([1, 2], [p.id for p in entrega.devueltos])
+        # La devolucion de las 15:00 aun no habia ocurrido al cierre
+        self.assertIsNone(entrega.pendientes[0].fecha_hora_devolucion)
+        self.assertEqual(EstadoPrestamo.ASIGNADO, entrega.prestados[1].estado)
+        self.assertEqual([120.0, 90.0], [entrega.minutos_en_uso(p) for p in entrega.devueltos])
+        self.assertEqual(240.0, entrega.minutos_en_uso(entrega.pendientes[0]))
+        self.assertEqual(ahora, entrega.congelada_en)
+
+        # Segunda lectura: sale de la foto sin consultar prestamos
+        self.service.entrega(dia=date(2024, 3, 1), turno=Turno.T1, ahora=ahora + timedelta(days=1))
+        self.assertEqual(1, self.prestamos.consultas)
+
+    def test_turno_en_curso_se_calcula_al_momento_sin_congelar(self) -> None:
+        ahora = datetime(2024, 3, 1, 11, 0, tzinfo=BOGOTA)
+
+        entrega = self.service.entrega(dia=date(2024, 3, 1), turno=Turno.T1, ahora=ahora)
+
+        self.assertEqual(ahora, entrega.corte)
+        self.assertIsNone(entrega.congelada_en)
+        self.assertEqual([3], [p.id for p in entrega.pendientes])
+        self.assertEqual({}, self.entregas.guardadas)
+        with self.assertRaises(BusinessRuleViolation):
+            self.service.entrega(dia=date(2024, 3, 1), turno=Turno.T2, ahora=ahora)
+
+    def test_congelar_cerradas_y_ultima_entrega(self) -> None:
+        ahora = datetime(2024, 3, 2, 7, 0, tzinfo=BOGOTA)  # en curso: Turno 1 del 2 de marzo
+
+        self.assertEqual(3, self.service.congelar_cerradas(ahora=ahora, dias=1))
+        self.assertEqual(
+            {(date(2024, 3, 1), Turno.T1), (date(2024, 3, 1), Turno.T2), (date(2024, 3, 1), Turno.T3)},
+            set(self.entregas.guardadas),
+        )
+        self.assertEqual(0, self.service.congelar_cerradas(ahora=ahora, dias=1))
+        ultima = self.service.ultima_entrega(ahora=ahora)
+        self.assertEqual((date(2024, 3, 1), Turno.T3), (ultima.dia, ultima.turno))
+        self.assertEqual([4], [p.id for p in ultima.pendientes])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import contextlib
+import unittest
+from datetime import date, datetime, timezone
+
+from app.application.exportacion_parquet import ExportacionParquetService
+from app.domain.errors import BusinessRuleViolation
+
+T1 = datetime(2024, 3, 5, tzinfo=timezone.utc)
+T2 = datetime(2024, 4, 2, tzinfo=timezone.utc)
+
+
+class FakeDestino:
+    """Cambios por tabla como (instante de la marca, mes); escribe contando filas por mes."""
+
+    def __init__(self, cambios):
+        self.cambios = cambios
+        self.marcas = {}
+        self.escritos = []
+
+    def bloqueo(self):
+        return contextlib.nullcontext()
+
+    def leer_marca(self, tabla):
+        return self.marcas.get(tabla)
+
+    def meses_modificados(self, tabla, *, desde):
+        nuevos = [(t, mes) for t, mes in self.cambios.get(tabla, []) if desde is None or t > desde]
+        if not nuevos:
+            return [], None
+        return sorted({mes for _, mes in nuevos}), max(t for t, _ in nuevos)
+
+    def escribir_mes(self, tabla, mes):
+        self.escritos.append((tabla, mes))
+        return 10
+
+    def guardar_marca(self, tabla, marca):
+        self.marcas[tabla] = marca
+
+
+class ExportacionParquetServiceTests(unittest.TestCase):
+    def test_solo_reescribe_los_meses_con_cambios_desde_el_watermark(self) -> None:
+        destino = FakeDestino({"prestamos": [(T1, date(2024, 3, 1)), (T1, date(2024, 2, 1))], "audit_log": []})
+        service = ExportacionParquetService(destino)
+
+        prestamos, audit = service.exportar()
+
+        self.assertEqual(([date(2024, 2, 1), date(2024, 3, 1)], 20, T1), (prestamos.meses, prestamos.filas, prestamos.marca))
+        self.assertEqual(([], 0, None), (audit.meses, audit.filas, audit.marca))
+
+        # Un cambio nuevo en abril: solo esa particion; la marca avanza
+        destino.cambios["prestamos"].append((T2, date(2024, 4, 1)))
+        destino.escritos.clear()
+        (prestamos,) = service.exportar(tablas=["prestamos"])
+        self.assertEqual([("prestamos", date(2024, 4, 1))], destino.escritos)
+        self.assertEqual(T2, destino.marcas["prestamos"])
+
+        # Sin cambios no escribe nada pero conserva la marca; completo reescribe todo
+        destino.escritos.clear()
+        self.assertEqual(T2, service.exportar(tablas=["prestamos"])[0].marca)
+        self.assertEqual([], destino.escritos)
+        service.exportar(tablas=["prestamos"], completo=True)
+        self.assertEqual(3, len(destino.escritos))
+
+    def test_rechaza_tablas_desconocidas(self) -> None:
+        with self.assertRaises(BusinessRuleViolation):
+            ExportacionParquetService(FakeDestino({})).exportar(tablas=["empleados"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 from datetime import datetime, timezone
 
 from app.application.services import PrestamosService
-from app.domain.entities import Empleado, Prestamo, RadioFrecuencia, SapUsuario
+from app.domain.entities import ContextoAsignacion, Empleado, Prestamo, RadioFrecuencia, SapUsuario
 from app.domain.errors import BusinessRuleViolation, EntityNotFound, InactiveEntity
 from app.domain.value_objects import EstadoPrestamo, Turno
 
@@ -43,6 +43,18 @@ class FakePrestamoRepo:
         self.marcar_devolucion_calls: list[tuple[int, datetime]] = []
         self.abiertos: dict[str, Prestamo] = {}
         self._storage: dict[int, Prestamo] = {}
+        self.catalogos = (FakeEmpleadoRepo(None), FakeRadioRepo(None), FakeSapRepo(None))
+
+    def resolver_asignacion(self, *, cedula: str, codigo_radio: str, usuario_sap: str):
+        empleados, radios, sap = self.catalogos
+        return ContextoAsignacion(
+            empleado=empleados.obtener_por_cedula(cedula),
+            radio=radios.obtener_por_codigo(codigo_radio),
+            sap_usuario=sap.obtener_por_username(usuario_sap),
+            cedula_ocupada=f"cedula:{cedula}" in self.abiertos,
+            sap_ocupado=f"usuario_sap:{usuario_sap}" in self.abiertos,
+            radio_ocupado=f"codigo_radio:{codigo_radio}" in self.abiertos,
+        )
 
     def crear(self, prestamo: Prestamo):
         self.created = prestamo
@@ -69,6 +81,14 @@ class FakePrestamoRepo:
         raise EntityNotFound("Prestamo no existe")
 
 
+class FakePublisher:
+    def __init__(self):
+        self.eventos = []
+
+    def publicar(self, evento):
+        self.eventos.append(evento)
+
+
 class PrestamosServiceTests(unittest.TestCase):
     def setUp(self) -> None:
         self.empleado = Empleado(id=1, cedula="1234567890", nombre="Alice", activo=True)
@@ -76,16 +96,19 @@ class PrestamosServiceTests(unittest.TestCase):
         self.sapuser = SapUsuario(id=1, username="sap-user", empleado_id=1, empleado_cedula=self.empleado.cedula, activo=True)
         self.prestamo_repo = FakePrestamoRepo()
 
-    def _service(self, *, empleado=... , radio=... , sap=...):
+    def _service(self, *, empleado=... , radio=... , sap=..., eventos=None):
         empleado_obj = self.empleado if empleado is ... else empleado
         radio_obj = self.radio if radio is ... else radio
         sap_obj = self.sapuser if sap is ... else sap
+        catalogos = (FakeEmpleadoRepo(empleado_obj), FakeRadioRepo(radio_obj), FakeSapRepo(sap_obj))
+        self.prestamo_repo.catalogos = catalogos
         return PrestamosService(
-            empleados=FakeEmpleadoRepo(empleado_obj),
-            radios=FakeRadioRepo(radio_obj),
-            sap=FakeSapRepo(sap_obj),
+            empleados=catalogos[0],
+            radios=catalogos[1],
+            sap=catalogos[2],
             prestamos=self.prestamo_repo,
             uow=None,
+            eventos=eventos,
         )
 
     def test_asignar_normaliza_inputs_y_persiste(self) -> None:
@@ -115,6 +138,17 @@ class PrestamosServiceTests(unittest.TestCase):
         with self.assertRaises(EntityNotFound):
             svc.asignar(cedula="1", codigo_radio="RF", usuario_sap="SAP", usuario_registra_id=1, ahora=datetime.now(timezone.utc))
 
+    def test_asignar_reporta_conflicto_por_dimension(self) -> None:
+        svc = self._service()
+        self.prestamo_repo.abiertos["usuario_sap:sap-user"] = object()
+        with self.assertRaisesRegex(BusinessRuleViolation, "SAP Usuario sap-user ya tiene"):
+            svc.asignar(cedula="1234567890", codigo_radio="RF-001", usuario_sap="sap-user", usuario_registra_id=1, ahora=datetime.now(timezone.utc))
+
+        self.prestamo_repo.abiertos["cedula:1234567890"] = object()
+        with self.assertRaisesRegex(BusinessRuleViolation, "Empleado 1234567890 ya tiene"):
+            svc.asignar(cedula="1234567890", codigo_radio="RF-001", usuario_sap="sap-user", usuario_registra_id=1, ahora=datetime.now(timezone.utc))
+        self.assertIsNone(self.prestamo_repo.created)
+
     def test_asignar_rechaza_input_invalido(self) -> None:
         svc = self._service()
         with self.assertRaises(BusinessRuleViolation):
@@ -146,6 +180,18 @@ class PrestamosServiceTests(unittest.TestCase):
         self.assertEqual(EstadoPrestamo.DEVUELTO, result.estado)
         self.assertEqual(1, len(self.prestamo_repo.marcar_devolucion_calls))
 
+    def test_asignar_y_devolver_publican_eventos(self) -> None:
+        publisher = FakePublisher()
+        svc = self._service(eventos=publisher)
+        ahora = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+        creado = svc.asignar(cedula="1234567890", codigo_radio="RF-001", usuario_sap="sap-user", usuario_registra_id=1, ahora=ahora)
+        self.prestamo_repo.abiertos["codigo_radio:RF-001"] = creado
+        svc.devolver(codigo_radio="RF-001", ahora=ahora)
+
+        self.assertEqual(["asignado", "devuelto"], [e.tipo for e in publisher.eventos])
+        self.assertEqual(EstadoPrestamo.DEVUELTO, publisher.eventos[1].prestamo.estado)
+
 
 if __name__ == "__main__":
     unittest.main()
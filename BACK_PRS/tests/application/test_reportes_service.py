@@ -0,0 +1,296 @@
+import unittest
+from dataclasses import replace
+from datetime import date, datetime, timedelta, timezone
+
+from app.application.reportes_service import UTILIZACION_DISPONIBLE, ReportesService
+from app.domain.errors import BusinessRuleViolation
+from app.domain.reportes import BloqueDuraciones, ConteoHoraSemana, ConteoTurnoDia, UsoEmpleadoMes
+from app.domain.value_objects import EstadoPrestamo, Turno
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _ts(horas: float) -> float:
+    return (BASE + timedelta(hours=horas)).timestamp()
+
+
+class FakeReportesRepo:
+    def __init__(self, filas=(), activos=(), conteos=(), intervalos=(), horas=(), usos=()):
+        self.filas = list(filas)
+        self.activos = list(activos)
+        self.conteos = list(conteos)
+        self.intervalos = list(intervalos)
+        self.horas = list(horas)
+        self.consultas_horas = 0
+        self.usos = list(usos)
+        self.consultas_meses = []
+
+    def contar_por_turno_dia(self, *, desde, hasta):
+        return self.conteos
+
+    def iterar_duraciones(self, *, desde, hasta, chunk_size=50_000):
+        # Bloques pequeños para ejercitar la concatenacion
+        for i in range(0, len(self.filas), 2):
+            radios, inicios, fines = zip(*self.filas[i : i + 2])
+            yield BloqueDuraciones(radios=radios, inicios=inicios, fines=fines)
+
+    def codigos_radios_activos(self):
+        return self.activos
+
+    def iterar_intervalos(self, *, desde, hasta, chunk_size=50_000):
+        return iter(sorted(self.intervalos, key=lambda i: i[0]))
+
+    def contar_por_hora_semana(self, *, desde, hasta, turno=None):
+        self.consultas_horas += 1
+        return self.horas
+
+    def contar_por_empleado_mes(self, *, desde, hasta):
+        self.consultas_meses.append((desde, hasta))
+        return [u for u in self.usos if desde <= u.mes <= hasta]
+
+
+class FakeCache:
+    def __init__(self):
+        self.datos = {}
+
+    def obtener(self, clave):
+        return self.datos.get(clave)
+
+    def guardar(self, clave, valor):
+        self.datos[clave] = valor
+
+
+class FakeResumenes:
+    def reconstruir(self, *, desde=None, hasta=None):
+        return 7
+
+
+class FakeVersiones:
+    def __init__(self):
+        self.incrementos = []
+
+    def obtener(self, coleccion):
+        return self.incrementos.count(coleccion)
+
+    def incrementar(self, coleccion):
+        self.incrementos.append(coleccion)
+
+
+class ReportesServiceTests(unittest.TestCase):
+    def test_turnos_por_dia_rellena_dias_sin_datos(self) -> None:
+        repo = FakeReportesRepo(
+            conteos=[
+                ConteoTurnoDia(dia=date(2024, 1, 2), turno=Turno.T2, estado=EstadoPrestamo.ASIGNADO, total=5),
+                ConteoTurnoDia(dia=date(2024, 1, 2), turno=Turno.T2, estado=EstadoPrestamo.DEVUELTO, total=3),
+                ConteoTurnoDia(dia=date(2024, 1, 1), turno=Turno.T3, estado=EstadoPrestamo.DEVUELTO, total=1),
+            ]
+        )
+
+        reporte = ReportesService(repo).turnos_por_dia(desde=date(2024, 1, 1), hasta=date(2024, 1, 2))
+
+        self.assertEqual([[0, 0, 0], [0, 5, 0]], reporte.asignaciones)
+        self.assertEqual([[0, 0, 1], [0, 3, 0]], reporte.devoluciones)
+
+    @unittest.skipUnless(UTILIZACION_DISPONIBLE, "requiere numpy")
+    def test_utilizacion_calcula_percentiles_uso_y_ocio_por_radio_y_flota(self) -> None:
+        filas = [
+            ("RF-1", _ts(0), _ts(1)),
+            ("RF-2", _ts(0), _ts(4)),
+            ("RF-1", _ts(2), _ts(5)),
+            ("RF-1", _ts(6), _ts(8)),
+            ("RF-2", _ts(20), None),  # abierto: en uso hasta 'ahora'
+        ]
+        repo = FakeReportesRepo(filas=filas, activos=["RF-1", "RF-2", "RF-3"])
+
+        reporte = ReportesService(repo).utilizacion(
+            desde=BASE, hasta=BASE + timedelta(days=1), ahora=BASE + timedelta(hours=22)
+        )
+
+        self.assertAlmostEqual(22.0, reporte.horas_periodo)
+        rf1, rf2, rf3 = reporte.radios
+        self.assertEqual(("RF-1", 3, 3), (rf1.codigo_radio, rf1.prestamos, rf1.cerrados))
+        self.assertAlmostEqual(2.0, rf1.media_horas)
+        self.assertAlmostEqual(2.0, rf1.p50_horas)
+        self.assertAlmostEqual(2.8, rf1.p90_horas)
+        self.assertAlmostEqual(6.0, rf1.horas_en_uso)
+        self.assertAlmostEqual(1 - 6 / 22, rf1.ratio_ocioso)
+        self.assertAlmostEqual(6.0, rf2.horas_en_uso)  # 4 cerradas + 2 del abierto
+        self.assertEqual(4.0, rf2.p99_horas)
+        self.assertEqual((0, None, 1.0), (rf3.prestamos, rf3.media_horas, rf3.ratio_ocioso))
+
+        self.assertEqual(5, reporte.flota.prestamos)
+        self.assertAlmostEqual(2.5, reporte.flota.media_horas)
+        self.assertAlmostEqual(2.5, reporte.flota.p50_horas)
+        self.assertAlmostEqual(12.0, reporte.flota.horas_en_uso)
+        self.assertAlmostEqual(1 - 12 / 66, reporte.flota.ratio_ocioso)
+
+    @unittest.skipUnless(UTILIZACION_DISPONIBLE, "requiere numpy")
+    def test_utilizacion_recorta_al_periodo_los_prestamos_solapados(self) -> None:
+        filas = [
+            ("RF-1", _ts(-3), _ts(2)),  # empezo antes del periodo
+            ("RF-1", _ts(23), None),  # abierto despues del fin del periodo
+        ]
+        repo = FakeReportesRepo(filas=filas, activos=["RF-1"])
+
+        reporte = ReportesService(repo).utilizacion(
+            desde=BASE, hasta=BASE + timedelta(days=1), ahora=BASE + timedelta(days=2)
+        )
+
+        [rf1] = reporte.radios
+        self.assertEqual((2, 1), (rf1.prestamos, rf1.cerrados))
+        self.assertAlmostEqual(5.0, rf1.media_horas)  # duracion completa del prestamo
+        self.assertAlmostEqual(3.0, rf1.horas_en_uso)  # 2 h dentro del periodo + 1 h del abierto
+
+    @unittest.skipUnless(UTILIZACION_DISPONIBLE, "requiere numpy")
+    def test_utilizacion_rechaza_rango_invertido(self) -> None:
+        with self.assertRaises(BusinessRuleViolation):
+            ReportesService(FakeReportesRepo()).utilizacion(desde=BASE, hasta=BASE, ahora=BASE)
+
+    def test_concurrencia_barrido_de_linea_pico_serie_y_turnos(self) -> None:
+        h = lambda horas: BASE + timedelta(hours=horas)
+        repo = FakeReportesRepo(
+            intervalos=[
+                (h(-2), h(1)),  # empezo antes del rango: cuenta desde 'desde'
+                (h(0.5), h(3)),
+                (h(1), h(2)),  # empieza cuando termina el primero: no se solapan
+                (h(2.5), h(7)),
+                (h(6.5), None),  # abierto: en uso hasta 'ahora'
+                (h(9), h(9)),  # duracion cero: se ignora
+            ]
+        )
+
+        reporte = ReportesService(repo).concurrencia(desde=h(0), hasta=h(12), ahora=h(10), paso_minutos=180)
+
+        self.assertEqual(2, reporte.pico)
+        self.assertEqual(h(0.5), reporte.instante_pico)
+        self.assertEqual([2, 1, 2, 1], [p.maximo for p in reporte.serie])
+        self.assertEqual([h(0), h(3), h(6), h(9)], [p.inicio for p in reporte.serie])
+        self.assertEqual([(date(2024, 1, 1), None, 2)], [(p.dia, p.turno, p.pico) for p in reporte.dias])
+        # Horario UTC del fake: 00-06 es Turno 3 del 31/12, 06-14 Turno 1
+        self.assertEqual(
+            [(date(2023, 12, 31), Turno.T3, 2, h(0.5)), (date(2024, 1, 1), Turno.T1, 2, h(6.5))],
+            [(p.dia, p.turno, p.pico, p.instante) for p in reporte.turnos],
+        )
+
+    def test_concurrencia_limita_puntos_de_la_serie(self) -> None:
+        with self.assertRaises(BusinessRuleViolation):
+            ReportesService(FakeReportesRepo()).concurrencia(
+                desde=BASE, hasta=BASE + timedelta(days=30), ahora=BASE, paso_minutos=1
+            )
+
+    def test_mapa_calor_arma_matrices_y_solo_cachea_rangos_cerrados(self) -> None:
+        repo = FakeReportesRepo(
+            horas=[
+                ConteoHoraSemana(evento="asignacion", dia_semana=0, hora=7, total=3),
+                ConteoHoraSemana(evento="devolucion", dia_semana=6, hora=23, total=2),
+            ]
+        )
+        cache = FakeCache()
+        service = ReportesService(repo, cache=cache)
+
+        mapa = service.mapa_calor(desde=date(2024, 1, 1), hasta=date(2024, 1, 31), hoy=date(2024, 2, 1))
+
+        self.assertEqual((7, 24), (len(mapa.asignaciones), len(mapa.asignaciones[0])))
+        self.assertEqual(3, mapa.asignaciones[0][7])
+        self.assertEqual(2, mapa.devoluciones[6][23])
+        self.assertEqual(5, sum(map(sum, mapa.asignaciones)) + sum(map(sum, mapa.devoluciones)))
+
+        # Periodo cerrado: la segunda consulta sale de la cache; otro turno es otra entrada
+        service.mapa_calor(desde=date(2024, 1, 1), hasta=date(2024, 1, 31), hoy=date(2024, 2, 1))
+        self.assertEqual(1, repo.consultas_horas)
+        service.mapa_calor(desde=date(2024, 1, 1), hasta=date(2024, 1, 31), hoy=date(2024, 2, 1), turno=Turno.T2)
+        self.assertEqual(2, repo.consultas_horas)
+
+        # Rango que incluye hoy: siempre se recalcula
+        for _ in range(2):
+            service.mapa_calor(desde=date(2024, 1, 1), hasta=date(2024, 2, 1), hoy=date(2024, 2, 1))
+        self.assertEqual(4, repo.consultas_horas)
+        self.assertEqual(2, len(cache.datos))
+
+    def test_mapa_calor_no_sirve_la_cache_de_una_version_anterior(self) -> None:
+        repo = FakeReportesRepo(horas=[ConteoHoraSemana(evento="asignacion", dia_semana=0, hora=7, total=3)])
+        versiones = FakeVersiones()
+        service = ReportesService(repo, cache=FakeCache(), versiones=versiones)
+        consulta = dict(desde=date(2024, 1, 1), hasta=date(2024, 1, 31), hoy=date(2024, 2, 1))
+
+        service.mapa_calor(**consulta)
+        service.mapa_calor(**consulta)
+        self.assertEqual(1, repo.consultas_horas)
+
+        # Una correccion en el admin cambia enero y sube la version de prestamos
+        repo.horas = [ConteoHoraSemana(evento="asignacion", dia_semana=0, hora=7, total=1)]
+        versiones.incrementar("prestamos")
+        self.assertEqual(1, service.mapa_calor(**consulta).asignaciones[0][7])
+        self.assertEqual(2, repo.consultas_horas)
+
+
+    def test_uso_empleados_mes_pivota_y_cachea_solo_meses_cerrados(self) -> None:
+        def uso(mes, cedula, prestamos, abiertos=0, horas=0.0):
+            return UsoEmpleadoMes(
+                mes=mes, cedula=cedula, empleado_nombre=f"Empleado {cedula}", prestamos=prestamos,
+                abiertos=abiertos, segundos_uso=horas * 3600,
+            )
+
+        enero, febrero, marzo = date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)
+        repo = FakeReportesRepo(
+            usos=[
+                uso(enero, "800", 2, horas=3.5),
+                uso(febrero, "700", 1, abiertos=1),  # febrero todavia puede cambiar
+                uso(marzo, "800", 1, horas=1.0),
+            ]
+        )
+        cache = FakeCache()
+        service = ReportesService(repo, cache=cache)
+
+        pivot = service.uso_empleados_mes(desde=date(2024, 1, 15), hasta=date(2024, 3, 9), hoy=date(2024, 3, 10))
+
+        self.assertEqual([enero, febrero, marzo], pivot.meses)
+        self.assertEqual(["700", "800"], pivot.cedulas)
+        self.assertEqual([[0, 1, 0], [2, 0, 1]], pivot.prestamos)
+        self.assertEqual([[0.0, 0.0, 0.0], [3.5, 0.0, 1.0]], pivot.horas)
+        self.assertEqual(["empleados-mes:2024-01-01"], list(cache.datos))
+
+        # Enero sale de la cache: solo se consultan febrero (abierto) y marzo (en curso)
+        service.uso_empleados_mes(desde=enero, hasta=marzo, hoy=date(2024, 3, 10))
+        self.assertEqual([(enero, marzo), (febrero, marzo)], repo.consultas_meses)
+
+    def test_uso_empleados_mes_no_sirve_la_cache_de_una_version_anterior(self) -> None:
+        enero = date(2024, 1, 1)
+        repo = FakeReportesRepo(
+            usos=[UsoEmpleadoMes(mes=enero, cedula="800", empleado_nombre="A", prestamos=2, abiertos=0, segundos_uso=0.0)]
+        )
+        versiones = FakeVersiones()
+        cache = FakeCache()
+        service = ReportesService(repo, cache=cache, versiones=versiones)
+
+        service.uso_empleados_mes(desde=enero, hasta=enero, hoy=date(2024, 3, 10))
+        service.uso_empleados_mes(desde=enero, hasta=enero, hoy=date(2024, 3, 10))
+        self.assertEqual([(enero, enero)], repo.consultas_meses)
+        self.assertEqual(["v0:empleados-mes:2024-01-01"], list(cache.datos))
+
+        # Un prestamo de enero borrado en el admin sube la version de prestamos
+        repo.usos = [replace(repo.usos[0], prestamos=1)]
+        versiones.incrementar("prestamos")
+        pivot = service.uso_empleados_mes(desde=enero, hasta=enero, hoy=date(2024, 3, 10))
+        self.assertEqual([[1]], pivot.prestamos)
+        self.assertEqual(2, len(repo.consultas_meses))
+
+    def test_uso_empleados_mes_limita_el_rango(self) -> None:
+        with self.assertRaises(BusinessRuleViolation):
+            ReportesService(FakeReportesRepo()).uso_empleados_mes(
+                desde=date(2020, 1, 1), hasta=date(2024, 1, 1), hoy=date(2024, 1, 1)
+            )
+
+    def test_reconstruir_resumenes_invalida_los_etags_de_prestamos(self) -> None:
+        versiones = FakeVersiones()
+        service = ReportesService(FakeReportesRepo(), FakeResumenes(), versiones=versiones)
+
+        self.assertEqual(7, service.reconstruir_resumenes())
+        self.assertEqual(["prestamos"], versiones.incrementos)
+        with self.assertRaises(BusinessRuleViolation):
+            service.reconstruir_resumenes(desde=date(2024, 1, 2), hasta=date(2024, 1, 1))
+        self.assertEqual(1, len(versiones.incrementos))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 from datetime import datetime
 
-from app.domain import Turno, calcular_turno, clean_doc, clean_rf, clean_sap
+from app.domain import Turno, calcular_turno, clean_doc, clean_rf, clean_sap, fin_turno, inicio_turno
 
 
 class CalcularTurnoTests(unittest.TestCase):
@@ -22,6 +22,20 @@ class CalcularTurnoTests(unittest.TestCase):
             calcular_turno(None)
 
 
+class LimitesTurnoTests(unittest.TestCase):
+    def test_inicio_turno_en_curso(self) -> None:
+        self.assertEqual(datetime(2024, 1, 1, 6, 0), inicio_turno(datetime(2024, 1, 1, 13, 59)))
+        self.assertEqual(datetime(2024, 1, 1, 14, 0), inicio_turno(datetime(2024, 1, 1, 14, 0)))
+        self.assertEqual(datetime(2024, 1, 1, 22, 0), inicio_turno(datetime(2024, 1, 1, 23, 10)))
+        self.assertEqual(datetime(2023, 12, 31, 22, 0), inicio_turno(datetime(2024, 1, 1, 5, 59)))
+
+    def test_fin_turno_del_prestamo(self) -> None:
+        self.assertEqual(datetime(2024, 1, 1, 14, 0), fin_turno(datetime(2024, 1, 1, 6, 0)))
+        self.assertEqual(datetime(2024, 1, 1, 22, 0), fin_turno(datetime(2024, 1, 1, 21, 59)))
+        self.assertEqual(datetime(2024, 1, 2, 6, 0), fin_turno(datetime(2024, 1, 1, 22, 30)))
+        self.assertEqual(datetime(2024, 1, 1, 6, 0), fin_turno(datetime(2024, 1, 1, 2, 0)))
+
+
 class CleanersTests(unittest.TestCase):
     def test_clean_doc_keeps_digits_and_limits_length(self) -> None:
         self.assertEqual("123456789012345", clean_doc(" abc12345678901234567890 "))
@@ -0,0 +1,85 @@
+import io
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from app.infrastructure.analitica import ANALITICA_DISPONIBLE, DuckDBAnaliticaRepository
+from app.infrastructure.archivos import bloqueo_exclusivo
+from app.infrastructure.models import AuditEntry, PrestamoHistoricoModel, PrestamoModel
+
+BOGOTA = ZoneInfo("America/Bogota")
+INICIO = datetime(2024, 3, 1, tzinfo=BOGOTA)
+
+
+class AnaliticaRepositoryTests(TransactionTestCase):
+    """DuckDB lee el archivo desde otra conexion: los datos tienen que estar confirmados."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username="analista", password="pass")
+        comunes = dict(usuario_sap="sap-1", turno="Turno 1 (6 am - 2 pm)")
+        PrestamoModel.objects.create(
+            cedula="701", empleado_nombre="Empleado 1", codigo_radio="RF-1", estado="DEVUELTO",
+            fecha_hora_prestamo=INICIO + timedelta(hours=7), fecha_hora_devolucion=INICIO + timedelta(hours=9),
+            usuario_registra=self.user, **comunes,
+        )
+        PrestamoModel.objects.create(
+            cedula="702", empleado_nombre="Empleado 2", codigo_radio="RF-1", estado="ASIGNADO",
+            fecha_hora_prestamo=INICIO + timedelta(hours=10), usuario_registra=self.user, **comunes,
+        )
+        ahora = INICIO + timedelta(days=1)
+        PrestamoHistoricoModel.objects.create(
+            id=1000, cedula="701", empleado_nombre="Empleado 1", codigo_radio="RF-2", estado="DEVUELTO",
+            fecha_hora_prestamo=INICIO + timedelta(hours=1), fecha_hora_devolucion=INICIO + timedelta(hours=5),
+            usuario_registra=self.user, created_at=ahora, updated_at=ahora, archivado_en=ahora, **comunes,
+        )
+        for _ in range(2):
+            AuditEntry.objects.create(aggregate="Empleado", action="UPDATED", id_ref="701", at=ahora, actor_user_id=self.user.id)
+
+    def test_snapshot_copia_la_base_en_linea(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            destino = Path(tmp) / "analitica.sqlite3"
+            call_command("snapshot_analitica", destino=str(destino), stdout=io.StringIO())
+
+            with sqlite3.connect(destino) as copia:
+                self.assertEqual(2, copia.execute("SELECT count(*) FROM prestamos").fetchone()[0])
+                self.assertEqual(2, copia.execute("SELECT count(*) FROM audit_log").fetchone()[0])
+            self.assertEqual(["analitica.sqlite3", "analitica.sqlite3.lock"], sorted(p.name for p in Path(tmp).iterdir()))
+
+    def test_snapshot_simultaneo_al_mismo_destino_falla(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            destino = Path(tmp) / "analitica.sqlite3"
+            with bloqueo_exclusivo(Path(tmp) / "analitica.sqlite3.lock", "ocupado"):
+                with self.assertRaisesMessage(CommandError, "Ya hay un snapshot en curso"):
+                    call_command("snapshot_analitica", destino=str(destino), stdout=io.StringIO())
+            self.assertFalse(destino.exists())
+
+    @unittest.skipUnless(ANALITICA_DISPONIBLE, "requiere duckdb")
+    def test_consultas_agregan_caliente_historico_y_auditoria(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            destino = Path(tmp) / "analitica.sqlite3"
+            call_command("snapshot_analitica", destino=str(destino), stdout=io.StringIO())
+            self._consultas(DuckDBAnaliticaRepository(str(destino)))
+
+    def _consultas(self, repo: DuckDBAnaliticaRepository) -> None:
+        rango = dict(desde=INICIO, hasta=INICIO + timedelta(days=1), limite=10)
+
+        radios = repo.consultar("radios", **rango)
+        filas = [dict(zip(radios.columnas, f)) for f in radios.filas]
+        self.assertEqual(["RF-1", "RF-2"], [f["codigo_radio"] for f in filas])
+        self.assertEqual((2, 1, 2.0, 2), (filas[0]["prestamos"], filas[0]["devueltos"], filas[0]["horas_en_uso"], filas[0]["empleados"]))
+        self.assertEqual(4.0, filas[1]["media_horas"])
+
+        empleados = repo.consultar("empleados", **rango)
+        self.assertEqual(["701", "702"], [f[0] for f in empleados.filas])
+        self.assertEqual(6.0, dict(zip(empleados.columnas, empleados.filas[0]))["horas_en_uso"])
+
+        auditoria = repo.consultar("auditoria", desde=INICIO, hasta=INICIO + timedelta(days=2), limite=10)
+        self.assertEqual([["Empleado", "UPDATED", self.user.id, 2]], [f[:4] for f in auditoria.filas])
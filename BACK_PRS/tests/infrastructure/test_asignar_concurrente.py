@@ -0,0 +1,129 @@
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase
+
+from app.application.services import PrestamosService
+from app.domain.errors import BusinessRuleViolation
+from app.infrastructure.models import EmpleadoModel, PrestamoModel, RadioFrecuenciaModel, SapUsuarioModel
+from app.infrastructure.repositories import (
+    DjangoEmpleadoRepository,
+    DjangoPrestamoRepository,
+    DjangoRadioRepository,
+    DjangoSapUsuarioRepository,
+    DjangoUnitOfWork,
+)
+
+
+class _ValidacionObsoleta(DjangoPrestamoRepository):
+    """Simula la carrera: la lectura de conflictos ocurre antes de que otro worker confirme."""
+
+    def resolver_asignacion(self, **kwargs):
+        ctx = super().resolver_asignacion(**kwargs)
+        return replace(ctx, cedula_ocupada=False, sap_ocupado=False, radio_ocupado=False)
+
+
+def _service(prestamos=None) -> PrestamosService:
+    return PrestamosService(
+        DjangoEmpleadoRepository(),
+        DjangoRadioRepository(),
+        DjangoSapUsuarioRepository(),
+        prestamos or DjangoPrestamoRepository(),
+        DjangoUnitOfWork(),
+    )
+
+
+class AsignarConcurrenteTests(TransactionTestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username="registra", password="pass")
+        for i in range(24):
+            EmpleadoModel.objects.create(cedula=f"{5000 + i}", nombre=f"Empleado {i}")
+            RadioFrecuenciaModel.objects.create(codigo=f"RF-{i:03d}")
+            SapUsuarioModel.objects.create(username=f"sap-{i}")
+
+    def _asignar(self, svc: PrestamosService, i: int, radio: str):
+        return svc.asignar(
+            cedula=f"{5000 + i}",
+            codigo_radio=radio,
+            usuario_sap=f"sap-{i}",
+            usuario_registra_id=self.user.id,
+            ahora=datetime.now(timezone.utc),
+        )
+
+    def test_restriccion_en_bd_rechaza_doble_asignacion_aunque_pase_la_validacion(self) -> None:
+        self._asignar(_service(), 0, "RF-000")
+
+        with self.assertRaisesRegex(BusinessRuleViolation, "Radio RF-000 ya está asignada"):
+            self._asignar(_service(_ValidacionObsoleta()), 1, "RF-000")
+
+        self.assertEqual(1, PrestamoModel.objects.filter(estado="ASIGNADO").count())
+
+    def test_asignaciones_concurrentes_mantienen_invariante_sin_errores_de_lock(self) -> None:
+        # 16 radios distintas a la vez + 8 operadores compitiendo por la misma radio
+        trabajos = [(i, f"RF-{i:03d}") for i in range(16)] + [(i, "RF-023") for i in range(16, 24)]
+        barrera = threading.Barrier(len(trabajos))
+        exitos, rechazos, errores = [], [], []
+
+        def worker(i: int, radio: str) -> None:
+            try:
+                barrera.wait()
+                exitos.append(self._asignar(_service(), i, radio).codigo_radio)
+            except BusinessRuleViolation as exc:
+                rechazos.append(str(exc))
+            except OperationalError as exc:  # "database is locked": fallo del test
+                errores.append(repr(exc))
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=worker, args=t) for t in trabajos]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual([], errores)
+        self.assertEqual(17, len(exitos))
+        self.assertEqual(1, exitos.count("RF-023"))
+        self.assertEqual(["Radio RF-023 ya está asignada"] * 7, rechazos)
+        self.assertEqual(17, PrestamoModel.objects.filter(estado="ASIGNADO").count())
+
+    def test_asignaciones_esperan_a_la_transaccion_en_curso_en_vez_de_fallar(self) -> None:
+        # Las escrituras se serializan (lock de la base y fila de version de la coleccion): lo que
+        # se garantiza es que esperan su turno dentro del timeout, no que corran en paralelo
+        tomada, liberada = threading.Event(), []
+        terminadas, errores = [], []
+
+        def escritura_larga() -> None:
+            try:
+                with transaction.atomic():
+                    PrestamoModel.objects.filter(pk=0).update(empleado_nombre="")
+                    tomada.set()
+                    time.sleep(0.5)
+                    liberada.append(time.monotonic())
+            finally:
+                connection.close()
+
+        def worker(i: int) -> None:
+            try:
+                tomada.wait()
+                self._asignar(_service(), i, f"RF-{i:03d}")
+                terminadas.append(time.monotonic())
+            except (BusinessRuleViolation, OperationalError) as exc:
+                errores.append(repr(exc))
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=escritura_larga)] + [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual([], errores)
+        self.assertEqual(4, len(terminadas))
+        self.assertTrue(all(t >= liberada[0] for t in terminadas))
+        self.assertEqual(4, PrestamoModel.objects.filter(estado="ASIGNADO").count())
@@ -1,11 +1,16 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.utils import timezone
 
-from app.domain.events import AdminChangeEvent
+from app.application.audit_retencion import AuditRetencionService
+from app.domain.events import AdminChangeEvent, ReglaRetencionAudit
+from app.infrastructure.models import AuditEntry
 from app.infrastructure.repositories import (
     DjangoAuditLogQueryRepository,
     DjangoAuditLogRepository,
+    DjangoAuditLogRetencionRepository,
 )
 
 
@@ -49,3 +54,51 @@ class AuditLogRepositoryTests(TestCase):
 
         self.assertEqual(1, len(records))
         self.assertEqual("RadioFrecuencia", records[0].aggregate)
+
+
+class AuditRetencionTests(TestCase):
+    def setUp(self) -> None:
+        self.writer = DjangoAuditLogRepository()
+        self.user = get_user_model().objects.create_user(username="auditor", password="pass123")
+        self.ahora = timezone.now()
+
+    def _append(self, action: str, dias: int, before=None, after=None) -> None:
+        self.writer.append(
+            AdminChangeEvent(
+                aggregate="Empleado",
+                action=action,
+                id_ref=f"{action}-{dias}",
+                at=self.ahora - timedelta(days=dias),
+                actor_user_id=self.user.id,
+                before=before,
+                after=after,
+            )
+        )
+
+    def test_aplica_regla_mas_especifica_por_lotes(self) -> None:
+        self._append("UPDATED", 800, {"nombre": "A", "activo": True}, {"nombre": "B", "activo": True})
+        self._append("UPDATED", 100, {"nombre": "A", "activo": True}, {"nombre": "B", "activo": True})
+        self._append("UPDATED", 10, {"nombre": "A", "activo": True}, {"nombre": "B", "activo": True})
+        self._append("DELETED", 800, {"nombre": "A", "activo": True})
+        service = AuditRetencionService(
+            DjangoAuditLogRetencionRepository(),
+            [
+                ReglaRetencionAudit(compactar_dias=90, purgar_dias=730),
+                ReglaRetencionAudit(action="DELETED", purgar_dias=1825),
+            ],
+        )
+
+        resultado = service.aplicar(ahora=self.ahora, lote=1)
+
+        self.assertEqual((1, 1), (resultado.purgados, resultado.compactados))
+        self.assertGreater(resultado.bytes_liberados, 0)
+        restantes = {e.id_ref: e for e in AuditEntry.objects.all()}
+        self.assertEqual({"UPDATED-100", "UPDATED-10", "DELETED-800"}, set(restantes))
+        compactada = restantes["UPDATED-100"]
+        self.assertTrue(compactada.compactado)
+        self.assertEqual(({"nombre": "A"}, {"nombre": "B"}), (compactada.before, compactada.after))
+        self.assertEqual({"nombre": "B", "activo": True}, restantes["UPDATED-10"].after)
+
+        # Idempotente: una segunda pasada no encuentra nada que hacer
+        self.assertEqual(0, service.aplicar(ahora=self.ahora).compactados)
+
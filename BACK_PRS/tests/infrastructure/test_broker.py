@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+from datetime import datetime, timezone
+
+from django.test import TestCase
+
+from app.domain.entities import Prestamo
+from app.domain.events import PrestamoEvento
+from app.domain.value_objects import EstadoPrestamo, Turno
+from app.infrastructure.broker import EventBroker, OnCommitPrestamoPublisher
+
+
+def _prestamo() -> Prestamo:
+    return Prestamo(
+        id=1,
+        cedula="1",
+        empleado_nombre="Alice",
+        usuario_sap="sap",
+        codigo_radio="RF-1",
+        fecha_hora_prestamo=datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc),
+        turno=Turno.T1,
+        estado=EstadoPrestamo.ASIGNADO,
+        usuario_registra_id=1,
+    )
+
+
+class EventBrokerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_un_publicar_despierta_a_todos_los_suscriptores(self) -> None:
+        broker = EventBroker()
+        esperas = [asyncio.create_task(broker.esperar(0, timeout=5)) for _ in range(50)]
+        await asyncio.sleep(0)
+
+        broker.publicar("asignado", "payload")
+        lecturas = await asyncio.gather(*esperas)
+
+        self.assertTrue(all([m.tipo for m in lectura.mensajes] == ["asignado"] for lectura in lecturas))
+
+    async def test_esperar_vence_sin_eventos(self) -> None:
+        broker = EventBroker()
+        lectura = await broker.esperar(0, timeout=0.01)
+        self.assertEqual([], lectura.mensajes)
+
+    async def test_reanuda_desde_id_y_detecta_eventos_descartados(self) -> None:
+        broker = EventBroker(capacidad=2)
+        for i in range(3):
+            broker.publicar("asignado", i)
+
+        reanudado = broker.leer_desde(2)
+        self.assertEqual([3], [m.id for m in reanudado.mensajes])
+        self.assertFalse(reanudado.perdidos)
+
+        # El evento 1 ya salio del buffer circular
+        self.assertTrue(broker.leer_desde(0).perdidos)
+
+
+class OnCommitPublisherTests(TestCase):
+    def test_publica_solo_al_confirmar_la_transaccion(self) -> None:
+        broker = EventBroker()
+        publisher = OnCommitPrestamoPublisher(broker)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            publisher.publicar(PrestamoEvento(tipo="asignado", prestamo=_prestamo()))
+            self.assertEqual(0, broker.ultimo_id)
+
+        self.assertEqual(1, broker.ultimo_id)
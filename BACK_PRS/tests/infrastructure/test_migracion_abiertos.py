@@ -0,0 +1,53 @@
+import importlib
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from app.infrastructure.models import PrestamoModel
+
+BOGOTA = ZoneInfo("America/Bogota")
+
+migracion = importlib.import_module("app.migrations.0008_prestamos_abiertos_parciales")
+
+
+class VerificarAbiertosUnicosTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username="registra", password="pass")
+
+    def _prestamo(self, cedula: str, radio: str, sap: str, *, estado: str = "ASIGNADO", hora: int = 7) -> PrestamoModel:
+        return PrestamoModel.objects.create(
+            cedula=cedula,
+            empleado_nombre=f"Empleado {cedula}",
+            usuario_sap=sap,
+            codigo_radio=radio,
+            fecha_hora_prestamo=datetime(2024, 3, 1, hora, 0, tzinfo=BOGOTA),
+            fecha_hora_devolucion=datetime(2024, 3, 1, hora, 0, tzinfo=BOGOTA) + timedelta(hours=1) if estado == "DEVUELTO" else None,
+            turno="Turno 1 (6 am - 2 pm)",
+            estado=estado,
+            usuario_registra=self.user,
+        )
+
+    def test_sin_duplicados_no_hace_nada(self) -> None:
+        self._prestamo("1", "RF-1", "sap-1")
+        self._prestamo("1", "RF-1", "sap-1", estado="DEVUELTO", hora=6)
+
+        migracion.verificar_abiertos_unicos(apps, None)
+
+    def test_duplicados_previos_abortan_con_el_detalle(self) -> None:
+        # Estado anterior a 0008: sin los indices parciales (el DDL se revierte con la transaccion del test)
+        with connection.cursor() as cursor:
+            for nombre in ("prestamo_abierto_cedula_uniq", "prestamo_abierto_radio_uniq", "prestamo_abierto_sap_uniq"):
+                cursor.execute(f'DROP INDEX "{nombre}"')
+        primero = self._prestamo("1", "RF-1", "sap-1")
+        segundo = self._prestamo("1", "RF-2", "sap-2", hora=8)
+
+        with self.assertRaises(RuntimeError) as ctx:
+            migracion.verificar_abiertos_unicos(apps, None)
+
+        mensaje = str(ctx.exception)
+        self.assertIn(f"cedula=1: prestamos [{primero.id}, {segundo.id}]", mensaje)
+        self.assertNotIn("codigo_radio=", mensaje)
@@ -0,0 +1,97 @@
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from app.domain.errors import BusinessRuleViolation
+from app.infrastructure.archivos import escribir_atomico
+from app.infrastructure.models import AuditEntry, PrestamoHistoricoModel, PrestamoModel
+from app.infrastructure.parquet import PARQUET_DISPONIBLE, ParquetExportacion
+
+BOGOTA = ZoneInfo("America/Bogota")
+
+
+class ParquetExportacionTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username="bi", password="pass")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.destino = ParquetExportacion(self.tmp.name)
+        comunes = dict(usuario_sap="sap-1", turno="Turno 3 (10 pm - 6 am)", usuario_registra=self.user)
+        # 31 de marzo 23:00 local ya es abril en UTC: pertenece a la particion de marzo
+        self.caliente = PrestamoModel.objects.create(
+            id=2, cedula="701", empleado_nombre="Empleado 1", codigo_radio="RF-1", estado="ASIGNADO",
+            fecha_hora_prestamo=datetime(2024, 3, 31, 23, 0, tzinfo=BOGOTA), **comunes,
+        )
+        archivado = datetime(2024, 3, 1, tzinfo=BOGOTA)
+        PrestamoHistoricoModel.objects.create(
+            id=1, cedula="702", empleado_nombre="Empleado 2", codigo_radio="RF-2", estado="DEVUELTO",
+            fecha_hora_prestamo=datetime(2024, 2, 10, 8, 0, tzinfo=BOGOTA),
+            fecha_hora_devolucion=datetime(2024, 2, 10, 9, 0, tzinfo=BOGOTA),
+            created_at=archivado, updated_at=archivado, archivado_en=archivado, **comunes,
+        )
+        AuditEntry.objects.create(
+            aggregate="Empleado", action="UPDATED", id_ref="701", at=datetime(2024, 3, 2, tzinfo=BOGOTA),
+            actor_user_id=self.user.id, before={"nombre": "Émpleado"}, after={"nombre": "Empleado 1"},
+        )
+
+    def test_meses_modificados_y_watermark(self) -> None:
+        meses, marca = self.destino.meses_modificados("prestamos", desde=None)
+        self.assertEqual([date(2024, 2, 1), date(2024, 3, 1)], meses)
+        self.assertEqual(self.caliente.updated_at, marca)
+
+        self.destino.guardar_marca("prestamos", marca)
+        self.assertEqual(marca, self.destino.leer_marca("prestamos"))
+        self.assertEqual(([], None), self.destino.meses_modificados("prestamos", desde=marca))
+
+        PrestamoModel.objects.filter(id=2).update(updated_at=marca + timedelta(seconds=1))
+        self.assertEqual([date(2024, 3, 1)], self.destino.meses_modificados("prestamos", desde=marca)[0])
+        self.assertEqual([date(2024, 3, 1)], self.destino.meses_modificados("audit_log", desde=None)[0])
+
+    def test_archivar_despues_del_watermark_marca_el_mes_del_historico(self) -> None:
+        _, marca = self.destino.meses_modificados("prestamos", desde=None)
+        # Archivado despues de la exportacion; conserva su updated_at anterior
+        PrestamoHistoricoModel.objects.filter(id=1).update(archivado_en=marca + timedelta(seconds=5))
+
+        meses, nueva = self.destino.meses_modificados("prestamos", desde=marca)
+
+        self.assertEqual([date(2024, 2, 1)], meses)
+        self.assertEqual(marca + timedelta(seconds=5), nueva)
+
+    def test_exportaciones_simultaneas_se_excluyen(self) -> None:
+        with self.destino.bloqueo():
+            with self.assertRaisesMessage(BusinessRuleViolation, "en curso"):
+                with ParquetExportacion(self.tmp.name).bloqueo():
+                    pass
+        with self.destino.bloqueo():
+            pass
+
+    def test_escritura_fallida_no_deja_temporales(self) -> None:
+        ruta = self.destino.raiz / "prestamos" / "part-0.parquet"
+
+        def falla(temporal):
+            temporal.write_text("a medias")
+            raise OSError("disco lleno")
+
+        with self.assertRaises(OSError):
+            escribir_atomico(ruta, falla)
+        self.assertEqual([], list(ruta.parent.iterdir()))
+        escribir_atomico(ruta, lambda temporal: temporal.write_text("ok"))
+        self.assertEqual(["part-0.parquet"], [p.name for p in ruta.parent.iterdir()])
+
+    @unittest.skipUnless(PARQUET_DISPONIBLE, "requiere pyarrow")
+    def test_escribe_particion_tipada_del_mes(self) -> None:
+        import pyarrow.parquet as pq
+
+        self.assertEqual(1, self.destino.escribir_mes("prestamos", date(2024, 3, 1)))
+        tabla = pq.read_table(self.destino.ruta_particion("prestamos", date(2024, 3, 1)))
+        self.assertEqual([2], tabla.column("id").to_pylist())
+        self.assertEqual("timestamp[us, tz=UTC]", str(tabla.schema.field("fecha_hora_prestamo").type))
+        self.assertEqual([None], tabla.column("fecha_hora_devolucion").to_pylist())
+
+        self.assertEqual(1, self.destino.escribir_mes("audit_log", date(2024, 3, 1)))
+        audit = pq.read_table(self.destino.ruta_particion("audit_log", date(2024, 3, 1)))
+        self.assertEqual(['{"nombre": "Émpleado"}'], audit.column("before").to_pylist())
@@ -0,0 +1,315 @@
+import re
+import sqlite3
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from app.domain.entities import Prestamo
+from app.domain.errors import BusinessRuleViolation
+from app.domain.value_objects import EstadoPrestamo, FiltroPrestamos, Turno
+from app.infrastructure.models import (
+    EmpleadoModel,
+    PrestamoHistoricoModel,
+    PrestamoModel,
+    RadioFrecuenciaModel,
+    SapUsuarioModel,
+)
+from app.infrastructure.repositories import DjangoPrestamoRepository, en_curso_en
+
+
+class DjangoPrestamoRepositoryTests(TestCase):
+    def setUp(self) -> None:
+        User = get_user_model()
+        self.user = User.objects.create_user(username="registra", password="pass")
+        self.repo = DjangoPrestamoRepository()
+        self.base = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+    def _crear(self, idx: int, *, fecha: datetime | None = None) -> Prestamo:
+        return self.repo.crear(
+            Prestamo(
+                id=None,
+                cedula=f"100{idx}",
+                empleado_nombre=f"Empleado {idx}",
+                usuario_sap=f"sap-{idx}",
+                codigo_radio=f"RF-{idx:03d}",
+                fecha_hora_prestamo=fecha or self.base + timedelta(minutes=idx),
+                turno=Turno.T1,
+                estado=EstadoPrestamo.ASIGNADO,
+                usuario_registra_id=self.user.id,
+            )
+        )
+
+    def test_listar_pagina_por_cursor_sin_repetir_ni_omitir(self) -> None:
+        for i in range(5):
+            self._crear(i)
+        # Dos filas con la misma fecha: el id desempata el keyset
+        self._crear(5, fecha=self.base + timedelta(minutes=4))
+
+        vistos = []
+        cursor = None
+        while True:
+            pagina = self.repo.listar(limit=2, cursor=cursor)
+            vistos.extend(p.id for p in pagina.items)
+            if pagina.siguiente is None:
+                break
+            cursor = pagina.siguiente
+
+        self.assertEqual(6, len(vistos))
+        self.assertEqual(6, len(set(vistos)))
+        fechas = [p.fecha_hora_prestamo for p in self.repo.listar(limit=10).items]
+        self.assertEqual(sorted(fechas, reverse=True), fechas)
+
+    def test_listar_ultima_pagina_sin_cursor(self) -> None:
+        self._crear(1)
+
+        pagina = self.repo.listar(limit=5)
+
+        self.assertEqual(1, len(pagina.items))
+        self.assertIsNone(pagina.siguiente)
+        self.assertEqual("registra", pagina.items[0].usuario_registra_username)
+
+    def test_listar_aplica_filtros_en_sql(self) -> None:
+        for i in range(4):
+            self._crear(i)
+        abierto = self.repo.listar(limit=10, filtro=FiltroPrestamos(codigo_radio="RF-002")).items[0]
+        self.repo.marcar_devolucion(abierto.id, self.base + timedelta(hours=1))
+
+        devueltos = self.repo.listar(limit=10, filtro=FiltroPrestamos(estado=EstadoPrestamo.DEVUELTO))
+        self.assertEqual(["RF-002"], [p.codigo_radio for p in devueltos.items])
+
+        por_prefijo = self.repo.listar(limit=10, filtro=FiltroPrestamos(usuario_sap="sap-"))
+        self.assertEqual(4, len(por_prefijo.items))
+
+        por_nombre = self.repo.listar(limit=10, filtro=FiltroPrestamos(empleado_nombre="empleado 3"))
+        self.assertEqual(["1003"], [p.cedula for p in por_nombre.items])
+
+        rango = FiltroPrestamos(desde=self.base + timedelta(minutes=1), hasta=self.base + timedelta(minutes=3))
+        self.assertEqual(
+            ["RF-002", "RF-001"],
+            [p.codigo_radio for p in self.repo.listar(limit=10, filtro=rango).items],
+        )
+        self.assertEqual(0, len(self.repo.listar(limit=10, filtro=FiltroPrestamos(turno=Turno.T2)).items))
+
+    def test_prestamo_abierto_ignora_historico_y_es_unico_por_dimension(self) -> None:
+        for i in range(3):
+            p = self._crear(1, fecha=self.base + timedelta(hours=i))
+            self.repo.marcar_devolucion(p.id, self.base + timedelta(hours=i, minutes=30))
+        abierto = self._crear(1, fecha=self.base + timedelta(hours=5))
+
+        encontrado = self.repo.obtener_prestamo_abierto(codigo_radio="RF-001")
+
+        self.assertEqual(abierto.id, encontrado.id)
+        self.assertIsNone(self.repo.obtener_prestamo_abierto(cedula="no-existe"))
+        with self.assertRaises(BusinessRuleViolation), transaction.atomic():
+            self._crear(1)
+
+    def test_resolver_asignacion_en_dos_consultas(self) -> None:
+        empleado = EmpleadoModel.objects.create(cedula="1001", nombre="Empleado 1")
+        RadioFrecuenciaModel.objects.create(codigo="RF-009", activo=False)
+        SapUsuarioModel.objects.create(username="sap-1", empleado=empleado)
+        self._crear(1)  # abierto para cedula 1001 / sap-1 / RF-001
+
+        with self.assertNumQueries(2):
+            ctx = self.repo.resolver_asignacion(cedula="1001", codigo_radio="RF-009", usuario_sap="sap-1")
+
+        self.assertEqual("Empleado 1", ctx.empleado.nombre)
+        self.assertFalse(ctx.radio.activo)
+        self.assertEqual("1001", ctx.sap_usuario.empleado_cedula)
+        self.assertEqual((True, True, False), (ctx.cedula_ocupada, ctx.sap_ocupado, ctx.radio_ocupado))
+
+        vacio = self.repo.resolver_asignacion(cedula="9", codigo_radio="X", usuario_sap="y")
+        self.assertEqual((None, None, None), (vacio.empleado, vacio.radio, vacio.sap_usuario))
+
+    def test_archivar_mueve_devueltos_antiguos_y_lecturas_siguen_viendolos(self) -> None:
+        ids = []
+        for i in range(5):
+            p = self._crear(i, fecha=self.base + timedelta(days=i))
+            if i < 4:
+                self.repo.marcar_devolucion(p.id, self.base + timedelta(days=i, hours=1))
+            ids.append(p.id)
+        # Devueltos 0..2 son anteriores al corte; 3 es reciente y 4 sigue abierto
+        movidos = self.repo.archivar_devueltos(antes_de=self.base + timedelta(days=3), lote=2)
+
+        self.assertEqual(3, movidos)
+        self.assertEqual(ids[:3], sorted(PrestamoHistoricoModel.objects.values_list("id", flat=True)))
+        self.assertEqual(ids[3:], sorted(PrestamoModel.objects.values_list("id", flat=True)))
+
+        vistos, cursor = [], None
+        while True:
+            pagina = self.repo.listar(limit=2, cursor=cursor)
+            vistos.extend(p.id for p in pagina.items)
+            if pagina.siguiente is None:
+                break
+            cursor = pagina.siguiente
+        self.assertEqual(list(reversed(ids)), vistos)
+        self.assertEqual(list(reversed(ids)), [p.id for p in self.repo.iterar(chunk_size=2)])
+        self.assertEqual("registra", self.repo.listar(limit=5).items[-1].usuario_registra_username)
+
+        devueltos = self.repo.listar(limit=10, filtro=FiltroPrestamos(estado=EstadoPrestamo.DEVUELTO))
+        self.assertEqual(4, len(devueltos.items))
+        with self.assertNumQueries(1):
+            abiertos = self.repo.listar(limit=10, filtro=FiltroPrestamos(estado=EstadoPrestamo.ASIGNADO))
+        self.assertEqual([ids[4]], [p.id for p in abiertos.items])
+
+        self.assertEqual(0, self.repo.archivar_devueltos(antes_de=self.base + timedelta(days=3)))
+
+
+    def test_prestamo_archivado_entre_las_dos_lecturas_sale_una_vez(self) -> None:
+        ids = []
+        for i in range(3):
+            p = self._crear(i)
+            self.repo.marcar_devolucion(p.id, self.base + timedelta(hours=1))
+            ids.append(p.id)
+        # Foto de una lectura que vio la fila en la tabla caliente y, ya archivada, en el historico
+        fila = PrestamoModel.objects.filter(id=ids[1]).values().get()
+        PrestamoHistoricoModel.objects.create(archivado_en=self.base, **fila)
+
+        self.assertEqual(list(reversed(ids)), [p.id for p in self.repo.iterar(chunk_size=2)])
+        pagina = self.repo.listar(limit=2)
+        self.assertEqual(list(reversed(ids))[:2], [p.id for p in pagina.items])
+        self.assertEqual([ids[0]], [p.id for p in self.repo.listar(limit=2, cursor=pagina.siguiente).items])
+
+    def test_intervalos_radio_incluye_el_prestamo_en_curso_al_inicio_de_la_ventana(self) -> None:
+        def prestamo(idx: int, inicio: float, fin: float | None, radio: str = "RF-900"):
+            p = self.repo.crear(
+                Prestamo(
+                    id=None,
+                    cedula=f"200{idx}",
+                    empleado_nombre=f"Empleado {idx}",
+                    usuario_sap=f"sap-{idx}",
+                    codigo_radio=radio,
+                    fecha_hora_prestamo=self.base + timedelta(hours=inicio),
+                    turno=Turno.T1,
+                    estado=EstadoPrestamo.ASIGNADO,
+                    usuario_registra_id=self.user.id,
+                )
+            )
+            if fin is not None:
+                self.repo.marcar_devolucion(p.id, self.base + timedelta(hours=fin))
+            return p.id
+
+        viejo = prestamo(0, -48, -47)  # termino antes de la ventana
+        en_curso = prestamo(1, -2, 1)  # empezo antes y sigue en uso al inicio
+        self.repo.archivar_devueltos(antes_de=self.base)  # ambos pasan al historico
+        dentro = prestamo(2, 3, 4)
+        abierto = prestamo(3, 6, None)
+        prestamo(4, 3, 5, radio="RF-901")  # otra radio
+
+        with self.assertNumQueries(4):  # dos busquedas por tabla
+            intervalos = self.repo.intervalos_radio(
+                codigo_radio="RF-900", desde=self.base, hasta=self.base + timedelta(hours=12)
+            )
+
+        self.assertEqual([en_curso, dentro, abierto], [i.id for i in intervalos])
+        self.assertEqual(("2001", self.base - timedelta(hours=2)), (intervalos[0].cedula, intervalos[0].inicio))
+        self.assertIsNone(intervalos[-1].fin)
+        # Ventana en la que la radio estuvo libre: el anterior ya se habia devuelto
+        libre = self.repo.intervalos_radio(
+            codigo_radio="RF-900", desde=self.base + timedelta(hours=1), hasta=self.base + timedelta(hours=2)
+        )
+        self.assertEqual([], libre)
+        self.assertNotIn(viejo, [i.id for i in intervalos])
+
+    def test_listar_abiertos_en_un_instante_sobre_ambas_tablas(self) -> None:
+        for i in range(4):
+            RadioFrecuenciaModel.objects.create(codigo=f"RF-{i:03d}")
+        t = self.base + timedelta(hours=10)
+        archivado = self._crear(0, fecha=t - timedelta(hours=3))
+        self.repo.marcar_devolucion(archivado.id, t + timedelta(hours=1))
+        self.repo.archivar_devueltos(antes_de=t)
+        devuelto_antes = self._crear(1, fecha=t - timedelta(hours=2))
+        self.repo.marcar_devolucion(devuelto_antes.id, t - timedelta(hours=1))
+        sigue_abierto = self._crear(2, fecha=t - timedelta(hours=1))
+        self._crear(3, fecha=t + timedelta(minutes=1))  # empieza despues de t
+        # Radios que no estan (o ya no estan) en el catalogo: igual aparecen
+        sin_catalogo = self._crear(4, fecha=t - timedelta(hours=5))
+        RadioFrecuenciaModel.objects.create(codigo="RF-005")
+        borrada = self._crear(5, fecha=t - timedelta(hours=4))
+        self.repo.marcar_devolucion(borrada.id, t + timedelta(minutes=30))
+        RadioFrecuenciaModel.objects.filter(codigo="RF-005").delete()
+
+        en_t = self.repo.listar_abiertos_en(t)
+
+        self.assertEqual([sin_catalogo.id, borrada.id, archivado.id, sigue_abierto.id], [p.id for p in en_t])
+        self.assertEqual([], self.repo.listar_abiertos_en(self.base))
+
+    def test_en_curso_en_salta_por_el_indice_sin_recorrer_el_historial(self) -> None:
+        for i in range(3):
+            self._crear(i)
+        for modelo in (PrestamoModel, PrestamoHistoricoModel):
+            with self.subTest(tabla=modelo._meta.db_table):
+                plan = en_curso_en(modelo, self.base + timedelta(hours=1)).explain()
+                # Solo el CTE (unas filas por radio) puede aparecer como SCAN; la tabla, siempre SEARCH
+                self.assertIsNone(re.search(rf"SCAN {modelo._meta.db_table}\b", plan), plan)
+                self.assertNotIn("TEMP B-TREE", plan, plan)
+                self.assertIn(f"SEARCH {modelo._meta.db_table} USING COVERING INDEX", plan, plan)
+
+    def test_estadisticas_empleado_en_un_aggregate_por_tabla(self) -> None:
+        def prestamo(inicio_h: float, fin_h: float | None, radio: str) -> Prestamo:
+            p = self.repo.crear(
+                Prestamo(
+                    id=None,
+                    cedula="3001",
+                    empleado_nombre="Empleado",
+                    usuario_sap="sap-3001",
+                    codigo_radio=radio,
+                    fecha_hora_prestamo=self.base + timedelta(hours=inicio_h),
+                    turno=Turno.T1,
+                    estado=EstadoPrestamo.ASIGNADO,
+                    usuario_registra_id=self.user.id,
+                )
+            )
+            if fin_h is not None:
+                self.repo.marcar_devolucion(p.id, self.base + timedelta(hours=fin_h))
+            return p
+
+        prestamo(0, 2, "RF-1")
+        self.repo.archivar_devueltos(antes_de=self.base + timedelta(hours=1))
+        prestamo(3, 7, "RF-2")
+        abierto = prestamo(8, None, "RF-3")
+
+        with self.assertNumQueries(2):
+            stats = self.repo.estadisticas_empleado("3001")
+
+        self.assertEqual((3, 2), (stats.prestamos, stats.devueltos))
+        self.assertAlmostEqual(3.0, stats.media_horas, places=3)
+        self.assertEqual(abierto.fecha_hora_prestamo, stats.ultimo_prestamo)
+        self.assertEqual(
+            (abierto.id, "RF-3", abierto.fecha_hora_prestamo), (stats.abierto_id, stats.abierto_radio, stats.abierto_desde)
+        )
+        vacio = self.repo.estadisticas_empleado("999")
+        self.assertEqual((0, None, None), (vacio.prestamos, vacio.media_horas, vacio.abierto_id))
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "lock de lectura propio de SQLite")
+class IterarSinRetenerLecturaTests(TransactionTestCase):
+    def test_exportacion_a_medias_no_impide_confirmar_a_otro_escritor(self) -> None:
+        user = get_user_model().objects.create_user(username="registra", password="pass")
+        base = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+        for i in range(5):
+            PrestamoModel.objects.create(
+                cedula=f"100{i}",
+                empleado_nombre=f"Empleado {i}",
+                usuario_sap=f"sap-{i}",
+                codigo_radio=f"RF-{i:03d}",
+                fecha_hora_prestamo=base + timedelta(minutes=i),
+                turno=Turno.T1.value,
+                estado=EstadoPrestamo.ASIGNADO.value,
+                usuario_registra=user,
+            )
+        exportacion = DjangoPrestamoRepository().iterar(chunk_size=2)
+        vistos = [next(exportacion).id]
+
+        # Otro proceso escribe mientras la descarga esta detenida entre bloques
+        otro = sqlite3.connect(connection.settings_dict["NAME"], timeout=0.2)
+        try:
+            otro.execute("UPDATE prestamos SET empleado_nombre = 'Cambiado' WHERE cedula = '1000'")
+            otro.commit()
+        finally:
+            otro.close()
+
+        vistos.extend(p.id for p in exportacion)
+        self.assertEqual(5, len(set(vistos)))
@@ -0,0 +1,164 @@
+import importlib
+from datetime import date, datetime, timedelta
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+
+from app.admin import PrestamoAdmin, marcar_como_devuelto
+from app.application.services import PrestamosService
+from app.domain.reportes import DIMENSION_EMPLEADO, DIMENSION_RADIO, DIMENSION_TURNO
+from app.infrastructure.models import (
+    EmpleadoModel,
+    PrestamoModel,
+    RadioFrecuenciaModel,
+    ResumenDiarioModel,
+    SapUsuarioModel,
+)
+from app.infrastructure.broker import prestamos_broker
+from app.infrastructure.reportes import DjangoResumenesRepository
+from app.infrastructure.repositories import (
+    DjangoEmpleadoRepository,
+    DjangoPrestamoRepository,
+    DjangoRadioRepository,
+    DjangoSapUsuarioRepository,
+    DjangoUnitOfWork,
+)
+
+BOGOTA = ZoneInfo("America/Bogota")
+
+
+class ResumenesRepositoryTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username="registra", password="pass")
+        for i in range(3):
+            EmpleadoModel.objects.create(cedula=f"80{i}", nombre=f"Empleado {i}")
+            RadioFrecuenciaModel.objects.create(codigo=f"RF-{i}")
+            SapUsuarioModel.objects.create(username=f"sap-{i}")
+        self.repo = DjangoResumenesRepository()
+        self.service = PrestamosService(
+            DjangoEmpleadoRepository(),
+            DjangoRadioRepository(),
+            DjangoSapUsuarioRepository(),
+            DjangoPrestamoRepository(),
+            DjangoUnitOfWork(),
+            resumenes=self.repo,
+        )
+
+    def _asignar(self, i: int, ahora: datetime) -> None:
+        self.service.asignar(
+            cedula=f"80{i}",
+            codigo_radio=f"RF-{i}",
+            usuario_sap=f"sap-{i}",
+            usuario_registra_id=self.user.id,
+            ahora=ahora,
+        )
+
+    def _foto(self, dimension: str):
+        return [
+            (r.dia, r.clave, r.asignados, r.devueltos, round(r.segundos_uso, 3))
+            for r in self.repo.listar_resumenes(
+                dimension=dimension, desde=datetime(2024, 3, 1).date(), hasta=datetime(2024, 3, 2).date()
+            )
+        ]
+
+    def test_incrementos_del_servicio_coinciden_con_la_reconstruccion(self) -> None:
+        manana = datetime(2024, 3, 1, 7, 0, tzinfo=BOGOTA)
+        self._asignar(0, manana)
+        self._asignar(1, manana + timedelta(minutes=30))
+        self.service.devolver(codigo_radio="RF-0", ahora=manana + timedelta(hours=2))
+        # 23:30 local es el 2 de marzo en UTC: cuenta en el dia local de inicio
+        self._asignar(0, datetime(2024, 3, 1, 23, 30, tzinfo=BOGOTA))
+        self.service.devolver_lote(
+            items=[{"codigo_radio": "RF-0"}, {"codigo_radio": "RF-1"}],
+            ahora=datetime(2024, 3, 2, 1, 0, tzinfo=BOGOTA),
+        )
+        self._asignar(2, datetime(2024, 3, 2, 15, 0, tzinfo=BOGOTA))
+
+        incremental = {d: self._foto(d) for d in (DIMENSION_TURNO, DIMENSION_RADIO, DIMENSION_EMPLEADO)}
+
+        dia1, dia2 = datetime(2024, 3, 1).date(), datetime(2024, 3, 2).date()
+        self.assertEqual(
+            [(dia1, "RF-0", 2, 2, 7200.0 + 5400.0), (dia1, "RF-1", 1, 1, 63000.0), (dia2, "RF-2", 1, 0, 0.0)],
+            incremental[DIMENSION_RADIO],
+        )
+
+        self.assertEqual(9, self.repo.reconstruir())
+        for dimension, filas in incremental.items():
+            self.assertEqual(filas, self._foto(dimension))
+
+    def test_reconstruir_corrige_dias_desfasados_y_borra_filas_sobrantes(self) -> None:
+        manana = datetime(2024, 3, 1, 7, 0, tzinfo=BOGOTA)
+        self._asignar(0, manana)
+        self.service.devolver(codigo_radio="RF-0", ahora=manana + timedelta(hours=1))
+        self._asignar(1, datetime(2024, 3, 2, 8, 0, tzinfo=BOGOTA))
+        correcto = {d: self._foto(d) for d in (DIMENSION_TURNO, DIMENSION_RADIO, DIMENSION_EMPLEADO)}
+        # Prestamo asignado antes de existir el resumen: solo llego la devolucion
+        ResumenDiarioModel.objects.filter(dia=date(2024, 3, 1)).update(asignados=0)
+        ResumenDiarioModel.objects.create(dia=date(2023, 1, 1), dimension=DIMENSION_RADIO, clave="RF-9", asignados=1)
+        ResumenDiarioModel.objects.create(dia=date(2024, 9, 1), dimension=DIMENSION_RADIO, clave="RF-9", asignados=1)
+
+        self.assertEqual(6, self.repo.reconstruir())
+
+        self.assertEqual(correcto, {d: self._foto(d) for d in correcto})
+        self.assertEqual(6, ResumenDiarioModel.objects.count())
+
+    def test_migracion_hace_el_backfill_de_los_prestamos_existentes(self) -> None:
+        manana = datetime(2024, 3, 1, 7, 0, tzinfo=BOGOTA)
+        self._asignar(0, manana)
+        self.service.devolver(codigo_radio="RF-0", ahora=manana + timedelta(hours=2))
+        self._asignar(1, datetime(2024, 3, 1, 23, 30, tzinfo=BOGOTA))
+        incremental = {d: self._foto(d) for d in (DIMENSION_TURNO, DIMENSION_RADIO, DIMENSION_EMPLEADO)}
+        ResumenDiarioModel.objects.all().delete()
+
+        migracion = importlib.import_module("app.migrations.0017_backfill_resumen_diario")
+        migracion.backfill_resumen_diario(apps, None)
+
+        self.assertEqual(incremental, {d: self._foto(d) for d in incremental})
+
+    def test_edicion_y_borrado_en_el_admin_corrigen_el_resumen(self) -> None:
+        manana = datetime(2024, 3, 1, 7, 0, tzinfo=BOGOTA)
+        self._asignar(0, manana)
+        self.service.devolver(codigo_radio="RF-0", ahora=manana + timedelta(hours=1))
+        self._asignar(1, manana)
+        self._asignar(2, manana)
+        modelo_admin = PrestamoAdmin(PrestamoModel, admin.site)
+        request = RequestFactory().post("/admin/")
+
+        # Se corrige la devolucion y se mueve el inicio al dia siguiente
+        obj = PrestamoModel.objects.get(codigo_radio="RF-0")
+        obj.fecha_hora_prestamo = datetime(2024, 3, 2, 6, 0, tzinfo=BOGOTA)
+        obj.fecha_hora_devolucion = datetime(2024, 3, 2, 9, 30, tzinfo=BOGOTA)
+        modelo_admin.save_model(request, obj, None, True)
+        modelo_admin.delete_model(request, PrestamoModel.objects.get(codigo_radio="RF-1"))
+        modelo_admin.delete_queryset(request, PrestamoModel.objects.filter(codigo_radio="RF-2"))
+
+        incremental = {d: self._foto(d) for d in (DIMENSION_TURNO, DIMENSION_RADIO, DIMENSION_EMPLEADO)}
+        self.assertEqual([(date(2024, 3, 2), "RF-0", 1, 1, 12600.0)], incremental[DIMENSION_RADIO])
+        self.repo.reconstruir()
+        self.assertEqual(incremental, {d: self._foto(d) for d in incremental})
+
+    def test_marcar_como_devuelto_en_el_admin_acumula_y_publica_al_confirmar(self) -> None:
+        manana = datetime(2024, 3, 1, 7, 0, tzinfo=BOGOTA)
+        self._asignar(0, manana)
+        self._asignar(1, manana)
+        modelo_admin = PrestamoAdmin(PrestamoModel, admin.site)
+        ultimo = prestamos_broker.ultimo_id
+
+        with (
+            mock.patch("django.utils.timezone.now", return_value=manana + timedelta(hours=2)),
+            mock.patch.object(modelo_admin, "message_user"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            marcar_como_devuelto(modelo_admin, RequestFactory().post("/admin/"), PrestamoModel.objects.all())
+            self.assertEqual(ultimo, prestamos_broker.ultimo_id)
+
+        mensajes = prestamos_broker.leer_desde(ultimo).mensajes
+        self.assertEqual(["devuelto", "devuelto"], [m.tipo for m in mensajes])
+        self.assertEqual({"RF-0", "RF-1"}, {m.payload.codigo_radio for m in mensajes})
+        incremental = {d: self._foto(d) for d in (DIMENSION_TURNO, DIMENSION_RADIO, DIMENSION_EMPLEADO)}
+        self.repo.reconstruir()
+        self.assertEqual(incremental, {d: self._foto(d) for d in incremental})
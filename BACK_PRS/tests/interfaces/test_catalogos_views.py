@@ -1,8 +1,11 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APITestCase
 
-from app.infrastructure.models import EmpleadoModel, RadioFrecuenciaModel, SapUsuarioModel
+from app.infrastructure.models import EmpleadoModel, PrestamoModel, RadioFrecuenciaModel, SapUsuarioModel
 
 
 class CatalogosViewsTests(APITestCase):
@@ -52,3 +55,88 @@ class CatalogosViewsTests(APITestCase):
         )
         self.assertEqual(201, resp.status_code)
         self.assertIsNone(resp.data["empleado_cedula"])
+
+    def test_listado_responde_304_mientras_no_cambie_la_coleccion(self) -> None:
+        url = reverse("radio-list")
+        self.client.post(url, {"codigo": "RF-300", "activo": True}, format="json")
+
+        first = self.client.get(url)
+        self.assertEqual(200, first.status_code)
+        etag = first["ETag"]
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, cached.status_code)
+        self.assertEqual(etag, cached["ETag"])
+
+        otros_filtros = self.client.get(url, {"q": "RF"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, otros_filtros.status_code)
+
+        self.client.post(url, {"codigo": "RF-301", "activo": True}, format="json")
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, changed.status_code)
+        self.assertEqual(2, len(changed.data))
+
+    def test_timeline_de_radio_en_formato_compacto(self) -> None:
+        bogota = ZoneInfo("America/Bogota")
+        RadioFrecuenciaModel.objects.create(codigo="RF-7")
+        PrestamoModel.objects.create(
+            cedula="555",
+            empleado_nombre="Empleado 5",
+            usuario_sap="sap-5",
+            codigo_radio="RF-7",
+            fecha_hora_prestamo=datetime(2024, 3, 1, 7, 0, tzinfo=bogota),
+            fecha_hora_devolucion=datetime(2024, 3, 1, 13, 0, tzinfo=bogota),
+            turno="Turno 1 (6 am - 2 pm)",
+            estado="DEVUELTO",
+            usuario_registra=self.admin,
+        )
+        url = reverse("radio-timeline", kwargs={"codigo": "rf-7"})
+
+        response = self.client.get(url, {"desde": "2024-03-01", "hasta": "2024-03-01"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(["id", "cedula", "empleado_nombre", "usuario_sap", "inicio", "fin"], response.data["columnas"])
+        [intervalo] = response.data["intervalos"]
+        self.assertEqual(["555", "Empleado 5", "sap-5"], intervalo[1:4])
+        self.assertEqual(["2024-03-01T07:00:00-05:00", "2024-03-01T13:00:00-05:00"], intervalo[4:])
+        self.assertEqual([], self.client.get(url, {"desde": "2024-03-02", "hasta": "2024-03-03"}).data["intervalos"])
+        self.assertEqual(404, self.client.get(reverse("radio-timeline", kwargs={"codigo": "RF-X"})).status_code)
+
+        # Borrada del catalogo: su historial sigue consultable
+        RadioFrecuenciaModel.objects.filter(codigo="RF-7").delete()
+        response = self.client.get(url, {"desde": "2024-03-02", "hasta": "2024-03-03"})
+        self.assertEqual((200, []), (response.status_code, response.data["intervalos"]))
+
+    def test_historial_de_empleado_paginado_con_estadisticas(self) -> None:
+        bogota = ZoneInfo("America/Bogota")
+        EmpleadoModel.objects.create(cedula="777", nombre="Empleado Siete")
+        EmpleadoModel.objects.create(cedula="778", nombre="Sin prestamos")
+        for dia in (1, 2, 3):
+            PrestamoModel.objects.create(
+                cedula="777",
+                empleado_nombre="Empleado Siete",
+                usuario_sap="sap-7",
+                codigo_radio=f"RF-{dia}",
+                fecha_hora_prestamo=datetime(2024, 3, dia, 7, 0, tzinfo=bogota),
+                fecha_hora_devolucion=datetime(2024, 3, dia, 9, 0, tzinfo=bogota) if dia < 3 else None,
+                turno="Turno 1 (6 am - 2 pm)",
+                estado="DEVUELTO" if dia < 3 else "ASIGNADO",
+                usuario_registra=self.admin,
+            )
+        url = reverse("empleado-prestamos-empleado", kwargs={"cedula": "777"})
+
+        primera = self.client.get(url, {"limit": 2})
+
+        self.assertEqual(200, primera.status_code)
+        self.assertEqual(["RF-3", "RF-2"], [p["codigo_radio"] for p in primera.data["results"]])
+        stats = primera.data["estadisticas"]
+        self.assertEqual((3, 2, "RF-3"), (stats["prestamos"], stats["devueltos"], stats["abierto_radio"]))
+        self.assertAlmostEqual(2.0, stats["media_horas"], places=3)
+        segunda = self.client.get(primera.data["next"])
+        self.assertEqual(["RF-1"], [p["codigo_radio"] for p in segunda.data["results"]])
+        self.assertIsNone(segunda.data["next"])
+
+        vacio = self.client.get(reverse("empleado-prestamos-empleado", kwargs={"cedula": "778"}))
+        self.assertEqual((200, 0), (vacio.status_code, vacio.data["estadisticas"]["prestamos"]))
+        self.assertEqual(404, self.client.get(reverse("empleado-prestamos-empleado", kwargs={"cedula": "404"})).status_code)
+
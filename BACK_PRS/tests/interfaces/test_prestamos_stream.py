@@ -0,0 +1,94 @@
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.domain.entities import Prestamo
+from app.domain.value_objects import EstadoPrestamo, Turno
+from app.infrastructure.broker import EventBroker
+from app.interfaces.views.stream import _eventos
+
+
+class PrestamosStreamTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username="tablero", password="pass")
+        self.bearer = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    def test_bajo_wsgi_responde_503(self) -> None:
+        self.assertEqual(503, self.client.get("/api/prestamos/stream/").status_code)
+        response = self.client.post("/api/prestamos/stream/ticket/", headers=self.bearer)
+        self.assertEqual(503, response.status_code)
+
+    async def test_requiere_autenticacion(self) -> None:
+        response = await self.async_client.get("/api/prestamos/stream/")
+        self.assertEqual(401, response.status_code)
+
+    async def test_jwt_en_query_string_no_autentica(self) -> None:
+        response = await self.async_client.get(
+            "/api/prestamos/stream/", {"token": str(AccessToken.for_user(self.user))}
+        )
+        self.assertEqual(401, response.status_code)
+
+    async def _ticket(self) -> dict:
+        return (await self.async_client.post("/api/prestamos/stream/ticket/", headers=self.bearer)).json()
+
+    async def test_acepta_ticket_de_corta_vida_una_sola_vez(self) -> None:
+        ticket = await self._ticket()
+        self.assertEqual(60, ticket["expira_en"])
+
+        response = await self.async_client.get("/api/prestamos/stream/", {"ticket": ticket["ticket"]})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("text/event-stream", response["Content-Type"])
+        response.close()
+
+        repetido = await self.async_client.get("/api/prestamos/stream/", {"ticket": ticket["ticket"]})
+        self.assertEqual(401, repetido.status_code)
+
+    async def test_rechaza_ticket_caducado_o_manipulado(self) -> None:
+        ticket = await self._ticket()
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + 61):
+            caducado = await self.async_client.get("/api/prestamos/stream/", {"ticket": ticket["ticket"]})
+        self.assertEqual(401, caducado.status_code)
+        ticket = await self._ticket()
+        manipulado = await self.async_client.get("/api/prestamos/stream/", {"ticket": ticket["ticket"] + "x"})
+        self.assertEqual(401, manipulado.status_code)
+
+    async def test_acepta_bearer_en_cabecera(self) -> None:
+        response = await self.async_client.get("/api/prestamos/stream/", headers=self.bearer)
+        self.assertEqual(200, response.status_code)
+        response.close()
+
+
+class EventosGeneratorTests(TestCase):
+    async def test_emite_eventos_con_id_reanudable(self) -> None:
+        broker = EventBroker()
+        prestamo = Prestamo(
+            id=7,
+            cedula="1",
+            empleado_nombre="Alice",
+            usuario_sap="sap",
+            codigo_radio="RF-1",
+            fecha_hora_prestamo=datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc),
+            turno=Turno.T1,
+            estado=EstadoPrestamo.ASIGNADO,
+            usuario_registra_id=1,
+        )
+        broker.publicar("asignado", prestamo)
+
+        stream = _eventos(broker, 0, resincronizar=False)
+        self.assertTrue((await anext(stream)).startswith("retry:"))
+        chunk = await anext(stream)
+
+        self.assertIn(f"id: {broker.instancia}:1\n", chunk)
+        self.assertIn("event: asignado\n", chunk)
+        self.assertIn('"codigo_radio":"RF-1"', chunk)
+        await stream.aclose()
+
+    async def test_last_event_id_de_otro_proceso_pide_resincronizar(self) -> None:
+        stream = _eventos(EventBroker(), 0, resincronizar=True)
+        await anext(stream)
+        self.assertIn("event: reset", await anext(stream))
+        await stream.aclose()
@@ -1,11 +1,22 @@
-from datetime import datetime, timezone
+import io
+import unittest
+import zipfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.infrastructure.parquet import PARQUET_DISPONIBLE
 
 from app.infrastructure.models import (
     EmpleadoModel,
+    PrestamoHistoricoModel,
+    PrestamoModel,
     RadioFrecuenciaModel,
     SapUsuarioModel,
 )
@@ -45,3 +56,258 @@ class PrestamoViewsTests(APITestCase):
         )
         self.assertEqual(200, devolver_resp.status_code)
         self.assertEqual("DEVUELTO", devolver_resp.data["estado"])
+
+    def test_listar_paginado_con_next(self) -> None:
+        url = reverse("prestamo-list")
+        self.client.post(
+            url,
+            {"cedula": self.empleado.cedula, "codigo_radio": self.radio.codigo, "usuario_sap": self.sap.username},
+            format="json",
+        )
+        otro = EmpleadoModel.objects.create(cedula="9002", nombre="Empleado Dos", activo=True)
+        radio = RadioFrecuenciaModel.objects.create(codigo="RF-201", activo=True)
+        sap = SapUsuarioModel.objects.create(username="sap-dos", activo=True)
+        self.client.post(
+            url,
+            {"cedula": otro.cedula, "codigo_radio": radio.codigo, "usuario_sap": sap.username},
+            format="json",
+        )
+
+        first = self.client.get(url, {"limit": 1})
+        self.assertEqual(200, first.status_code)
+        self.assertEqual(1, len(first.data["results"]))
+        self.assertIsNotNone(first.data["next"])
+
+        second = self.client.get(first.data["next"])
+        self.assertEqual(1, len(second.data["results"]))
+        self.assertIsNone(second.data["next"])
+        self.assertNotEqual(first.data["results"][0]["id"], second.data["results"][0]["id"])
+
+    def test_listar_rechaza_cursor_invalido(self) -> None:
+        response = self.client.get(reverse("prestamo-list"), {"cursor": "no-es-un-cursor"})
+        self.assertEqual(400, response.status_code)
+
+    def test_listar_filtra_por_estado_turno_y_fechas(self) -> None:
+        url = reverse("prestamo-list")
+        self.client.post(
+            url,
+            {
+                "cedula": self.empleado.cedula,
+                "codigo_radio": self.radio.codigo,
+                "usuario_sap": self.sap.username,
+                "ahora": "2024-03-10T08:00:00-05:00",
+            },
+            format="json",
+        )
+
+        coincide = self.client.get(url, {"estado": "ASIGNADO", "turno": "1", "desde": "2024-03-10", "hasta": "2024-03-10"})
+        self.assertEqual(1, len(coincide.data["results"]))
+
+        fuera_de_rango = self.client.get(url, {"desde": "2024-03-11"})
+        self.assertEqual(0, len(fuera_de_rango.data["results"]))
+
+        invalido = self.client.get(url, {"turno": "9"})
+        self.assertEqual(400, invalido.status_code)
+
+    def test_modo_delta_devuelve_solo_cambios_desde_watermark(self) -> None:
+        url = reverse("prestamo-list")
+        self.client.post(
+            url,
+            {"cedula": self.empleado.cedula, "codigo_radio": self.radio.codigo, "usuario_sap": self.sap.username},
+            format="json",
+        )
+        inicial = self.client.get(url)
+        watermark = inicial.data["watermark"]
+        self.assertIsNotNone(watermark)
+
+        sin_cambios = self.client.get(url, {"since": watermark})
+        self.assertEqual([], sin_cambios.data["results"])
+        self.assertEqual(watermark, sin_cambios.data["watermark"])
+
+        self.client.post(reverse("prestamo-devolver"), {"cedula": self.empleado.cedula}, format="json")
+        delta = self.client.get(url, {"since": watermark})
+        self.assertEqual(1, len(delta.data["results"]))
+        self.assertEqual("DEVUELTO", delta.data["results"][0]["estado"])
+        self.assertFalse(delta.data["has_more"])
+        self.assertNotEqual(watermark, delta.data["watermark"])
+
+        desde_cero = self.client.get(url, {"since": "0"})
+        self.assertEqual(1, len(desde_cero.data["results"]))
+
+    def test_resumen_cuenta_todo_el_filtro_en_servidor(self) -> None:
+        ahora = datetime(2024, 3, 12, 15, 0, tzinfo=timezone.utc)  # 10:00 en Bogota
+        comunes = dict(usuario_sap="sap-r", turno="Turno 1 (6 am - 2 pm)", usuario_registra=self.user)
+        PrestamoModel.objects.create(
+            cedula="1", empleado_nombre="Uno", codigo_radio="RF-1", estado="ASIGNADO",
+            fecha_hora_prestamo=ahora - timedelta(hours=1), **comunes,
+        )
+        PrestamoModel.objects.create(
+            cedula="2", empleado_nombre="Dos", codigo_radio="RF-2", estado="DEVUELTO",
+            fecha_hora_prestamo=ahora - timedelta(days=1), fecha_hora_devolucion=ahora - timedelta(hours=2), **comunes,
+        )
+        PrestamoHistoricoModel.objects.create(
+            id=900, cedula="3", empleado_nombre="Tres", codigo_radio="RF-3", estado="DEVUELTO",
+            fecha_hora_prestamo=ahora - timedelta(days=40), fecha_hora_devolucion=ahora - timedelta(days=39),
+            created_at=ahora, updated_at=ahora, archivado_en=ahora, **comunes,
+        )
+        url = reverse("prestamo-resumen")
+
+        with mock.patch("django.utils.timezone.now", return_value=ahora):
+            response = self.client.get(url)
+            solo_abiertos = self.client.get(url, {"estado": "ASIGNADO"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"total": 3, "abiertos": 1, "prestados_hoy": 1, "devueltos_hoy": 1}, response.data)
+        self.assertEqual({"total": 1, "abiertos": 1, "prestados_hoy": 1, "devueltos_hoy": 0}, solo_abiertos.data)
+
+        # El mismo ETag al dia siguiente no sirve: los conteos de hoy cambian a medianoche
+        with mock.patch("django.utils.timezone.now", return_value=ahora + timedelta(days=1)):
+            manana = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual((200, 0), (manana.status_code, manana.data["prestados_hoy"]))
+
+    def _asignar_uno(self) -> None:
+        self.client.post(
+            reverse("prestamo-list"),
+            {"cedula": self.empleado.cedula, "codigo_radio": self.radio.codigo, "usuario_sap": self.sap.username},
+            format="json",
+        )
+
+    def test_exportar_csv_en_streaming(self) -> None:
+        self._asignar_uno()
+
+        response = self.client.get(reverse("prestamo-exportar"), {"formato": "csv", "estado": "ASIGNADO"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn(self.radio.codigo, lines[1])
+
+    async def test_exportar_csv_bajo_asgi_no_bufferiza(self) -> None:
+        await sync_to_async(self._asignar_uno)()
+
+        response = await self.async_client.get(
+            reverse("prestamo-exportar"),
+            {"formato": "csv"},
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.is_async)
+        lines = b"".join([chunk async for chunk in response.streaming_content]).decode("utf-8-sig").splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn(self.radio.codigo, lines[1])
+
+    def test_exportar_xlsx_genera_libro_valido(self) -> None:
+
+        self._asignar_uno()
+
+        response = self.client.get(reverse("prestamo-exportar"), {"formato": "xlsx"})
+
+        self.assertEqual(200, response.status_code)
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as zf:
+            self.assertIsNone(zf.testzip())
+            sheet = zf.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(2, sheet.count("<row>"))
+        self.assertIn(self.empleado.nombre, sheet)
+
+    def test_devolver_lote_cierra_en_una_transaccion_con_resultado_por_item(self) -> None:
+        self._asignar_uno()
+        otro = EmpleadoModel.objects.create(cedula="9002", nombre="Empleado Dos", activo=True)
+        RadioFrecuenciaModel.objects.create(codigo="RF-201", activo=True)
+        SapUsuarioModel.objects.create(username="sap-dos", activo=True)
+        self.client.post(
+            reverse("prestamo-list"),
+            {"cedula": otro.cedula, "codigo_radio": "RF-201", "usuario_sap": "sap-dos"},
+            format="json",
+        )
+
+        response = self.client.post(
+            reverse("prestamo-devolver-lote"),
+            {
+                "items": [
+                    {"codigo_radio": " rf-200 "},
+                    {"usuario_sap": "sap-dos"},
+                    {"cedula": self.empleado.cedula},
+                    {"codigo_radio": "RF-999"},
+                    {},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, response.data["devueltos"])
+        results = response.data["results"]
+        self.assertEqual([True, True, False, False, False], [r["ok"] for r in results])
+        self.assertEqual("DEVUELTO", results[0]["prestamo"]["estado"])
+        self.assertIn("ya se incluyó", results[2]["error"])
+        self.assertIn("RF-999", results[3]["error"])
+        abiertos = self.client.get(reverse("prestamo-list"), {"estado": "ASIGNADO"})
+        self.assertEqual([], abiertos.data["results"])
+
+    def test_vencidos_materializados_por_comando(self) -> None:
+        hace_dos_dias = datetime.now(timezone.utc) - timedelta(days=2)
+        self._asignar_uno()
+        PrestamoModel.objects.update(fecha_hora_prestamo=hace_dos_dias)
+        otro = EmpleadoModel.objects.create(cedula="9002", nombre="Empleado Dos", activo=True)
+        RadioFrecuenciaModel.objects.create(codigo="RF-201", activo=True)
+        SapUsuarioModel.objects.create(username="sap-dos", activo=True)
+        self.client.post(  # abierto en el turno actual: no esta vencido
+            reverse("prestamo-list"),
+            {"cedula": otro.cedula, "codigo_radio": "RF-201", "usuario_sap": "sap-dos"},
+            format="json",
+        )
+
+        out = io.StringIO()
+        call_command("detectar_vencidos", stdout=out)
+        self.assertIn("1 préstamo(s) vencido(s)", out.getvalue())
+
+        response = self.client.get(reverse("prestamo-vencidos"))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([self.radio.codigo], [v["codigo_radio"] for v in response.data])
+        self.assertIsNotNone(response.data[0]["fin_turno"])
+
+        self.client.post(reverse("prestamo-devolver"), {"codigo_radio": self.radio.codigo}, format="json")
+        self.assertEqual([], self.client.get(reverse("prestamo-vencidos")).data)
+
+    def test_as_of_devuelve_quien_tenia_cada_radio_en_el_instante(self) -> None:
+        inicio = datetime(2024, 3, 12, 8, 30, tzinfo=timezone.utc)  # 03:30 en Bogota
+        self.client.post(
+            reverse("prestamo-list"),
+            {
+                "cedula": self.empleado.cedula,
+                "codigo_radio": self.radio.codigo,
+                "usuario_sap": self.sap.username,
+                "ahora": inicio.isoformat(),
+            },
+            format="json",
+        )
+        self.client.post(
+            reverse("prestamo-devolver"),
+            {"codigo_radio": self.radio.codigo, "ahora": (inicio + timedelta(hours=2)).isoformat()},
+            format="json",
+        )
+        url = reverse("prestamo-as-of")
+
+        response = self.client.get(url, {"t": "2024-03-12T03:40:00"})  # hora local
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            [(self.empleado.cedula, self.radio.codigo)], [(p["cedula"], p["codigo_radio"]) for p in response.data]
+        )
+        self.assertEqual([], self.client.get(url, {"t": "2024-03-12T06:00:00-05:00"}).data)
+        self.assertEqual(400, self.client.get(url).status_code)
+
+    def test_exportar_parquet_solo_para_administradores(self) -> None:
+        url = reverse("prestamo-exportar-parquet")
+        self.assertEqual(403, self.client.post(url, {}, format="json").status_code)
+
+    @unittest.skipIf(PARQUET_DISPONIBLE, "pyarrow instalado")
+    def test_exportar_parquet_sin_pyarrow_responde_503(self) -> None:
+        admin = get_user_model().objects.create_superuser(username="admin-bi", password="pass")
+        self.client.force_authenticate(admin)
+
+        response = self.client.post(reverse("prestamo-exportar-parquet"), {}, format="json")
+
+        self.assertEqual(503, response.status_code)
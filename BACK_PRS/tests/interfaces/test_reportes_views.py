@@ -0,0 +1,329 @@
+import io
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from app.application.reportes_service import UTILIZACION_DISPONIBLE
+from app.domain.reportes import ResultadoAnalitico
+from app.domain.value_objects import EstadoPrestamo, Turno
+from app.infrastructure.analitica import ANALITICA_DISPONIBLE
+from app.infrastructure.models import EntregaTurnoModel, PrestamoModel
+from app.infrastructure.reportes import DjangoResumenesRepository
+
+BOGOTA = ZoneInfo("America/Bogota")
+
+
+class ReportesViewsTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username="supervisor", password="pass")
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def _prestamo(
+        self, idx: int, local: datetime, turno: Turno, estado: EstadoPrestamo, devuelto: Optional[datetime] = None
+    ) -> None:
+        PrestamoModel.objects.create(
+            cedula=f"70{idx}",
+            empleado_nombre=f"Empleado {idx}",
+            usuario_sap=f"sap-{idx}",
+            codigo_radio=f"RF-{idx}",
+            fecha_hora_prestamo=local.replace(tzinfo=BOGOTA),
+            fecha_hora_devolucion=devuelto.replace(tzinfo=BOGOTA) if devuelto else None,
+            turno=turno.value,
+            estado=estado.value,
+            usuario_registra=self.user,
+        )
+
+    def test_turnos_agrupa_por_dia_local_y_turno(self) -> None:
+        # Devuelto en el turno 2: la devolucion cuenta ahi, no en el turno 1 del prestamo
+        self._prestamo(1, datetime(2024, 3, 1, 7, 0), Turno.T1, EstadoPrestamo.DEVUELTO, datetime(2024, 3, 1, 15, 0))
+        self._prestamo(2, datetime(2024, 3, 1, 9, 0), Turno.T1, EstadoPrestamo.ASIGNADO)
+        self._prestamo(3, datetime(2024, 3, 1, 15, 0), Turno.T2, EstadoPrestamo.DEVUELTO, datetime(2024, 3, 1, 16, 0))
+        # 23:30 en Bogota ya es 2 de marzo en UTC: debe contar en el dia local 1 de marzo
+        self._prestamo(4, datetime(2024, 3, 1, 23, 30), Turno.T3, EstadoPrestamo.ASIGNADO)
+        self._prestamo(5, datetime(2024, 3, 3, 1, 0), Turno.T3, EstadoPrestamo.DEVUELTO, datetime(2024, 3, 3, 6, 30))
+        self._prestamo(6, datetime(2024, 3, 5, 8, 0), Turno.T1, EstadoPrestamo.ASIGNADO)  # fuera de rango
+        # Iniciado antes del rango, devuelto dentro: solo cuenta la devolucion
+        self._prestamo(7, datetime(2024, 2, 29, 22, 0), Turno.T3, EstadoPrestamo.DEVUELTO, datetime(2024, 3, 1, 6, 10))
+        # Filas insertadas sin pasar por el servicio: el reporte lee el resumen diario
+        DjangoResumenesRepository().reconstruir()
+
+        response = self.client.get(reverse("reporte-turnos"), {"desde": "2024-03-01", "hasta": "2024-03-03"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([t.value for t in Turno], response.data["turnos"])
+        self.assertEqual(["2024-03-01", "2024-03-02", "2024-03-03"], response.data["dias"])
+        self.assertEqual([[2, 1, 1], [0, 0, 0], [0, 0, 1]], response.data["asignaciones"])
+        self.assertEqual([[1, 2, 0], [0, 0, 0], [1, 0, 0]], response.data["devoluciones"])
+        self.assertIn("ETag", response)
+
+    def test_turnos_sin_parametros_cambia_de_etag_al_cambiar_de_dia(self) -> None:
+        url = reverse("reporte-turnos")
+
+        with mock.patch("django.utils.timezone.now", return_value=datetime(2024, 3, 1, 23, 0, tzinfo=BOGOTA)):
+            hoy = self.client.get(url)
+        with mock.patch("django.utils.timezone.now", return_value=datetime(2024, 3, 2, 7, 0, tzinfo=BOGOTA)):
+            manana = self.client.get(url, HTTP_IF_NONE_MATCH=hoy["ETag"])
+
+        self.assertEqual(["2024-03-01"], hoy.data["dias"])
+        self.assertEqual((200, ["2024-03-01", "2024-03-02"]), (manana.status_code, manana.data["dias"]))
+
+    def test_turnos_rechaza_rango_invalido(self) -> None:
+        url = reverse("reporte-turnos")
+        self.assertEqual(400, self.client.get(url, {"desde": "2024-03-05", "hasta": "2024-03-01"}).status_code)
+        self.assertEqual(400, self.client.get(url, {"desde": "2022-01-01", "hasta": "2024-01-01"}).status_code)
+
+    @unittest.skipUnless(UTILIZACION_DISPONIBLE, "requiere numpy")
+    def test_utilizacion_lee_duraciones_desde_la_bd(self) -> None:
+        self._prestamo(1, datetime(2024, 3, 1, 7, 0), Turno.T1, EstadoPrestamo.DEVUELTO)
+        PrestamoModel.objects.filter(cedula="701").update(
+            fecha_hora_devolucion=datetime(2024, 3, 1, 8, 30, tzinfo=BOGOTA)
+        )
+        self._prestamo(2, datetime(2024, 3, 1, 9, 0), Turno.T1, EstadoPrestamo.ASIGNADO)
+
+        response = self.client.get(reverse("reporte-utilizacion"), {"desde": "2024-03-01", "hasta": "2024-03-01"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(24.0, response.data["horas_periodo"])
+        self.assertEqual(["RF-1", "RF-2"], [r["codigo_radio"] for r in response.data["radios"]])
+        self.assertAlmostEqual(1.5, response.data["radios"][0]["media_horas"], places=3)
+        self.assertAlmostEqual(15.0, response.data["radios"][1]["horas_en_uso"], places=3)  # abierto hasta fin de dia
+        self.assertEqual(2, response.data["flota"]["prestamos"])
+
+    @unittest.skipUnless(UTILIZACION_DISPONIBLE, "requiere numpy")
+    def test_utilizacion_recorta_los_prestamos_iniciados_antes_del_rango(self) -> None:
+        self._prestamo(1, datetime(2024, 2, 28, 8, 0), Turno.T1, EstadoPrestamo.DEVUELTO, datetime(2024, 2, 28, 9, 0))
+        self._prestamo(2, datetime(2024, 2, 29, 22, 0), Turno.T3, EstadoPrestamo.DEVUELTO, datetime(2024, 3, 1, 2, 0))
+        PrestamoModel.objects.filter(cedula="702").update(codigo_radio="RF-1")
+
+        response = self.client.get(reverse("reporte-utilizacion"), {"desde": "2024-03-01", "hasta": "2024-03-01"})
+
+        self.assertEqual(200, response.status_code)
+        [rf1] = response.data["radios"]
+        self.assertEqual((1, 1), (rf1["prestamos"], rf1["cerrados"]))
+        self.assertAlmostEqual(4.0, rf1["media_horas"], places=3)
+        self.assertAlmostEqual(2.0, rf1["horas_en_uso"], places=3)
+
+    @unittest.skipUnless(UTILIZACION_DISPONIBLE, "requiere numpy")
+    def test_utilizacion_etag_cambia_con_el_minuto_mientras_el_rango_sigue_abierto(self) -> None:
+        self._prestamo(1, datetime(2024, 3, 1, 7, 0), Turno.T1, EstadoPrestamo.ASIGNADO)
+        url = reverse("reporte-utilizacion")
+        ahora = datetime(2024, 3, 1, 12, 0, 10, tzinfo=BOGOTA)
+
+        with mock.patch("django.utils.timezone.now", return_value=ahora):
+            abierto = self.client.get(url)
+            cerrado = self.client.get(url, {"desde": "2024-02-01", "hasta": "2024-02-29"})
+            self.assertEqual(304, self.client.get(url, HTTP_IF_NONE_MATCH=abierto["ETag"]).status_code)
+        self.assertAlmostEqual(5.0, abierto.data["flota"]["horas_en_uso"], places=3)
+
+        with mock.patch("django.utils.timezone.now", return_value=ahora + timedelta(minutes=1)):
+            despues = self.client.get(url, HTTP_IF_NONE_MATCH=abierto["ETag"])
+            self.assertEqual(
+                304,
+                self.client.get(
+                    url, {"desde": "2024-02-01", "hasta": "2024-02-29"}, HTTP_IF_NONE_MATCH=cerrado["ETag"]
+                ).status_code,
+            )
+        self.assertEqual(200, despues.status_code)
+        self.assertNotEqual(abierto["ETag"], despues["ETag"])
+        self.assertAlmostEqual(5.0 + 1 / 60, despues.data["flota"]["horas_en_uso"], places=3)
+
+    def test_concurrencia_incluye_prestamos_abiertos_al_inicio_del_rango(self) -> None:
+        self._prestamo(1, datetime(2024, 2, 29, 23, 0), Turno.T3, EstadoPrestamo.DEVUELTO)
+        self._prestamo(2, datetime(2024, 3, 1, 7, 0), Turno.T1, EstadoPrestamo.DEVUELTO)
+        self._prestamo(3, datetime(2024, 3, 1, 9, 0), Turno.T1, EstadoPrestamo.DEVUELTO)
+        for cedula, devolucion in (("701", (7, 30)), ("702", (10, 0)), ("703", (11, 0))):
+            PrestamoModel.objects.filter(cedula=cedula).update(
+                fecha_hora_devolucion=datetime(2024, 3, 1, *devolucion, tzinfo=BOGOTA)
+            )
+
+        response = self.client.get(
+            reverse("reporte-concurrencia"), {"desde": "2024-03-01", "hasta": "2024-03-01", "paso": 360}
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, response.data["pico"])
+        self.assertEqual([1, 2, 0, 0], [p["maximo"] for p in response.data["serie"]])
+        self.assertEqual(
+            [("2024-02-29", "Turno 3 (10 pm - 6 am)", 1), ("2024-03-01", "Turno 1 (6 am - 2 pm)", 2)],
+            [(p["dia"], p["turno"], p["pico"]) for p in response.data["turnos"] if p["pico"]],
+        )
+
+    def test_concurrencia_corta_lo_abierto_en_el_minuto_en_curso(self) -> None:
+        # Abierto desde semanas antes del rango: entra por el seek por radio, no por recorrer el historico
+        self._prestamo(1, datetime(2024, 2, 1, 7, 0), Turno.T1, EstadoPrestamo.ASIGNADO)
+        self._prestamo(2, datetime(2024, 2, 2, 7, 0), Turno.T1, EstadoPrestamo.DEVUELTO, datetime(2024, 2, 2, 9, 0))
+        url = reverse("reporte-concurrencia")
+        params = {"desde": "2024-03-01", "hasta": "2024-03-01", "paso": 360}
+        ahora = datetime(2024, 3, 1, 12, 0, 10, tzinfo=BOGOTA)
+
+        with mock.patch("django.utils.timezone.now", return_value=ahora):
+            response = self.client.get(url, params)
+            self.assertEqual(304, self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"]).status_code)
+        with mock.patch("django.utils.timezone.now", return_value=ahora + timedelta(minutes=1)):
+            despues = self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual([1, 1, 0, 0], [p["maximo"] for p in response.data["serie"]])
+        self.assertEqual(200, despues.status_code)
+        self.assertNotEqual(response["ETag"], despues["ETag"])
+
+    def test_mapa_calor_cuenta_cada_evento_en_su_hora_local(self) -> None:
+        # 2024-03-01 es viernes (fila 4); las 23:30 locales ya son sabado en UTC
+        self._prestamo(1, datetime(2024, 3, 1, 23, 30), Turno.T3, EstadoPrestamo.DEVUELTO)
+        PrestamoModel.objects.filter(cedula="701").update(
+            fecha_hora_devolucion=datetime(2024, 3, 2, 5, 15, tzinfo=BOGOTA)
+        )
+        self._prestamo(2, datetime(2024, 3, 4, 7, 0), Turno.T1, EstadoPrestamo.ASIGNADO)
+        self._prestamo(3, datetime(2024, 3, 4, 7, 45), Turno.T1, EstadoPrestamo.ASIGNADO)
+        url = reverse("reporte-mapa-calor")
+
+        response = self.client.get(url, {"desde": "2024-03-01", "hasta": "2024-03-07"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("lunes", response.data["dias_semana"][0])
+        asignaciones, devoluciones = response.data["asignaciones"], response.data["devoluciones"]
+        self.assertEqual((1, 2), (asignaciones[4][23], asignaciones[0][7]))
+        self.assertEqual(3, sum(map(sum, asignaciones)))
+        self.assertEqual(1, devoluciones[5][5])
+        self.assertEqual(1, sum(map(sum, devoluciones)))
+
+        response = self.client.get(url, {"desde": "2024-03-01", "hasta": "2024-03-07", "turno": "3"})
+        self.assertEqual("Turno 3 (10 pm - 6 am)", response.data["turno"])
+        self.assertEqual(1, sum(map(sum, response.data["asignaciones"])))
+        self.assertEqual(400, self.client.get(url, {"turno": "4"}).status_code)
+
+    def test_mapa_calor_sin_parametros_no_sirve_el_rango_de_ayer(self) -> None:
+        url = reverse("reporte-mapa-calor")
+        self._prestamo(1, datetime(2024, 3, 2, 7, 0), Turno.T1, EstadoPrestamo.ASIGNADO)
+
+        with mock.patch("django.utils.timezone.now", return_value=datetime(2024, 3, 1, 23, 0, tzinfo=BOGOTA)):
+            ayer = self.client.get(url)
+        with mock.patch("django.utils.timezone.now", return_value=datetime(2024, 3, 2, 8, 0, tzinfo=BOGOTA)):
+            hoy = self.client.get(url, HTTP_IF_NONE_MATCH=ayer["ETag"])
+
+        self.assertEqual(0, sum(map(sum, ayer.data["asignaciones"])))
+        self.assertEqual((200, 1), (hoy.status_code, sum(map(sum, hoy.data["asignaciones"]))))
+
+    def test_entrega_turno_congela_el_turno_cerrado_y_luego_lo_lee(self) -> None:
+        self._prestamo(1, datetime(2024, 3, 1, 7, 0), Turno.T1, EstadoPrestamo.DEVUELTO)
+        PrestamoModel.objects.filter(cedula="701").update(
+            fecha_hora_devolucion=datetime(2024, 3, 1, 9, 0, tzinfo=BOGOTA)
+        )
+        self._prestamo(2, datetime(2024, 3, 1, 13, 0), Turno.T1, EstadoPrestamo.ASIGNADO)
+        url = reverse("reporte-entrega-turno")
+
+        response = self.client.get(url, {"dia": "2024-03-01", "turno": "1"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(["RF-2"], [p["codigo_radio"] for p in response.data["pendientes"]])
+        self.assertEqual(["RF-1", "RF-2"], [p["codigo_radio"] for p in response.data["prestados"]])
+        self.assertEqual(120.0, response.data["media_minutos_devueltos"])
+        self.assertEqual(60.0, response.data["pendientes"][0]["minutos_en_uso"])
+        self.assertIsNotNone(response.data["congelada_en"])
+
+        # Cambios posteriores no alteran la foto congelada
+        PrestamoModel.objects.filter(cedula="702").update(
+            estado=EstadoPrestamo.DEVUELTO.value, fecha_hora_devolucion=datetime(2024, 3, 1, 13, 30, tzinfo=BOGOTA)
+        )
+        response = self.client.get(url, {"dia": "2024-03-01", "turno": "1"}, HTTP_IF_NONE_MATCH="")
+        self.assertEqual(["RF-2"], [p["codigo_radio"] for p in response.data["pendientes"]])
+        self.assertEqual(1, EntregaTurnoModel.objects.count())
+        self.assertEqual(400, self.client.get(url, {"dia": "2024-03-01"}).status_code)
+        self.assertEqual(200, self.client.get(url).status_code)  # ultimo turno cerrado
+
+    def test_entrega_turno_sin_parametros_no_repite_el_turno_anterior_con_304(self) -> None:
+        url = reverse("reporte-entrega-turno")
+        tarde = datetime(2024, 3, 1, 15, 0, tzinfo=BOGOTA)
+
+        with mock.patch("django.utils.timezone.now", return_value=tarde):
+            primera = self.client.get(url)
+            self.assertEqual(304, self.client.get(url, HTTP_IF_NONE_MATCH=primera["ETag"]).status_code)
+            en_curso = self.client.get(url, {"dia": "2024-03-01", "turno": "2"})
+        with mock.patch("django.utils.timezone.now", return_value=tarde.replace(hour=22, minute=30)):
+            noche = self.client.get(url, HTTP_IF_NONE_MATCH=primera["ETag"])
+            cerrado = self.client.get(url, {"dia": "2024-03-01", "turno": "2"}, HTTP_IF_NONE_MATCH=en_curso["ETag"])
+
+        self.assertEqual("Turno 1 (6 am - 2 pm)", primera.data["turno"])
+        self.assertEqual((200, "Turno 2 (2 pm - 10 pm)"), (noche.status_code, noche.data["turno"]))
+        # El turno en curso se corto a las 15:00; ya cerrado, la foto llega hasta las 22:00
+        self.assertEqual(200, cerrado.status_code)
+        self.assertEqual("2024-03-01T22:00:00-05:00", cerrado.data["corte"])
+
+    def test_comando_congela_los_turnos_cerrados(self) -> None:
+        call_command("congelar_entregas", "--dias", "1", stdout=io.StringIO())
+        self.assertEqual(3, EntregaTurnoModel.objects.count())
+        out = io.StringIO()
+        call_command("congelar_entregas", stdout=out)
+        self.assertIn("0 entrega(s)", out.getvalue())
+
+
+    def test_empleados_mes_pivota_en_json_y_csv(self) -> None:
+        self._prestamo(1, datetime(2024, 1, 31, 23, 0), Turno.T3, EstadoPrestamo.DEVUELTO)  # 1 feb en UTC
+        PrestamoModel.objects.filter(cedula="701").update(
+            fecha_hora_devolucion=datetime(2024, 2, 1, 1, 30, tzinfo=BOGOTA)
+        )
+        self._prestamo(2, datetime(2024, 2, 10, 8, 0), Turno.T1, EstadoPrestamo.ASIGNADO)
+        url = reverse("reporte-empleados-mes")
+
+        response = self.client.get(url, {"desde": "2024-01", "hasta": "2024-02"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(["2024-01", "2024-02"], response.data["meses"])
+        filas = {f["cedula"]: f for f in response.data["empleados"]}
+        self.assertEqual([1, 0], filas["701"]["prestamos"])
+        self.assertAlmostEqual(2.5, filas["701"]["horas"][0], places=3)
+        self.assertEqual(([0, 1], [0.0, 0.0]), (filas["702"]["prestamos"], filas["702"]["horas"]))
+
+        response = self.client.get(url, {"desde": "2024-01", "hasta": "2024-02", "formato": "csv"})
+        lineas = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual("Cédula,Empleado,2024-01 préstamos,2024-01 horas,2024-02 préstamos,2024-02 horas", lineas[0])
+        self.assertEqual("701,Empleado 1,1,2.50,0,0.00", lineas[1])
+        self.assertEqual(400, self.client.get(url, {"desde": "2024-13"}).status_code)
+
+    def test_empleados_mes_sin_parametros_cambia_de_etag_al_cambiar_de_mes(self) -> None:
+        url = reverse("reporte-empleados-mes")
+
+        with mock.patch("django.utils.timezone.now", return_value=datetime(2024, 2, 29, 12, 0, tzinfo=BOGOTA)):
+            febrero = self.client.get(url)
+            self.assertEqual(304, self.client.get(url, HTTP_IF_NONE_MATCH=febrero["ETag"]).status_code)
+        with mock.patch("django.utils.timezone.now", return_value=datetime(2024, 3, 1, 12, 0, tzinfo=BOGOTA)):
+            marzo = self.client.get(url, HTTP_IF_NONE_MATCH=febrero["ETag"])
+
+        self.assertEqual(("2023-03", "2024-02"), (febrero.data["meses"][0], febrero.data["meses"][-1]))
+        self.assertEqual(200, marzo.status_code)
+        self.assertEqual(("2023-04", "2024-03"), (marzo.data["meses"][0], marzo.data["meses"][-1]))
+
+    @unittest.skipIf(ANALITICA_DISPONIBLE, "duckdb instalado")
+    def test_analitica_sin_duckdb_responde_503(self) -> None:
+        response = self.client.get(reverse("reporte-analitica", args=["radios"]))
+
+        self.assertEqual(503, response.status_code)
+
+    def test_analitica_delega_en_el_motor_y_responde_columnas_y_filas(self) -> None:
+        resultado = ResultadoAnalitico(consulta="radios", columnas=["codigo_radio", "prestamos"], filas=[["RF-1", 3]])
+        with self.settings(ANALITICA_SQLITE="/tmp/analitica.sqlite3"), mock.patch(
+            "app.interfaces.views.reportes.ANALITICA_DISPONIBLE", True
+        ), mock.patch("app.infrastructure.analitica.DuckDBAnaliticaRepository.consultar", return_value=resultado) as consultar:
+            response = self.client.get(
+                reverse("reporte-analitica", args=["radios"]), {"desde": "2024-03-01", "hasta": "2024-03-31", "limite": 5}
+            )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual((["codigo_radio", "prestamos"], [["RF-1", 3]]), (response.data["columnas"], response.data["filas"]))
+        self.assertEqual(("radios", 5), (consultar.call_args.args[0], consultar.call_args.kwargs["limite"]))
+        self.assertEqual(datetime(2024, 3, 1, tzinfo=BOGOTA), consultar.call_args.kwargs["desde"])
+
+    def test_analitica_sin_snapshot_configurado_no_lee_la_base_en_linea(self) -> None:
+        with self.settings(ANALITICA_SQLITE=None), mock.patch("app.interfaces.views.reportes.ANALITICA_DISPONIBLE", True):
+            response = self.client.get(reverse("reporte-analitica", args=["radios"]))
+
+        self.assertEqual(503, response.status_code)
+        self.assertIn("ANALITICA_SQLITE", response.data["detail"])
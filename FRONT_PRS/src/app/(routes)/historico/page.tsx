@@ -3,10 +3,8 @@
 
 import { useEffect, useMemo, useRef, useState } from "react";
 import Menu from "@/components/Menu";
-import { apiGET } from "@/lib/api";
-import type { PrestamoResp } from "@/lib/types";
-import { exportXLSX } from "@/lib/xlsx";
-import { rowsToCSV, downloadCSV } from "@/lib/csv";
+import { apiDownload, apiGET, cursorDe } from "@/lib/api";
+import type { CursorPage, PrestamoResp, ResumenPrestamos } from "@/lib/types";
 
 /* ----------------------------- Helpers ----------------------------- */
 type SortKey = keyof Pick<
@@ -23,18 +21,8 @@ type SortKey = keyof Pick<
 >;
 type Order = "asc" | "desc";
 
-const headers: Record<string, string> = {
-  id: "ID",
-  cedula: "Cédula",
-  empleado_nombre: "Empleado",
-  usuario_sap: "Usuario SAP",
-  codigo_radio: "RF",
-  turno: "Turno",
-  estado: "Estado",
-  fecha_hora_prestamo: "Prestado",
-  fecha_hora_devolucion: "Devuelto",
-  usuario_registra: "Registrado por",
-};
+/** Filas por pedido al backend; el resto se trae con "Cargar más" siguiendo el cursor. */
+const PAGE_LIMIT = 200;
 
 function parseDate(v?: string | null): Date | null {
   if (!v) return null;
@@ -94,7 +82,10 @@ export default function HistoricoPage() {
   const [qHasta, setQHasta] = useState("");
 
   const [rows, setRows] = useState<PrestamoResp[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [resumen, setResumen] = useState<ResumenPrestamos | null>(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [err, setErr] = useState<string | null>(null);
   const [lastUpdated, setLastUpdated] = useState<Date | null>(null);
 
@@ -110,15 +101,34 @@ export default function HistoricoPage() {
   const [autoRefresh, setAutoRefresh] = useState(false);
   const timerRef = useRef<ReturnType<typeof setInterval> | null>(null);
 
+  function filterParams() {
+    const params = new URLSearchParams();
+    if (qCedula) params.set("cedula", qCedula.trim());
+    if (qRadio) params.set("codigo_radio", qRadio.trim());
+    if (qSAP) params.set("usuario_sap", qSAP.trim());
+    if (qNombre) params.set("empleado_nombre", qNombre.trim());
+    if (qEstado) params.set("estado", qEstado);
+    if (qTurno) params.set("turno", qTurno);
+    if (qDesde) params.set("desde", qDesde);
+    if (qHasta) params.set("hasta", qHasta);
+    return params;
+  }
+
+  // Primera pagina del listado + totales del filtro completo calculados en el servidor
   async function load() {
     setLoading(true);
     setErr(null);
     try {
-      const params = new URLSearchParams();
-      if (qCedula) params.set("cedula", qCedula.trim());
-      if (qRadio) params.set("codigo_radio", qRadio.trim());
-      const data = await apiGET<PrestamoResp[]>(`/prestamos/?${params.toString()}`);
-      setRows(Array.isArray(data) ? data : []);
+      const filtros = filterParams().toString();
+      const params = filterParams();
+      params.set("limit", String(PAGE_LIMIT));
+      const [data, totales] = await Promise.all([
+        apiGET<CursorPage<PrestamoResp>>(`/prestamos/?${params.toString()}`),
+        apiGET<ResumenPrestamos>(`/prestamos/resumen/?${filtros}`),
+      ]);
+      setRows(Array.isArray(data?.results) ? data.results : []);
+      setNextCursor(cursorDe(data?.next));
+      setResumen(totales);
       setPage(1);
       setLastUpdated(new Date());
     } catch (e: any) {
@@ -128,6 +138,29 @@ export default function HistoricoPage() {
     }
   }
 
+  // Sigue el cursor `next` y agrega la pagina siguiente a las ya cargadas
+  async function loadMore() {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    setErr(null);
+    try {
+      const params = filterParams();
+      params.set("limit", String(PAGE_LIMIT));
+      params.set("cursor", nextCursor);
+      const data = await apiGET<CursorPage<PrestamoResp>>(`/prestamos/?${params.toString()}`);
+      const nuevos = Array.isArray(data?.results) ? data.results : [];
+      setRows((prev) => {
+        const ids = new Set(prev.map((r) => r.id));
+        return [...prev, ...nuevos.filter((r) => !ids.has(r.id))];
+      });
+      setNextCursor(cursorDe(data?.next));
+    } catch (e: any) {
+      setErr(e?.message || "No fue posible cargar más registros.");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   useEffect(() => {
     load(); // primera carga
     return () => {
@@ -146,27 +179,8 @@ export default function HistoricoPage() {
     }
   }, [autoRefresh]); // eslint-disable-line react-hooks/exhaustive-deps
 
-  // filtros client-side + orden
-  const filtered = useMemo(() => {
-    let r = rows;
-    if (qSAP) r = r.filter((x) => x.usuario_sap?.toLowerCase().includes(qSAP.toLowerCase()));
-    if (qNombre) r = r.filter((x) => x.empleado_nombre?.toLowerCase().includes(qNombre.toLowerCase()));
-    if (qEstado) r = r.filter((x) => x.estado === qEstado);
-    if (qTurno) {
-      const t = qTurno === "1" ? "Turno 1" : qTurno === "2" ? "Turno 2" : "Turno 3";
-      r = r.filter((x) => x.turno?.startsWith(t));
-    }
-    if (qDesde) {
-      const d = new Date(qDesde);
-      r = r.filter((x) => parseDate(x.fecha_hora_prestamo)! >= d);
-    }
-    if (qHasta) {
-      const d = new Date(qHasta);
-      d.setHours(23, 59, 59, 999);
-      r = r.filter((x) => parseDate(x.fecha_hora_prestamo)! <= d);
-    }
-    return sortRows(r, sortKey, sortOrder);
-  }, [rows, qSAP, qNombre, qEstado, qTurno, qDesde, qHasta, sortKey, sortOrder]);
+  // los filtros se aplican en el servidor; aqui solo se ordenan las paginas cargadas
+  const filtered = useMemo(() => sortRows(rows, sortKey, sortOrder), [rows, sortKey, sortOrder]);
 
   const total = filtered.length;
   const pages = Math.max(1, Math.ceil(total / pageSize));
@@ -184,22 +198,22 @@ export default function HistoricoPage() {
     }
   }
 
-  const openCount = filtered.filter((r) => (r.estado || "").toUpperCase() !== "DEVUELTO").length;
+  // Totales de todo el filtro (no solo de lo cargado); mientras llegan, lo cargado
+  const totalFiltro = resumen?.total ?? total;
+  const openCount = resumen?.abiertos ?? filtered.filter((r) => (r.estado || "").toUpperCase() !== "DEVUELTO").length;
 
   /* ----------------------------- Export handlers ----------------------------- */
+  // El backend genera el archivo en streaming con los mismos filtros del listado
   async function onExportXLSX() {
-    await exportXLSX(filtered, headers, {
-      filename: "historico.xlsx",
-      sheetName: "Histórico",
-      dateKeys: ["fecha_hora_prestamo", "fecha_hora_devolucion"],
-    });
+    const params = filterParams();
+    params.set("formato", "xlsx");
+    await apiDownload(`/prestamos/exportar/?${params.toString()}`, "historico.xlsx");
   }
-  function onExportCSV() {
-    const csv = rowsToCSV(filtered, headers, { delimiter: ",", includeBOM: true, excelSepDirective: true });
-    downloadCSV(csv, "historico.csv");
+  async function onExportCSV() {
+    const params = filterParams();
+    params.set("formato", "csv");
+    await apiDownload(`/prestamos/exportar/?${params.toString()}`, "historico.csv");
   }
-
-  /* ----------------------------- UI ----------------------------- */
   return (
     <>
       {/* Top bar más ancha */}
@@ -208,7 +222,7 @@ export default function HistoricoPage() {
           <div className="flex items-center gap-3">
             <h1 className="text-2xl tracking-tight font-semibold">Histórico</h1>
             <div className="hidden md:flex items-center gap-2">
-              <span className="badge bg-cloud/60 dark:bg-coffee/40">Total: <b>{total}</b></span>
+              <span className="badge bg-cloud/60 dark:bg-coffee/40">Total: <b>{totalFiltro}</b></span>
               <span className="badge bg-cloud/60 dark:bg-coffee/40">Abiertos: <b>{openCount}</b></span>
             </div>
           </div>
@@ -376,9 +390,14 @@ export default function HistoricoPage() {
           {/* Paginación */}
           <div className="flex items-center justify-between mt-4">
             <div className="table-footnote">
-              Página {page} de {pages} · Mostrando {pageRows.length} de {total}
+              Página {page} de {pages} · Mostrando {pageRows.length} de {total} cargados ({totalFiltro} en total)
             </div>
             <div className="flex items-center gap-2">
+              {nextCursor && (
+                <button className="btn btn-outline" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? "Cargando…" : "Cargar más"}
+                </button>
+              )}
               <button
                 className="btn btn-outline"
                 onClick={() => setPage(1)}
@@ -3,8 +3,8 @@
 
 import Link from "next/link";
 import { useEffect, useMemo, useRef, useState } from "react";
-import { apiGET } from "@/lib/api";
-import type { PrestamoResp } from "@/lib/types";
+import { apiGET, openEventStream } from "@/lib/api";
+import type { CursorPage, DeltaPage, PrestamoResp, ResumenPrestamos } from "@/lib/types";
 
 /** Utilidades */
 function parseDate(value?: string | null): Date | null {
@@ -40,6 +40,7 @@ function RowSkeleton({ idx }: { idx: number }) {
 
 export default function Home() {
   const [rows, setRows] = useState<PrestamoResp[]>([]);
+  const [resumen, setResumen] = useState<ResumenPrestamos | null>(null);
   const [loading, setLoading] = useState(true);
   const [err, setErr] = useState<string | null>(null);
   const [query, setQuery] = useState("");
@@ -47,11 +48,20 @@ export default function Home() {
   const [lastUpdated, setLastUpdated] = useState<Date | null>(null);
   const timerRef = useRef<ReturnType<typeof setInterval> | null>(null);
 
+  const watermarkRef = useRef<string | null>(null);
+
+  // Las métricas salen de un aggregate en el servidor; del listado basta la primera
+  // página (los más recientes) para "Últimos movimientos"
   async function load() {
     setErr(null);
     try {
-      const data = await apiGET<PrestamoResp[]>("/prestamos/");
-      setRows(Array.isArray(data) ? data : []);
+      const [data, totales] = await Promise.all([
+        apiGET<CursorPage<PrestamoResp>>("/prestamos/?limit=50"),
+        apiGET<ResumenPrestamos>("/prestamos/resumen/"),
+      ]);
+      setRows(Array.isArray(data?.results) ? data.results : []);
+      setResumen(totales);
+      watermarkRef.current = data?.watermark ?? "0";
       setLastUpdated(new Date());
     } catch (e: any) {
       setErr(e?.message || "No fue posible cargar los datos.");
@@ -60,6 +70,33 @@ export default function Home() {
     }
   }
 
+  // Auto-refresh incremental: solo trae filas creadas/modificadas desde el ultimo watermark
+  async function loadDelta() {
+    if (!watermarkRef.current) return load();
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const data = await apiGET<DeltaPage<PrestamoResp>>(
+          `/prestamos/?since=${encodeURIComponent(watermarkRef.current)}`
+        );
+        const changes = Array.isArray(data?.results) ? data.results : [];
+        if (changes.length) {
+          setRows((prev) => {
+            const byId = new Map(prev.map((r) => [r.id, r]));
+            for (const c of changes) byId.set(c.id, c);
+            return [...byId.values()];
+          });
+        }
+        watermarkRef.current = data?.watermark ?? watermarkRef.current;
+        hasMore = Boolean(data?.has_more);
+      }
+      setResumen(await apiGET<ResumenPrestamos>("/prestamos/resumen/"));
+      setLastUpdated(new Date());
+    } catch (e: any) {
+      setErr(e?.message || "No fue posible cargar los datos.");
+    }
+  }
+
   useEffect(() => {
     load();
     return () => {
@@ -67,49 +104,36 @@ export default function Home() {
     };
   }, []);
 
-  // Auto-actualizar cada 30s
+  // Auto-actualizar: push por SSE; sin EventSource o sin servidor ASGI, polling cada 30s
   useEffect(() => {
     if (timerRef.current) {
       clearInterval(timerRef.current);
       timerRef.current = null;
     }
-    if (autoRefresh) {
-      timerRef.current = setInterval(load, 30_000);
-    }
-  }, [autoRefresh]);
+    if (!autoRefresh) return;
+    let activo = true;
+    let cerrar: (() => void) | null = null;
+    const onChange = () => void loadDelta();
+    void openEventStream("/prestamos/stream/", { asignado: onChange, devuelto: onChange, reset: onChange }).then(
+      (close) => {
+        if (!activo) return close?.();
+        if (close) cerrar = close;
+        else timerRef.current = setInterval(loadDelta, 30_000);
+      },
+    );
+    return () => {
+      activo = false;
+      cerrar?.();
+      if (timerRef.current) clearInterval(timerRef.current);
+      timerRef.current = null;
+    };
+  }, [autoRefresh]); // eslint-disable-line react-hooks/exhaustive-deps
 
   /** Cálculos */
-  const total = rows.length;
-
-  // Consideramos "abierto" si NO hay fecha de devolución,
-  // o si el estado no es "DEVUELTO" por si el backend cambia el flag.
-  const abiertos = useMemo(
-    () =>
-      rows.filter(
-        (r) =>
-          !r.fecha_hora_devolucion ||
-          (typeof r.estado === "string" && r.estado.toUpperCase() !== "DEVUELTO")
-      ).length,
-    [rows]
-  );
-
-  const prestadosHoy = useMemo(() => {
-    const d0 = new Date(); d0.setHours(0, 0, 0, 0);
-    const d1 = new Date(d0); d1.setDate(d1.getDate() + 1);
-    return rows.filter((r) => {
-      const t = parseDate(r.fecha_hora_prestamo);
-      return t && t >= d0 && t < d1;
-    }).length;
-  }, [rows]);
-
-  const devueltosHoy = useMemo(() => {
-    const d0 = new Date(); d0.setHours(0, 0, 0, 0);
-    const d1 = new Date(d0); d1.setDate(d1.getDate() + 1);
-    return rows.filter((r) => {
-      const t = parseDate(r.fecha_hora_devolucion);
-      return t && t >= d0 && t < d1;
-    }).length;
-  }, [rows]);
+  const total = resumen?.total ?? 0;
+  const abiertos = resumen?.abiertos ?? 0;
+  const prestadosHoy = resumen?.prestados_hoy ?? 0;
+  const devueltosHoy = resumen?.devueltos_hoy ?? 0;
 
   const ultimos = useMemo(() => {
     const sorted = [...rows].sort((a, b) => {
@@ -174,13 +174,29 @@ export async function apiGET<T>(path: string): Promise<T> {
     {
       method: "GET",
       headers: { "Content-Type": "application/json" },
-      cache: "no-store",
+      // no-cache: el navegador revalida con If-None-Match y reutiliza el cuerpo ante un 304
+      cache: "no-cache",
     },
   );
   if (!res.ok) throw new Error(await safeErr(res));
   return res.json();
 }
 
+/** Descarga un archivo generado por el backend (p. ej. exportaciones) y lo guarda con `filename`. */
+export async function apiDownload(path: string, filename: string): Promise<void> {
+  const res = await fetchWithAuth(path, { method: "GET", cache: "no-store" });
+  if (!res.ok) throw new Error(await safeErr(res));
+  const blob = await res.blob();
+  const url = URL.createObjectURL(blob);
+  const a = document.createElement("a");
+  a.href = url;
+  a.download = filename;
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+  URL.revokeObjectURL(url);
+}
+
 export async function apiPOST<T>(path: string, body: unknown): Promise<T> {
   const res = await fetchWithAuth(
     path,
@@ -217,3 +233,62 @@ export async function apiDELETE(path: string): Promise<void> {
   );
   if (!res.ok) throw new Error(await safeErr(res));
 }
+
+/** Cursor opaco del enlace `next` de una pagina (la URL absoluta puede no coincidir con API_BASE tras un proxy). */
+export function cursorDe(next: string | null | undefined): string | null {
+  if (!next) return null;
+  try {
+    return new URL(next, API_BASE).searchParams.get("cursor");
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Abre un stream SSE autenticado con un ticket de un solo uso: EventSource no
+ * permite cabeceras y un JWT en la URL quedaria en los access logs. La
+ * reconexion automatica reusa la URL y falla (ticket ya consumido), asi que se
+ * reabre con un ticket nuevo
+ * desde el ultimo id recibido. Devuelve null si el entorno no soporta
+ * EventSource o el backend no sirve SSE (WSGI): el llamador hace polling.
+ */
+export async function openEventStream(
+  path: string,
+  handlers: Record<string, (evt: MessageEvent) => void>,
+): Promise<(() => void) | null> {
+  if (typeof window === "undefined" || typeof EventSource === "undefined") return null;
+  let source: EventSource | null = null;
+  let cerrado = false;
+  let ultimoId = "";
+
+  const abrir = async (): Promise<boolean> => {
+    const res = await fetchWithAuth(`${path}ticket/`, { method: "POST" });
+    if (!res.ok) return false;
+    const { ticket } = (await res.json()) as { ticket: string };
+    if (cerrado) return true;
+    const params = new URLSearchParams({ ticket });
+    if (ultimoId) params.set("lastEventId", ultimoId);
+    const sep = path.includes("?") ? "&" : "?";
+    const es = new EventSource(`${API_BASE}${path}${sep}${params}`);
+    for (const [evt, fn] of Object.entries(handlers)) {
+      es.addEventListener(evt, (e) => {
+        const msg = e as MessageEvent;
+        ultimoId = msg.lastEventId || ultimoId;
+        fn(msg);
+      });
+    }
+    es.onerror = () => {
+      if (es.readyState === EventSource.CLOSED && !cerrado) {
+        setTimeout(() => void abrir().catch(() => undefined), 3000);
+      }
+    };
+    source = es;
+    return true;
+  };
+
+  if (!(await abrir().catch(() => false))) return null;
+  return () => {
+    cerrado = true;
+    source?.close();
+  };
+}
@@ -12,6 +12,28 @@ export type PrestamoResp = {
   fecha_hora_devolucion: string | null;
 };
 
+/** Respuesta paginada por cursor (keyset) del backend. */
+export type CursorPage<T> = {
+  next: string | null;
+  watermark: string | null;
+  results: T[];
+};
+
+/** Totales de todo el filtro calculados en el servidor (GET /prestamos/resumen/). */
+export type ResumenPrestamos = {
+  total: number;
+  abiertos: number;
+  prestados_hoy: number;
+  devueltos_hoy: number;
+};
+
+/** Respuesta del modo delta (?since=watermark) del listado de prestamos. */
+export type DeltaPage<T> = {
+  watermark: string | null;
+  has_more: boolean;
+  results: T[];
+};
+
 export type Empleado = { cedula: string; nombre: string; activo: boolean };
 export type Radio    = { codigo: string; descripcion: string | null; activo: boolean };
 export type SapUsuario = {